@@ -13,36 +13,63 @@ load_dotenv(dotenv_path=env_path)
 GITHUB_PAT = os.getenv("GITHUB_PAT")
 GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY")
 
-if not GITHUB_PAT:
-    raise ValueError("GITHUB_PAT is not set in .env")
 if not GOOGLE_API_KEY:
     raise ValueError("GOOGLE_API_KEY is not set in .env")
 
-# Initialize GitHub MCP tool
-github_tool = MCPToolset(
-    connection_params=StdioServerParameters(
-        command="docker",
-        args=[
-            "run", "-i", "--rm",
-            "-e", f"GITHUB_PERSONAL_ACCESS_TOKEN={GITHUB_PAT}",
-            "ghcr.io/github/github-mcp-server"
-        ]
+
+def pooled_tools():
+    """
+    Inside the Django project (the agent pool's workers), the safe GitHub
+    tools over its shared MCP session pool; None when loaded on its own,
+    e.g. by `adk run` on the replay path.
+    """
+    if not os.getenv("DJANGO_SETTINGS_MODULE"):
+        return None
+    try:
+        from django.conf import settings
+        from issues.services.github_tools import TOOLS
+
+        settings.GITHUB_MCP_SERVER
+    except Exception:
+        return None
+    return TOOLS
+
+
+def standalone_tools():
+    if not GITHUB_PAT:
+        raise ValueError("GITHUB_PAT is not set in .env")
+
+    # A GitHub MCP server started by this process alone
+    github_tool = MCPToolset(
+        connection_params=StdioServerParameters(
+            command="docker",
+            args=[
+                "run", "-i", "--rm",
+                "-e", f"GITHUB_PERSONAL_ACCESS_TOKEN={GITHUB_PAT}",
+                "ghcr.io/github/github-mcp-server"
+            ]
+        )
     )
-)
 
-# Keep only safe functions
-safe_function_names = {'list_issues', 'get_issue', 'get_issue_comments', 'search_issues'}
-github_tool.function_declarations = [
-    f for f in getattr(github_tool, 'function_declarations', [])
-    if getattr(f, 'name', None) in safe_function_names
-]
+    # Keep only safe functions
+    safe_function_names = {'list_issues', 'get_issue', 'get_issue_comments', 'search_issues'}
+    github_tool.function_declarations = [
+        f for f in getattr(github_tool, 'function_declarations', [])
+        if getattr(f, 'name', None) in safe_function_names
+    ]
+    return [github_tool] if github_tool.function_declarations else []
+
+
+tools = pooled_tools()
+if tools is None:
+    tools = standalone_tools()
 
 # Create agent with filtered tools
 agent = Agent(
     model="gemini-2.0-flash",
     name="github_issues_agent", 
     instruction="""
-You are a GitHub Issues Extractor with access to filtered GitHub MCP tools.
+You are a GitHub Issues Extractor with access to filtered GitHub tools.
 
 Given a GitHub URL (issue or repo), fetch issue info or list recent issues.
 Return ONLY JSON with:
@@ -54,7 +81,7 @@ Return ONLY JSON with:
 - labels
 - type
 
-Use only the safe MCP tools available to you.
+Use only the safe GitHub tools available to you.
 """,
-    tools=[github_tool] if github_tool.function_declarations else []
+    tools=tools
 )
@@ -0,0 +1,16 @@
+"""
+Celery application for github_issues_project.
+
+Start a worker with:
+    celery -A github_issues_project worker -l info
+"""
+
+import os
+
+from celery import Celery
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'github_issues_project.settings')
+
+app = Celery('github_issues_project')
+app.config_from_object('django.conf:settings', namespace='CELERY')
+app.autodiscover_tasks()
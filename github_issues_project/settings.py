@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/4.2/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -42,6 +43,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # First, so its span and timing cover the rest of the stack.
+    'issues.middleware.TelemetryMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -123,3 +126,240 @@ STATIC_URL = 'static/'
 # https://docs.djangoproject.com/en/4.2/ref/settings/#default-auto-field
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
+
+
+# Warm ADK agent worker pool (issues/services/agent_pool.py).
+# Set ADK_AGENT_POOL_ENABLED=0 to fall back to one `adk run --replay` per query.
+ADK_AGENT_POOL = {
+    'ENABLED': os.getenv('ADK_AGENT_POOL_ENABLED', '1') == '1',
+    'SIZE': int(os.getenv('ADK_AGENT_POOL_SIZE', '2')),
+    'MAX_REQUESTS': int(os.getenv('ADK_AGENT_POOL_MAX_REQUESTS', '100')),
+    'REQUEST_TIMEOUT': 120,
+    'HEARTBEAT_INTERVAL': 5,
+    'HEARTBEAT_TIMEOUT': 30,
+    'STARTUP_TIMEOUT': 60,
+    'RESTART_BACKOFF': 10,
+    'REPLAY_COMMAND': os.getenv('ADK_REPLAY_COMMAND', 'adk').split(),
+}
+
+# Shared GitHub MCP server sessions (issues/services/mcp_sessions.py).
+# Point COMMAND/ARGS at `python -m issues.testing.fake_mcp_server` to run
+# without Docker or network access. The github_mcp agent's tools use them
+# too (issues/services/github_tools.py), with one pool per agent pool worker
+# process, so up to ADK_AGENT_POOL SIZE + 1 pools of SIZE servers each.
+# Agents run by `adk` on the replay path still start their own server.
+GITHUB_MCP_SERVER = {
+    'COMMAND': 'docker',
+    'ARGS': ['run', '-i', '--rm', '-e', 'GITHUB_PERSONAL_ACCESS_TOKEN', 'ghcr.io/github/github-mcp-server'],
+    'ENV': {'GITHUB_PERSONAL_ACCESS_TOKEN': os.getenv('GITHUB_PAT', '')},
+}
+
+GITHUB_MCP_POOL = {
+    'SIZE': int(os.getenv('GITHUB_MCP_POOL_SIZE', '2')),
+    'MAX_IN_FLIGHT': 8,
+    'CALL_TIMEOUT': 30,
+    'STARTUP_TIMEOUT': 60,
+    'HEALTH_INTERVAL': 30,
+    'RETRY_AFTER': 60,
+}
+
+# Stored fix suggestions (issues/services/suggestion_cache.py). Bump the
+# agent version whenever the suggest-fix agent's model or instructions
+# change so old suggestions stop being served.
+SUGGEST_FIX_AGENT_VERSION = 'github_suggest_fix/gemini-2.0-flash/v1'
+
+SUGGESTION_CACHE = {
+    'TTL': 7 * 24 * 3600,
+    'LRU_SIZE': 512,
+}
+
+# Prompt building and compaction (issues/services/prompts.py). Budgets are
+# in tokens per prompt (per ticket for multi-ticket prompts); issue bodies
+# over budget are compacted.
+AGENT_PROMPTS = {
+    'TOKEN_BUDGETS': {
+        'github_suggest_fix': int(os.getenv('SUGGEST_FIX_PROMPT_TOKENS', '1500')),
+        'github_mcp': 500,
+    },
+    'MAX_TRACE_FRAMES': 8,
+    'PROSE_SHARE': 0.3,
+}
+
+# Repository path/symbol index (issues/services/repo_index.py), built with
+# `manage.py index_repo owner/repo <checkout or tarball>`.
+REPO_INDEX = {
+    'TOP_K': 8,
+    'CONTENT_BYTES': 64 * 1024,
+    'TERMS_PER_FILE': 200,
+    'MEMORY_TTL': 300,
+}
+
+# Near-duplicate ticket detection (issues/services/similarity.py). A ticket
+# whose estimated similarity to one with a stored suggestion reaches
+# REUSE_THRESHOLD is served that suggestion instead of calling the agent.
+SIMILARITY = {
+    'NUM_PERM': 128,
+    'BANDS': 32,
+    'SHINGLE_SIZE': 3,
+    'REUSE_THRESHOLD': float(os.getenv('SIMILARITY_REUSE_THRESHOLD', '0.8')),
+    'REUSE': os.getenv('SIMILARITY_REUSE', '1') == '1',
+    'REFRESH_INTERVAL': 5,
+}
+
+# Ticket full-text search (issues/services/ticket_search.py). The index is
+# FTS5 on SQLite and a tsvector column on Postgres, both from migration 0010.
+TICKET_SEARCH = {
+    'WEIGHTS': {'title': 10.0, 'body': 1.0, 'labels': 4.0},
+    'SNIPPET_WORDS': 16,
+    'PAGE_SIZE': 20,
+    'RANK_WINDOW': 2000,
+}
+
+# Multi-ticket suggest-fix requests (issues/services/batch_suggest.py)
+SUGGEST_BATCH = {
+    'TOKEN_BUDGET': int(os.getenv('SUGGEST_BATCH_TOKEN_BUDGET', '8000')),
+    'OUTPUT_TOKENS_PER_TICKET': 200,
+    'MAX_TICKETS': 20,
+    'CONCURRENCY': 2,
+    'TIMEOUT': 300,
+    'VIEW_LIMIT': 200,
+}
+
+# Coalescing of identical in-flight agent requests (issues/services/singleflight.py).
+# STORE "cache" shares locks and results through CACHES['default'], so set
+# REDIS_CACHE_URL to coalesce across web and Celery worker processes.
+SINGLEFLIGHT = {
+    'STORE': os.getenv('SINGLEFLIGHT_STORE', 'cache'),
+    'CACHE_ALIAS': 'default',
+    'LOCK_TTL': 300,
+    'RESULT_TTL': 30,
+    'POLL_INTERVAL': 0.05,
+    'WAIT_TIMEOUT': 300,
+}
+
+if os.getenv('REDIS_CACHE_URL'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.getenv('REDIS_CACHE_URL'),
+        }
+    }
+
+# Admission control for agent (Gemini) calls (issues/services/rate_limiter.py).
+# Set RATE_LIMIT_REDIS_URL (or REDIS_CACHE_URL) so web and Celery processes
+# share one budget; without it each process enforces the limits on its own.
+# RPM should sit a little under the project's Gemini quota.
+GEMINI_RATE_LIMIT = {
+    'ENABLED': os.getenv('GEMINI_RATE_LIMIT_ENABLED', '1') == '1',
+    'REDIS_URL': os.getenv('RATE_LIMIT_REDIS_URL') or os.getenv('REDIS_CACHE_URL'),
+    'RPM': int(os.getenv('GEMINI_RPM', '60')),
+    'BURST': 10,
+    'BULK_SHARE': 0.5,
+    'INITIAL_CONCURRENCY': 4,
+    'MIN_CONCURRENCY': 1,
+    'MAX_CONCURRENCY': 32,
+    'LATENCY_TARGET': 30,
+    'COOLDOWN': 10,
+    'ACQUIRE_TIMEOUT': {'interactive': 30, 'bulk': 600},
+}
+
+# Background pre-computation of suggestions (issues/services/suggestion_warmup.py)
+SUGGESTION_WARMUP = {
+    'CONCURRENCY': 2,
+    'PAGE_SIZE': 20,
+    'ORDER': os.getenv('SUGGESTION_WARMUP_ORDER', 'newest'),
+    'PRIORITY_LABELS': ['security', 'critical', 'bug'],
+    'TASK_LIMIT': 100,
+    'STALE_AFTER': 900,
+}
+
+# Celery (github_issues_project/celery.py)
+CELERY_BROKER_URL = os.getenv('CELERY_BROKER_URL', 'redis://localhost:6379/0')
+CELERY_TASK_IGNORE_RESULT = True
+CELERY_BEAT_SCHEDULE = {
+    'sync-repos': {
+        'task': 'issues.tasks.sync_repos_task',
+        'schedule': 300.0,
+    },
+    'warm-suggestions': {
+        'task': 'issues.tasks.warm_suggestions_task',
+        'schedule': 600.0,
+    },
+    'cleanup-old-sessions': {
+        'task': 'issues.tasks.cleanup_old_sessions',
+        'schedule': 3600.0,
+    },
+    'cleanup-old-jobs': {
+        'task': 'issues.tasks.cleanup_old_jobs',
+        'schedule': 86400.0,
+    },
+}
+
+# Background ticket extraction (issues/services/extraction_jobs.py).
+# RUNNER is "thread" (in-process pool, no broker needed) or "celery".
+EXTRACTION_JOBS = {
+    'RUNNER': os.getenv('EXTRACTION_JOB_RUNNER', 'thread'),
+    'THREADS': 4,
+    'MAX_TICKETS': 10,
+}
+
+# Archive-then-delete retention and idle session eviction
+# (issues/services/retention.py). Tickets are only removed when
+# cleanup_old_tickets is scheduled or `manage.py apply_retention` runs.
+RETENTION = {
+    'TICKET_DAYS': 30,
+    'JOB_DAYS': 14,
+    'CHUNK_SIZE': 500,
+    'CHUNK_PAUSE': 0,
+    'ARCHIVE': True,
+    'ARCHIVE_DIR': os.getenv('RETENTION_ARCHIVE_DIR') or None,
+    'SESSION_IDLE_SECONDS': 24 * 3600,
+}
+
+# Ticket follow-up conversations (issues/services/conversations.py). BACKEND
+# None keeps sessions in the cache when it is Redis, else in a per-process LRU.
+CONVERSATIONS = {
+    'BACKEND': os.getenv('CONVERSATION_BACKEND') or None,
+    'TTL': 7 * 24 * 3600,
+    'LOCAL_MAX_SESSIONS': 1000,
+    'MAX_TURNS': 4,
+    'HISTORY_TOKENS': 800,
+    'MAX_SESSION_BYTES': 32 * 1024,
+}
+
+# Streaming NDJSON/CSV export of tickets and suggestions
+# (issues/services/ticket_export.py).
+EXPORTS = {
+    'CHUNK_SIZE': 2000,
+    'BUFFER_BYTES': 64 * 1024,
+    'COMPRESS_LEVEL': 6,
+}
+
+# Buffered job/ticket event log (issues/services/job_events.py).
+JOB_EVENTS = {
+    'MIN_LEVEL': os.getenv('JOB_EVENTS_MIN_LEVEL', 'info'),
+    'MAX_BUFFER': 200,
+    'MAX_PER_JOB': 1000,
+    'MAX_PER_TICKET': 100,
+}
+
+# Read-only GitHub client used for canonical repo/issue URLs, bypassing the
+# LLM agent (issues/services/issue_extraction.py). Use
+# issues.services.github_client.LocalGitHubClient for offline runs.
+GITHUB_CLIENT = 'issues.services.github_client.MCPGitHubClient'
+# Repository sync needs ETag support, so it talks to the REST API directly.
+GITHUB_SYNC_CLIENT = 'issues.services.github_client.RESTGitHubClient'
+GITHUB_PAT = os.getenv('GITHUB_PAT', '')
+FAST_PATH_LIST_LIMIT = 30
+
+# OpenTelemetry spans and metrics (issues/services/telemetry.py). Metrics
+# are served at /metrics; OTLP export reads the standard
+# OTEL_EXPORTER_OTLP_* variables, e.g. OTEL_EXPORTER_OTLP_ENDPOINT.
+TELEMETRY = {
+    'ENABLED': os.getenv('TELEMETRY_ENABLED', '1') == '1',
+    'SERVICE_NAME': os.getenv('OTEL_SERVICE_NAME', 'github-issues'),
+    'OTLP': bool(os.getenv('OTEL_EXPORTER_OTLP_ENDPOINT')),
+    'CONSOLE': os.getenv('TELEMETRY_CONSOLE', '0') == '1',
+    'EXPORT_INTERVAL': 30,
+    'PROMETHEUS': True,
+}
@@ -16,10 +16,12 @@ Including another URLconf
 """
 from django.contrib import admin
 from django.urls import path, include
-from issues.views import home
+from issues.views import home, metrics_view
 
 urlpatterns = [
     path("admin/", admin.site.urls),
     path("issues/", include("issues.urls")), 
+    path("api/v1/", include("issues.api_urls", namespace="v1")),
+    path("metrics", metrics_view, name="metrics"),
     path('', home, name='home'), 
 ]
\ No newline at end of file
@@ -1,6 +1,43 @@
 from django.contrib import admin
-from .models import Ticket  # only import what exists
+from .models import ExtractionJob, JobEvent, RepositoryIndex, RepoSyncState, SuggestedFix, SuggestionWarmup, Ticket
 
 @admin.register(Ticket)
 class TicketAdmin(admin.ModelAdmin):
     list_display = ("repo", "owner", "issue_number", "title", "type")
+
+
+@admin.register(SuggestedFix)
+class SuggestedFixAdmin(admin.ModelAdmin):
+    list_display = ("ticket", "agent_version", "created_at", "expires_at", "hits", "generation_ms")
+    raw_id_fields = ("ticket",)
+
+
+@admin.register(ExtractionJob)
+class ExtractionJobAdmin(admin.ModelAdmin):
+    list_display = ("id", "url", "status", "stage", "progress", "created_at", "finished_at")
+    list_filter = ("status",)
+
+
+@admin.register(JobEvent)
+class JobEventAdmin(admin.ModelAdmin):
+    list_display = ("job", "seq", "level", "stage", "message", "ticket", "created_at")
+    list_filter = ("level", "stage")
+    raw_id_fields = ("job", "ticket")
+
+
+@admin.register(RepoSyncState)
+class RepoSyncStateAdmin(admin.ModelAdmin):
+    list_display = ("owner", "repo", "enabled", "cursor", "last_status", "last_synced_at", "issues_synced")
+    list_filter = ("enabled", "last_status")
+
+
+@admin.register(SuggestionWarmup)
+class SuggestionWarmupAdmin(admin.ModelAdmin):
+    list_display = ("id", "status", "order", "processed", "total", "succeeded", "failed", "created_at", "finished_at")
+    list_filter = ("status",)
+
+
+@admin.register(RepositoryIndex)
+class RepositoryIndexAdmin(admin.ModelAdmin):
+    list_display = ("owner", "repo", "commit_sha", "file_count", "symbol_count", "build_ms", "built_at")
+    exclude = ("data",)
@@ -0,0 +1,210 @@
+# issues/api.py
+"""
+Versioned REST API over tickets and stored suggestions (/api/v1/).
+
+Lists use the ticket list's (created_at, id) keyset: ?after= / ?before=
+cursors and ?page_size= up to MAX_PAGE_SIZE, so a deep page costs the same
+as the first. ?fields=a,b returns only those fields and reads only their
+columns; lists leave out body and payload unless asked for. Filters are
+equality on indexed columns, plus ?updated_since= for tickets.
+
+Every GET carries an ETag, computed from a first query that reads only ids
+and version columns, and tickets a Last-Modified from updated_at. A
+matching If-None-Match or If-Modified-Since gets a 304 before any row is
+loaded in full, so polling an unchanged page costs one index lookup.
+Suggestions have no column that moves on every change, so they carry no
+Last-Modified and are validated by ETag alone.
+PATCH on a ticket honours If-Match and answers 412 if it changed since.
+"""
+import hashlib
+from collections import namedtuple
+
+from django.shortcuts import get_object_or_404
+from django.utils import timezone
+from django.utils.cache import get_conditional_response
+from django.utils.dateparse import parse_datetime
+from django.utils.http import http_date
+from rest_framework.exceptions import ValidationError
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+from rest_framework.views import APIView
+
+from issues.models import SuggestedFix, Ticket
+from issues.serializers import SuggestionSerializer, TicketSerializer
+from issues.services.ticket_listing import DEFAULT_PAGE_SIZE, InvalidCursor, keyset_page
+
+Resource = namedtuple(
+    "Resource", ["model", "serializer", "list_fields", "columns", "filters", "version_fields", "modified_field"]
+)
+
+TICKETS = Resource(
+    Ticket, TicketSerializer,
+    [name for name in TicketSerializer.Meta.fields if name != "body"],
+    {},
+    {"owner": "owner", "repo": "repo", "status": "status", "type": "type"},
+    ["updated_at"],
+    "updated_at",
+)
+SUGGESTIONS = Resource(
+    SuggestedFix, SuggestionSerializer,
+    [name for name in SuggestionSerializer.Meta.fields if name != "payload"],
+    # API fields read from another column.
+    {"ticket_id": "ticket", "suggested_fix": "payload", "files_to_fix": "payload"},
+    {"ticket": "ticket_id", "owner": "ticket__owner", "repo": "ticket__repo"},
+    # Regenerating rewrites the payload and moves expires_at; hits count reads.
+    ["hits", "expires_at"],
+    None,
+)
+
+
+def _fields(request, resource, default):
+    raw = request.query_params.get("fields")
+    if not raw:
+        return default
+    names = [name.strip() for name in raw.split(",") if name.strip()]
+    unknown = sorted(set(names) - set(resource.serializer.Meta.fields))
+    if unknown:
+        raise ValidationError({"fields": f"Unknown fields: {', '.join(unknown)}"})
+    return names
+
+
+def _columns(resource, fields):
+    # created_at and id are the keyset; they're read whatever is shown.
+    return sorted({"id", "created_at", *(resource.columns.get(name, name) for name in fields)})
+
+
+def _filtered(request, resource):
+    params = request.query_params
+    filters = {lookup: params[name] for name, lookup in resource.filters.items() if params.get(name)}
+    if resource is TICKETS and params.get("updated_since"):
+        updated_since = parse_datetime(params["updated_since"])
+        if updated_since is None:
+            raise ValidationError({"updated_since": "Expected an ISO datetime"})
+        if timezone.is_naive(updated_since):
+            updated_since = timezone.make_aware(updated_since)
+        filters["updated_at__gt"] = updated_since
+    if resource is SUGGESTIONS and params.get("fresh") in ("1", "true"):
+        filters["expires_at__gt"] = timezone.now()
+    return resource.model.objects.filter(**filters)
+
+
+def _validators(rows, resource, fields, extra=()):
+    """
+    ETag and Last-Modified for a response showing `fields` of `rows`. The
+    Last-Modified is None for resources without a modified_field.
+    """
+    versions = [(row.id, *(getattr(row, name) for name in resource.version_fields)) for row in rows]
+    digest = hashlib.sha1(repr((fields, versions, *extra)).encode()).hexdigest()
+    if resource.modified_field is None:
+        return f'"{digest}"', None
+    stamps = [getattr(row, resource.modified_field) for row in rows]
+    return f'"{digest}"', int(max(stamps).timestamp()) if stamps else None
+
+
+def _conditional(request, etag, last_modified, response=None):
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified, response=response)
+    if response is not None and response.status_code == 304:
+        _set_validators(response, etag, last_modified)
+    return response
+
+
+def _set_validators(response, etag, last_modified):
+    response["ETag"] = etag
+    if last_modified is not None:
+        response["Last-Modified"] = http_date(last_modified)
+    # Revalidate every time, so an edit shows up at the next poll.
+    response["Cache-Control"] = "no-cache"
+    return response
+
+
+class ResourceList(APIView):
+    resource = None
+
+    def get(self, request):
+        resource = self.resource
+        fields = _fields(request, resource, resource.list_fields)
+        try:
+            page_size = int(request.query_params.get("page_size", DEFAULT_PAGE_SIZE))
+        except ValueError:
+            raise ValidationError({"page_size": "Expected a number"})
+        try:
+            page = keyset_page(
+                _filtered(request, resource).only("id", "created_at", *resource.version_fields),
+                after=request.query_params.get("after"),
+                before=request.query_params.get("before"),
+                page_size=page_size,
+            )
+        except InvalidCursor as e:
+            raise ValidationError({"cursor": str(e)})
+
+        etag, last_modified = _validators(page.items, resource, fields, (page.next_cursor, page.prev_cursor))
+        not_modified = _conditional(request, etag, last_modified)
+        if not_modified is not None:
+            return not_modified
+
+        rows = resource.model.objects.only(*_columns(resource, fields)).in_bulk([row.id for row in page.items])
+        url = request.build_absolute_uri()
+        response = Response({
+            "results": resource.serializer([rows[row.id] for row in page.items if row.id in rows], many=True,
+                                           fields=fields).data,
+            "next": replace_query_param(remove_query_param(url, "before"), "after", page.next_cursor)
+            if page.next_cursor else None,
+            "previous": replace_query_param(remove_query_param(url, "after"), "before", page.prev_cursor)
+            if page.prev_cursor else None,
+        })
+        return _set_validators(response, etag, last_modified)
+
+
+class ResourceDetail(APIView):
+    resource = None
+
+    def _current(self, pk):
+        resource = self.resource
+        return get_object_or_404(resource.model.objects.only("id", "created_at", *resource.version_fields), pk=pk)
+
+    def get(self, request, pk):
+        resource = self.resource
+        fields = _fields(request, resource, resource.serializer.Meta.fields)
+        etag, last_modified = _validators([self._current(pk)], resource, fields)
+        not_modified = _conditional(request, etag, last_modified)
+        if not_modified is not None:
+            return not_modified
+        row = get_object_or_404(resource.model.objects.only(*_columns(resource, fields)), pk=pk)
+        return _set_validators(Response(resource.serializer(row, fields=fields).data), etag, last_modified)
+
+
+class TicketList(ResourceList):
+    resource = TICKETS
+
+
+class TicketDetail(ResourceDetail):
+    resource = TICKETS
+
+    def patch(self, request, pk):
+        """
+        Change a ticket's status. With If-Match, only if the ticket is
+        unchanged since the representation that ETag came from.
+        """
+        fields = _fields(request, TICKETS, TicketSerializer.Meta.fields)
+        etag, last_modified = _validators([self._current(pk)], TICKETS, fields)
+        failed = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if failed is not None:
+            return failed
+        ticket = get_object_or_404(Ticket, pk=pk)
+        serializer = TicketSerializer(ticket, data=request.data, partial=True)
+        serializer.is_valid(raise_exception=True)
+        if serializer.validated_data:
+            for name, value in serializer.validated_data.items():
+                setattr(ticket, name, value)
+            # Not title/body, so the similarity index is left alone.
+            ticket.save(update_fields=[*serializer.validated_data, "updated_at"])
+        etag, last_modified = _validators([ticket], TICKETS, fields)
+        return _set_validators(Response(TicketSerializer(ticket, fields=fields).data), etag, last_modified)
+
+
+class SuggestionList(ResourceList):
+    resource = SUGGESTIONS
+
+
+class SuggestionDetail(ResourceDetail):
+    resource = SUGGESTIONS
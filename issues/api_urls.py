@@ -0,0 +1,13 @@
+# issues/api_urls.py
+from django.urls import path
+
+from . import api
+
+app_name = 'api'
+
+urlpatterns = [
+    path('tickets/', api.TicketList.as_view(), name='ticket_list'),
+    path('tickets/<int:pk>/', api.TicketDetail.as_view(), name='ticket_detail'),
+    path('suggestions/', api.SuggestionList.as_view(), name='suggestion_list'),
+    path('suggestions/<int:pk>/', api.SuggestionDetail.as_view(), name='suggestion_detail'),
+]
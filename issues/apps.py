@@ -4,3 +4,10 @@ from django.apps import AppConfig
 class IssuesConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'issues'
+
+    def ready(self):
+        from . import signals  # noqa: F401
+        from .services.telemetry import connect_celery_signals, setup_telemetry
+
+        setup_telemetry()
+        connect_celery_signals()
@@ -0,0 +1,41 @@
+from django.core.management.base import BaseCommand
+
+from issues.services.retention import POLICIES, apply_policy, evict_idle_sessions
+
+
+class Command(BaseCommand):
+    help = (
+        "Archive expired rows to gzip NDJSON and delete them in small chunks, "
+        "then evict idle ADK sessions from the cache."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--policy", action="append", choices=sorted(POLICIES),
+                            help="Policy to apply; repeat for several (default: all)")
+        parser.add_argument("--days", type=int, help="Override the policy's retention in days")
+        parser.add_argument("--chunk-size", type=int, help="Rows archived and deleted per transaction")
+        parser.add_argument("--no-archive", action="store_true", help="Delete without writing an archive")
+        parser.add_argument("--dry-run", action="store_true", help="Only count what would be deleted")
+        parser.add_argument("--skip-sessions", action="store_true", help="Don't evict idle sessions")
+
+    def handle(self, *args, **options):
+        for name in options["policy"] or POLICIES:
+            result = apply_policy(
+                name,
+                days=options["days"],
+                chunk_size=options["chunk_size"],
+                archive=False if options["no_archive"] else None,
+                dry_run=options["dry_run"],
+            )
+            if result.cutoff is None:
+                self.stdout.write(f"{name}: retention disabled")
+            elif options["dry_run"]:
+                self.stdout.write(f"{name}: {result.deleted} rows older than {result.cutoff:%Y-%m-%d} would be deleted")
+            else:
+                self.stdout.write(
+                    f"{name}: deleted {result.deleted} rows older than {result.cutoff:%Y-%m-%d} "
+                    f"in {result.chunks} chunks ({result.seconds}s), archive: {result.archive or 'none'}"
+                )
+
+        if not options["skip_sessions"] and not options["dry_run"]:
+            self.stdout.write(f"sessions: evicted {evict_idle_sessions()} idle")
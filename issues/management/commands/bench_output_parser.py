@@ -0,0 +1,101 @@
+# issues/management/commands/bench_output_parser.py
+import json
+import random
+import re
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from issues.services.adk_integration import accept_issues
+from issues.services.output_parser import JSONStreamScanner, parse_stream
+from issues.testing.agent_transcripts import chunks, malformed_transcript, transcript
+
+URL = "https://github.com/octo/widgets"
+CHUNK_SIZE = 4096
+REPEATS = 3
+
+def _legacy_parse(output):
+    """
+    The regex approach this parser replaced, kept for comparison.
+    """
+    patterns = [
+        r"(\{[^{}]*\"repo\"[^{}]*\})",
+        r"(\[[^\[\]]*\{[^{}]*\"repo\"[^{}]*\}[^\[\]]*\])",
+        r"```json\s*(\{.*?\})\s*```",
+        r"```json\s*(\[.*?\])\s*```",
+    ]
+    # The old suggested-fix pattern; it rescans to the end from every "{".
+    re.findall(r'(\{.*"suggested_fix".*\})', output, re.DOTALL)
+    for pattern in patterns:
+        for match in re.findall(pattern, output, re.DOTALL):
+            try:
+                return json.loads(match)
+            except json.JSONDecodeError:
+                continue
+    return None
+
+
+class Command(BaseCommand):
+    help = "Benchmark the streaming agent output parser and run it against malformed transcripts."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--sizes", default="1,2,4,8", help="Comma-separated transcript sizes in MB")
+        parser.add_argument("--fuzz", type=int, default=200, help="Number of malformed transcripts to try")
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument("--legacy", action="store_true", help="Also time the old regex parsers (quadratic; use small sizes)")
+        parser.add_argument("--tolerance", type=float, default=2.0,
+                            help="Fail if seconds per MB grows by more than this factor across sizes")
+
+    def handle(self, *args, **options):
+        rng = random.Random(options["seed"])
+        self.benchmark([float(s) for s in options["sizes"].split(",")], rng, options["legacy"], options["tolerance"])
+        if options["fuzz"]:
+            self.fuzz(options["fuzz"], rng)
+
+    def benchmark(self, sizes, rng, legacy, tolerance):
+        per_mb = []
+        for size_mb in sizes:
+            text, answer = transcript(int(size_mb * 1024 * 1024), rng)
+            elapsed = None
+            for _ in range(REPEATS):
+                started = time.perf_counter()
+                result = parse_stream(chunks(text, rng, CHUNK_SIZE), lambda value: accept_issues(value, URL))
+                run = time.perf_counter() - started
+                elapsed = run if elapsed is None else min(elapsed, run)
+            if [i["issue_number"] for i in result or []] != [i["issue_number"] for i in answer]:
+                raise CommandError(f"Wrong result for {size_mb} MB transcript")
+            per_mb.append(elapsed / size_mb)
+            line = f"{size_mb:>7.2f} MB  {elapsed:8.3f}s  {elapsed / size_mb:.3f}s/MB"
+            if legacy:
+                started = time.perf_counter()
+                _legacy_parse(text)
+                line += f"  legacy {time.perf_counter() - started:8.3f}s"
+            self.stdout.write(line)
+
+        growth = max(per_mb) / min(per_mb)
+        self.stdout.write(f"Time per MB varies by {growth:.2f}x across sizes")
+        if growth > tolerance:
+            raise CommandError(f"Parser time is not linear in input size ({growth:.2f}x > {tolerance}x)")
+
+    def fuzz(self, count, rng):
+        failures = 0
+        for n in range(count):
+            text, expected = malformed_transcript(rng)
+            scanner = JSONStreamScanner()
+            chunked = []
+            for chunk in chunks(text, rng):
+                chunked.extend(scanner.feed(chunk))
+            chunked.extend(scanner.finish())
+            whole_scanner = JSONStreamScanner()
+            whole = whole_scanner.feed(text) + whole_scanner.finish()
+
+            if whole != chunked:
+                failures += 1
+                self.stderr.write(f"Case {n}: chunking changed the result")
+            elif expected is not None and expected not in whole:
+                failures += 1
+                self.stderr.write(f"Case {n}: lost value {expected!r}")
+
+        self.stdout.write(f"Fuzz: {count - failures}/{count} transcripts passed")
+        if failures:
+            raise CommandError(f"{failures} fuzz cases failed")
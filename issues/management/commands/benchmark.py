@@ -0,0 +1,71 @@
+import logging
+import os
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+
+from issues.testing.benchmark import Benchmark, save_results
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark create-tickets, suggest-fix, the ticket list and the Celery tasks end to end "
+        "against the fake agent and fake GitHub MCP server, in a throwaway test database. "
+        "Reports p50/p95/p99 latency, throughput and peak RSS, and saves the run as JSON "
+        "for benchmark_compare."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--scenarios", default=",".join(Benchmark.SCENARIOS),
+                            help=f"Comma-separated subset of {', '.join(Benchmark.SCENARIOS)}")
+        parser.add_argument("--requests", type=int, default=50, help="Operations per scenario")
+        parser.add_argument("--concurrency", type=int, default=8, help="Operations in flight at once")
+        parser.add_argument("--latency-ms", type=int, default=50, help="Fake agent latency")
+        parser.add_argument("--output-bytes", type=int, default=0,
+                            help="Agent chatter printed before each answer")
+        parser.add_argument("--agent", choices=["pool", "replay"], default="pool",
+                            help="Fake warm pool (in-process) or fake `adk run --replay` subprocesses")
+        parser.add_argument("--issues", type=int, default=50, help="Issues per repository on the fake MCP server")
+        parser.add_argument("--mcp-latency-ms", type=int, default=0, help="Fake MCP server latency per tool call")
+        parser.add_argument("--repos", type=int, default=5, help="Tracked repositories to seed")
+        parser.add_argument("--tickets", type=int, default=1000, help="Tickets to seed across those repositories")
+        parser.add_argument("--output", help="Results file (default benchmarks/<timestamp>.json)")
+
+    def handle(self, *args, **options):
+        scenarios = [name.strip() for name in options["scenarios"].split(",") if name.strip()]
+        unknown = set(scenarios) - set(Benchmark.SCENARIOS)
+        if unknown:
+            raise CommandError(f"Unknown scenarios: {', '.join(sorted(unknown))}")
+
+        benchmark = Benchmark(
+            requests=options["requests"],
+            concurrency=options["concurrency"],
+            latency_ms=options["latency_ms"],
+            output_bytes=options["output_bytes"],
+            issues=options["issues"],
+            repos=options["repos"],
+            tickets=options["tickets"],
+            agent=options["agent"],
+            mcp_latency_ms=options["mcp_latency_ms"],
+        )
+        self.stdout.write(
+            f"{'scenario':<26} {'ops':>5} {'err':>4} {'req/s':>8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'rss MB':>7}"
+        )
+        if options["verbosity"] < 2:
+            # Per-job and per-task info logs would bury the table; errors still show.
+            logging.disable(logging.WARNING)
+        try:
+            with benchmark:
+                results = benchmark.run(scenarios, progress=self.report)
+        finally:
+            logging.disable(logging.NOTSET)
+
+        path = options["output"] or os.path.join("benchmarks", f"{datetime.now():%Y%m%d-%H%M%S}.json")
+        save_results(results, path)
+        self.stdout.write(f"Results saved to {path}")
+
+    def report(self, label, summary):
+        self.stdout.write(
+            f"{label:<26} {summary['operations']:>5} {summary['errors']:>4} {summary['throughput_rps']:>8.1f} "
+            f"{summary['p50_ms']:>9.1f} {summary['p95_ms']:>9.1f} {summary['p99_ms']:>9.1f} {summary['peak_rss_mb']:>7.1f}"
+        )
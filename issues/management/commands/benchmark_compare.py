@@ -0,0 +1,42 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from issues.testing.benchmark import compare_results, load_results
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare two `benchmark` result files and fail if any scenario got slower, "
+        "lost throughput, used more memory or had more errors than the baseline."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("baseline", help="Results file to compare against")
+        parser.add_argument("current", help="Results file of the new run")
+        parser.add_argument("--threshold", type=float, default=10.0,
+                            help="Percent change that counts as a regression")
+        parser.add_argument("--min-delta-ms", type=float, default=1.0,
+                            help="Ignore latency changes smaller than this")
+
+    def handle(self, *args, **options):
+        try:
+            baseline = load_results(options["baseline"])
+            current = load_results(options["current"])
+        except (OSError, ValueError) as e:
+            raise CommandError(f"Could not read results: {e}")
+
+        rows = compare_results(baseline, current, options["threshold"] / 100, options["min_delta_ms"])
+        if not rows:
+            raise CommandError("The two runs have no scenarios in common")
+        if baseline.get("options") != current.get("options"):
+            self.stderr.write("Warning: the runs used different options; differences may not be regressions")
+
+        regressions = 0
+        for scenario, metric, before, after, change, regressed in rows:
+            regressions += regressed
+            delta = f"{change * 100:+7.1f}%" if change is not None else f"{after - before:+8d}"
+            flag = "  REGRESSION" if regressed else ""
+            self.stdout.write(f"{scenario:<26} {metric:<15} {before:>10} -> {after:>10}  {delta}{flag}")
+
+        if regressions:
+            raise CommandError(f"{regressions} regression(s) above {options['threshold']}%")
+        self.stdout.write(self.style.SUCCESS("No regressions"))
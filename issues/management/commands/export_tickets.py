@@ -0,0 +1,51 @@
+import sys
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from issues.services.ticket_export import CONTENT_TYPES, DATASETS, ExportError, export_stream, get_export_settings
+
+
+class Command(BaseCommand):
+    help = (
+        "Stream tickets or stored suggestions as NDJSON or CSV, optionally gzip-compressed, "
+        "to a file or stdout. Memory use doesn't depend on the number of rows."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--dataset", choices=sorted(DATASETS), default="tickets")
+        parser.add_argument("--format", choices=sorted(CONTENT_TYPES), default="ndjson")
+        parser.add_argument("--gzip", action="store_true", help="Compress the output (implied by a .gz --output)")
+        parser.add_argument("--output", "-o", default="-", help="File to write (default: stdout)")
+        for name in ("owner", "repo", "status", "type"):
+            parser.add_argument(f"--{name}", help=f"Only rows whose ticket has this {name}")
+        parser.add_argument("--since", help="Created on or after (YYYY-MM-DD or ISO datetime)")
+        parser.add_argument("--until", help="Created before; a bare date includes that day")
+        parser.add_argument("--chunk-size", type=int, help="Rows fetched per database round trip")
+
+    def handle(self, *args, **options):
+        params = {name: options[name] for name in ("owner", "repo", "status", "type", "since", "until") if options[name]}
+        compress = options["gzip"] or options["output"].endswith(".gz")
+        config = None
+        if options["chunk_size"]:
+            config = {**get_export_settings(), "CHUNK_SIZE": options["chunk_size"]}
+        try:
+            stream = export_stream(options["dataset"], params, options["format"], compress, config)
+        except ExportError as e:
+            raise CommandError(str(e))
+
+        started = time.monotonic()
+        written = 0
+        output = sys.stdout.buffer if options["output"] == "-" else open(options["output"], "wb")
+        try:
+            for block in stream:
+                output.write(block)
+                written += len(block)
+        finally:
+            if output is not sys.stdout.buffer:
+                output.close()
+            else:
+                output.flush()
+        self.stderr.write(
+            f"Exported {options['dataset']} to {options['output']}: {written} bytes in {time.monotonic() - started:.1f}s"
+        )
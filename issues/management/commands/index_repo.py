@@ -0,0 +1,44 @@
+# issues/management/commands/index_repo.py
+from django.core.management.base import BaseCommand, CommandError
+
+from issues.models import Ticket
+from issues.services.repo_index import RepoIndex, index_repository, ticket_query
+
+
+class Command(BaseCommand):
+    help = (
+        "Index a local checkout or source tarball of a repository so fix "
+        "suggestions can be pointed at files that exist. Indexes are stored "
+        "per commit; re-indexing the same commit is a no-op without --force."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("repository", help="owner/repo, as on the tickets")
+        parser.add_argument("source", help="Path to a checkout directory or a .tar/.tar.gz/.tgz archive")
+        parser.add_argument("--sha", help="Commit SHA, when it can't be read from the checkout or archive")
+        parser.add_argument("--force", action="store_true", help="Rebuild even if this commit is already indexed")
+        parser.add_argument("--show", type=int, metavar="TICKET_ID",
+                            help="Afterwards, print the candidate files for this ticket")
+
+    def handle(self, *args, **options):
+        owner, _, repo = options["repository"].partition("/")
+        if not owner or not repo:
+            raise CommandError("Repository must be given as owner/repo")
+
+        try:
+            index, created = index_repository(owner, repo, options["source"], options["sha"], options["force"])
+        except (OSError, ValueError) as e:
+            raise CommandError(str(e))
+
+        verb = "Indexed" if created else ("Rebuilt" if options["force"] else "Already indexed")
+        self.stdout.write(
+            f"{verb} {index}: {index.file_count} files, {index.symbol_count} symbols, "
+            f"{len(index.data) // 1024} KiB, built in {index.build_ms} ms"
+        )
+
+        if options["show"]:
+            ticket = Ticket.objects.filter(id=options["show"]).first()
+            if ticket is None:
+                raise CommandError(f"No ticket {options['show']}")
+            for candidate in RepoIndex.from_row(index).candidates(ticket_query(ticket)):
+                self.stdout.write(f"{candidate['score']:8.2f}  {candidate['path']}  {', '.join(candidate['symbols'])}")
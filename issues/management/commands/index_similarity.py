@@ -0,0 +1,43 @@
+# issues/management/commands/index_similarity.py
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from issues.models import Ticket, TicketSignature
+from issues.services.similarity import backfill, get_similarity_index, similar_tickets
+
+
+class Command(BaseCommand):
+    help = (
+        "Compute MinHash signatures for tickets that have none (new tickets are "
+        "signed as they are saved). Use --rebuild after changing SIMILARITY "
+        "NUM_PERM, BANDS, SHINGLE_SIZE or SEED."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rebuild", action="store_true", help="Drop all signatures and recompute them")
+        parser.add_argument("--show", type=int, metavar="TICKET_ID",
+                            help="Afterwards, print the tickets most similar to this one")
+
+    def handle(self, *args, **options):
+        if options["rebuild"]:
+            deleted, _ = TicketSignature.objects.all().delete()
+            self.stdout.write(f"Dropped {deleted} signatures")
+
+        started = time.monotonic()
+        count = backfill()
+        self.stdout.write(f"Signed {count} tickets in {time.monotonic() - started:.1f}s")
+
+        if options["show"]:
+            index = get_similarity_index()
+            index.refresh(force=True)
+            ticket = Ticket.objects.filter(id=options["show"]).first()
+            if ticket is None:
+                raise CommandError(f"No ticket {options['show']}")
+            started = time.perf_counter()
+            neighbours = similar_tickets(ticket, k=10)
+            elapsed = (time.perf_counter() - started) * 1000
+            titles = Ticket.objects.in_bulk([ticket_id for ticket_id, _ in neighbours])
+            self.stdout.write(f"{len(index.lsh)} tickets indexed; query took {elapsed:.3f} ms")
+            for ticket_id, similarity in neighbours:
+                self.stdout.write(f"{similarity:6.2f}  #{ticket_id}  {titles[ticket_id].title}")
@@ -0,0 +1,139 @@
+# issues/management/commands/loadtest_agents.py
+import asyncio
+import os
+import statistics
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.test import AsyncClient, Client
+from django.test.utils import override_settings
+from django.urls import reverse
+
+from issues.models import Ticket
+from issues.services import agent_pool
+from issues.testing import fake_adk
+
+LOADTEST_OWNER = "loadtest"
+
+
+def _summary(label, latencies, elapsed, errors):
+    ordered = sorted(latencies)
+    p95 = ordered[max(0, int(len(ordered) * 0.95) - 1)] if ordered else 0
+    return (
+        f"{label:<5} {len(latencies):>5} requests in {elapsed:7.2f}s  "
+        f"{len(latencies) / elapsed:8.1f} req/s  "
+        f"p50 {statistics.median(ordered) if ordered else 0:6.2f}s  p95 {p95:6.2f}s  errors {errors}"
+    )
+
+
+class Command(BaseCommand):
+    help = (
+        "Fire concurrent suggest-fix requests through the WSGI and ASGI handlers "
+        "against a fake agent with fixed latency, and compare throughput. With "
+        "--url, load a running server (runserver/gunicorn vs uvicorn) instead."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--requests", type=int, default=100, help="Concurrent requests per run")
+        parser.add_argument("--latency-ms", type=int, default=1000, help="Fake agent latency")
+        parser.add_argument("--threads", type=int, default=8,
+                            help="WSGI worker threads, e.g. gunicorn --threads")
+        parser.add_argument("--mode", choices=["wsgi", "asgi", "both"], default="both")
+        parser.add_argument("--agent", choices=["pool", "replay"], default="pool",
+                            help="Fake warm pool (in-process) or fake `adk run --replay` subprocesses")
+        parser.add_argument("--url", help="Load a running server at this base URL instead (uses httpx)")
+
+    def handle(self, *args, **options):
+        if options["url"]:
+            return self.against_server(options)
+
+        latency = options["latency_ms"] / 1000
+        os.environ["FAKE_ADK_LATENCY_MS"] = str(options["latency_ms"])
+        pool_settings = {
+            **settings.ADK_AGENT_POOL,
+            "ENABLED": options["agent"] == "pool",
+            "REPLAY_COMMAND": [sys.executable, "-S", fake_adk.__file__],
+        }
+        pools = {}
+
+        def fake_pool(agent_name):
+            return pools.setdefault(agent_name, fake_adk.FakeAgentPool(agent_name, latency))
+
+        # The rate limiter would cap both handlers at the same RPM; this
+        # measures the handlers, so it is switched off.
+        limiter_settings = {**getattr(settings, "GEMINI_RATE_LIMIT", {}), "ENABLED": False}
+        with override_settings(ADK_AGENT_POOL=pool_settings, GEMINI_RATE_LIMIT=limiter_settings,
+                               ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, "testserver"]), \
+                mock.patch.object(agent_pool, "get_pool", fake_pool):
+            try:
+                if options["mode"] in ("wsgi", "both"):
+                    self.stdout.write(self.run_wsgi(self.make_tickets(options["requests"]), options["threads"]))
+                if options["mode"] in ("asgi", "both"):
+                    self.stdout.write(asyncio.run(self.run_asgi(self.make_tickets(options["requests"]))))
+            finally:
+                Ticket.objects.filter(owner=LOADTEST_OWNER).delete()
+
+    def make_tickets(self, count):
+        # One ticket per request so concurrent requests never share a cache key.
+        Ticket.objects.filter(owner=LOADTEST_OWNER).delete()
+        Ticket.objects.bulk_create([
+            Ticket(owner=LOADTEST_OWNER, repo="loadtest", issue_number=n, title=f"Load test {n}",
+                   body="", labels=[])
+            for n in range(count)
+        ])
+        return list(Ticket.objects.filter(owner=LOADTEST_OWNER).values_list("id", flat=True))
+
+    def _path(self, ticket_id):
+        return reverse("suggest_fix_for_issue", args=[ticket_id]) + "?regenerate=1"
+
+    def run_wsgi(self, ticket_ids, threads):
+        def one(ticket_id):
+            started = time.monotonic()
+            response = Client().get(self._path(ticket_id))
+            return time.monotonic() - started, response.status_code == 200
+
+        started = time.monotonic()
+        with ThreadPoolExecutor(max_workers=threads) as executor:
+            results = list(executor.map(one, ticket_ids))
+        elapsed = time.monotonic() - started
+        return _summary("wsgi", [r[0] for r in results], elapsed, sum(1 for r in results if not r[1]))
+
+    async def run_asgi(self, ticket_ids):
+        client = AsyncClient()
+
+        async def one(ticket_id):
+            started = time.monotonic()
+            response = await client.get(self._path(ticket_id))
+            return time.monotonic() - started, response.status_code == 200
+
+        started = time.monotonic()
+        results = await asyncio.gather(*(one(ticket_id) for ticket_id in ticket_ids))
+        elapsed = time.monotonic() - started
+        return _summary("asgi", [r[0] for r in results], elapsed, sum(1 for r in results if not r[1]))
+
+    def against_server(self, options):
+        import httpx
+
+        ticket_ids = list(Ticket.objects.order_by("-id").values_list("id", flat=True)[:options["requests"]])
+        if not ticket_ids:
+            raise CommandError("No tickets to request suggestions for")
+        base = options["url"].rstrip("/")
+
+        async def run():
+            limits = httpx.Limits(max_connections=len(ticket_ids))
+            async with httpx.AsyncClient(base_url=base, timeout=None, limits=limits) as client:
+                async def one(ticket_id):
+                    started = time.monotonic()
+                    response = await client.get(self._path(ticket_id))
+                    return time.monotonic() - started, response.status_code == 200
+
+                started = time.monotonic()
+                results = await asyncio.gather(*(one(ticket_id) for ticket_id in ticket_ids))
+                elapsed = time.monotonic() - started
+                return _summary("http", [r[0] for r in results], elapsed, sum(1 for r in results if not r[1]))
+
+        self.stdout.write(asyncio.run(run()))
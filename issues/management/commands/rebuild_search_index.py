@@ -0,0 +1,29 @@
+# issues/management/commands/rebuild_search_index.py
+from django.core.management.base import BaseCommand
+
+from issues.services.ticket_search import get_search_backend, search_tickets
+
+
+class Command(BaseCommand):
+    help = (
+        "Rebuild the ticket full-text index from the ticket table. Triggers "
+        "keep it current; this is for restores or raw writes that bypassed "
+        "them. Optionally run a query against it afterwards."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--query", help="Afterwards, print the top matches for this query")
+
+    def handle(self, *args, **options):
+        backend = get_search_backend()
+        if backend.rebuild():
+            self.stdout.write(f"Rebuilt and optimized the {backend.name} index")
+        else:
+            self.stdout.write(f"The {backend.name} backend maintains itself; nothing to rebuild")
+
+        if options["query"]:
+            page = search_tickets(options["query"])
+            self.stdout.write(f"{len(page.items)} results in {page.took_ms} ms")
+            for ticket in page.items:
+                rank = "" if ticket.rank is None else f"{ticket.rank:8.3f}  "
+                self.stdout.write(f"{rank}#{ticket.id} {ticket.owner}/{ticket.repo}#{ticket.issue_number}  {ticket.title}")
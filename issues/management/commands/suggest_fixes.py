@@ -0,0 +1,51 @@
+# issues/management/commands/suggest_fixes.py
+from django.core.management.base import BaseCommand, CommandError
+
+from issues.models import Ticket
+from issues.services.batch_suggest import SUGGEST_FIELDS, suggest_fixes_batch
+from issues.services.ticket_listing import FILTER_FIELDS, filter_tickets
+
+
+class Command(BaseCommand):
+    help = "Suggest fixes for many tickets, packing several tickets into each agent request."
+
+    def add_arguments(self, parser):
+        parser.add_argument("ticket_ids", nargs="*", type=int, help="Tickets to process (default: use the filters)")
+        parser.add_argument("--owner")
+        parser.add_argument("--repo")
+        parser.add_argument("--status", default=Ticket.STATUS_UNSOLVED)
+        parser.add_argument("--type")
+        parser.add_argument("--limit", type=int, default=200)
+        parser.add_argument("--force", action="store_true", help="Ignore cached suggestions")
+        parser.add_argument("--token-budget", type=int, help="Override SUGGEST_BATCH['TOKEN_BUDGET']")
+        parser.add_argument("--max-tickets", type=int, help="Override SUGGEST_BATCH['MAX_TICKETS']")
+        parser.add_argument("--concurrency", type=int, help="Override SUGGEST_BATCH['CONCURRENCY']")
+
+    def handle(self, *args, **options):
+        if options["ticket_ids"]:
+            tickets = Ticket.objects.filter(id__in=options["ticket_ids"]).order_by("id")
+        else:
+            tickets, _ = filter_tickets({name: options[name] for name in FILTER_FIELDS})
+            tickets = tickets.only(*SUGGEST_FIELDS).order_by("-created_at", "-id")
+        tickets = list(tickets[:options["limit"]])
+        if not tickets:
+            raise CommandError("No matching tickets")
+
+        result = suggest_fixes_batch(
+            tickets,
+            force=options["force"],
+            token_budget=options["token_budget"],
+            max_tickets=options["max_tickets"],
+            concurrency=options["concurrency"],
+        )
+
+        cached = sum(1 for source in result.sources.values() if source in ("memory", "db"))
+        reused = sum(1 for source in result.sources.values() if source == "reused")
+        self.stdout.write(
+            f"{len(tickets)} tickets: {cached} cached, {reused} reused from similar tickets, "
+            f"{len(result.suggestions) - cached - reused} generated "
+            f"in {result.batches} batches, {result.retried} retried individually, {len(result.failed)} failed"
+        )
+        self.stdout.write(f"{result.elapsed:.1f}s, {result.tickets_per_minute} tickets/minute")
+        if result.failed:
+            self.stderr.write(f"No suggestion for tickets: {', '.join(map(str, result.failed))}")
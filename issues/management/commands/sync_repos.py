@@ -0,0 +1,44 @@
+# issues/management/commands/sync_repos.py
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from issues.models import RepoSyncState
+from issues.services.repo_sync import sync_all_repos, sync_repo, track_repo
+
+
+class Command(BaseCommand):
+    help = "Incrementally sync GitHub issues into tickets for tracked repositories."
+
+    def add_arguments(self, parser):
+        parser.add_argument("repos", nargs="*", help="owner/repo to track and sync (default: every tracked repo)")
+        parser.add_argument("--interval", type=int, default=0,
+                            help="Keep running, syncing every N seconds")
+        parser.add_argument("--untrack", action="store_true", help="Stop syncing the given repos")
+
+    def handle(self, *args, **options):
+        states = []
+        for name in options["repos"]:
+            owner, _, repo = name.partition("/")
+            if not owner or not repo:
+                raise CommandError(f"Expected owner/repo, got {name!r}")
+            if options["untrack"]:
+                RepoSyncState.objects.filter(owner=owner, repo=repo).update(enabled=False)
+                self.stdout.write(f"Stopped tracking {name}")
+            else:
+                states.append(track_repo(owner, repo))
+        if options["untrack"]:
+            return
+
+        while True:
+            results = [sync_repo(state) for state in states] if states else sync_all_repos()
+            for result in results:
+                self.stdout.write(
+                    f"{result.repo}: {result.status} "
+                    f"(fetched {result.fetched}, created {result.created}, updated {result.updated})"
+                )
+            if not options["interval"]:
+                return
+            time.sleep(options["interval"])
+            for state in states:
+                state.refresh_from_db()
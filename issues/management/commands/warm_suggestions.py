@@ -0,0 +1,35 @@
+# issues/management/commands/warm_suggestions.py
+from django.core.management.base import BaseCommand
+
+from issues.models import SuggestionWarmup
+from issues.services.suggestion_warmup import run_warmup, start_or_resume_warmup
+
+
+class Command(BaseCommand):
+    help = "Pre-compute suggestions for unsolved tickets that don't have a fresh one."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--order", choices=[c[0] for c in SuggestionWarmup.ORDER_CHOICES],
+                            help="Priority order for new runs (default: SUGGESTION_WARMUP['ORDER'])")
+        parser.add_argument("--limit", type=int, help="Stop after this many tickets")
+        parser.add_argument("--concurrency", type=int, help="Agent calls in flight at once")
+        parser.add_argument("--new", action="store_true", help="Start a new run instead of resuming an interrupted one")
+
+    def handle(self, *args, **options):
+        run = start_or_resume_warmup(order=options["order"], limit=options["limit"], resume=not options["new"])
+        self.stdout.write(f"{run}: {run.total - run.processed} tickets queued, {run.order} first")
+
+        def report(run, ticket, ok, latency_ms):
+            outcome = "ok" if ok else "FAILED"
+            self.stdout.write(f"[{run.processed}/{run.total}] ticket {ticket.id} {outcome} in {latency_ms} ms")
+
+        try:
+            run = run_warmup(run, concurrency=options["concurrency"], on_ticket=report)
+        except KeyboardInterrupt:
+            self.stderr.write(f"Interrupted after {run.processed} tickets; run the command again to resume")
+            return
+
+        self.stdout.write(
+            f"Done: {run.succeeded} stored, {run.failed} failed, "
+            f"avg {run.latency_ms_avg} ms, max {run.latency_ms_max} ms per ticket"
+        )
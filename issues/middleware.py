@@ -0,0 +1,58 @@
+# issues/middleware.py
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from opentelemetry import trace
+
+from issues.services import telemetry
+
+
+class TelemetryMiddleware:
+    """
+    A server span and an http.server.request.duration sample per request,
+    labelled with the URL pattern rather than the path. Runs natively under
+    both WSGI and ASGI. For streaming responses (job events) the time is to
+    the first byte, not the end of the stream.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        started = time.perf_counter()
+        with telemetry.tracer.start_as_current_span(request.method, kind=trace.SpanKind.SERVER) as span:
+            response = self.get_response(request)
+            self._finish(request, response, span, started)
+        return response
+
+    async def __acall__(self, request):
+        started = time.perf_counter()
+        with telemetry.tracer.start_as_current_span(request.method, kind=trace.SpanKind.SERVER) as span:
+            response = await self.get_response(request)
+            self._finish(request, response, span, started)
+        return response
+
+    def _finish(self, request, response, span, started):
+        match = getattr(request, "resolver_match", None)
+        route = f"/{match.route}" if match is not None and match.route else "unmatched"
+        span.update_name(f"{request.method} {route}")
+        span.set_attributes({
+            "http.request.method": request.method,
+            "http.route": route,
+            "url.path": request.path,
+            "http.response.status_code": response.status_code,
+        })
+        if response.status_code >= 500:
+            span.set_status(trace.Status(trace.StatusCode.ERROR))
+        telemetry.http_duration.record(time.perf_counter() - started, {
+            "method": request.method,
+            "route": route,
+            "status_code": response.status_code,
+        })
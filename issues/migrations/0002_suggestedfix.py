@@ -0,0 +1,27 @@
+# Generated by Django 4.2.7 on 2026-10-17 02:39
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('issues', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SuggestedFix',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('cache_key', models.CharField(max_length=64, unique=True)),
+                ('agent_version', models.CharField(max_length=100)),
+                ('payload', models.JSONField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('expires_at', models.DateTimeField(db_index=True)),
+                ('hits', models.PositiveIntegerField(default=0)),
+                ('ticket', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='suggestions', to='issues.ticket')),
+            ],
+        ),
+    ]
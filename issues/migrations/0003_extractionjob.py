@@ -0,0 +1,33 @@
+# Generated by Django 4.2.7 on 2026-10-17 02:40
+
+from django.db import migrations, models
+import uuid
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('issues', '0002_suggestedfix'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ExtractionJob',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('url', models.URLField(max_length=500)),
+                ('start_date', models.DateField(blank=True, null=True)),
+                ('end_date', models.DateField(blank=True, null=True)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('running', 'Running'), ('succeeded', 'Succeeded'), ('failed', 'Failed')], db_index=True, default='pending', max_length=20)),
+                ('stage', models.CharField(blank=True, max_length=50)),
+                ('progress', models.PositiveSmallIntegerField(default=0)),
+                ('message', models.CharField(blank=True, max_length=500)),
+                ('result', models.JSONField(blank=True, null=True)),
+                ('error', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('started_at', models.DateTimeField(blank=True, null=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 4.2.7 on 2026-10-17 02:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('issues', '0003_extractionjob'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RepoSyncState',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('owner', models.CharField(max_length=255)),
+                ('repo', models.CharField(max_length=255)),
+                ('enabled', models.BooleanField(default=True)),
+                ('cursor', models.DateTimeField(blank=True, null=True)),
+                ('etag', models.CharField(blank=True, max_length=255)),
+                ('last_synced_at', models.DateTimeField(blank=True, null=True)),
+                ('last_status', models.CharField(blank=True, max_length=20)),
+                ('last_error', models.TextField(blank=True)),
+                ('issues_synced', models.PositiveIntegerField(default=0)),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='reposyncstate',
+            constraint=models.UniqueConstraint(fields=('owner', 'repo'), name='unique_repo_sync_state'),
+        ),
+    ]
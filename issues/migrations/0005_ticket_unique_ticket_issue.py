@@ -0,0 +1,38 @@
+from django.db import migrations, models
+from django.db.models import Count, Min
+
+
+def merge_duplicate_tickets(apps, schema_editor):
+    """
+    Keep the oldest ticket for each (owner, repo, issue_number), move stored
+    suggestions onto it and delete the rest, so the unique index can be built.
+    """
+    Ticket = apps.get_model("issues", "Ticket")
+    SuggestedFix = apps.get_model("issues", "SuggestedFix")
+
+    duplicates = (
+        Ticket.objects.values("owner", "repo", "issue_number")
+        .annotate(keep_id=Min("id"), copies=Count("id"))
+        .filter(copies__gt=1)
+    )
+    for group in duplicates.iterator():
+        extra = Ticket.objects.filter(
+            owner=group["owner"], repo=group["repo"], issue_number=group["issue_number"]
+        ).exclude(id=group["keep_id"])
+        SuggestedFix.objects.filter(ticket__in=extra).update(ticket_id=group["keep_id"])
+        extra.delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('issues', '0004_reposyncstate'),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicate_tickets, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='ticket',
+            constraint=models.UniqueConstraint(fields=('owner', 'repo', 'issue_number'), name='unique_ticket_issue'),
+        ),
+    ]
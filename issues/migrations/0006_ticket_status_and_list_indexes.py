@@ -0,0 +1,38 @@
+# Generated by Django 4.2.7 on 2026-10-17 02:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('issues', '0005_ticket_unique_ticket_issue'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ticket',
+            name='status',
+            field=models.CharField(choices=[('unsolved', 'Unsolved'), ('solved', 'Solved')], default='unsolved', max_length=20),
+        ),
+        migrations.AddIndex(
+            model_name='ticket',
+            index=models.Index(fields=['-created_at', '-id'], name='ticket_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='ticket',
+            index=models.Index(fields=['owner', 'repo', '-created_at', '-id'], name='ticket_owner_repo_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='ticket',
+            index=models.Index(fields=['repo', '-created_at', '-id'], name='ticket_repo_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='ticket',
+            index=models.Index(fields=['status', '-created_at', '-id'], name='ticket_status_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='ticket',
+            index=models.Index(fields=['type', '-created_at', '-id'], name='ticket_type_created_idx'),
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 4.2.7 on 2026-10-17 02:51
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('issues', '0006_ticket_status_and_list_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SuggestionWarmup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(choices=[('running', 'Running'), ('interrupted', 'Interrupted'), ('completed', 'Completed')], db_index=True, default='running', max_length=20)),
+                ('order', models.CharField(choices=[('newest', 'Newest first'), ('label', 'Priority labels, then newest')], default='newest', max_length=20)),
+                ('limit', models.PositiveIntegerField(blank=True, null=True)),
+                ('total', models.PositiveIntegerField(default=0)),
+                ('processed', models.PositiveIntegerField(default=0)),
+                ('succeeded', models.PositiveIntegerField(default=0)),
+                ('failed', models.PositiveIntegerField(default=0)),
+                ('failed_ticket_ids', models.JSONField(blank=True, default=list)),
+                ('latency_ms_total', models.PositiveBigIntegerField(default=0)),
+                ('latency_ms_max', models.PositiveIntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='suggestedfix',
+            name='generation_ms',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+    ]
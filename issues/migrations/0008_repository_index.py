@@ -0,0 +1,35 @@
+# Generated by Django 4.2.7 on 2026-10-17 03:08
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('issues', '0007_suggestion_warmup'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RepositoryIndex',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('owner', models.CharField(max_length=255)),
+                ('repo', models.CharField(max_length=255)),
+                ('commit_sha', models.CharField(max_length=64)),
+                ('source', models.CharField(blank=True, max_length=1024)),
+                ('file_count', models.PositiveIntegerField(default=0)),
+                ('symbol_count', models.PositiveIntegerField(default=0)),
+                ('data', models.BinaryField()),
+                ('build_ms', models.PositiveIntegerField(default=0)),
+                ('built_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['owner', 'repo', '-built_at'], name='repo_index_latest_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='repositoryindex',
+            constraint=models.UniqueConstraint(fields=('owner', 'repo', 'commit_sha'), name='unique_repository_index'),
+        ),
+    ]
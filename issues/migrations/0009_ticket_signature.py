@@ -0,0 +1,22 @@
+# Generated by Django 4.2.7 on 2026-10-17 03:11
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('issues', '0008_repository_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TicketSignature',
+            fields=[
+                ('ticket', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='signature', serialize=False, to='issues.ticket')),
+                ('signature', models.BinaryField()),
+                ('updated_at', models.DateTimeField(db_index=True)),
+            ],
+        ),
+    ]
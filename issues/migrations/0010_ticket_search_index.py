@@ -0,0 +1,105 @@
+# Hand-written: full-text index over Ticket title, body and labels.
+
+from django.db import migrations
+
+SQLITE_TRIGGERS = [
+    # Triggers rather than signals: bulk_create (ticket ingestion) and
+    # queryset.update() never send post_save. The upsert's DO UPDATE fires
+    # the update trigger.
+    """
+    CREATE TRIGGER issues_ticket_fts_ai AFTER INSERT ON issues_ticket BEGIN
+        INSERT INTO issues_ticket_fts(rowid, title, body, labels)
+        VALUES (new.id, new.title, new.body, new.labels);
+    END
+    """,
+    """
+    CREATE TRIGGER issues_ticket_fts_ad AFTER DELETE ON issues_ticket BEGIN
+        INSERT INTO issues_ticket_fts(issues_ticket_fts, rowid, title, body, labels)
+        VALUES ('delete', old.id, old.title, old.body, old.labels);
+    END
+    """,
+    """
+    CREATE TRIGGER issues_ticket_fts_au AFTER UPDATE OF title, body, labels ON issues_ticket BEGIN
+        INSERT INTO issues_ticket_fts(issues_ticket_fts, rowid, title, body, labels)
+        VALUES ('delete', old.id, old.title, old.body, old.labels);
+        INSERT INTO issues_ticket_fts(rowid, title, body, labels)
+        VALUES (new.id, new.title, new.body, new.labels);
+    END
+    """,
+]
+
+SQLITE_FORWARD = [
+    # External-content table: the text lives only in issues_ticket, FTS5
+    # keeps just the inverted index. Labels are indexed as their JSON text;
+    # the tokenizer drops the brackets and quotes. Prefix indexes make the
+    # search box's trailing-word prefix match a single doclist lookup for
+    # short prefixes, which would otherwise expand to every matching term.
+    """
+    CREATE VIRTUAL TABLE issues_ticket_fts USING fts5(
+        title, body, labels,
+        content='issues_ticket', content_rowid='id',
+        tokenize='porter unicode61 remove_diacritics 2',
+        prefix='2 3 4'
+    )
+    """,
+    *SQLITE_TRIGGERS,
+    "INSERT INTO issues_ticket_fts(issues_ticket_fts) VALUES ('rebuild')",
+]
+
+SQLITE_REVERSE = [
+    "DROP TRIGGER IF EXISTS issues_ticket_fts_au",
+    "DROP TRIGGER IF EXISTS issues_ticket_fts_ad",
+    "DROP TRIGGER IF EXISTS issues_ticket_fts_ai",
+    "DROP TABLE IF EXISTS issues_ticket_fts",
+]
+
+# A stored generated column is kept current by Postgres itself on every
+# write path, so it needs no triggers. It is not a model field.
+POSTGRES_FORWARD = [
+    """
+    ALTER TABLE issues_ticket ADD COLUMN search_vector tsvector GENERATED ALWAYS AS (
+        setweight(to_tsvector('english', coalesce(title, '')), 'A') ||
+        setweight(to_tsvector('english', coalesce(labels::text, '')), 'B') ||
+        setweight(to_tsvector('english', coalesce(body, '')), 'C')
+    ) STORED
+    """,
+    "CREATE INDEX issues_ticket_search_idx ON issues_ticket USING gin (search_vector)",
+]
+
+POSTGRES_REVERSE = [
+    "DROP INDEX IF EXISTS issues_ticket_search_idx",
+    "ALTER TABLE issues_ticket DROP COLUMN IF EXISTS search_vector",
+]
+
+STATEMENTS = {
+    "sqlite": (SQLITE_FORWARD, SQLITE_REVERSE),
+    "postgresql": (POSTGRES_FORWARD, POSTGRES_REVERSE),
+}
+
+
+def _run(schema_editor, forward):
+    statements = STATEMENTS.get(schema_editor.connection.vendor)
+    if statements is None:
+        # Other databases fall back to icontains in ticket_search.
+        return
+    for sql in statements[0 if forward else 1]:
+        schema_editor.execute(sql)
+
+
+def create_search_index(apps, schema_editor):
+    _run(schema_editor, forward=True)
+
+
+def drop_search_index(apps, schema_editor):
+    _run(schema_editor, forward=False)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('issues', '0009_ticket_signature'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
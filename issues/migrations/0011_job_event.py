@@ -0,0 +1,32 @@
+# Generated by Django 4.2.7 on 2026-10-17 03:51
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('issues', '0010_ticket_search_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='JobEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('seq', models.PositiveIntegerField(default=0)),
+                ('level', models.PositiveSmallIntegerField(choices=[(10, 'Debug'), (20, 'Info'), (30, 'Warning'), (40, 'Error')], default=20)),
+                ('stage', models.CharField(blank=True, max_length=50)),
+                ('message', models.CharField(max_length=500)),
+                ('data', models.JSONField(blank=True, null=True)),
+                ('created_at', models.DateTimeField()),
+                ('elapsed_ms', models.PositiveIntegerField(default=0)),
+                ('job', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='events', to='issues.extractionjob')),
+                ('ticket', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='events', to='issues.ticket')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['job', 'seq'], name='job_event_seq_idx'), models.Index(fields=['ticket', '-id'], name='job_event_ticket_idx')],
+            },
+        ),
+    ]
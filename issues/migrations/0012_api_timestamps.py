@@ -0,0 +1,56 @@
+# Generated by Django 4.2.7 on 2026-10-17 04:10
+
+import importlib
+
+from django.db import migrations, models
+import django.utils.timezone
+
+search_index = importlib.import_module('issues.migrations.0010_ticket_search_index')
+
+
+def backfill_updated_at(apps, schema_editor):
+    # Nothing recorded when existing tickets last changed; start from
+    # created_at.
+    Ticket = apps.get_model('issues', 'Ticket')
+    Ticket.objects.update(updated_at=models.F('created_at'))
+
+
+def restore_search_triggers(apps, schema_editor):
+    # On SQLite, adding or removing a NOT NULL column rebuilds issues_ticket,
+    # and the rebuild drops the full-text sync triggers from 0010. Put them
+    # back, and resync the index with whatever was written without them.
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for name in ('ai', 'ad', 'au'):
+        schema_editor.execute(f'DROP TRIGGER IF EXISTS issues_ticket_fts_{name}')
+    for sql in search_index.SQLITE_TRIGGERS:
+        schema_editor.execute(sql)
+    schema_editor.execute("INSERT INTO issues_ticket_fts(issues_ticket_fts) VALUES ('rebuild')")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('issues', '0011_job_event'),
+    ]
+
+    operations = [
+        # Reversed, this runs after RemoveField's rebuild.
+        migrations.RunPython(migrations.RunPython.noop, restore_search_triggers),
+        migrations.AddField(
+            model_name='ticket',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, db_index=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+        migrations.RunPython(backfill_updated_at, migrations.RunPython.noop),
+        migrations.RunPython(restore_search_triggers, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='suggestedfix',
+            index=models.Index(fields=['-created_at', '-id'], name='suggestion_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='suggestedfix',
+            index=models.Index(fields=['ticket', '-created_at', '-id'], name='suggestion_ticket_created_idx'),
+        ),
+    ]
@@ -1,7 +1,16 @@
 # issues/models.py
+import uuid
+
 from django.db import models
 
 class Ticket(models.Model):
+    STATUS_UNSOLVED = "unsolved"
+    STATUS_SOLVED = "solved"
+    STATUS_CHOICES = [
+        (STATUS_UNSOLVED, "Unsolved"),
+        (STATUS_SOLVED, "Solved"),
+    ]
+
     repo = models.CharField(max_length=255)
     owner = models.CharField(max_length=255)
     issue_number = models.IntegerField()
@@ -9,7 +18,290 @@ class Ticket(models.Model):
     body = models.TextField()
     labels = models.JSONField()
     type = models.CharField(max_length=50)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=STATUS_UNSOLVED)
     created_at = models.DateTimeField(auto_now_add=True)
+    # Bumped by save() and by the ingest upsert; the API's ETag and
+    # Last-Modified come from it.
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["owner", "repo", "issue_number"], name="unique_ticket_issue"),
+        ]
+        # Every list filter is an equality prefix on the (-created_at, -id)
+        # keyset order used by view_tickets.
+        indexes = [
+            models.Index(fields=["-created_at", "-id"], name="ticket_created_idx"),
+            models.Index(fields=["owner", "repo", "-created_at", "-id"], name="ticket_owner_repo_created_idx"),
+            models.Index(fields=["repo", "-created_at", "-id"], name="ticket_repo_created_idx"),
+            models.Index(fields=["status", "-created_at", "-id"], name="ticket_status_created_idx"),
+            models.Index(fields=["type", "-created_at", "-id"], name="ticket_type_created_idx"),
+        ]
 
     def __str__(self):
         return f"{self.repo}#{self.issue_number} - {self.title}"
+
+
+class SuggestedFix(models.Model):
+    """
+    A stored agent suggestion, addressed by a hash of everything that went
+    into the prompt (see issues/services/suggestion_cache.py).
+    """
+    ticket = models.ForeignKey(Ticket, on_delete=models.CASCADE, related_name="suggestions")
+    cache_key = models.CharField(max_length=64, unique=True)
+    agent_version = models.CharField(max_length=100)
+    payload = models.JSONField()
+    created_at = models.DateTimeField(auto_now_add=True)
+    expires_at = models.DateTimeField(db_index=True)
+    hits = models.PositiveIntegerField(default=0)
+    generation_ms = models.PositiveIntegerField(null=True, blank=True)
+
+    class Meta:
+        # The API pages suggestions in the same (-created_at, -id) keyset
+        # order as tickets.
+        indexes = [
+            models.Index(fields=["-created_at", "-id"], name="suggestion_created_idx"),
+            models.Index(fields=["ticket", "-created_at", "-id"], name="suggestion_ticket_created_idx"),
+        ]
+
+    def __str__(self):
+        return f"Suggestion for {self.ticket} ({self.cache_key[:12]})"
+
+
+class ExtractionJob(models.Model):
+    """
+    One background run of "fetch issues from a GitHub URL and save them as
+    tickets", so the HTTP request that asks for it can return immediately.
+    """
+    STATUS_PENDING = "pending"
+    STATUS_RUNNING = "running"
+    STATUS_SUCCEEDED = "succeeded"
+    STATUS_FAILED = "failed"
+    STATUS_CHOICES = [
+        (STATUS_PENDING, "Pending"),
+        (STATUS_RUNNING, "Running"),
+        (STATUS_SUCCEEDED, "Succeeded"),
+        (STATUS_FAILED, "Failed"),
+    ]
+    FINISHED_STATUSES = {STATUS_SUCCEEDED, STATUS_FAILED}
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    url = models.URLField(max_length=500)
+    start_date = models.DateField(null=True, blank=True)
+    end_date = models.DateField(null=True, blank=True)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=STATUS_PENDING, db_index=True)
+    stage = models.CharField(max_length=50, blank=True)
+    progress = models.PositiveSmallIntegerField(default=0)
+    message = models.CharField(max_length=500, blank=True)
+    result = models.JSONField(null=True, blank=True)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    @property
+    def is_finished(self):
+        return self.status in self.FINISHED_STATUSES
+
+    @property
+    def duration_seconds(self):
+        if not self.started_at:
+            return None
+        return ((self.finished_at or self.updated_at) - self.started_at).total_seconds()
+
+    def as_dict(self):
+        return {
+            "job_id": str(self.id),
+            "url": self.url,
+            "status": self.status,
+            "stage": self.stage,
+            "progress": self.progress,
+            "message": self.message,
+            "result": self.result,
+            "error": self.error,
+            "created_at": self.created_at.isoformat(),
+            "started_at": self.started_at.isoformat() if self.started_at else None,
+            "finished_at": self.finished_at.isoformat() if self.finished_at else None,
+            "queued_seconds": (self.started_at - self.created_at).total_seconds() if self.started_at else None,
+            "duration_seconds": self.duration_seconds,
+        }
+
+    def __str__(self):
+        return f"Job {self.id} ({self.status}) for {self.url}"
+
+
+class JobEvent(models.Model):
+    """
+    One line of a job's progress log (see issues/services/job_events.py).
+    Events are buffered in memory and written in batches. `seq` orders them
+    within a job; `elapsed_ms` is monotonic time since the writer started,
+    so the order holds even if the wall clock jumps.
+    """
+    DEBUG = 10
+    INFO = 20
+    WARNING = 30
+    ERROR = 40
+    LEVEL_CHOICES = [
+        (DEBUG, "Debug"),
+        (INFO, "Info"),
+        (WARNING, "Warning"),
+        (ERROR, "Error"),
+    ]
+
+    job = models.ForeignKey(ExtractionJob, on_delete=models.CASCADE, null=True, blank=True, related_name="events")
+    ticket = models.ForeignKey(Ticket, on_delete=models.CASCADE, null=True, blank=True, related_name="events")
+    seq = models.PositiveIntegerField(default=0)
+    level = models.PositiveSmallIntegerField(choices=LEVEL_CHOICES, default=INFO)
+    stage = models.CharField(max_length=50, blank=True)
+    message = models.CharField(max_length=500)
+    data = models.JSONField(null=True, blank=True)
+    created_at = models.DateTimeField()
+    elapsed_ms = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["job", "seq"], name="job_event_seq_idx"),
+            models.Index(fields=["ticket", "-id"], name="job_event_ticket_idx"),
+        ]
+
+    def as_dict(self):
+        return {
+            "seq": self.seq,
+            "level": self.get_level_display().lower(),
+            "stage": self.stage,
+            "message": self.message,
+            "data": self.data,
+            "ticket_id": self.ticket_id,
+            "created_at": self.created_at.isoformat(),
+            "elapsed_ms": self.elapsed_ms,
+        }
+
+    def __str__(self):
+        return f"{self.get_level_display()} {self.stage or '-'}: {self.message[:60]}"
+
+
+class RepoSyncState(models.Model):
+    """
+    Incremental sync position for one GitHub repository: the newest
+    `updated_at` already applied and the ETag of the last listing.
+    """
+    owner = models.CharField(max_length=255)
+    repo = models.CharField(max_length=255)
+    enabled = models.BooleanField(default=True)
+    cursor = models.DateTimeField(null=True, blank=True)
+    etag = models.CharField(max_length=255, blank=True)
+    last_synced_at = models.DateTimeField(null=True, blank=True)
+    last_status = models.CharField(max_length=20, blank=True)
+    last_error = models.TextField(blank=True)
+    issues_synced = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["owner", "repo"], name="unique_repo_sync_state"),
+        ]
+
+    def __str__(self):
+        return f"{self.owner}/{self.repo}"
+
+
+class RepositoryIndex(models.Model):
+    """
+    Path and symbol index of one commit of a repository, used to rank the
+    files an issue most likely touches (see issues/services/repo_index.py).
+    `data` is zlib-compressed JSON.
+    """
+    owner = models.CharField(max_length=255)
+    repo = models.CharField(max_length=255)
+    commit_sha = models.CharField(max_length=64)
+    source = models.CharField(max_length=1024, blank=True)
+    file_count = models.PositiveIntegerField(default=0)
+    symbol_count = models.PositiveIntegerField(default=0)
+    data = models.BinaryField()
+    build_ms = models.PositiveIntegerField(default=0)
+    built_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["owner", "repo", "commit_sha"], name="unique_repository_index"),
+        ]
+        indexes = [
+            models.Index(fields=["owner", "repo", "-built_at"], name="repo_index_latest_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.owner}/{self.repo}@{self.commit_sha[:12]}"
+
+
+class TicketSignature(models.Model):
+    """
+    MinHash signature of a ticket's title and body, for near-duplicate
+    lookups (see issues/services/similarity.py).
+    """
+    ticket = models.OneToOneField(Ticket, on_delete=models.CASCADE, primary_key=True, related_name="signature")
+    signature = models.BinaryField()
+    updated_at = models.DateTimeField(db_index=True)
+
+    def __str__(self):
+        return f"Signature for {self.ticket_id}"
+
+
+class SuggestionWarmup(models.Model):
+    """
+    One pass of pre-computing suggestions for unsolved tickets. An
+    interrupted run is resumed rather than restarted: tickets it already
+    answered have a fresh suggestion and drop out of the queue, and the ones
+    that failed are remembered so they aren't retried in the same run.
+    """
+    STATUS_RUNNING = "running"
+    STATUS_INTERRUPTED = "interrupted"
+    STATUS_COMPLETED = "completed"
+    STATUS_CHOICES = [
+        (STATUS_RUNNING, "Running"),
+        (STATUS_INTERRUPTED, "Interrupted"),
+        (STATUS_COMPLETED, "Completed"),
+    ]
+
+    ORDER_NEWEST = "newest"
+    ORDER_LABEL = "label"
+    ORDER_CHOICES = [
+        (ORDER_NEWEST, "Newest first"),
+        (ORDER_LABEL, "Priority labels, then newest"),
+    ]
+
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=STATUS_RUNNING, db_index=True)
+    order = models.CharField(max_length=20, choices=ORDER_CHOICES, default=ORDER_NEWEST)
+    limit = models.PositiveIntegerField(null=True, blank=True)
+    total = models.PositiveIntegerField(default=0)
+    processed = models.PositiveIntegerField(default=0)
+    succeeded = models.PositiveIntegerField(default=0)
+    failed = models.PositiveIntegerField(default=0)
+    failed_ticket_ids = models.JSONField(default=list, blank=True)
+    latency_ms_total = models.PositiveBigIntegerField(default=0)
+    latency_ms_max = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    @property
+    def latency_ms_avg(self):
+        return round(self.latency_ms_total / self.processed) if self.processed else None
+
+    def as_dict(self):
+        return {
+            "id": self.id,
+            "status": self.status,
+            "order": self.order,
+            "total": self.total,
+            "processed": self.processed,
+            "succeeded": self.succeeded,
+            "failed": self.failed,
+            "latency_ms_avg": self.latency_ms_avg,
+            "latency_ms_max": self.latency_ms_max,
+            "created_at": self.created_at.isoformat(),
+            "updated_at": self.updated_at.isoformat(),
+            "finished_at": self.finished_at.isoformat() if self.finished_at else None,
+        }
+
+    def __str__(self):
+        return f"Warmup {self.id} ({self.status}, {self.processed}/{self.total})"
@@ -0,0 +1,47 @@
+# issues/serializers.py
+from rest_framework import serializers
+
+from issues.models import SuggestedFix, Ticket
+
+
+class SparseFieldsMixin:
+    """
+    Takes `fields=[names]` and drops every other field, for ?fields=.
+    """
+
+    def __init__(self, *args, fields=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        if fields is not None:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+
+
+class TicketSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    class Meta:
+        model = Ticket
+        fields = [
+            "id", "owner", "repo", "issue_number", "title", "body", "labels", "type", "status",
+            "created_at", "updated_at",
+        ]
+        # Tickets come from GitHub; only triage state is edited here.
+        read_only_fields = [name for name in fields if name != "status"]
+
+
+class SuggestionSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    ticket_id = serializers.IntegerField(read_only=True)
+    suggested_fix = serializers.SerializerMethodField()
+    files_to_fix = serializers.SerializerMethodField()
+
+    class Meta:
+        model = SuggestedFix
+        fields = [
+            "id", "ticket_id", "agent_version", "suggested_fix", "files_to_fix", "payload", "hits",
+            "generation_ms", "created_at", "expires_at",
+        ]
+        read_only_fields = fields
+
+    def get_suggested_fix(self, suggestion):
+        return suggestion.payload.get("suggested_fix") if isinstance(suggestion.payload, dict) else None
+
+    def get_files_to_fix(self, suggestion):
+        return suggestion.payload.get("files_to_fix") if isinstance(suggestion.payload, dict) else None
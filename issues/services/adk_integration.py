@@ -1,81 +1,66 @@
 # issues/services/adk_integration.py
-import json
+import logging
 import re
-import subprocess
-import tempfile
-import os
-from pathlib import Path
+
+from issues.services import telemetry
+from issues.services.agent_pool import AgentInvocationError, run_agent
+from issues.services.output_parser import StreamingOutputParser, parse_stream
+from issues.services.prompts import extract_issues_prompt
+
+logger = logging.getLogger(__name__)
 
 
 def get_issues_from_url(url: str):
     """
-    Extract GitHub issues from a URL using ADK CLI replay.
+    Extract GitHub issues from a URL using the github_mcp agent.
     """
-    prompt_text = f"Extract issues from {url}"
-
-    # Locate the agent directory
-    agent_dir = Path(__file__).parent.parent.parent / "adk_agents" / "github_mcp"
-
-    # Create replay JSON file
-    replay_data = {"state": {}, "queries": [prompt_text]}
-    with tempfile.NamedTemporaryFile(mode="w", suffix=".json", delete=False) as f:
-        json.dump(replay_data, f, indent=2)
-        replay_file = f.name
+    prompt_text = extract_issues_prompt(url)
+    parser = StreamingOutputParser(lambda value: accept_issues(value, url))
 
     try:
-        # Run ADK CLI with replay
-        result = subprocess.run(
-            ["adk", "run", str(agent_dir), "--replay", replay_file],
-            capture_output=True,
-            text=True,
-            timeout=120,
-            cwd=str(agent_dir.parent),
-        )
-
-        if result.returncode == 0:
-            return parse_adk_output(result.stdout, url)
+        run_agent("github_mcp", prompt_text, stop_when=parser.feed)
+    except AgentInvocationError as e:
+        logger.error(f"github_mcp agent failed for {url}: {e}")
         return []
 
-    finally:
-        try:
-            os.unlink(replay_file)
-        except OSError:
-            pass
+    issues = parser.finish() or []
+    telemetry.record_parse("github_mcp", parser)
+    return issues
 
 
 def parse_adk_output(output: str, url: str):
     """
     Parse JSON issue objects from ADK CLI output.
     """
-    json_patterns = [
-        r"(\{[^{}]*\"repo\"[^{}]*\})",            # Single issue object
-        r"(\[[^\[\]]*\{[^{}]*\"repo\"[^{}]*\}[^\[\]]*\])",  # Array of issues
-        r"```json\s*(\{.*?\})\s*```",             # JSON in markdown block
-        r"```json\s*(\[.*?\])\s*```",             # JSON array in markdown block
-    ]
-
-    for pattern in json_patterns:
-        matches = re.findall(pattern, output, re.DOTALL)
-        for match in matches:
-            try:
-                issues = json.loads(match)
-                if isinstance(issues, dict):
-                    issues = [issues]
-
-                valid_issues = []
-                for issue in issues:
-                    if isinstance(issue, dict):
-                        issue = fill_missing_fields(issue, url)
-                        if all(k in issue for k in ["repo", "owner", "issue_number", "title"]):
-                            valid_issues.append(issue)
-
-                if valid_issues:
-                    return valid_issues
-
-            except json.JSONDecodeError:
-                continue
-
-    return []
+    return parse_stream([output], lambda value: accept_issues(value, url)) or []
+
+
+def accept_issues(value, url: str):
+    """
+    Turn one decoded JSON value into a list of complete issues, or None.
+    Accepts a single issue, a list of issues, or an object wrapping a list.
+    """
+    if isinstance(value, dict) and not _looks_like_issue(value):
+        value = next(
+            (v for v in value.values() if isinstance(v, list) and any(_looks_like_issue(i) for i in v)),
+            None,
+        )
+    if isinstance(value, dict):
+        value = [value]
+    if not isinstance(value, list):
+        return None
+
+    valid_issues = []
+    for issue in value:
+        if _looks_like_issue(issue):
+            issue = fill_missing_fields(issue, url)
+            if all(k in issue for k in ["repo", "owner", "issue_number", "title"]):
+                valid_issues.append(issue)
+    return valid_issues or None
+
+
+def _looks_like_issue(value):
+    return isinstance(value, dict) and any(k in value for k in ("repo", "issue_number", "title"))
 
 
 def fill_missing_fields(issue: dict, url: str):
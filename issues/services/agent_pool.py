@@ -0,0 +1,735 @@
+# issues/services/agent_pool.py
+import asyncio
+import atexit
+import importlib
+import itertools
+import json
+import logging
+import multiprocessing
+import os
+import queue
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import Future
+from pathlib import Path
+
+from django.conf import settings
+
+from issues.services import telemetry
+
+logger = logging.getLogger(__name__)
+
+AGENTS_DIR = Path(__file__).parent.parent.parent / "adk_agents"
+
+DEFAULT_POOL_SETTINGS = {
+    "ENABLED": True,
+    "SIZE": 2,
+    "MAX_REQUESTS": 100,
+    "REQUEST_TIMEOUT": 120,
+    "HEARTBEAT_INTERVAL": 5,
+    "HEARTBEAT_TIMEOUT": 30,
+    "STARTUP_TIMEOUT": 60,
+    "RESTART_BACKOFF": 10,
+    # argv prefix for the replay path, e.g. a wrapper script or a fake agent.
+    "REPLAY_COMMAND": ["adk"],
+}
+
+
+# Longest single line of agent output the async replay path will buffer.
+REPLAY_LINE_LIMIT = 16 * 1024 * 1024
+
+
+class AgentInvocationError(Exception):
+    """
+    Raised when an agent query could not be answered. `stderr` is the ADK
+    CLI's error output and `status` the HTTP status of a failed model API
+    call, where known; the message may quote the agent's whole transcript.
+    """
+
+    def __init__(self, message, stderr=None, status=None):
+        super().__init__(message)
+        self.stderr = stderr
+        self.status = status
+
+
+def get_pool_settings():
+    config = dict(DEFAULT_POOL_SETTINGS)
+    config.update(getattr(settings, "ADK_AGENT_POOL", {}))
+    return config
+
+
+# ---------------------------------------------------------------------------
+# Worker process side
+# ---------------------------------------------------------------------------
+
+class _AgentRunner:
+    """
+    Holds one loaded agent and a private event loop inside a worker process.
+    The agent module (and its MCP toolset) is imported once and reused for
+    every query the worker serves.
+    """
+
+    user_id = "django"
+
+    def __init__(self, agent_name):
+        from google.adk.runners import InMemoryRunner
+
+        self.app_name = agent_name
+        self.agent = importlib.import_module(agent_name).agent
+        self.runner = InMemoryRunner(agent=self.agent, app_name=agent_name)
+        self.loop = asyncio.new_event_loop()
+
+    def run(self, prompt_text):
+        return self.loop.run_until_complete(self._run(prompt_text))
+
+    async def _run(self, prompt_text):
+        from google.genai import types
+
+        sessions = self.runner.session_service
+        session = await sessions.create_session(app_name=self.app_name, user_id=self.user_id)
+        message = types.Content(role="user", parts=[types.Part(text=prompt_text)])
+
+        chunks = []
+        try:
+            async for event in self.runner.run_async(
+                user_id=self.user_id, session_id=session.id, new_message=message
+            ):
+                if event.content and event.content.parts:
+                    chunks.extend(part.text for part in event.content.parts if getattr(part, "text", None))
+        finally:
+            await sessions.delete_session(app_name=self.app_name, user_id=self.user_id, session_id=session.id)
+        return "\n".join(chunks)
+
+    def close(self):
+        for tool in getattr(self.agent, "tools", []):
+            close = getattr(tool, "close", None)
+            if close is not None:
+                try:
+                    self.loop.run_until_complete(close())
+                except Exception:
+                    pass
+        self.loop.close()
+
+
+def _error_status(error):
+    """
+    The HTTP status carried by a model API error (google.genai's APIError
+    has it as `code`), or None.
+    """
+    for name in ("code", "status_code"):
+        value = getattr(error, name, None)
+        if isinstance(value, int):
+            return value
+    return None
+
+
+def _worker_main(worker_id, agent_name, agents_dir, max_requests, heartbeat_interval, requests_q, responses_q):
+    """
+    Entry point of a pool worker. Messages sent back to the parent are
+    (kind, worker_id, request_id, payload) tuples.
+    """
+    sys.path.insert(0, agents_dir)
+    try:
+        runner = _AgentRunner(agent_name)
+    except Exception as e:
+        responses_q.put(("failed", worker_id, None, f"Could not load agent {agent_name}: {e!r}"))
+        return
+
+    responses_q.put(("ready", worker_id, None, None))
+    served = 0
+    while served < max_requests:
+        try:
+            request_id, prompt_text = requests_q.get(timeout=heartbeat_interval)
+        except queue.Empty:
+            responses_q.put(("heartbeat", worker_id, None, None))
+            continue
+        if request_id is None:
+            break
+
+        responses_q.put(("started", worker_id, request_id, None))
+        try:
+            responses_q.put(("done", worker_id, request_id, runner.run(prompt_text)))
+        except Exception as e:
+            responses_q.put(("error", worker_id, request_id, (repr(e), _error_status(e))))
+        served += 1
+
+    runner.close()
+    responses_q.put(("retired", worker_id, None, None))
+
+
+# ---------------------------------------------------------------------------
+# Parent (Django) side
+# ---------------------------------------------------------------------------
+
+class _WorkerHandle:
+    def __init__(self, worker_id, process):
+        self.id = worker_id
+        self.process = process
+        self.state = "starting"
+        self.request_id = None
+        self.busy_since = None
+        self.last_seen = time.monotonic()
+        self.spawned_at = self.last_seen
+        self.served = 0
+
+
+class AgentPool:
+    """
+    A fixed-size pool of long-lived worker processes that each keep one ADK
+    agent loaded. Queries are put on a shared request queue and answered
+    through a shared response queue; a single dispatcher thread resolves the
+    matching futures, watches heartbeats and replaces dead, hung or retired
+    workers.
+    """
+
+    def __init__(self, agent_name, size, max_requests, request_timeout,
+                 heartbeat_interval, heartbeat_timeout, startup_timeout, restart_backoff):
+        self.agent_name = agent_name
+        self.size = size
+        self.max_requests = max_requests
+        self.request_timeout = request_timeout
+        self.heartbeat_interval = heartbeat_interval
+        self.heartbeat_timeout = heartbeat_timeout
+        self.startup_timeout = startup_timeout
+        self.restart_backoff = restart_backoff
+
+        self._ctx = multiprocessing.get_context("spawn")
+        self._requests = self._ctx.Queue()
+        self._responses = self._ctx.Queue()
+        self._workers = {}
+        self._pending = {}
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._stopping = threading.Event()
+        self._next_spawn_at = 0.0
+        self._recycled = 0
+        self._last_error = None
+        self._dispatcher = None
+
+    @classmethod
+    def from_settings(cls, agent_name):
+        config = get_pool_settings()
+        return cls(
+            agent_name,
+            size=config["SIZE"],
+            max_requests=config["MAX_REQUESTS"],
+            request_timeout=config["REQUEST_TIMEOUT"],
+            heartbeat_interval=config["HEARTBEAT_INTERVAL"],
+            heartbeat_timeout=config["HEARTBEAT_TIMEOUT"],
+            startup_timeout=config["STARTUP_TIMEOUT"],
+            restart_backoff=config["RESTART_BACKOFF"],
+        )
+
+    def start(self):
+        with self._lock:
+            for _ in range(self.size):
+                self._spawn()
+        self._dispatcher = threading.Thread(
+            target=self._dispatch_loop, name=f"agent-pool-{self.agent_name}", daemon=True
+        )
+        self._dispatcher.start()
+
+    def submit(self, prompt_text):
+        """
+        Queue a prompt and return a concurrent.futures.Future for its output.
+        """
+        request_id = uuid.uuid4().hex
+        future = Future()
+        future.request_id = request_id
+        future.submitted_at = time.monotonic()
+        future.started_at = future.finished_at = None
+        with self._lock:
+            self._pending[request_id] = future
+        self._requests.put((request_id, prompt_text))
+        return future
+
+    def forget(self, future):
+        """
+        Stop tracking a request whose caller gave up waiting on it.
+        """
+        with self._lock:
+            self._pending.pop(future.request_id, None)
+
+    def run(self, prompt_text, timeout=None):
+        timeout = timeout or self.request_timeout
+        future = self.submit(prompt_text)
+        try:
+            return future.result(timeout=timeout)
+        except TimeoutError:
+            self.forget(future)
+            raise AgentInvocationError(f"{self.agent_name} did not answer within {timeout}s")
+        finally:
+            record_pool_timings(self.agent_name, future)
+
+    def health(self):
+        with self._lock:
+            workers = [
+                {
+                    "id": w.id,
+                    "pid": w.process.pid,
+                    "state": w.state,
+                    "alive": w.process.is_alive(),
+                    "served": w.served,
+                    "seconds_since_seen": round(time.monotonic() - w.last_seen, 1),
+                }
+                for w in self._workers.values()
+            ]
+            return {
+                "agent": self.agent_name,
+                "size": self.size,
+                "healthy": sum(1 for w in workers if w["alive"] and w["state"] in ("idle", "busy")),
+                "pending": len(self._pending),
+                "recycled": self._recycled,
+                "last_error": self._last_error,
+                "workers": workers,
+            }
+
+    def shutdown(self, timeout=5):
+        self._stopping.set()
+        with self._lock:
+            workers = list(self._workers.values())
+            for _ in workers:
+                self._requests.put((None, None))
+        for worker in workers:
+            worker.process.join(timeout)
+            if worker.process.is_alive():
+                worker.process.terminate()
+        with self._lock:
+            for future in self._pending.values():
+                if not future.done():
+                    future.set_exception(AgentInvocationError("Agent pool shut down"))
+            self._pending.clear()
+
+    # -- internals ---------------------------------------------------------
+
+    def _spawn(self):
+        worker_id = next(self._ids)
+        process = self._ctx.Process(
+            target=_worker_main,
+            args=(worker_id, self.agent_name, str(AGENTS_DIR), self.max_requests,
+                  self.heartbeat_interval, self._requests, self._responses),
+            name=f"adk-{self.agent_name}-{worker_id}",
+            daemon=True,
+        )
+        process.start()
+        self._workers[worker_id] = _WorkerHandle(worker_id, process)
+
+    def _dispatch_loop(self):
+        while not self._stopping.is_set():
+            try:
+                message = self._responses.get(timeout=self.heartbeat_interval)
+            except queue.Empty:
+                message = None
+            except (EOFError, OSError):
+                break
+            with self._lock:
+                if message is not None:
+                    self._handle(*message)
+                self._check_workers()
+
+    def _handle(self, kind, worker_id, request_id, payload):
+        worker = self._workers.get(worker_id)
+        if worker is None:
+            return
+        worker.last_seen = time.monotonic()
+
+        if kind == "ready":
+            worker.state = "idle"
+            # Loading the agent module and its toolset, MCP server included.
+            telemetry.record_stage("agent.worker_start", worker.last_seen - worker.spawned_at, agent=self.agent_name)
+        elif kind == "started":
+            worker.state = "busy"
+            worker.request_id = request_id
+            worker.busy_since = worker.last_seen
+            future = self._pending.get(request_id)
+            if future is not None:
+                future.started_at = worker.last_seen
+        elif kind in ("done", "error"):
+            worker.state = "idle"
+            worker.request_id = None
+            worker.busy_since = None
+            worker.served += 1
+            future = self._pending.pop(request_id, None)
+            if future is not None:
+                future.finished_at = worker.last_seen
+            if future is not None and not future.done():
+                if kind == "done":
+                    future.set_result(payload)
+                else:
+                    message, status = payload
+                    future.set_exception(AgentInvocationError(message, status=status))
+        elif kind == "retired":
+            worker.state = "retired"
+            self._recycled += 1
+        elif kind == "failed":
+            worker.state = "failed"
+            self._last_error = payload
+            logger.error(f"Agent worker {worker_id} failed to start: {payload}")
+            if not any(w.state in ("starting", "idle", "busy") for w in self._workers.values()):
+                # Nobody can serve the queue, so fail waiting callers now
+                # instead of letting them sit out the full request timeout.
+                for future in self._pending.values():
+                    if not future.done():
+                        future.set_exception(AgentInvocationError(payload))
+                self._pending.clear()
+
+    def _drain(self):
+        """
+        Handle every message already queued.
+        """
+        while True:
+            try:
+                message = self._responses.get_nowait()
+            except (queue.Empty, EOFError, OSError):
+                return
+            self._handle(*message)
+
+    def _check_workers(self):
+        if any(not w.process.is_alive() for w in self._workers.values()):
+            # A worker puts its last answer (and "retired") before it exits,
+            # so read those first rather than calling a finished worker dead.
+            self._drain()
+        now = time.monotonic()
+        for worker in list(self._workers.values()):
+            reason = None
+            if worker.state in ("retired", "failed"):
+                reason = worker.state
+            elif not worker.process.is_alive():
+                reason = "died"
+            elif worker.state == "busy" and now - worker.busy_since > self.request_timeout:
+                reason = "hung"
+            elif worker.state == "starting" and now - worker.last_seen > self.startup_timeout:
+                reason = "unresponsive"
+            elif worker.state == "idle" and now - worker.last_seen > self.heartbeat_timeout:
+                reason = "unresponsive"
+            if reason is None:
+                continue
+
+            if reason != "retired":
+                logger.warning(f"Replacing {self.agent_name} worker {worker.id} ({reason})")
+            if worker.process.is_alive() and reason != "retired":
+                worker.process.terminate()
+            worker.process.join(1)
+            if worker.request_id:
+                future = self._pending.pop(worker.request_id, None)
+                if future is not None and not future.done():
+                    future.set_exception(AgentInvocationError(f"Agent worker {reason} while serving request"))
+            del self._workers[worker.id]
+            if reason == "failed" or (reason == "died" and worker.state == "starting"):
+                # Don't crash-loop when the agent can't even be loaded.
+                self._next_spawn_at = now + self.restart_backoff
+
+        if not self._stopping.is_set() and now >= self._next_spawn_at:
+            while len(self._workers) < self.size:
+                self._spawn()
+
+
+def record_pool_timings(agent_name, future):
+    """
+    Split a pool request into time queued for a free worker and time the
+    worker spent running the agent (model and tool calls).
+    """
+    if future.started_at is None:
+        telemetry.record_stage("agent.queue_wait", time.monotonic() - future.submitted_at, outcome="error",
+                               agent=agent_name)
+        return
+    telemetry.record_stage("agent.queue_wait", future.started_at - future.submitted_at, agent=agent_name)
+    if future.finished_at is not None:
+        ok = future.done() and not future.cancelled() and future.exception() is None
+        outcome = "ok" if ok else "error"
+        telemetry.record_stage("agent.run", future.finished_at - future.started_at, outcome=outcome, agent=agent_name)
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(agent_name):
+    with _pools_lock:
+        pool = _pools.get(agent_name)
+        if pool is None:
+            pool = AgentPool.from_settings(agent_name)
+            pool.start()
+            _pools[agent_name] = pool
+        return pool
+
+
+def pool_health():
+    with _pools_lock:
+        return [pool.health() for pool in _pools.values()]
+
+
+@atexit.register
+def shutdown_pools():
+    with _pools_lock:
+        for pool in _pools.values():
+            pool.shutdown()
+        _pools.clear()
+
+
+def _replay_argv(agent_dir, replay_file):
+    return [*get_pool_settings()["REPLAY_COMMAND"], "run", str(agent_dir), "--replay", replay_file]
+
+
+def _write_replay_file(prompt_text):
+    replay_data = {"state": {}, "queries": [prompt_text]}
+    with tempfile.NamedTemporaryFile(mode="w", suffix=".json", delete=False) as f:
+        json.dump(replay_data, f, indent=2)
+        return f.name
+
+
+def _remove_replay_file(replay_file):
+    try:
+        os.unlink(replay_file)
+    except OSError:
+        pass
+
+
+class _ReplayTimings:
+    """
+    Splits an `adk run --replay` process into start-up (interpreter, agent
+    and MCP toolset loading, up to the first line of output) and the run
+    itself (model and tool calls).
+    """
+
+    def __init__(self, agent_name):
+        self.agent_name = agent_name
+        self.spawned_at = time.perf_counter()
+        self.first_output_at = None
+
+    def output(self):
+        if self.first_output_at is None:
+            self.first_output_at = time.perf_counter()
+            telemetry.record_stage("agent.process_start", self.first_output_at - self.spawned_at, agent=self.agent_name)
+
+    def finish(self):
+        now = time.perf_counter()
+        if self.first_output_at is None:
+            telemetry.record_stage("agent.process_start", now - self.spawned_at, outcome="error", agent=self.agent_name)
+        else:
+            telemetry.record_stage("agent.run", now - self.first_output_at, agent=self.agent_name)
+
+
+def run_adk_replay(agent_name, prompt_text, timeout=120, stop_when=None):
+    """
+    Run a single query through `adk run --replay` in a fresh process.
+    This is the slow path used when the warm pool is disabled.
+
+    Output is read line by line as the agent writes it. If `stop_when`
+    returns true for a line, the process is stopped and the output read so
+    far is returned.
+    """
+    agent_dir = AGENTS_DIR / agent_name
+    with telemetry.stage("agent.write_prompt", agent=agent_name):
+        replay_file = _write_replay_file(prompt_text)
+
+    lines = []
+    stopped_early = False
+    timings = _ReplayTimings(agent_name)
+    try:
+        with tempfile.TemporaryFile(mode="w+") as stderr:
+            process = subprocess.Popen(
+                _replay_argv(agent_dir, replay_file),
+                stdout=subprocess.PIPE,
+                stderr=stderr,
+                text=True,
+                cwd=str(agent_dir.parent),
+            )
+            timer = threading.Timer(timeout, process.kill)
+            timer.start()
+            try:
+                for line in process.stdout:
+                    timings.output()
+                    lines.append(line)
+                    if stop_when is not None and stop_when(line):
+                        stopped_early = True
+                        process.terminate()
+                        break
+                process.stdout.close()
+                returncode = process.wait()
+                timed_out = not timer.is_alive() and not stopped_early
+            finally:
+                timer.cancel()
+                if process.poll() is None:
+                    process.kill()
+                    process.wait()
+            stderr.seek(0)
+            error_output = stderr.read()
+    finally:
+        _remove_replay_file(replay_file)
+        timings.finish()
+
+    output = "".join(lines)
+    if timed_out:
+        raise AgentInvocationError(f"ADK CLI replay timed out after {timeout}s")
+    if returncode != 0 and not stopped_early:
+        raise AgentInvocationError(f"ADK CLI failed. stdout: {output}, stderr: {error_output}", stderr=error_output)
+    return output
+
+
+def run_agent(agent_name, prompt_text, timeout=None, stop_when=None):
+    """
+    Send one prompt to an agent under adk_agents/ and return its text output.
+    Routes through the warm worker pool unless ADK_AGENT_POOL["ENABLED"] is off.
+
+    `stop_when` is called with output as it arrives (one line at a time for
+    the replay path, the whole answer for the pool) and may return true to
+    stop reading early.
+
+    Calls go through the Gemini rate limiter (issues.services.rate_limiter)
+    when it is enabled; wrap bulk work in rate_limiter.traffic_class("bulk").
+    """
+    with telemetry.stage("agent.call", agent=agent_name):
+        telemetry.record_prompt(agent_name, prompt_text)
+        limiter = _rate_limiter()
+        if limiter is None:
+            output = _invoke(agent_name, prompt_text, timeout, stop_when)
+        else:
+            from issues.services.rate_limiter import RateLimitTimeout
+
+            waiting = _LimiterWait(agent_name)
+
+            def attempt():
+                waiting.done()
+                return _invoke(agent_name, prompt_text, timeout, stop_when)
+
+            try:
+                output = limiter.call(attempt)
+            except RateLimitTimeout as e:
+                raise AgentInvocationError(str(e)) from e
+        telemetry.record_response(agent_name, output)
+        return output
+
+
+class _LimiterWait:
+    """
+    Times how long a call waited on the rate limiter for each attempt.
+    done() is called as the limiter lets the call through.
+    """
+
+    def __init__(self, agent_name):
+        self.agent_name = agent_name
+        self.since = time.perf_counter()
+
+    def done(self):
+        now = time.perf_counter()
+        telemetry.record_stage("agent.rate_limit_wait", now - self.since, agent=self.agent_name)
+        self.since = now
+
+
+def _rate_limiter():
+    # Imported lazily: the limiter reads settings that may not be configured
+    # when agent pool worker processes import this module.
+    from issues.services.rate_limiter import get_rate_limiter
+
+    return get_rate_limiter()
+
+
+def _invoke(agent_name, prompt_text, timeout, stop_when):
+    config = get_pool_settings()
+    timeout = timeout or config["REQUEST_TIMEOUT"]
+    if not config["ENABLED"]:
+        return run_adk_replay(agent_name, prompt_text, timeout=timeout, stop_when=stop_when)
+    output = get_pool(agent_name).run(prompt_text, timeout=timeout)
+    if stop_when is not None:
+        stop_when(output)
+    return output
+
+
+async def arun_adk_replay(agent_name, prompt_text, timeout=120, stop_when=None):
+    """
+    asyncio version of run_adk_replay: the subprocess is awaited instead of
+    holding a thread for the length of the query.
+    """
+    agent_dir = AGENTS_DIR / agent_name
+    with telemetry.stage("agent.write_prompt", agent=agent_name):
+        replay_file = _write_replay_file(prompt_text)
+    timings = _ReplayTimings(agent_name)
+    try:
+        process = await asyncio.create_subprocess_exec(
+            *_replay_argv(agent_dir, replay_file),
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+            cwd=str(agent_dir.parent),
+            limit=REPLAY_LINE_LIMIT,
+        )
+        # Drain stderr alongside stdout so a chatty agent can't fill the pipe.
+        stderr_task = asyncio.ensure_future(process.stderr.read())
+        lines = []
+
+        async def read_output():
+            async for line in process.stdout:
+                timings.output()
+                lines.append(line.decode("utf-8", errors="replace"))
+                if stop_when is not None and stop_when(lines[-1]):
+                    return True
+            return False
+
+        try:
+            stopped_early = await asyncio.wait_for(read_output(), timeout)
+        except asyncio.TimeoutError:
+            raise AgentInvocationError(f"ADK CLI replay timed out after {timeout}s")
+        finally:
+            if process.returncode is None:
+                process.kill()
+            returncode = await process.wait()
+            error_output = (await stderr_task).decode("utf-8", errors="replace")
+    finally:
+        _remove_replay_file(replay_file)
+        timings.finish()
+
+    output = "".join(lines)
+    if returncode != 0 and not stopped_early:
+        raise AgentInvocationError(f"ADK CLI failed. stdout: {output}, stderr: {error_output}", stderr=error_output)
+    return output
+
+
+async def arun_agent(agent_name, prompt_text, timeout=None, stop_when=None):
+    """
+    asyncio version of run_agent, for async views. A pool request is awaited
+    through its Future, so a waiting request costs a coroutine, not a thread.
+    """
+    with telemetry.stage("agent.call", agent=agent_name):
+        telemetry.record_prompt(agent_name, prompt_text)
+        limiter = _rate_limiter()
+        if limiter is None:
+            output = await _ainvoke(agent_name, prompt_text, timeout, stop_when)
+        else:
+            from issues.services.rate_limiter import RateLimitTimeout
+
+            waiting = _LimiterWait(agent_name)
+
+            def attempt():
+                waiting.done()
+                return _ainvoke(agent_name, prompt_text, timeout, stop_when)
+
+            try:
+                output = await limiter.acall(attempt)
+            except RateLimitTimeout as e:
+                raise AgentInvocationError(str(e)) from e
+        telemetry.record_response(agent_name, output)
+        return output
+
+
+async def _ainvoke(agent_name, prompt_text, timeout, stop_when):
+    config = get_pool_settings()
+    timeout = timeout or config["REQUEST_TIMEOUT"]
+    if not config["ENABLED"]:
+        return await arun_adk_replay(agent_name, prompt_text, timeout=timeout, stop_when=stop_when)
+
+    pool = get_pool(agent_name)
+    future = pool.submit(prompt_text)
+    try:
+        output = await asyncio.wait_for(asyncio.wrap_future(future), timeout)
+    except asyncio.TimeoutError:
+        pool.forget(future)
+        raise AgentInvocationError(f"{agent_name} did not answer within {timeout}s")
+    finally:
+        record_pool_timings(agent_name, future)
+    if stop_when is not None:
+        stop_when(output)
+    return output
@@ -0,0 +1,153 @@
+# issues/services/batch_suggest.py
+import logging
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import close_old_connections
+
+from issues.services.prompts import BATCH_INSTRUCTIONS, count_tokens, issue_details
+from issues.services.rate_limiter import mark_thread_bulk
+from issues.services.repo_index import preload_indexes
+from issues.services.suggest_fix_integration import suggest_fix_for_ticket, suggest_fixes_for_tickets
+from issues.services.suggestion_cache import (
+    get_cached_suggestion,
+    record_miss,
+    reused_suggestion,
+    store_suggestion,
+    suggestion_cache_key,
+)
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BATCH_SETTINGS = {
+    "TOKEN_BUDGET": 8000,
+    "OUTPUT_TOKENS_PER_TICKET": 200,
+    "MAX_TICKETS": 20,
+    "CONCURRENCY": 2,
+    "TIMEOUT": 300,
+    "VIEW_LIMIT": 200,
+}
+
+# Ticket columns the prompt and cache key need.
+SUGGEST_FIELDS = ["id", "owner", "repo", "issue_number", "title", "body", "labels", "created_at"]
+
+BatchResult = namedtuple(
+    "BatchResult",
+    ["suggestions", "sources", "failed", "batches", "retried", "elapsed", "tickets_per_minute"],
+)
+
+
+def get_batch_settings():
+    config = dict(DEFAULT_BATCH_SETTINGS)
+    config.update(getattr(settings, "SUGGEST_BATCH", {}))
+    return config
+
+
+def plan_batches(tickets, token_budget=None, max_tickets=None):
+    """
+    Pack tickets, in order, into batches whose prompt plus expected answer
+    stays within `token_budget`. A ticket too large for any batch still gets
+    a batch of its own.
+    """
+    config = get_batch_settings()
+    token_budget = token_budget or config["TOKEN_BUDGET"]
+    max_tickets = max_tickets or config["MAX_TICKETS"]
+    overhead = count_tokens(BATCH_INSTRUCTIONS)
+
+    batches = []
+    current, used = [], overhead
+    for ticket in tickets:
+        cost = count_tokens(issue_details(ticket)) + config["OUTPUT_TOKENS_PER_TICKET"]
+        if current and (used + cost > token_budget or len(current) >= max_tickets):
+            batches.append(current)
+            current, used = [], overhead
+        current.append(ticket)
+        used += cost
+    if current:
+        batches.append(current)
+    return batches
+
+
+def suggest_fixes_batch(tickets, force=False, token_budget=None, max_tickets=None, concurrency=None):
+    """
+    Suggest fixes for many tickets with as few agent requests as the token
+    budget allows.
+
+    Cached suggestions are served as usual. The rest are packed into batches
+    that run concurrently; every ticket a batch fails to answer is retried on
+    its own. Results are stored in the suggestion cache.
+    """
+    config = get_batch_settings()
+    concurrency = concurrency or config["CONCURRENCY"]
+    started = time.monotonic()
+
+    suggestions, sources, keys = {}, {}, {}
+    pending = []
+    for ticket in tickets:
+        keys[ticket.id] = suggestion_cache_key(ticket)
+        if not force:
+            payload, source = get_cached_suggestion(ticket, keys[ticket.id])
+            if payload is not None:
+                suggestions[ticket.id], sources[ticket.id] = payload, source
+                continue
+            payload = reused_suggestion(ticket)
+            if payload is not None:
+                suggestions[ticket.id], sources[ticket.id] = payload, "reused"
+                continue
+        record_miss()
+        pending.append(ticket)
+
+    preload_indexes(pending)
+    batches = plan_batches(pending, token_budget, max_tickets)
+    retry = []
+    with ThreadPoolExecutor(
+        max_workers=concurrency, thread_name_prefix="suggest-batch", initializer=mark_thread_bulk
+    ) as executor:
+        answers = executor.map(lambda batch: suggest_fixes_for_tickets(batch, timeout=config["TIMEOUT"]), batches)
+        for batch, fixes in zip(batches, answers):
+            for ticket in batch:
+                if ticket.id in fixes:
+                    suggestions[ticket.id], sources[ticket.id] = fixes[ticket.id], "batch"
+                else:
+                    retry.append(ticket)
+
+        if retry:
+            logger.warning(f"Retrying {len(retry)} ticket(s) individually after batch parse failures")
+        for ticket, payload in zip(retry, executor.map(suggest_fix_for_ticket, retry)):
+            if payload:
+                suggestions[ticket.id], sources[ticket.id] = payload, "single"
+
+    # Stored from this thread: the workers above never touch the database.
+    for ticket in pending:
+        if ticket.id in suggestions:
+            store_suggestion(ticket, suggestions[ticket.id], keys[ticket.id])
+
+    failed = [ticket.id for ticket in pending if ticket.id not in suggestions]
+    elapsed = time.monotonic() - started
+    generated = len(pending) - len(failed)
+    tickets_per_minute = round(generated / elapsed * 60, 1) if elapsed > 0 else None
+
+    logger.info(
+        f"Batch suggest: {len(tickets)} tickets, {len(tickets) - len(pending)} cached, "
+        f"{len(batches)} batches, {len(retry)} retried, {len(failed)} failed, "
+        f"{elapsed:.1f}s ({tickets_per_minute} tickets/min)"
+    )
+    return BatchResult(suggestions, sources, failed, len(batches), len(retry), elapsed, tickets_per_minute)
+
+
+async def asuggest_fixes_batch(tickets, **kwargs):
+    """
+    suggest_fixes_batch for async views. The batch runs on a thread of its
+    own rather than the one sync_to_async shares, so minutes of agent calls
+    don't hold up every other request's database work.
+    """
+    def run():
+        try:
+            return suggest_fixes_batch(tickets, **kwargs)
+        finally:
+            close_old_connections()
+
+    return await sync_to_async(run, thread_sensitive=False)()
@@ -0,0 +1,365 @@
+# issues/services/conversations.py
+"""
+Follow-up conversations about a ticket.
+
+One session per ticket holds the recent exchanges verbatim, a rolling
+summary of older ones and facts pulled out of them (file paths, error
+types, function names, versions, URLs). After every exchange the session is
+compacted: the oldest exchanges are folded into the summary until at most
+MAX_TURNS remain and the rendered history fits HISTORY_TOKENS. Each stored
+message is cut to MESSAGE_TOKENS and the summary to SUMMARY_TOKENS, so a
+follow-up prompt stays about the same size however long the conversation
+gets, and a session never grows past MAX_SESSION_BYTES.
+
+Sessions live in the Django cache when it is Redis (REDIS_CACHE_URL), so
+web and Celery processes share them; each write is recorded with
+retention.track_session, so cleanup_old_sessions evicts idle ones.
+Otherwise they live in a per-process LRU of LOCAL_MAX_SESSIONS.
+"""
+import json
+import logging
+import re
+import threading
+import time
+import uuid
+from collections import OrderedDict, namedtuple
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import caches
+
+from issues.services import telemetry
+from issues.services.agent_pool import AgentInvocationError, arun_agent, run_agent
+from issues.services.output_parser import StreamingOutputParser
+from issues.services.prompts import compact_text, conversation_prompt, count_tokens
+from issues.services.retention import track_session
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CONVERSATION_SETTINGS = {
+    # "cache", "local", or None to use the cache only when it is Redis.
+    "BACKEND": None,
+    "CACHE_ALIAS": "default",
+    "KEY_PREFIX": "conversation",
+    # Idle sessions expire after this many seconds.
+    "TTL": 7 * 24 * 3600,
+    "LOCAL_MAX_SESSIONS": 1000,
+    "AGENT": "github_suggest_fix",
+    "MAX_TURNS": 4,
+    "HISTORY_TOKENS": 800,
+    "SUMMARY_TOKENS": 300,
+    "MESSAGE_TOKENS": 250,
+    "MAX_FACTS": 15,
+    "MAX_SESSION_BYTES": 32 * 1024,
+    # Seconds to wait for another process's update of the same session.
+    "LOCK_TIMEOUT": 2,
+}
+
+ConversationReply = namedtuple(
+    "ConversationReply", ["success", "response", "session_id", "turns", "summarized", "prompt_tokens", "error"]
+)
+
+FACT_PATTERNS = [
+    re.compile(r"https?://[^\s)>\]]+"),
+    re.compile(r"(?<![\w/.-])(?:[\w.-]+/)*[\w-]+\.(?:py|pyi|js|jsx|ts|tsx|go|rb|java|kt|rs|c|h|cc|cpp|cs|php|"
+               r"html|css|scss|sql|sh|yml|yaml|toml|json|cfg|ini|md)\b"),
+    re.compile(r"\b[A-Z]\w*(?:Error|Exception|Warning)\b"),
+    re.compile(r"\b[A-Za-z_][\w.]*\(\)"),
+    re.compile(r"\bv?\d+\.\d+(?:\.\d+)+\b"),
+]
+SENTENCE_RE = re.compile(r"(?<=[.!?])\s+")
+
+
+def get_conversation_settings():
+    config = dict(DEFAULT_CONVERSATION_SETTINGS)
+    config.update(getattr(settings, "CONVERSATIONS", {}))
+    return config
+
+
+def session_key(ticket_id, config=None):
+    config = config or get_conversation_settings()
+    return f"{config['KEY_PREFIX']}:ticket:{ticket_id}"
+
+
+def new_session(ticket_id):
+    now = time.time()
+    return {
+        "session_id": uuid.uuid4().hex,
+        "ticket_id": ticket_id,
+        "summary": [],
+        "summarized": 0,
+        "facts": [],
+        "turns": [],
+        "created_at": now,
+        "updated_at": now,
+    }
+
+
+# -- Stores ----------------------------------------------------------------------
+
+class LocalSessionStore:
+    """
+    Sessions in this process, least recently used evicted first.
+    """
+
+    def __init__(self, config):
+        self.config = config
+        self.sessions = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            entry = self.sessions.get(key)
+            if entry is None:
+                return None
+            expires, session = entry
+            if expires < time.monotonic():
+                del self.sessions[key]
+                return None
+            self.sessions.move_to_end(key)
+            return json.loads(session)
+
+    def update(self, key, change):
+        with self.lock:
+            entry = self.sessions.pop(key, None)
+            current = json.loads(entry[1]) if entry and entry[0] >= time.monotonic() else None
+            session = change(current)
+            self.sessions[key] = (time.monotonic() + self.config["TTL"], json.dumps(session))
+            while len(self.sessions) > self.config["LOCAL_MAX_SESSIONS"]:
+                self.sessions.popitem(last=False)
+            return session
+
+    def delete(self, key):
+        with self.lock:
+            self.sessions.pop(key, None)
+
+
+class CacheSessionStore:
+    """
+    Sessions in a Django cache shared by all processes. Updates hold a short
+    cache.add lock so concurrent follow-ups on a ticket don't drop a turn.
+    """
+
+    def __init__(self, config):
+        self.config = config
+        self.cache = caches[config["CACHE_ALIAS"]]
+
+    def get(self, key):
+        return self.cache.get(key)
+
+    def update(self, key, change):
+        lock_key = f"{key}:lock"
+        token = uuid.uuid4().hex
+        deadline = time.monotonic() + self.config["LOCK_TIMEOUT"]
+        locked = self.cache.add(lock_key, token, timeout=self.config["LOCK_TIMEOUT"] * 5)
+        while not locked and time.monotonic() < deadline:
+            time.sleep(0.02)
+            locked = self.cache.add(lock_key, token, timeout=self.config["LOCK_TIMEOUT"] * 5)
+        if not locked:
+            logger.warning(f"Updating conversation {key} without its lock")
+        try:
+            session = change(self.cache.get(key))
+            self.cache.set(key, session, timeout=self.config["TTL"])
+        finally:
+            if locked and self.cache.get(lock_key) == token:
+                self.cache.delete(lock_key)
+        track_session(key)
+        return session
+
+    def delete(self, key):
+        self.cache.delete(key)
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_conversation_store():
+    global _store
+    config = get_conversation_settings()
+    backend = config["BACKEND"]
+    if backend is None:
+        cache_backend = settings.CACHES[config["CACHE_ALIAS"]]["BACKEND"]
+        backend = "cache" if "redis" in cache_backend.lower() else "local"
+    with _store_lock:
+        store_class = CacheSessionStore if backend == "cache" else LocalSessionStore
+        if not isinstance(_store, store_class) or _store.config != config:
+            _store = store_class(config)
+        return _store
+
+
+# -- Compaction ---------------------------------------------------------------------
+
+def extract_facts(text):
+    found = []
+    for pattern in FACT_PATTERNS:
+        found.extend(match.group(0).rstrip(".,;:") for match in pattern.finditer(text or ""))
+    return found
+
+
+def _gist(text, words):
+    first = SENTENCE_RE.split((text or "").strip(), maxsplit=1)[0].split()
+    return " ".join(first[:words]) + (" ..." if len(first) > words else "")
+
+
+def _fold(session, config):
+    """
+    Move the oldest verbatim exchange into the summary and the facts.
+    """
+    turn = session["turns"].pop(0)
+    session["summary"].append(f"- Asked: {_gist(turn['user'], 20)} Answered: {_gist(turn['assistant'], 30)}")
+    session["summarized"] += 1
+    facts = list(session["facts"])
+    for fact in extract_facts(turn["user"]) + extract_facts(turn["assistant"]):
+        if fact in facts:
+            facts.remove(fact)
+        facts.append(fact)
+    session["facts"] = facts[-config["MAX_FACTS"]:]
+    while len(session["summary"]) > 1 and count_tokens("\n".join(session["summary"])) > config["SUMMARY_TOKENS"]:
+        session["summary"].pop(0)
+
+
+def render_history(session):
+    """
+    The session as prompt text: summary, facts, then recent exchanges.
+    """
+    if not session or not (session["summary"] or session["turns"]):
+        return ""
+    parts = []
+    if session["summary"]:
+        shown = len(session["summary"])
+        dropped = session["summarized"] - shown
+        parts.append(f"Earlier in this conversation ({session['summarized']} exchanges"
+                     f"{f', oldest {dropped} omitted' if dropped > 0 else ''}):")
+        parts.extend(session["summary"])
+    if session["facts"]:
+        parts.append("Facts so far: " + ", ".join(session["facts"]))
+    if session["turns"]:
+        parts.append("Recent exchanges:")
+        for turn in session["turns"]:
+            parts.append(f"User: {turn['user']}\nAssistant: {turn['assistant']}")
+    return "\n".join(parts) + "\n"
+
+
+def compact(session, config=None):
+    """
+    Fold old exchanges into the summary until the session is within
+    MAX_TURNS, HISTORY_TOKENS and MAX_SESSION_BYTES.
+    """
+    config = config or get_conversation_settings()
+    while session["turns"] and (
+        len(session["turns"]) > config["MAX_TURNS"]
+        or (len(session["turns"]) > 1 and count_tokens(render_history(session)) > config["HISTORY_TOKENS"])
+    ):
+        _fold(session, config)
+    # The last exchange stays verbatim; make room for it in the summary.
+    while count_tokens(render_history(session)) > config["HISTORY_TOKENS"]:
+        if len(session["summary"]) > 1:
+            session["summary"].pop(0)
+        elif session["facts"]:
+            session["facts"].pop(0)
+        else:
+            break
+    while len(json.dumps(session)) > config["MAX_SESSION_BYTES"]:
+        if session["turns"]:
+            _fold(session, config)
+        elif len(session["summary"]) > 1:
+            session["summary"].pop(0)
+        elif session["facts"]:
+            session["facts"].pop(0)
+        else:
+            break
+    return session
+
+
+def add_turn(session, ticket_id, message, response, config=None):
+    config = config or get_conversation_settings()
+    session = session or new_session(ticket_id)
+    session["turns"].append({
+        "user": compact_text(message, config["MESSAGE_TOKENS"]),
+        "assistant": compact_text(response, config["MESSAGE_TOKENS"]),
+        "at": time.time(),
+    })
+    session["updated_at"] = time.time()
+    return compact(session, config)
+
+
+# -- Follow-ups -------------------------------------------------------------------
+
+def accept_reply(value):
+    """
+    The agent's answer to a follow-up: {"response": ...}, or a fix object
+    from an agent that only knows how to suggest fixes.
+    """
+    if not isinstance(value, dict):
+        return None
+    text = value.get("response") or value.get("suggested_fix")
+    if not isinstance(text, str) or not text.strip():
+        return None
+    files = value.get("files_to_fix")
+    return {"response": text.strip(), "files_to_fix": files if isinstance(files, list) else []}
+
+
+def get_session(ticket_id):
+    return get_conversation_store().get(session_key(ticket_id))
+
+
+def reset_session(ticket_id):
+    get_conversation_store().delete(session_key(ticket_id))
+
+
+def _prepare(ticket, message, config):
+    session = get_session(ticket.id)
+    return session, conversation_prompt(ticket, render_history(session), message, config["MESSAGE_TOKENS"])
+
+
+def _finish(ticket, message, reply, prompt, config):
+    if reply is None:
+        session = get_session(ticket.id)
+        return ConversationReply(
+            False, "", session["session_id"] if session else None,
+            len(session["turns"]) if session else 0, session["summarized"] if session else 0,
+            count_tokens(prompt), "Agent returned no usable answer",
+        )
+    session = get_conversation_store().update(
+        session_key(ticket.id, config), lambda current: add_turn(current, ticket.id, message, reply["response"], config)
+    )
+    return ConversationReply(
+        True, reply["response"], session["session_id"], len(session["turns"]), session["summarized"],
+        count_tokens(prompt), None,
+    )
+
+
+def continue_conversation(ticket, message):
+    """
+    Ask the agent a follow-up about `ticket` with the session's history,
+    and store the exchange.
+    """
+    config = get_conversation_settings()
+    _, prompt = _prepare(ticket, message, config)
+    reply = None
+    try:
+        parser = StreamingOutputParser(accept_reply)
+        run_agent(config["AGENT"], prompt, stop_when=parser.feed)
+        reply = parser.finish()
+        telemetry.record_parse(config["AGENT"], parser)
+    except AgentInvocationError as e:
+        logger.error(f"Follow-up on ticket {ticket.id} failed: {e}")
+    return _finish(ticket, message, reply, prompt, config)
+
+
+async def acontinue_conversation(ticket, message):
+    """
+    continue_conversation for async views.
+    """
+    config = get_conversation_settings()
+    _, prompt = await sync_to_async(_prepare, thread_sensitive=False)(ticket, message, config)
+    reply = None
+    try:
+        parser = StreamingOutputParser(accept_reply)
+        await arun_agent(config["AGENT"], prompt, stop_when=parser.feed)
+        reply = parser.finish()
+        telemetry.record_parse(config["AGENT"], parser)
+    except AgentInvocationError as e:
+        logger.error(f"Follow-up on ticket {ticket.id} failed: {e}")
+    return await sync_to_async(_finish, thread_sensitive=False)(ticket, message, reply, prompt, config)
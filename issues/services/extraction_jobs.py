@@ -0,0 +1,218 @@
+# issues/services/extraction_jobs.py
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import close_old_connections
+from django.utils import timezone
+
+from issues.models import ExtractionJob
+from issues.services import telemetry
+from issues.services.adk_integration import fill_missing_fields
+from issues.services.job_events import EventBuffer
+from issues.services.issue_extraction import extract_issues
+from issues.services.ticket_ingest import ingest_issues
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_JOB_SETTINGS = {
+    "RUNNER": "thread",
+    "THREADS": 4,
+    "MAX_TICKETS": 10,
+}
+
+REQUIRED_FIELDS = ["repo", "owner", "issue_number", "title", "body"]
+
+
+class JobFailed(Exception):
+    """Raised inside a job to fail it with a user-facing message."""
+
+
+def get_job_settings():
+    config = dict(DEFAULT_JOB_SETTINGS)
+    config.update(getattr(settings, "EXTRACTION_JOBS", {}))
+    return config
+
+
+_executor = None
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=get_job_settings()["THREADS"], thread_name_prefix="extraction-job")
+    return _executor
+
+
+def submit_extraction_job(url, start_date=None, end_date=None):
+    """
+    Record a new job and hand it to the configured runner. Returns at once.
+    """
+    job = ExtractionJob.objects.create(url=url, start_date=start_date, end_date=end_date)
+    _dispatch(job)
+    return job
+
+
+async def asubmit_extraction_job(url, start_date=None, end_date=None):
+    """
+    submit_extraction_job for async views.
+    """
+    job = await ExtractionJob.objects.acreate(url=url, start_date=start_date, end_date=end_date)
+    if get_job_settings()["RUNNER"] == "celery":
+        # Publishing to the broker is blocking network I/O.
+        await sync_to_async(_dispatch, thread_sensitive=False)(job)
+    else:
+        _dispatch(job)
+    return job
+
+
+def _dispatch(job):
+    if get_job_settings()["RUNNER"] == "celery":
+        from issues.tasks import process_github_url_task
+        process_github_url_task.delay(str(job.id))
+    else:
+        _get_executor().submit(_run_in_thread, job.id)
+
+
+def _run_in_thread(job_id):
+    try:
+        run_extraction_job(job_id)
+    finally:
+        close_old_connections()
+
+
+def _update(job, events=None, **fields):
+    """
+    Save progress fields. With `events`, this is a stage boundary: the new
+    message (or the error) joins the job's log and the buffered events are
+    written first, so a client that sees the new state also finds its log.
+    """
+    for name, value in fields.items():
+        setattr(job, name, value)
+    if events is not None:
+        if job.status == ExtractionJob.STATUS_FAILED:
+            events.error(job.error, stage=job.stage)
+        elif fields.get("message"):
+            events.info(fields["message"], stage=job.stage)
+        events.flush()
+    job.save(update_fields=[*fields, "updated_at"])
+
+
+def run_extraction_job(job_id):
+    """
+    Execute a job end to end, recording stage and progress as it goes.
+    """
+    job = ExtractionJob.objects.get(id=job_id)
+    if job.is_finished:
+        return job
+
+    with telemetry.stage("extraction.job") as span:
+        span.set_attributes({"job.id": str(job.id), "job.url": job.url})
+        job = _run_job(job)
+        span.set_attribute("job.status", job.status)
+        return job
+
+
+def _run_job(job):
+    with EventBuffer(job) as events:
+        return _run_stages(job, events)
+
+
+def _run_stages(job, events):
+    _update(job, events, status=ExtractionJob.STATUS_RUNNING, started_at=timezone.now(),
+            stage="fetching", progress=10, message=f"Fetching issues from {job.url}")
+    try:
+        with telemetry.stage("extraction.fetch"):
+            issues, source = extract_issues(job.url)
+        telemetry.record_extraction(len(issues), source)
+        if not issues:
+            raise JobFailed("No issues found")
+        if "error" in issues[0]:
+            raise JobFailed(f"Agent failed to fetch issues: {issues[0]}")
+
+        events.debug(f"Fetched {len(issues)} issues", stage="fetching", source=source, count=len(issues))
+        _update(job, events, stage="filtering", progress=60, message=f"Received {len(issues)} issues via {source}")
+        received = len(issues)
+        issues = filter_issues_by_date(issues, job.start_date, job.end_date)
+        if len(issues) < received:
+            events.info(f"{received - len(issues)} issues outside the date range", stage="filtering",
+                        start_date=str(job.start_date or ""), end_date=str(job.end_date or ""))
+        max_tickets = get_job_settings()["MAX_TICKETS"]
+        if len(issues) > max_tickets:
+            events.info(f"Keeping the first {max_tickets} of {len(issues)} issues", stage="filtering")
+        issues = issues[:max_tickets]
+
+        _update(job, events, stage="saving", progress=80, message=f"Saving {len(issues)} tickets")
+        saved = save_issues_as_tickets(issues, job.url, events)
+        saved_tickets = saved.ticket_ids
+        if not saved_tickets:
+            raise JobFailed("No tickets could be saved: issues may be missing required fields or filtered out by date")
+        for ticket_id in saved_tickets:
+            events.debug("Saved from extraction job", stage="saving", ticket=ticket_id)
+
+        _update(job, events, status=ExtractionJob.STATUS_SUCCEEDED, stage="done", progress=100,
+                finished_at=timezone.now(), message=f"Saved {len(saved_tickets)} tickets",
+                result={
+                    "saved_ticket_ids": saved_tickets,
+                    "total_processed": len(issues),
+                    "total_saved": len(saved_tickets),
+                    "created": saved.created,
+                    "updated": saved.updated,
+                    "unchanged": saved.skipped,
+                    "source": source,
+                })
+    except Exception as e:
+        logger.error(f"Extraction job {job.id} failed: {e}")
+        _update(job, events, status=ExtractionJob.STATUS_FAILED, finished_at=timezone.now(),
+                error=str(e), message="Failed")
+    return job
+
+
+def filter_issues_by_date(issues, start_date=None, end_date=None):
+    """
+    Keep issues created within [start_date, end_date] when the agent reports
+    a created_at; issues without one are kept.
+    """
+    if not start_date and not end_date:
+        return issues
+
+    filtered_issues = []
+    for issue in issues:
+        created_str = issue.get("created_at")
+        if created_str:
+            created_on = datetime.strptime(created_str, "%Y-%m-%dT%H:%M:%SZ").date()
+            if start_date and created_on < start_date:
+                continue
+            if end_date and created_on > end_date:
+                continue
+        filtered_issues.append(issue)
+    return filtered_issues
+
+
+def save_issues_as_tickets(issues, url, events=None):
+    """
+    Fill gaps from the URL, then upsert the whole batch in one go.
+    """
+    complete = []
+    for issue in issues:
+        missing_fields = [field for field in REQUIRED_FIELDS if field not in issue]
+        if missing_fields:
+            logger.warning(f"Issue missing required fields {missing_fields}: {issue}")
+            issue = fill_missing_fields(issue, url)
+            missing_fields = [field for field in REQUIRED_FIELDS if field not in issue]
+            if missing_fields:
+                logger.error(f"Still missing fields {missing_fields} after processing: {issue}")
+                if events is not None:
+                    events.warning("Skipped an issue with missing fields", stage="saving",
+                                   missing=missing_fields, issue_number=issue.get("issue_number"))
+                continue
+        complete.append(issue)
+
+    result = ingest_issues(complete)
+    logger.info(f"Saved tickets for {url}: {result.created} created, {result.updated} updated, {result.skipped} unchanged")
+    if events is not None:
+        events.info(f"{result.created} created, {result.updated} updated, {result.skipped} unchanged",
+                    stage="saving", created=result.created, updated=result.updated, unchanged=result.skipped)
+    return result
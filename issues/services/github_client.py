@@ -0,0 +1,171 @@
+# issues/services/github_client.py
+import logging
+from abc import ABC, abstractmethod
+from collections import namedtuple
+from functools import lru_cache
+
+import requests
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+
+# Result of fetch_updated_issues: `not_modified` is True when the server
+# answered a conditional request with 304 and `issues` is empty.
+SyncBatch = namedtuple("SyncBatch", ["issues", "etag", "not_modified"])
+
+
+class GitHubClientError(Exception):
+    """Raised when a GitHub client can't answer a request."""
+
+
+class GitHubClient(ABC):
+    """
+    Minimal read-only GitHub interface used by the extraction fast path.
+    Methods return GitHub REST-shaped issue dicts. Clients implement
+    get_issue and list_issues, and may override fetch_updated_issues.
+    """
+
+    @abstractmethod
+    def get_issue(self, owner, repo, issue_number):
+        pass
+
+    @abstractmethod
+    def list_issues(self, owner, repo, state="open", since=None, per_page=30, page=1):
+        pass
+
+    def fetch_updated_issues(self, owner, repo, since=None, etag=None, per_page=100):
+        """
+        Fetch every issue (any state) updated at or after `since`, by paging
+        list_issues. Clients that can't make conditional requests ignore
+        `etag`; RESTGitHubClient overrides this to send it.
+        """
+        issues = []
+        page = 1
+        while True:
+            batch = self.list_issues(owner, repo, state="all", since=since, per_page=per_page, page=page)
+            issues.extend(batch)
+            if len(batch) < per_page:
+                return SyncBatch(issues, None, False)
+            page += 1
+
+
+class MCPGitHubClient(GitHubClient):
+    """
+    Talks to GitHub through the shared MCP session pool.
+    """
+
+    def _call(self, name, **arguments):
+        from issues.services.mcp_sessions import MCPError, call_github_tool
+
+        try:
+            return call_github_tool(name, **arguments)
+        except MCPError as e:
+            raise GitHubClientError(str(e)) from e
+
+    def get_issue(self, owner, repo, issue_number):
+        return self._call("get_issue", owner=owner, repo=repo, issue_number=issue_number)
+
+    def list_issues(self, owner, repo, state="open", since=None, per_page=30, page=1):
+        arguments = {"owner": owner, "repo": repo, "state": state, "perPage": per_page, "page": page}
+        if since:
+            arguments["since"] = since
+        return self._call("list_issues", **arguments)
+
+
+class RESTGitHubClient(GitHubClient):
+    """
+    Talks to the GitHub REST API directly. Used for repository sync because
+    it supports conditional requests (ETag / 304 Not Modified).
+    """
+
+    api_url = "https://api.github.com"
+
+    def __init__(self, token=None, timeout=30):
+        self.timeout = timeout
+        self.session = requests.Session()
+        self.session.headers.update({
+            "Accept": "application/vnd.github+json",
+            "X-GitHub-Api-Version": "2022-11-28",
+        })
+        token = token if token is not None else settings.GITHUB_PAT
+        if token:
+            self.session.headers["Authorization"] = f"Bearer {token}"
+
+    def _get(self, url, params=None, etag=None):
+        headers = {"If-None-Match": etag} if etag else {}
+        try:
+            response = self.session.get(url, params=params, headers=headers, timeout=self.timeout)
+        except requests.RequestException as e:
+            raise GitHubClientError(str(e)) from e
+        if response.status_code not in (200, 304):
+            raise GitHubClientError(f"GET {url} returned {response.status_code}: {response.text[:200]}")
+        return response
+
+    def get_issue(self, owner, repo, issue_number):
+        return self._get(f"{self.api_url}/repos/{owner}/{repo}/issues/{issue_number}").json()
+
+    def list_issues(self, owner, repo, state="open", since=None, per_page=30, page=1):
+        params = {"state": state, "per_page": per_page, "page": page}
+        if since:
+            params["since"] = since
+        return self._get(f"{self.api_url}/repos/{owner}/{repo}/issues", params=params).json()
+
+    def fetch_updated_issues(self, owner, repo, since=None, etag=None, per_page=100):
+        params = {"state": "all", "sort": "updated", "direction": "asc", "per_page": per_page}
+        if since:
+            params["since"] = since
+        response = self._get(f"{self.api_url}/repos/{owner}/{repo}/issues", params=params, etag=etag)
+        if response.status_code == 304:
+            return SyncBatch([], etag, True)
+
+        issues = response.json()
+        new_etag = response.headers.get("ETag")
+        next_url = response.links.get("next", {}).get("url")
+        while next_url:
+            page = self._get(next_url)
+            issues.extend(page.json())
+            next_url = page.links.get("next", {}).get("url")
+        return SyncBatch(issues, new_etag, False)
+
+
+class LocalGitHubClient(GitHubClient):
+    """
+    In-memory stand-in for tests and offline runs. Serves the issues it was
+    given, or synthetic ones (see issues.testing.fake_mcp_server) when
+    `synthetic` is set.
+    """
+
+    def __init__(self, issues=None, synthetic=0):
+        self.issues = {key: list(value) for key, value in (issues or {}).items()}
+        self.synthetic = synthetic
+        self.calls = []
+
+    def _repo_issues(self, owner, repo):
+        if (owner, repo) not in self.issues and self.synthetic:
+            from issues.testing.fake_mcp_server import make_issue
+            self.issues[(owner, repo)] = [make_issue(owner, repo, n) for n in range(self.synthetic, 0, -1)]
+        return self.issues.get((owner, repo), [])
+
+    def get_issue(self, owner, repo, issue_number):
+        self.calls.append(("get_issue", owner, repo, issue_number))
+        for issue in self._repo_issues(owner, repo):
+            if issue["number"] == issue_number:
+                return issue
+        raise GitHubClientError(f"{owner}/{repo}#{issue_number} not found")
+
+    def list_issues(self, owner, repo, state="open", since=None, per_page=30, page=1):
+        self.calls.append(("list_issues", owner, repo, state, since))
+        issues = self._repo_issues(owner, repo)
+        if state != "all":
+            issues = [i for i in issues if i.get("state", "open") == state]
+        if since:
+            issues = [i for i in issues if i.get("updated_at", "") >= since]
+        start = (page - 1) * per_page
+        return issues[start:start + per_page]
+
+
+@lru_cache(maxsize=None)
+def get_github_client(setting="GITHUB_CLIENT"):
+    return import_string(getattr(settings, setting))()
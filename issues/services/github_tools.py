@@ -0,0 +1,87 @@
+# issues/services/github_tools.py
+"""
+The github_mcp agent's safe GitHub tools as ADK function tools over the
+shared MCP session pool (mcp_sessions), for the agent when it is loaded
+inside this Django project, as in the agent pool's workers. Each worker
+process starts its own pool on the first tool call and keeps its sessions
+for as long as the worker lives, instead of a toolset of its own.
+
+A failed call returns {"error": ...} so the model can say so rather than
+the run failing.
+"""
+import asyncio
+
+from issues.services.mcp_sessions import MCPError, get_mcp_pool
+
+
+async def _call(name, **arguments):
+    arguments = {key: value for key, value in arguments.items() if value not in (None, "")}
+    try:
+        # Starting the pool blocks, so not on the agent's event loop.
+        pool = await asyncio.to_thread(get_mcp_pool)
+        return await asyncio.wait_for(pool.acall_tool(name, arguments), pool.call_timeout + 5)
+    except asyncio.TimeoutError:
+        return {"error": f"{name} timed out"}
+    except MCPError as e:
+        return {"error": str(e)}
+
+
+async def list_issues(owner: str, repo: str, state: str = "open", labels: list[str] = None, since: str = "",
+                      page: int = 1, perPage: int = 30) -> dict:
+    """
+    List issues in a GitHub repository, newest first.
+
+    Args:
+        owner: Repository owner.
+        repo: Repository name.
+        state: "open", "closed" or "all".
+        labels: Only issues with all of these labels.
+        since: Only issues updated at or after this ISO 8601 timestamp.
+        page: Page number, from 1.
+        perPage: Results per page, up to 100.
+    """
+    return await _call("list_issues", owner=owner, repo=repo, state=state, labels=labels, since=since,
+                       page=page, perPage=perPage)
+
+
+async def get_issue(owner: str, repo: str, issue_number: int) -> dict:
+    """
+    Get one issue of a GitHub repository.
+
+    Args:
+        owner: Repository owner.
+        repo: Repository name.
+        issue_number: The issue's number.
+    """
+    return await _call("get_issue", owner=owner, repo=repo, issue_number=issue_number)
+
+
+async def get_issue_comments(owner: str, repo: str, issue_number: int, page: int = 1, perPage: int = 30) -> dict:
+    """
+    Get the comments on a GitHub issue.
+
+    Args:
+        owner: Repository owner.
+        repo: Repository name.
+        issue_number: The issue's number.
+        page: Page number, from 1.
+        perPage: Results per page, up to 100.
+    """
+    return await _call("get_issue_comments", owner=owner, repo=repo, issue_number=issue_number,
+                       page=page, perPage=perPage)
+
+
+async def search_issues(q: str, page: int = 1, perPage: int = 30) -> dict:
+    """
+    Search GitHub issues and pull requests.
+
+    Args:
+        q: GitHub search syntax, e.g. "repo:owner/name is:open crash".
+        page: Page number, from 1.
+        perPage: Results per page, up to 100.
+    """
+    return await _call("search_issues", q=q, page=page, perPage=perPage)
+
+
+# Exactly mcp_sessions.SAFE_TOOLS.
+TOOLS = [list_issues, get_issue, get_issue_comments, search_issues]
@@ -0,0 +1,99 @@
+# issues/services/issue_extraction.py
+import logging
+import re
+from collections import namedtuple
+from urllib.parse import urlsplit, urlunsplit
+
+from django.conf import settings
+
+from issues.services.adk_integration import get_issues_from_url
+from issues.services.github_client import GitHubClientError, get_github_client
+from issues.services.singleflight import coalesce
+
+logger = logging.getLogger(__name__)
+
+GitHubTarget = namedtuple("GitHubTarget", ["owner", "repo", "issue_number"])
+
+# Canonical repository, issue-list and single-issue URLs, e.g.
+#   https://github.com/owner/repo
+#   https://github.com/owner/repo/issues
+#   https://github.com/owner/repo/issues/42
+GITHUB_URL_RE = re.compile(
+    r"^https?://(?:www\.)?github\.com/"
+    r"(?P<owner>[A-Za-z0-9-]+)/(?P<repo>[A-Za-z0-9._-]+?)(?:\.git)?"
+    r"(?:/issues(?:/(?P<number>\d+))?)?/?(?:[?#].*)?$"
+)
+
+
+def parse_github_url(url):
+    """
+    Return a GitHubTarget for a canonical GitHub repo/issue URL, else None.
+    """
+    match = GITHUB_URL_RE.match(url.strip())
+    if not match:
+        return None
+    number = match.group("number")
+    return GitHubTarget(match.group("owner"), match.group("repo"), int(number) if number else None)
+
+
+def issue_to_ticket_dict(issue, owner, repo):
+    """
+    Map a GitHub REST issue payload to the dict shape the agent returns.
+    """
+    return {
+        "repo": repo,
+        "owner": owner,
+        "issue_number": issue["number"],
+        "title": issue.get("title") or "",
+        "body": issue.get("body") or "",
+        "labels": [label["name"] if isinstance(label, dict) else label for label in issue.get("labels", [])],
+        "type": "pull_request" if issue.get("pull_request") else "issue",
+        "state": issue.get("state", "open"),
+        "created_at": issue.get("created_at"),
+        "updated_at": issue.get("updated_at"),
+    }
+
+
+def fetch_issues_direct(target):
+    client = get_github_client()
+    if target.issue_number is not None:
+        issues = [client.get_issue(target.owner, target.repo, target.issue_number)]
+    else:
+        issues = client.list_issues(target.owner, target.repo, per_page=settings.FAST_PATH_LIST_LIMIT)
+    return [issue_to_ticket_dict(issue, target.owner, target.repo) for issue in issues]
+
+
+def normalize_url(url):
+    """
+    Reduce URLs that fetch the same issues to one string, e.g. the repo
+    URL with or without /issues, a trailing slash, .git or a fragment.
+    """
+    target = parse_github_url(url)
+    if target is not None:
+        normalized = f"github.com/{target.owner.lower()}/{target.repo.lower()}"
+        return f"{normalized}/issues/{target.issue_number}" if target.issue_number else normalized
+    parts = urlsplit(url.strip())
+    return urlunsplit((parts.scheme.lower(), parts.netloc.lower(), parts.path.rstrip("/"), parts.query, ""))
+
+
+def extract_issues(url):
+    """
+    Fetch issues for a URL, returning (issues, source).
+
+    Canonical GitHub URLs go straight to the GitHub client ("github");
+    anything else, or a failed direct fetch, falls back to the LLM agent
+    ("agent"). Concurrent requests for the same URL share one fetch.
+    """
+    (issues, source), _ = coalesce(f"issues:{normalize_url(url)}", lambda: _extract_issues(url))
+    return issues, source
+
+
+def _extract_issues(url):
+    target = parse_github_url(url)
+    if target is not None:
+        try:
+            return fetch_issues_direct(target), "github"
+        except GitHubClientError as e:
+            logger.warning(f"Direct GitHub fetch failed for {url}, falling back to agent: {e}")
+
+    return get_issues_from_url(url), "agent"
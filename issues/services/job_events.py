@@ -0,0 +1,191 @@
+# issues/services/job_events.py
+"""
+Progress log for background jobs and tickets.
+
+A job logs through an EventBuffer, which keeps events in memory and writes
+them with one bulk_create when the job crosses a stage boundary, when the
+buffer fills up, or when the job ends (including on failure). Logging a
+line therefore costs an append, not an INSERT, and ingestion isn't held up
+by its own log.
+
+Each job keeps at most MAX_PER_JOB events and each ticket its newest
+MAX_PER_TICKET. Events below MIN_LEVEL are dropped before they are
+buffered. job_events() / ajob_events() read a job's log in order from a
+sequence number, for the progress stream.
+"""
+import logging
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import F, Max, Window
+from django.db.models.functions import RowNumber
+from django.utils import timezone
+
+from issues.models import JobEvent
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_JOB_EVENT_SETTINGS = {
+    "MIN_LEVEL": "info",
+    # Events held in memory before an early flush.
+    "MAX_BUFFER": 200,
+    "MAX_PER_JOB": 1000,
+    "MAX_PER_TICKET": 100,
+}
+
+LEVELS = {
+    "debug": JobEvent.DEBUG,
+    "info": JobEvent.INFO,
+    "warning": JobEvent.WARNING,
+    "error": JobEvent.ERROR,
+}
+
+MESSAGE_LENGTH = JobEvent._meta.get_field("message").max_length
+STAGE_LENGTH = JobEvent._meta.get_field("stage").max_length
+
+
+def get_job_event_settings():
+    config = dict(DEFAULT_JOB_EVENT_SETTINGS)
+    config.update(getattr(settings, "JOB_EVENTS", {}))
+    return config
+
+
+class EventBuffer:
+    """
+    Collects the events of one job (or, without a job, of one ticket) and
+    writes them in batches. Use as a context manager so whatever is still
+    buffered is written when the block ends, however it ends.
+    """
+
+    def __init__(self, job=None, ticket=None, config=None):
+        self.config = config or get_job_event_settings()
+        self.job_id = job.pk if job is not None else None
+        self.ticket_id = ticket.pk if ticket is not None else None
+        self.min_level = LEVELS[self.config["MIN_LEVEL"]]
+        self.pending = []
+        self.stored = 0
+        self.dropped = 0
+        self._seq = None
+        self._started = time.monotonic()
+        self._started_at = timezone.now()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def log(self, level, message, stage="", ticket=None, **data):
+        level = LEVELS[level]
+        if level < self.min_level:
+            return
+        if self.job_id is not None and self.stored + len(self.pending) >= self.config["MAX_PER_JOB"]:
+            self.dropped += 1
+            return
+        self.pending.append(self._event(level, message, stage, ticket, data))
+        if len(self.pending) >= self.config["MAX_BUFFER"]:
+            self.flush()
+
+    def debug(self, message, **kwargs):
+        self.log("debug", message, **kwargs)
+
+    def info(self, message, **kwargs):
+        self.log("info", message, **kwargs)
+
+    def warning(self, message, **kwargs):
+        self.log("warning", message, **kwargs)
+
+    def error(self, message, **kwargs):
+        self.log("error", message, **kwargs)
+
+    def _event(self, level, message, stage, ticket, data):
+        elapsed = time.monotonic() - self._started
+        if ticket is None:
+            ticket_id = self.ticket_id
+        else:
+            ticket_id = ticket if isinstance(ticket, int) else ticket.pk
+        return JobEvent(
+            job_id=self.job_id,
+            ticket_id=ticket_id,
+            level=level,
+            stage=stage[:STAGE_LENGTH],
+            message=str(message)[:MESSAGE_LENGTH],
+            data=data or None,
+            created_at=self._started_at + timedelta(seconds=elapsed),
+            elapsed_ms=int(elapsed * 1000),
+        )
+
+    def flush(self):
+        """
+        Write the buffered events in one INSERT and apply the per-ticket
+        cap to the tickets they mention. Returns the number written.
+        """
+        if not self.pending:
+            return 0
+        events, self.pending = self.pending, []
+        if self.job_id is not None:
+            if self._seq is None:
+                # A retried job continues its earlier log.
+                self._seq = JobEvent.objects.filter(job_id=self.job_id).aggregate(seq=Max("seq"))["seq"] or 0
+            for event in events:
+                self._seq += 1
+                event.seq = self._seq
+        JobEvent.objects.bulk_create(events)
+        self.stored += len(events)
+        trim_ticket_events({event.ticket_id for event in events if event.ticket_id is not None},
+                           self.config["MAX_PER_TICKET"])
+        return len(events)
+
+    def close(self):
+        """
+        Flush what is left, noting any events the per-job cap dropped. A
+        failing write is logged rather than raised, so it can't hide the
+        error that ended the job.
+        """
+        if self.dropped:
+            self.pending.append(self._event(
+                JobEvent.WARNING, f"{self.dropped} more events were not stored (MAX_PER_JOB)", "", None, {}
+            ))
+            self.dropped = 0
+        try:
+            self.flush()
+        except Exception as e:
+            logger.error(f"Could not store job events for job {self.job_id} / ticket {self.ticket_id}: {e}")
+
+
+def trim_ticket_events(ticket_ids, keep):
+    """
+    Delete all but the newest `keep` events of each ticket: one SELECT for
+    the surplus over all the tickets, and one DELETE if there is any.
+    """
+    if not ticket_ids:
+        return 0
+    surplus = list(
+        JobEvent.objects.filter(ticket_id__in=ticket_ids)
+        .annotate(position=Window(RowNumber(), partition_by=F("ticket_id"), order_by=F("id").desc()))
+        .filter(position__gt=keep)
+        .values_list("id", flat=True)
+    )
+    if not surplus:
+        return 0
+    deleted, _ = JobEvent.objects.filter(id__in=surplus).delete()
+    return deleted
+
+
+def _job_events_queryset(job_id, after, min_level):
+    queryset = JobEvent.objects.filter(job_id=job_id, seq__gt=after)
+    if min_level:
+        queryset = queryset.filter(level__gte=LEVELS[min_level])
+    return queryset.order_by("seq")
+
+
+def job_events(job_id, after=0, limit=500, min_level=None):
+    """
+    A job's events with seq greater than `after`, oldest first.
+    """
+    return list(_job_events_queryset(job_id, after, min_level)[:limit])
+
+
+async def ajob_events(job_id, after=0, limit=500, min_level=None):
+    return [event async for event in _job_events_queryset(job_id, after, min_level)[:limit]]
@@ -0,0 +1,403 @@
+# issues/services/mcp_sessions.py
+import asyncio
+import atexit
+import json
+import logging
+import threading
+import time
+
+from django.conf import settings
+from mcp import ClientSession, StdioServerParameters
+from mcp.client.stdio import stdio_client
+from mcp.shared.exceptions import McpError
+
+from issues.services import telemetry
+
+logger = logging.getLogger(__name__)
+
+# Same allow-list the github_mcp agent applies to its toolset.
+SAFE_TOOLS = {"list_issues", "get_issue", "get_issue_comments", "search_issues"}
+
+DEFAULT_POOL_SETTINGS = {
+    "SIZE": 2,
+    "MAX_IN_FLIGHT": 8,
+    "CALL_TIMEOUT": 30,
+    "STARTUP_TIMEOUT": 60,
+    "HEALTH_INTERVAL": 30,
+    # After a failed start, calls fail at once for this many seconds
+    # instead of each waiting on another start.
+    "RETRY_AFTER": 60,
+}
+
+
+class MCPError(Exception):
+    """Base class for MCP session pool errors."""
+
+
+class MCPToolError(MCPError):
+    """The server answered, but the tool call itself failed."""
+
+
+class MCPSessionError(MCPError):
+    """No healthy session could serve the call."""
+
+
+def get_pool_settings():
+    config = dict(DEFAULT_POOL_SETTINGS)
+    config.update(getattr(settings, "GITHUB_MCP_POOL", {}))
+    return config
+
+
+def get_server_params():
+    server = settings.GITHUB_MCP_SERVER
+    return StdioServerParameters(
+        command=server["COMMAND"],
+        args=list(server.get("ARGS", [])),
+        env=server.get("ENV"),
+    )
+
+
+class _Slot:
+    """
+    One MCP server process and the ClientSession talking to it.
+    """
+
+    def __init__(self, index):
+        self.index = index
+        self.session = None
+        self.task = None
+        self.ready = asyncio.Event()
+        self.stop = asyncio.Event()
+        self.in_flight = 0
+        self.calls = 0
+        self.errors = 0
+        self.restarts = 0
+        self.call_seconds = 0.0
+        self.last_error = None
+
+
+class MCPSessionPool:
+    """
+    Keeps SIZE GitHub MCP server sessions open on a private event loop and
+    spreads tool calls across them. A session can carry up to MAX_IN_FLIGHT
+    concurrent requests; calls go to the least loaded healthy session.
+    Sessions that stop answering are torn down and started again.
+    """
+
+    def __init__(self, server_params, size=2, max_in_flight=8, call_timeout=30,
+                 startup_timeout=60, health_interval=30):
+        self.server_params = server_params
+        self.size = size
+        self.max_in_flight = max_in_flight
+        self.call_timeout = call_timeout
+        self.startup_timeout = startup_timeout
+        self.health_interval = health_interval
+
+        self._loop = asyncio.new_event_loop()
+        self._thread = None
+        self._slots = []
+        self._changed = None
+        self._health_task = None
+        self._started_at = None
+        # Fire-and-forget tasks, held so they aren't garbage collected mid-run.
+        self._background = set()
+
+    @classmethod
+    def from_settings(cls):
+        config = get_pool_settings()
+        return cls(
+            get_server_params(),
+            size=config["SIZE"],
+            max_in_flight=config["MAX_IN_FLIGHT"],
+            call_timeout=config["CALL_TIMEOUT"],
+            startup_timeout=config["STARTUP_TIMEOUT"],
+            health_interval=config["HEALTH_INTERVAL"],
+        )
+
+    # -- public, thread-safe API -------------------------------------------
+
+    def start(self):
+        """
+        Start the sessions. Raises MCPSessionError, with the loop thread
+        stopped again, if none of them comes up.
+        """
+        self._thread = threading.Thread(target=self._loop.run_forever, name="mcp-session-pool", daemon=True)
+        self._thread.start()
+        try:
+            self._submit(self._start()).result(self.startup_timeout + 5)
+        except Exception as e:
+            self.shutdown()
+            if isinstance(e, MCPSessionError):
+                raise
+            raise MCPSessionError(f"MCP server did not start: {e!r}") from e
+
+    def call_tool(self, name, arguments=None, timeout=None):
+        """
+        Call an MCP tool from synchronous code and return its decoded result.
+        """
+        future = self._submit(self._call(name, arguments or {}))
+        try:
+            return future.result((timeout or self.call_timeout) + 5)
+        except TimeoutError as e:
+            future.cancel()
+            raise MCPSessionError(f"MCP call {name} timed out") from e
+
+    async def acall_tool(self, name, arguments=None):
+        """
+        Awaitable variant of call_tool for code running on another event loop.
+        """
+        return await asyncio.wrap_future(self._submit(self._call(name, arguments or {})))
+
+    def stats(self):
+        sessions = [
+            {
+                "index": slot.index,
+                "healthy": slot.session is not None,
+                "in_flight": slot.in_flight,
+                "calls": slot.calls,
+                "errors": slot.errors,
+                "restarts": slot.restarts,
+                "call_seconds": round(slot.call_seconds, 3),
+                "last_error": slot.last_error,
+            }
+            for slot in self._slots
+        ]
+        capacity = self.size * self.max_in_flight
+        in_flight = sum(s["in_flight"] for s in sessions)
+        uptime = time.monotonic() - self._started_at if self._started_at else 0
+        # Total call time over uptime is the average number of open calls.
+        avg_in_flight = sum(s["call_seconds"] for s in sessions) / uptime if uptime else 0
+        return {
+            "size": self.size,
+            "healthy": sum(1 for s in sessions if s["healthy"]),
+            "in_flight": in_flight,
+            "capacity": capacity,
+            "utilization": round(in_flight / capacity, 3) if capacity else 0,
+            "avg_in_flight": round(avg_in_flight, 3),
+            "avg_utilization": round(avg_in_flight / capacity, 3) if capacity else 0,
+            "sessions": sessions,
+        }
+
+    def shutdown(self):
+        if self._thread is None:
+            return
+        try:
+            self._submit(self._stop()).result(10)
+        except Exception:
+            pass
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(5)
+        if not self._thread.is_alive():
+            self._loop.close()
+        self._thread = None
+
+    # -- event loop side ---------------------------------------------------
+
+    def _submit(self, coro):
+        return asyncio.run_coroutine_threadsafe(coro, self._loop)
+
+    async def _start(self):
+        self._changed = asyncio.Condition()
+        self._started_at = time.monotonic()
+        self._slots = [_Slot(i) for i in range(self.size)]
+        for slot in self._slots:
+            slot.task = asyncio.create_task(self._run_slot(slot))
+        # Until every session is up or has given up: a server that can't
+        # start at all fails here at once rather than after the timeout.
+        async with self._changed:
+            try:
+                await asyncio.wait_for(
+                    self._changed.wait_for(lambda: all(s.ready.is_set() or s.task.done() for s in self._slots)),
+                    self.startup_timeout,
+                )
+            except asyncio.TimeoutError:
+                raise MCPSessionError(f"MCP server did not start within {self.startup_timeout}s")
+        if not any(slot.ready.is_set() for slot in self._slots):
+            raise MCPSessionError(f"MCP server did not start: {self._slots[0].last_error}")
+        self._health_task = asyncio.create_task(self._health_loop())
+
+    async def _stop(self):
+        if self._health_task:
+            self._health_task.cancel()
+        for slot in self._slots:
+            slot.stop.set()
+        await asyncio.gather(*(slot.task for slot in self._slots if slot.task), return_exceptions=True)
+
+    async def _run_slot(self, slot):
+        """
+        Owns the lifetime of one server process. The stdio and session
+        context managers have to be entered and exited in the same task.
+        """
+        started = time.monotonic()
+        try:
+            async with stdio_client(self.server_params) as (read, write):
+                async with ClientSession(read, write) as session:
+                    await session.initialize()
+                    # Server process (or container) start plus the handshake.
+                    telemetry.record_stage("mcp.session_start", time.monotonic() - started)
+                    slot.session = session
+                    slot.ready.set()
+                    await self._notify()
+                    await slot.stop.wait()
+        except Exception as e:
+            slot.last_error = repr(e)
+            if not slot.ready.is_set():
+                telemetry.record_stage("mcp.session_start", time.monotonic() - started, outcome="error")
+            logger.warning(f"MCP session {slot.index} ended: {e!r}")
+        finally:
+            slot.session = None
+            slot.ready.clear()
+        # Wakes _start waiting on a session that failed to come up.
+        await self._notify()
+
+    async def _restart(self, slot):
+        if slot.stop.is_set():
+            return
+        slot.session = None
+        slot.stop.set()
+        try:
+            await asyncio.wait_for(slot.task, 5)
+        except Exception:
+            slot.task.cancel()
+        slot.ready = asyncio.Event()
+        slot.stop = asyncio.Event()
+        slot.restarts += 1
+        logger.info(f"Restarting MCP session {slot.index} (restart #{slot.restarts})")
+        slot.task = asyncio.create_task(self._run_slot(slot))
+
+    async def _health_loop(self):
+        while True:
+            await asyncio.sleep(self.health_interval)
+            for slot in self._slots:
+                if slot.session is None:
+                    if slot.task.done():
+                        await self._restart(slot)
+                    continue
+                if slot.in_flight:
+                    continue
+                try:
+                    await asyncio.wait_for(slot.session.send_ping(), 5)
+                except Exception as e:
+                    slot.last_error = f"ping failed: {e!r}"
+                    await self._restart(slot)
+
+    async def _notify(self):
+        async with self._changed:
+            self._changed.notify_all()
+
+    def _pick(self):
+        candidates = [s for s in self._slots if s.session is not None and s.in_flight < self.max_in_flight]
+        return min(candidates, key=lambda s: s.in_flight) if candidates else None
+
+    async def _acquire(self):
+        async with self._changed:
+            try:
+                await asyncio.wait_for(self._changed.wait_for(lambda: self._pick() is not None), self.call_timeout)
+            except asyncio.TimeoutError:
+                raise MCPSessionError("No healthy MCP session available")
+            slot = self._pick()
+            slot.in_flight += 1
+            return slot
+
+    async def _call(self, name, arguments):
+        if name not in SAFE_TOOLS:
+            raise MCPToolError(f"Tool {name!r} is not allowed")
+
+        slot = await self._acquire()
+        slot.calls += 1
+        started = time.monotonic()
+        outcome = "error"
+        try:
+            result = await asyncio.wait_for(slot.session.call_tool(name, arguments), self.call_timeout)
+            outcome = "ok"
+        except McpError as e:
+            slot.errors += 1
+            raise MCPToolError(str(e))
+        except Exception as e:
+            # Timeouts and broken pipes mean the session itself is suspect.
+            slot.errors += 1
+            slot.last_error = repr(e)
+            task = asyncio.create_task(self._restart(slot))
+            self._background.add(task)
+            task.add_done_callback(self._background.discard)
+            raise MCPSessionError(f"MCP session {slot.index} failed during {name}: {e!r}")
+        finally:
+            slot.in_flight -= 1
+            elapsed = time.monotonic() - started
+            slot.call_seconds += elapsed
+            telemetry.record_stage("mcp.call", elapsed, outcome=outcome, tool=name)
+            await self._notify()
+
+        text = "".join(getattr(part, "text", "") for part in result.content)
+        if result.isError:
+            raise MCPToolError(text or f"{name} failed")
+        try:
+            return json.loads(text)
+        except json.JSONDecodeError:
+            return text
+
+
+_pool = None
+_pool_lock = threading.Lock()
+# Set when the start in progress ends; None while no start is in progress.
+_starting = None
+# (monotonic time until which starting is not retried, the error)
+_start_failure = None
+
+
+def get_mcp_pool():
+    """
+    The shared pool, started on first use. Starting can take a while, so it
+    happens outside _pool_lock: other callers needing the pool wait for that
+    start to end, and mcp_pool_stats() doesn't wait at all.
+    """
+    global _pool, _starting, _start_failure
+    while True:
+        with _pool_lock:
+            if _pool is not None:
+                return _pool
+            if _start_failure is not None and time.monotonic() < _start_failure[0]:
+                raise MCPSessionError(f"MCP server unavailable: {_start_failure[1]}")
+            starting = _starting
+            if starting is None:
+                starting = _starting = threading.Event()
+                break
+        starting.wait()
+
+    try:
+        pool = MCPSessionPool.from_settings()
+        pool.start()
+    except MCPSessionError as e:
+        with _pool_lock:
+            _start_failure = (time.monotonic() + get_pool_settings()["RETRY_AFTER"], str(e))
+        raise
+    else:
+        with _pool_lock:
+            _start_failure = None
+            _pool = pool
+        return pool
+    finally:
+        with _pool_lock:
+            _starting = None
+        starting.set()
+
+
+def mcp_pool_stats():
+    with _pool_lock:
+        return _pool.stats() if _pool is not None else None
+
+
+@atexit.register
+def shutdown_mcp_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown()
+            _pool = None
+
+
+def call_github_tool(name, **arguments):
+    """
+    Call one of the safe GitHub MCP tools through the shared session pool.
+    """
+    return get_mcp_pool().call_tool(name, arguments)
@@ -0,0 +1,207 @@
+# issues/services/output_parser.py
+"""
+Incremental extraction of JSON values from agent transcripts.
+
+The scanner only ever looks at structural characters (brackets and quotes),
+found with C-level regex searches, and tries json.loads on a span once its
+brackets balance. Each character is scanned once; a span that fails to decode
+falls back to the complete values nested inside it, so the worst case is
+O(n * nesting depth) rather than the backtracking of a `.*` pattern.
+"""
+import bisect
+import json
+import re
+import time
+
+# Next opening bracket while outside any value.
+_OPEN_RE = re.compile(r"[{\[]")
+# Next structural character inside a value.
+_STRUCT_RE = re.compile(r"[{}\[\]\"]")
+# Next character that can end (or break) a JSON string. JSON strings can't
+# contain raw newlines, so one means the quote was prose, not JSON.
+_STRING_END_RE = re.compile(r"[\"\\\n]")
+
+_CLOSERS = {"{": "}", "[": "]"}
+
+
+class _Frame:
+    __slots__ = ("start", "closer", "children")
+
+    def __init__(self, start, closer):
+        self.start = start
+        self.closer = closer
+        self.children = []
+
+
+class JSONStreamScanner:
+    """
+    Feed text in arbitrary chunks; get back every top-level JSON object or
+    array that appears in it (including ones inside ```json fences).
+
+    Positions are absolute offsets into the whole stream. Chunks are kept
+    only while an unfinished value still needs them.
+    """
+
+    def __init__(self):
+        self._chunks = []
+        self._starts = []
+        self._length = 0
+        self._stack = []
+        self._in_string = False
+        self._escape_pending = False
+
+    def feed(self, text):
+        if not text:
+            return []
+        base = self._length
+        self._chunks.append(text)
+        self._starts.append(base)
+        self._length += len(text)
+        values = self._scan(text, base)
+        self._release()
+        return values
+
+    def finish(self):
+        """
+        End of stream: salvage complete values nested inside any value that
+        never closed.
+        """
+        values = []
+        for frame in self._stack:
+            for child in frame.children:
+                values.extend(self._decode_span(child))
+        self._stack = []
+        self._in_string = False
+        self._release()
+        return values
+
+    def _release(self):
+        keep_from = self._stack[0].start if self._stack else self._length
+        while self._chunks and self._starts[0] + len(self._chunks[0]) <= keep_from:
+            self._chunks.pop(0)
+            self._starts.pop(0)
+
+    def _text(self, start, end):
+        first = bisect.bisect_right(self._starts, start) - 1
+        parts = []
+        for index in range(first, len(self._chunks)):
+            chunk_start = self._starts[index]
+            if chunk_start >= end:
+                break
+            chunk = self._chunks[index]
+            parts.append(chunk[max(start - chunk_start, 0):end - chunk_start])
+        return "".join(parts)
+
+    def _scan(self, text, base):
+        values = []
+        pos = 0
+        if self._escape_pending:
+            self._escape_pending = False
+            pos = 1
+        while True:
+            if self._in_string:
+                match = _STRING_END_RE.search(text, pos)
+                if match is None:
+                    return values
+                char = match.group()
+                if char == "\\":
+                    if match.end() >= len(text):
+                        # Escape split across chunks; skip its target next time.
+                        self._escape_pending = True
+                        return values
+                    pos = match.end() + 1
+                    continue
+                self._in_string = False
+                pos = match.end()
+                continue
+
+            if not self._stack:
+                match = _OPEN_RE.search(text, pos)
+                if match is None:
+                    return values
+                self._stack.append(_Frame(base + match.start(), _CLOSERS[match.group()]))
+                pos = match.end()
+                continue
+
+            match = _STRUCT_RE.search(text, pos)
+            if match is None:
+                return values
+            char = match.group()
+            pos = match.end()
+
+            if char == '"':
+                self._in_string = True
+            elif char in _CLOSERS:
+                self._stack.append(_Frame(base + match.start(), _CLOSERS[char]))
+            elif char == self._stack[-1].closer:
+                frame = self._stack.pop()
+                span = (frame.start, base + match.end(), frame.children)
+                if self._stack:
+                    self._stack[-1].children.append(span)
+                else:
+                    values.extend(self._decode_span(span))
+            # A closer that doesn't match is treated as plain text; the
+            # enclosing span will then fail to decode and fall back to its
+            # children.
+
+    def _decode_span(self, span):
+        start, end, children = span
+        try:
+            return [json.loads(self._text(start, end))]
+        except ValueError:
+            values = []
+            for child in children:
+                values.extend(self._decode_span(child))
+            return values
+
+
+class StreamingOutputParser:
+    """
+    Wraps a JSONStreamScanner with an `accept` function that turns a decoded
+    value into a result (or None). `feed` returns the first accepted result
+    as soon as it is complete, so callers can stop reading the agent early.
+    `seconds` is the time spent parsing, apart from waiting on the agent.
+    """
+
+    def __init__(self, accept):
+        self.accept = accept
+        self.scanner = JSONStreamScanner()
+        self.result = None
+        self.seconds = 0.0
+
+    @property
+    def done(self):
+        return self.result is not None
+
+    def feed(self, text):
+        if self.result is None:
+            started = time.perf_counter()
+            self._consider(self.scanner.feed(text))
+            self.seconds += time.perf_counter() - started
+        return self.result
+
+    def finish(self):
+        if self.result is None:
+            started = time.perf_counter()
+            self._consider(self.scanner.finish())
+            self.seconds += time.perf_counter() - started
+        return self.result
+
+    def _consider(self, values):
+        for value in values:
+            result = self.accept(value)
+            if result:
+                self.result = result
+                return
+
+
+def parse_stream(chunks, accept):
+    """
+    Run `accept` over the JSON values in an iterable of text chunks and
+    return the first accepted result, or None.
+    """
+    parser = StreamingOutputParser(accept)
+    for chunk in chunks:
+        if parser.feed(chunk):
+            return parser.result
+    return parser.finish()
@@ -0,0 +1,522 @@
+# issues/services/prompts.py
+"""
+Prompt text for the agents under adk_agents/.
+
+Issue bodies are compacted before they go into a prompt, so that pasted
+logs and stack traces do not dominate it:
+
+- runs of repeated lines, and log lines already seen, are folded into a
+  one-line note;
+- stack traces keep their first and last frames and the frames from
+  project code, while library frames in between are dropped;
+- if the body is still over the agent's token budget, prose is cut before
+  code blocks are.
+
+When the ticket's repository has been indexed (issues/services/repo_index.py),
+the suggest-fix prompt also lists the files the index ranks highest.
+
+Every prompt built here is counted into per-agent totals of tokens before
+and after compaction (see prompt_stats()).
+"""
+import functools
+import logging
+import math
+import re
+
+from django.conf import settings
+from django.core.cache import cache
+
+from issues.services.repo_index import cached_index, ticket_query
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PROMPT_SETTINGS = {
+    # Token budget for one prompt (per ticket, for multi-ticket prompts).
+    "TOKEN_BUDGETS": {
+        "github_suggest_fix": 1500,
+        "github_mcp": 500,
+    },
+    "DEFAULT_TOKEN_BUDGET": 2000,
+    # Traces with more frames than this are collapsed.
+    "MAX_TRACE_FRAMES": 8,
+    # Share of an over-budget body kept for prose; code blocks get the rest.
+    "PROSE_SHARE": 0.3,
+    "TITLE_CHARS": 300,
+}
+
+FIX_INSTRUCTIONS = """
+Suggest a concise fix and which files to modify. Return ONLY a JSON object with:
+- issue_id
+- suggested_fix
+- files_to_fix (list of file paths)
+"""
+
+BATCH_INSTRUCTIONS = """
+Suggest a concise fix and which files to modify for EACH ticket above.
+Return ONLY a JSON array with one object per ticket, each with:
+- ticket_id (the number after "Ticket" above)
+- suggested_fix
+- files_to_fix (list of file paths)
+"""
+
+FOLLOW_UP_INSTRUCTIONS = """
+Answer the follow-up question about this issue, taking the conversation so
+far into account. Return ONLY a JSON object with:
+- response
+- files_to_fix (list of file paths, may be empty)
+"""
+
+STATS_FIELDS = ("prompts", "compacted", "raw_tokens", "sent_tokens")
+
+CODE_CUT_NOTE = "... [{} lines omitted] ..."
+PROSE_CUT_NOTE = " [...truncated]"
+
+WORD_RE = re.compile(r"\w+|[^\w\s]")
+FENCE_RE = re.compile(r"^(`{3,}|~{3,})[^\n]*\n.*?^\1[ \t]*$\n?", re.MULTILINE | re.DOTALL)
+VOLATILE_RE = re.compile(r"0x[0-9a-fA-F]+|[0-9a-fA-F]{8,}|\d+")
+LOG_LINE_RE = re.compile(
+    r"^\s*(\[?\d{4}-\d{2}-\d{2}|\[?\d{2}:\d{2}:\d{2}|\[?(TRACE|DEBUG|INFO|WARN|WARNING|ERROR|FATAL|CRITICAL)\b)"
+)
+# Python `File "...", line N, in f` and JVM/JavaScript `at ...` frames.
+PY_FRAME_RE = re.compile(r'^\s*File "[^"]*", line \d+')
+AT_FRAME_RE = re.compile(r"^\s+at \S+")
+LIBRARY_FRAME_RE = re.compile(
+    r"site-packages|dist-packages|node_modules|/lib/python\d|<frozen|\(internal/|"
+    r"\bat (java|javax|jdk|sun|kotlin|scala)\.|\bat org\.(springframework|junit|apache)\."
+)
+
+
+def get_prompt_settings():
+    config = dict(DEFAULT_PROMPT_SETTINGS)
+    config.update(getattr(settings, "AGENT_PROMPTS", {}))
+    return config
+
+
+def token_budget(agent_name):
+    config = get_prompt_settings()
+    return config["TOKEN_BUDGETS"].get(agent_name, config["DEFAULT_TOKEN_BUDGET"])
+
+
+def count_tokens(text):
+    """
+    Estimate the model's token count: about one token per short word or
+    punctuation mark, and one per four characters of longer words, which
+    tracks SentencePiece/BPE counts for prose, code and logs alike.
+    """
+    return sum(math.ceil(len(piece) / 4) for piece in WORD_RE.findall(text))
+
+
+# ---------------------------------------------------------------------------
+# Compaction
+# ---------------------------------------------------------------------------
+
+
+def _split_code_blocks(text):
+    """
+    Split markdown into [(is_code, text)] around fenced code blocks.
+    """
+    segments, position = [], 0
+    for match in FENCE_RE.finditer(text):
+        if match.start() > position:
+            segments.append((False, text[position:match.start()]))
+        segments.append((True, match.group(0)))
+        position = match.end()
+    if position < len(text):
+        segments.append((False, text[position:]))
+    return segments
+
+
+def _normalize(line):
+    return VOLATILE_RE.sub("#", line.strip())
+
+
+def collapse_repeated_lines(text):
+    """
+    Fold runs of lines that differ only in numbers (timestamps, ids,
+    counters) into the first one, and drop log lines seen earlier.
+    """
+    out, seen_logs = [], set()
+    previous, repeats, dropped, held = None, 0, 0, None
+
+    def flush():
+        nonlocal repeats, dropped
+        # A single repeat costs less than the note that would replace it.
+        if repeats == 1:
+            out.append(held)
+        elif repeats:
+            out.append(f"    [previous line repeated {repeats} more times]")
+        if dropped:
+            out.append(f"    [{dropped} repeated log lines omitted]")
+        repeats = dropped = 0
+
+    for line in text.split("\n"):
+        key = _normalize(line)
+        if key and key == previous:
+            if dropped:
+                dropped += 1
+            else:
+                repeats += 1
+                held = line
+            continue
+        if key and LOG_LINE_RE.match(line) and key in seen_logs:
+            if repeats:
+                flush()
+            dropped += 1
+            previous = key
+            continue
+        flush()
+        if LOG_LINE_RE.match(line):
+            seen_logs.add(key)
+        out.append(line)
+        previous = key
+    flush()
+    return "\n".join(out)
+
+
+def _is_frame_start(lines, i):
+    return bool(PY_FRAME_RE.match(lines[i]) or AT_FRAME_RE.match(lines[i]))
+
+
+def _read_frames(lines, i):
+    """
+    Read consecutive stack frames from lines[i]; return (frames, next index).
+    A Python frame includes the source line printed under it.
+    """
+    frames = []
+    while i < len(lines) and _is_frame_start(lines, i):
+        frame = [lines[i]]
+        i += 1
+        if (
+            PY_FRAME_RE.match(frame[0])
+            and i < len(lines)
+            and lines[i].startswith("    ")
+            and not _is_frame_start(lines, i)
+        ):
+            frame.append(lines[i])
+            i += 1
+        frames.append(frame)
+    return frames, i
+
+
+def _distinctive_frames(frames, max_frames):
+    """
+    Indexes of the frames worth keeping: the outermost, the two innermost,
+    and project (non-library) frames, one per recursion run.
+    """
+    keep = {0, len(frames) - 2, len(frames) - 1}
+    previous = None
+    for index, frame in enumerate(frames):
+        text = "\n".join(frame)
+        if not LIBRARY_FRAME_RE.search(text) and _normalize(text) != previous:
+            keep.add(index)
+        previous = _normalize(text)
+    keep = sorted(index for index in keep if index >= 0)
+    if len(keep) > max_frames:
+        # Innermost frames are closest to the failure.
+        keep = keep[:1] + keep[-(max_frames - 1):]
+    return keep
+
+
+def collapse_stack_traces(text, max_frames=None):
+    """
+    Shorten long Python, JVM and JavaScript stack traces to their
+    distinctive frames, noting how many were left out.
+    """
+    max_frames = max_frames or get_prompt_settings()["MAX_TRACE_FRAMES"]
+    lines = text.split("\n")
+    out, i = [], 0
+    while i < len(lines):
+        if not _is_frame_start(lines, i):
+            out.append(lines[i])
+            i += 1
+            continue
+        frames, i = _read_frames(lines, i)
+        if len(frames) <= max_frames:
+            out.extend(line for frame in frames for line in frame)
+            continue
+        indent = re.match(r"\s*", frames[0][0]).group(0)
+        previous = -1
+        for index in _distinctive_frames(frames, max_frames):
+            if index > previous + 1:
+                out.append(f"{indent}... {index - previous - 1} frames omitted ...")
+            out.extend(frames[index])
+            previous = index
+    return "\n".join(out)
+
+
+def _truncate(text, budget, is_code):
+    """
+    Cut `text` to about `budget` tokens on line boundaries. Code keeps its
+    head and tail, prose its head.
+    """
+    lines = text.split("\n")
+    costs = [count_tokens(line) + 1 for line in lines]
+    # The note saying what was cut comes out of the budget too.
+    budget -= count_tokens(CODE_CUT_NOTE.format(len(lines)) if is_code else PROSE_CUT_NOTE)
+    if is_code:
+        head, tail, used = [], [], 0
+        # The closing fence must survive so the rest of the prompt is not
+        # read as code.
+        tail_budget = budget // 3
+        for line, cost in zip(reversed(lines), reversed(costs)):
+            if tail and used + cost > tail_budget:
+                break
+            tail.insert(0, line)
+            used += cost
+        for line, cost in zip(lines[:len(lines) - len(tail)], costs):
+            if head and used + cost > budget:
+                break
+            head.append(line)
+            used += cost
+        omitted = len(lines) - len(head) - len(tail)
+        if omitted <= 0:
+            return text
+        return "\n".join(head + [CODE_CUT_NOTE.format(omitted)] + tail)
+
+    kept, used = [], 0
+    for line, cost in zip(lines, costs):
+        if used + cost > budget:
+            words = line.split(" ")
+            partial = []
+            for word in words:
+                used += count_tokens(word)
+                if used > budget:
+                    break
+                partial.append(word)
+            if partial:
+                kept.append(" ".join(partial))
+            break
+        kept.append(line)
+        used += cost
+    return "\n".join(kept) + PROSE_CUT_NOTE + "\n"
+
+
+def _water_fill(costs, budget):
+    """
+    Share `budget` among segments: small ones are kept whole and the large
+    ones split what is left evenly.
+    """
+    allocation = [0] * len(costs)
+    pending = sorted(range(len(costs)), key=lambda i: costs[i])
+    while pending:
+        share = budget // len(pending)
+        index = pending[0]
+        if costs[index] > share:
+            for index in pending:
+                allocation[index] = share
+            break
+        allocation[index] = costs[index]
+        budget -= costs[index]
+        pending.pop(0)
+    return allocation
+
+
+def _fit_to_budget(segments, budget, prose_share):
+    """
+    Cut segments down to `budget` tokens in total. Code blocks get the
+    budget first, but prose keeps at least `prose_share` of it so the
+    description of the problem survives a large paste.
+    """
+    costs = [count_tokens(text) for _, text in segments]
+    code = [i for i, (is_code, _) in enumerate(segments) if is_code]
+    prose = [i for i, (is_code, _) in enumerate(segments) if not is_code]
+    code_cost = sum(costs[i] for i in code)
+    prose_cost = sum(costs[i] for i in prose)
+    prose_budget = min(prose_cost, max(int(budget * prose_share), budget - code_cost))
+
+    allocation = {}
+    for indexes, class_budget in ((code, budget - prose_budget), (prose, prose_budget)):
+        allocation.update(zip(indexes, _water_fill([costs[i] for i in indexes], class_budget)))
+
+    fitted = []
+    for index, (is_code, text) in enumerate(segments):
+        if allocation[index] >= costs[index]:
+            fitted.append(text)
+        elif allocation[index] >= 20:
+            fitted.append(_truncate(text, allocation[index], is_code))
+        else:
+            fitted.append("[...omitted]\n" if is_code else "[...]\n")
+    return "".join(fitted)
+
+
+@functools.lru_cache(maxsize=256)
+def compact_text(text, budget):
+    """
+    Fold repeats, collapse stack traces, then cut to `budget` tokens.
+    """
+    if not text:
+        return ""
+    text = collapse_repeated_lines(collapse_stack_traces(text.replace("\r\n", "\n")))
+    segments = _split_code_blocks(text)
+    if count_tokens(text) > budget:
+        text = _fit_to_budget(segments, budget, get_prompt_settings()["PROSE_SHARE"])
+    return text.strip()
+
+
+# ---------------------------------------------------------------------------
+# Prompts
+# ---------------------------------------------------------------------------
+
+
+def _labels(labels):
+    return ", ".join(label["name"] if isinstance(label, dict) else str(label) for label in labels or [])
+
+
+def _issue_section(ticket, body, candidates=""):
+    issue_url = f"https://github.com/{ticket.owner}/{ticket.repo}/issues/{ticket.issue_number}"
+    title = ticket.title[:get_prompt_settings()["TITLE_CHARS"]]
+    return f"""GitHub issue URL: {issue_url}
+Issue title: {title}
+Issue body:
+{body}
+Labels: {_labels(ticket.labels)}
+Repo: {ticket.repo}
+{candidates}"""
+
+
+def candidate_files(ticket):
+    """
+    The repository index's best-matching files for the ticket, as prompt
+    lines, or "" when the repository has no index loaded.
+    """
+    index = cached_index(ticket.owner, ticket.repo)
+    if index is None:
+        return ""
+    lines = [f"Candidate files at commit {index.commit_sha[:12]} (choose files_to_fix from these):"]
+    for candidate in index.candidates(ticket_query(ticket)):
+        symbols = f" ({', '.join(candidate['symbols'])})" if candidate["symbols"] else ""
+        lines.append(f"- {candidate['path']}{symbols}")
+    return "\n".join(lines) + "\n"
+
+
+def issue_details(ticket, agent_name="github_suggest_fix", candidates=None):
+    """
+    The ticket as prompt text, with its body compacted to fit the agent's
+    budget along with the rest of the section.
+    """
+    if candidates is None:
+        candidates = candidate_files(ticket)
+    overhead = count_tokens(_issue_section(ticket, "", candidates)) + count_tokens(FIX_INSTRUCTIONS)
+    body_budget = max(token_budget(agent_name) - overhead, 50)
+    return _issue_section(ticket, compact_text(ticket.body or "", body_budget), candidates)
+
+
+def _fix_prompt(ticket):
+    candidates = candidate_files(ticket)
+    prompt = f"\n{issue_details(ticket, candidates=candidates)}{FIX_INSTRUCTIONS}"
+    raw = f"\n{_issue_section(ticket, ticket.body or '', candidates)}{FIX_INSTRUCTIONS}"
+    return raw, prompt
+
+
+def fix_prompt(ticket):
+    raw, prompt = _fix_prompt(ticket)
+    record_prompt("github_suggest_fix", raw, prompt)
+    return prompt
+
+
+async def afix_prompt(ticket):
+    """
+    fix_prompt for async code: the counters are updated through the async
+    cache API instead of blocking the event loop.
+    """
+    raw, prompt = _fix_prompt(ticket)
+    await arecord_prompt("github_suggest_fix", raw, prompt)
+    return prompt
+
+
+def batch_prompt(tickets):
+    blocks, raw_blocks = [], []
+    for ticket in tickets:
+        candidates = candidate_files(ticket)
+        blocks.append(f"Ticket {ticket.id}\n{issue_details(ticket, candidates=candidates)}")
+        raw_blocks.append(f"Ticket {ticket.id}\n{_issue_section(ticket, ticket.body or '', candidates)}")
+    prompt = "\n".join(blocks) + BATCH_INSTRUCTIONS
+    record_prompt("github_suggest_fix", "\n".join(raw_blocks) + BATCH_INSTRUCTIONS, prompt)
+    return prompt
+
+
+def conversation_prompt(ticket, history, message, message_budget):
+    """
+    A follow-up question with the conversation history rendered by
+    issues/services/conversations.py; the question is compacted to
+    `message_budget` tokens.
+    """
+    details = issue_details(ticket)
+    prompt = f"\n{details}\n{history}Follow-up question:\n{compact_text(message, message_budget)}\n{FOLLOW_UP_INSTRUCTIONS}"
+    raw = f"\n{_issue_section(ticket, ticket.body or '')}\n{history}Follow-up question:\n{message}\n{FOLLOW_UP_INSTRUCTIONS}"
+    record_prompt("github_suggest_fix", raw, prompt)
+    return prompt
+
+
+def extract_issues_prompt(url):
+    prompt = f"Extract issues from {url}"
+    record_prompt("github_mcp", prompt, prompt)
+    return prompt
+
+
+# ---------------------------------------------------------------------------
+# Size accounting
+# ---------------------------------------------------------------------------
+
+
+def _add(key, amount):
+    # Django cache counters, like the suggestion cache's, so every process
+    # adds into the same totals when CACHES is shared.
+    cache.add(key, 0, timeout=None)
+    try:
+        cache.incr(key, amount)
+    except ValueError:
+        cache.set(key, amount, timeout=None)
+
+
+async def _aadd(key, amount):
+    await cache.aadd(key, 0, timeout=None)
+    try:
+        await cache.aincr(key, amount)
+    except ValueError:
+        await cache.aset(key, amount, timeout=None)
+
+
+def _increments(agent_name, raw_tokens, sent_tokens):
+    """
+    The counters a prompt adds to, and by how much.
+    """
+    increments = {"prompts": 1, "raw_tokens": raw_tokens, "sent_tokens": sent_tokens}
+    if sent_tokens < raw_tokens:
+        increments["compacted"] = 1
+        logger.info(f"{agent_name} prompt compacted from {raw_tokens} to {sent_tokens} tokens")
+    else:
+        logger.debug(f"{agent_name} prompt: {sent_tokens} tokens")
+    return increments
+
+
+def record_prompt(agent_name, raw, sent):
+    raw_tokens, sent_tokens = count_tokens(raw), count_tokens(sent)
+    for field, amount in _increments(agent_name, raw_tokens, sent_tokens).items():
+        _add(f"prompts:{agent_name}:{field}", amount)
+    return raw_tokens, sent_tokens
+
+
+async def arecord_prompt(agent_name, raw, sent):
+    raw_tokens, sent_tokens = count_tokens(raw), count_tokens(sent)
+    for field, amount in _increments(agent_name, raw_tokens, sent_tokens).items():
+        await _aadd(f"prompts:{agent_name}:{field}", amount)
+    return raw_tokens, sent_tokens
+
+
+def prompt_stats():
+    """
+    Per agent: prompts built, how many were compacted, and total tokens
+    before and after compaction.
+    """
+    stats = {}
+    for agent_name in get_prompt_settings()["TOKEN_BUDGETS"]:
+        counts = {field: cache.get(f"prompts:{agent_name}:{field}", 0) for field in STATS_FIELDS}
+        counts["budget"] = token_budget(agent_name)
+        counts["avg_raw_tokens"] = round(counts["raw_tokens"] / counts["prompts"]) if counts["prompts"] else None
+        counts["avg_sent_tokens"] = round(counts["sent_tokens"] / counts["prompts"]) if counts["prompts"] else None
+        counts["saved_ratio"] = (
+            round(1 - counts["sent_tokens"] / counts["raw_tokens"], 4) if counts["raw_tokens"] else None
+        )
+        stats[agent_name] = counts
+    return stats
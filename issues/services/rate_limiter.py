@@ -0,0 +1,502 @@
+# issues/services/rate_limiter.py
+"""
+Cluster-wide admission control for agent (Gemini) calls.
+
+Every agent invocation needs a token from a requests-per-minute bucket and
+a slot in a concurrency window. The window is adapted AIMD-style: it grows
+by about one slot per window's worth of successful calls, and is cut
+multiplicatively when a call is throttled (429 / RESOURCE_EXHAUSTED) or its
+latency goes above the target. A throttle also pauses everyone for a short
+cool-down instead of letting each process discover the 429 on its own.
+
+Bulk traffic (batch suggestions, warm-up) draws from its own bucket and may
+only use part of the window, so interactive requests always have headroom.
+
+State lives in Redis when one is configured, so web and Celery processes
+share one budget; otherwise (or if Redis is unreachable) in process memory.
+"""
+import asyncio
+import contextlib
+import contextvars
+import logging
+import re
+import threading
+import time
+import uuid
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+TRAFFIC_INTERACTIVE = "interactive"
+TRAFFIC_BULK = "bulk"
+TRAFFIC_CLASSES = (TRAFFIC_INTERACTIVE, TRAFFIC_BULK)
+
+DEFAULT_LIMITER_SETTINGS = {
+    "ENABLED": True,
+    "REDIS_URL": None,
+    "KEY_PREFIX": "gemini-limiter",
+    "RPM": 60,
+    "BURST": 10,
+    "BULK_SHARE": 0.5,
+    "INITIAL_CONCURRENCY": 4,
+    "MIN_CONCURRENCY": 1,
+    "MAX_CONCURRENCY": 32,
+    # Calls slower than this count as congestion.
+    "LATENCY_TARGET": 30,
+    "DECREASE_FACTOR": 0.5,
+    "LATENCY_DECREASE_FACTOR": 0.9,
+    # Pause after a throttle; also the minimum gap between two decreases.
+    "COOLDOWN": 10,
+    "RETRIES_ON_THROTTLE": 2,
+    "ACQUIRE_TIMEOUT": {TRAFFIC_INTERACTIVE: 30, TRAFFIC_BULK: 600},
+    # A slot held longer than this (e.g. by a killed process) is reclaimed.
+    "LEASE_TTL": 300,
+    "POLL_INTERVAL": 0.25,
+}
+
+THROTTLE_RE = re.compile(r"\b429\b|RESOURCE_EXHAUSTED|rate limit|quota exceeded", re.IGNORECASE)
+
+# Seconds to stay on in-process limits after Redis fails before retrying it.
+FALLBACK_RETRY_AFTER = 30
+
+_traffic_class = contextvars.ContextVar("agent_traffic_class", default=TRAFFIC_INTERACTIVE)
+
+
+class RateLimitTimeout(Exception):
+    """Raised when no slot frees up within the traffic class's timeout."""
+
+
+def get_limiter_settings():
+    config = dict(DEFAULT_LIMITER_SETTINGS)
+    config.update(getattr(settings, "GEMINI_RATE_LIMIT", {}))
+    return config
+
+
+@contextlib.contextmanager
+def traffic_class(name):
+    """
+    Mark agent calls made in this block (this thread or task) as `name`.
+    """
+    if name not in TRAFFIC_CLASSES:
+        raise ValueError(f"Unknown traffic class {name!r}")
+    token = _traffic_class.set(name)
+    try:
+        yield
+    finally:
+        _traffic_class.reset(token)
+
+
+def mark_thread_bulk():
+    """
+    ThreadPoolExecutor initializer for bulk workers: executor threads don't
+    inherit the submitter's context, so the class is set per thread.
+    """
+    _traffic_class.set(TRAFFIC_BULK)
+
+
+def current_traffic_class():
+    return _traffic_class.get()
+
+
+def is_throttle_error(error):
+    """
+    Whether a failed agent call was throttled by the model API, judged by
+    the error's status code, else the CLI's stderr, else the error's own
+    text. Never the agent's stdout, which quotes issues and tool output
+    that may well mention rate limits.
+    """
+    status = getattr(error, "status", None)
+    if isinstance(status, int):
+        return status == 429
+    stderr = getattr(error, "stderr", None)
+    return bool(THROTTLE_RE.search(stderr if stderr is not None else str(error)))
+
+
+class MemoryLimiterBackend:
+    """
+    Limiter state for a single process.
+    """
+
+    def __init__(self, config):
+        self.config = config
+        self._lock = threading.Lock()
+        now = time.time()
+        self.limit = float(config["INITIAL_CONCURRENCY"])
+        self.throttled_until = 0.0
+        self.last_decrease = 0.0
+        self.buckets = {"all": [float(config["BURST"]), now], TRAFFIC_BULK: [float(config["BURST"]), now]}
+        self.leases = {cls: {} for cls in TRAFFIC_CLASSES}
+        self.counters = {"admitted": 0, "throttled": 0, "slow": 0, "ok": 0}
+
+    def _refill(self, name, rate, now):
+        bucket = self.buckets[name]
+        bucket[0] = min(float(self.config["BURST"]), bucket[0] + (now - bucket[1]) * rate)
+        bucket[1] = now
+        return bucket[0]
+
+    def _caps(self):
+        total = max(1, int(self.limit))
+        return total, max(1, int(self.limit * self.config["BULK_SHARE"]))
+
+    def try_acquire(self, cls, lease_id):
+        """
+        Return 0 and hold a slot, or the number of seconds worth waiting.
+        """
+        config = self.config
+        with self._lock:
+            now = time.time()
+            if now < self.throttled_until:
+                return self.throttled_until - now
+            for leases in self.leases.values():
+                for lease, expiry in list(leases.items()):
+                    if expiry < now:
+                        del leases[lease]
+
+            total_cap, bulk_cap = self._caps()
+            in_flight = sum(len(leases) for leases in self.leases.values())
+            if in_flight >= total_cap or (cls == TRAFFIC_BULK and len(self.leases[TRAFFIC_BULK]) >= bulk_cap):
+                return config["POLL_INTERVAL"]
+
+            rate = config["RPM"] / 60
+            needed = ["all"]
+            if cls == TRAFFIC_BULK:
+                needed.append(TRAFFIC_BULK)
+            rates = {"all": rate, TRAFFIC_BULK: rate * config["BULK_SHARE"]}
+            tokens = {name: self._refill(name, rates[name], now) for name in needed}
+            short = [(1 - tokens[name]) / rates[name] for name in needed if tokens[name] < 1]
+            if short:
+                return max(short)
+
+            for name in needed:
+                self.buckets[name][0] -= 1
+            self.leases[cls][lease_id] = now + config["LEASE_TTL"]
+            self.counters["admitted"] += 1
+            return 0
+
+    def release(self, cls, lease_id, latency, throttled):
+        config = self.config
+        with self._lock:
+            now = time.time()
+            self.leases[cls].pop(lease_id, None)
+            congested = throttled or latency > config["LATENCY_TARGET"]
+            if throttled:
+                self.counters["throttled"] += 1
+                self.throttled_until = max(self.throttled_until, now + config["COOLDOWN"])
+            elif congested:
+                self.counters["slow"] += 1
+            else:
+                self.counters["ok"] += 1
+
+            if congested:
+                # One congestion event often fails several in-flight calls;
+                # only cut once per cool-down.
+                if now - self.last_decrease >= config["COOLDOWN"]:
+                    factor = config["DECREASE_FACTOR"] if throttled else config["LATENCY_DECREASE_FACTOR"]
+                    self.limit = max(float(config["MIN_CONCURRENCY"]), self.limit * factor)
+                    self.last_decrease = now
+            else:
+                self.limit = min(float(config["MAX_CONCURRENCY"]), self.limit + 1 / self.limit)
+
+    def snapshot(self):
+        with self._lock:
+            now = time.time()
+            total_cap, bulk_cap = self._caps()
+            rate = self.config["RPM"] / 60
+            return {
+                "backend": "memory",
+                "concurrency_limit": round(self.limit, 2),
+                "caps": {"total": total_cap, TRAFFIC_BULK: bulk_cap},
+                "in_flight": {cls: len(leases) for cls, leases in self.leases.items()},
+                "tokens": {
+                    "all": round(min(self.config["BURST"], self.buckets["all"][0] + (now - self.buckets["all"][1]) * rate), 2),
+                    TRAFFIC_BULK: round(min(
+                        self.config["BURST"],
+                        self.buckets[TRAFFIC_BULK][0]
+                        + (now - self.buckets[TRAFFIC_BULK][1]) * rate * self.config["BULK_SHARE"],
+                    ), 2),
+                },
+                "throttled_for": round(max(0.0, self.throttled_until - now), 2),
+                "counters": dict(self.counters),
+            }
+
+
+# KEYS: limit, throttled_until, bucket:all, bucket:bulk, leases:interactive,
+#       leases:bulk, counters
+# ARGV: cls, lease_id, now, rpm, burst, bulk_share, initial, lease_ttl, poll
+_ACQUIRE_LUA = """
+local now = tonumber(ARGV[3])
+local throttled_until = tonumber(redis.call('GET', KEYS[2]) or '0')
+if now < throttled_until then return tostring(throttled_until - now) end
+
+redis.call('ZREMRANGEBYSCORE', KEYS[5], '-inf', now)
+redis.call('ZREMRANGEBYSCORE', KEYS[6], '-inf', now)
+local limit = tonumber(redis.call('GET', KEYS[1]) or ARGV[7])
+local bulk_share = tonumber(ARGV[6])
+local total_cap = math.max(1, math.floor(limit))
+local bulk_cap = math.max(1, math.floor(limit * bulk_share))
+local bulk_in_flight = redis.call('ZCARD', KEYS[6])
+local in_flight = redis.call('ZCARD', KEYS[5]) + bulk_in_flight
+if in_flight >= total_cap or (ARGV[1] == 'bulk' and bulk_in_flight >= bulk_cap) then
+  return ARGV[9]
+end
+
+local rate = tonumber(ARGV[4]) / 60
+local burst = tonumber(ARGV[5])
+local function refill(key, r)
+  local state = redis.call('HMGET', key, 'tokens', 'ts')
+  local tokens = tonumber(state[1] or burst)
+  local ts = tonumber(state[2] or now)
+  return math.min(burst, tokens + (now - ts) * r)
+end
+local all_tokens = refill(KEYS[3], rate)
+local wait = 0
+if all_tokens < 1 then wait = (1 - all_tokens) / rate end
+local bulk_tokens = nil
+if ARGV[1] == 'bulk' then
+  bulk_tokens = refill(KEYS[4], rate * bulk_share)
+  if bulk_tokens < 1 then wait = math.max(wait, (1 - bulk_tokens) / (rate * bulk_share)) end
+end
+if wait > 0 then return tostring(wait) end
+
+redis.call('HSET', KEYS[3], 'tokens', all_tokens - 1, 'ts', now)
+if bulk_tokens then redis.call('HSET', KEYS[4], 'tokens', bulk_tokens - 1, 'ts', now) end
+local leases = KEYS[5]
+if ARGV[1] == 'bulk' then leases = KEYS[6] end
+redis.call('ZADD', leases, now + tonumber(ARGV[8]), ARGV[2])
+redis.call('HINCRBY', KEYS[7], 'admitted', 1)
+return '0'
+"""
+
+# KEYS: limit, throttled_until, last_decrease, leases:<cls>, counters
+# ARGV: lease_id, now, latency, throttled, initial, min, max, latency_target,
+#       decrease, latency_decrease, cooldown
+_RELEASE_LUA = """
+local now = tonumber(ARGV[2])
+redis.call('ZREM', KEYS[4], ARGV[1])
+local limit = tonumber(redis.call('GET', KEYS[1]) or ARGV[5])
+local throttled = ARGV[4] == '1'
+local congested = throttled or tonumber(ARGV[3]) > tonumber(ARGV[8])
+local cooldown = tonumber(ARGV[11])
+if throttled then
+  redis.call('HINCRBY', KEYS[5], 'throttled', 1)
+  local until_ts = tonumber(redis.call('GET', KEYS[2]) or '0')
+  redis.call('SET', KEYS[2], tostring(math.max(until_ts, now + cooldown)))
+elseif congested then
+  redis.call('HINCRBY', KEYS[5], 'slow', 1)
+else
+  redis.call('HINCRBY', KEYS[5], 'ok', 1)
+end
+if congested then
+  local last = tonumber(redis.call('GET', KEYS[3]) or '0')
+  if now - last >= cooldown then
+    local factor = tonumber(ARGV[10])
+    if throttled then factor = tonumber(ARGV[9]) end
+    limit = math.max(tonumber(ARGV[6]), limit * factor)
+    redis.call('SET', KEYS[3], tostring(now))
+  end
+else
+  limit = math.min(tonumber(ARGV[7]), limit + 1 / limit)
+end
+redis.call('SET', KEYS[1], tostring(limit))
+return tostring(limit)
+"""
+
+
+class RedisLimiterBackend:
+    """
+    Limiter state in Redis, updated atomically by Lua scripts so every
+    process sees one bucket and one window. Slots are leases in sorted sets,
+    so a crashed process only holds its slots until LEASE_TTL.
+    """
+
+    def __init__(self, config, client=None):
+        import redis
+
+        self.config = config
+        self.client = client or redis.Redis.from_url(config["REDIS_URL"], socket_timeout=2)
+        self._acquire = self.client.register_script(_ACQUIRE_LUA)
+        self._release = self.client.register_script(_RELEASE_LUA)
+        prefix = config["KEY_PREFIX"]
+        self.keys = {
+            name: f"{prefix}:{name}"
+            for name in ("limit", "throttled_until", "last_decrease", "bucket:all", "bucket:bulk", "counters")
+        }
+        for cls in TRAFFIC_CLASSES:
+            self.keys[f"leases:{cls}"] = f"{prefix}:leases:{cls}"
+
+    def try_acquire(self, cls, lease_id):
+        c, k = self.config, self.keys
+        wait = self._acquire(
+            keys=[k["limit"], k["throttled_until"], k["bucket:all"], k["bucket:bulk"],
+                  k["leases:interactive"], k["leases:bulk"], k["counters"]],
+            args=[cls, lease_id, time.time(), c["RPM"], c["BURST"], c["BULK_SHARE"],
+                  c["INITIAL_CONCURRENCY"], c["LEASE_TTL"], c["POLL_INTERVAL"]],
+        )
+        return float(wait)
+
+    def release(self, cls, lease_id, latency, throttled):
+        c, k = self.config, self.keys
+        self._release(
+            keys=[k["limit"], k["throttled_until"], k["last_decrease"], k[f"leases:{cls}"], k["counters"]],
+            args=[lease_id, time.time(), latency, "1" if throttled else "0", c["INITIAL_CONCURRENCY"],
+                  c["MIN_CONCURRENCY"], c["MAX_CONCURRENCY"], c["LATENCY_TARGET"], c["DECREASE_FACTOR"],
+                  c["LATENCY_DECREASE_FACTOR"], c["COOLDOWN"]],
+        )
+
+    def snapshot(self):
+        c, k = self.config, self.keys
+        now = time.time()
+        pipe = self.client.pipeline()
+        pipe.get(k["limit"])
+        pipe.get(k["throttled_until"])
+        for cls in TRAFFIC_CLASSES:
+            pipe.zcount(k[f"leases:{cls}"], now, "+inf")
+        pipe.hgetall(k["bucket:all"])
+        pipe.hgetall(k["bucket:bulk"])
+        pipe.hgetall(k["counters"])
+        limit, throttled_until, interactive, bulk, all_bucket, bulk_bucket, counters = pipe.execute()
+
+        limit = float(limit or c["INITIAL_CONCURRENCY"])
+        rate = c["RPM"] / 60
+
+        def tokens(bucket, r):
+            if not bucket:
+                return float(c["BURST"])
+            return round(min(c["BURST"], float(bucket[b"tokens"]) + (now - float(bucket[b"ts"])) * r), 2)
+
+        return {
+            "backend": "redis",
+            "concurrency_limit": round(limit, 2),
+            "caps": {
+                "total": max(1, int(limit)),
+                TRAFFIC_BULK: max(1, int(limit * c["BULK_SHARE"])),
+            },
+            "in_flight": {TRAFFIC_INTERACTIVE: interactive, TRAFFIC_BULK: bulk},
+            "tokens": {"all": tokens(all_bucket, rate), TRAFFIC_BULK: tokens(bulk_bucket, rate * c["BULK_SHARE"])},
+            "throttled_for": round(max(0.0, float(throttled_until or 0) - now), 2),
+            "counters": {key.decode(): int(value) for key, value in counters.items()},
+        }
+
+
+class AgentRateLimiter:
+    """
+    Wraps agent calls: `call(fn)` / `acall(coro_fn)` wait for admission,
+    time the call, feed the outcome back into the window and retry calls
+    that were throttled.
+    """
+
+    def __init__(self, backend, config):
+        self.backend = backend
+        self.config = config
+        self._fallback = None
+        self._fallback_until = 0.0
+
+    def _backend_call(self, method, *args):
+        if self._fallback_until > time.monotonic():
+            return getattr(self._fallback, method)(*args)
+        try:
+            return getattr(self.backend, method)(*args)
+        except Exception as e:
+            if isinstance(self.backend, MemoryLimiterBackend):
+                raise
+            # Losing Redis shouldn't take agent calls down with it: enforce
+            # the limits in-process for a while, then try Redis again.
+            logger.warning(f"Rate limiter backend unavailable ({e}); using in-process limits")
+            if self._fallback is None:
+                self._fallback = MemoryLimiterBackend(self.config)
+            self._fallback_until = time.monotonic() + FALLBACK_RETRY_AFTER
+            return getattr(self._fallback, method)(*args)
+
+    def _deadline(self, cls):
+        return time.monotonic() + self.config["ACQUIRE_TIMEOUT"][cls]
+
+    def acquire(self, cls=None):
+        cls = cls or current_traffic_class()
+        lease_id = uuid.uuid4().hex
+        deadline = self._deadline(cls)
+        while True:
+            wait = self._backend_call("try_acquire", cls, lease_id)
+            if not wait:
+                return cls, lease_id
+            if time.monotonic() + wait > deadline:
+                raise RateLimitTimeout(f"No {cls} agent slot available within {self.config['ACQUIRE_TIMEOUT'][cls]}s")
+            time.sleep(min(wait, self.config["POLL_INTERVAL"] * 4))
+
+    async def aacquire(self, cls=None):
+        cls = cls or current_traffic_class()
+        lease_id = uuid.uuid4().hex
+        deadline = self._deadline(cls)
+        while True:
+            wait = await asyncio.to_thread(self._backend_call, "try_acquire", cls, lease_id)
+            if not wait:
+                return cls, lease_id
+            if time.monotonic() + wait > deadline:
+                raise RateLimitTimeout(f"No {cls} agent slot available within {self.config['ACQUIRE_TIMEOUT'][cls]}s")
+            await asyncio.sleep(min(wait, self.config["POLL_INTERVAL"] * 4))
+
+    def release(self, lease, latency, throttled):
+        cls, lease_id = lease
+        self._backend_call("release", cls, lease_id, latency, throttled)
+
+    def call(self, fn):
+        for attempt in range(self.config["RETRIES_ON_THROTTLE"] + 1):
+            lease = self.acquire()
+            started = time.monotonic()
+            try:
+                result = fn()
+            except Exception as e:
+                throttled = is_throttle_error(e)
+                self.release(lease, time.monotonic() - started, throttled)
+                if throttled and attempt < self.config["RETRIES_ON_THROTTLE"]:
+                    logger.warning(f"Agent call throttled, retrying after cool-down: {e}")
+                    continue
+                raise
+            self.release(lease, time.monotonic() - started, False)
+            return result
+
+    async def acall(self, coro_fn):
+        for attempt in range(self.config["RETRIES_ON_THROTTLE"] + 1):
+            lease = await self.aacquire()
+            started = time.monotonic()
+            try:
+                result = await coro_fn()
+            except Exception as e:
+                throttled = is_throttle_error(e)
+                await asyncio.to_thread(self.release, lease, time.monotonic() - started, throttled)
+                if throttled and attempt < self.config["RETRIES_ON_THROTTLE"]:
+                    logger.warning(f"Agent call throttled, retrying after cool-down: {e}")
+                    continue
+                raise
+            except asyncio.CancelledError:
+                await asyncio.shield(asyncio.to_thread(self.release, lease, time.monotonic() - started, False))
+                raise
+            await asyncio.to_thread(self.release, lease, time.monotonic() - started, False)
+            return result
+
+    def snapshot(self):
+        snapshot = self._backend_call("snapshot")
+        snapshot["settings"] = {
+            key: self.config[key]
+            for key in ("RPM", "BURST", "BULK_SHARE", "MIN_CONCURRENCY", "MAX_CONCURRENCY", "LATENCY_TARGET", "COOLDOWN")
+        }
+        return snapshot
+
+
+_limiter = None
+_limiter_lock = threading.Lock()
+
+
+def get_rate_limiter():
+    """
+    The process-wide limiter, or None when GEMINI_RATE_LIMIT["ENABLED"] is off.
+    """
+    global _limiter
+    config = get_limiter_settings()
+    if not config["ENABLED"]:
+        return None
+    with _limiter_lock:
+        if _limiter is None:
+            backend = RedisLimiterBackend(config) if config["REDIS_URL"] else MemoryLimiterBackend(config)
+            _limiter = AgentRateLimiter(backend, config)
+        return _limiter
@@ -0,0 +1,447 @@
+# issues/services/repo_index.py
+"""
+Repository index: which files exist at a commit, what they define, and a
+BM25 ranking of them against an issue.
+
+An index is built from a local checkout or a tarball and stored once per
+commit SHA (RepositoryIndex). Each file is one document whose terms come
+from its path, the symbols it defines and its leading content, weighted in
+that order. Identifiers are split on snake_case and camelCase, so
+"getUserProfile" matches "user profile".
+
+The suggest-fix prompt lists the top-ranked files, and the agent's
+files_to_fix are checked against the index afterwards. Loaded indexes are
+kept in memory per repository; worker threads only read that memory, so
+whoever dispatches them calls preload_indexes() first.
+"""
+import json
+import logging
+import math
+import os
+import re
+import subprocess
+import tarfile
+import threading
+import time
+import zlib
+from collections import Counter, defaultdict
+
+from asgiref.sync import sync_to_async
+from cachetools import TTLCache
+from django.conf import settings
+
+from issues.models import RepositoryIndex
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_REPO_INDEX_SETTINGS = {
+    # Candidate files listed in the prompt.
+    "TOP_K": 8,
+    "SYMBOLS_PER_CANDIDATE": 5,
+    # Only this much of each file is read for symbols and content terms.
+    "CONTENT_BYTES": 64 * 1024,
+    # Distinct content terms kept per file (the most frequent ones).
+    "TERMS_PER_FILE": 200,
+    "SYMBOLS_PER_FILE": 50,
+    "SKIP_DIRS": [".git", "node_modules", "vendor", "dist", "build", "__pycache__", ".venv", "venv", ".tox"],
+    # Loaded indexes stay in memory this long before the database is
+    # checked for a newer commit.
+    "MEMORY_TTL": 300,
+    "MEMORY_SIZE": 32,
+}
+
+INDEX_FORMAT = 1
+
+# BM25 parameters and per-field term weights.
+K1 = 1.2
+B = 0.75
+FIELD_WEIGHTS = {"path": 3, "symbol": 2, "content": 1}
+
+IDENTIFIER_RE = re.compile(r"[A-Za-z_][A-Za-z0-9_]*")
+WORD_PART_RE = re.compile(r"[A-Z]+(?=[A-Z][a-z])|[A-Z]?[a-z]+|[A-Z]+|[0-9]+")
+SYMBOL_RE = re.compile(
+    r"^\s*(?:export\s+)?(?:pub(?:\(\w+\))?\s+)?(?:async\s+)?(?:abstract\s+)?"
+    r"(?:def|class|function|func|fn|interface|struct|enum|trait|type|module|object)\s+"
+    r"(?:\([^)]*\)\s*)?([A-Za-z_$][\w$]*)",
+    re.MULTILINE,
+)
+# Mentions of files in issue text: "issues/views.py", "views.py:88", File "x.py".
+PATH_MENTION_RE = re.compile(r"(?<![\w/.-])((?:[\w.-]+/)*[\w-]+\.[A-Za-z][\w]{0,7})\b")
+
+STOPWORDS = frozenset("""
+a an and are as at be but by for from has have if in into is it its not of on or so such that the their
+then there these this to was were when where which while will with would you your we our can should
+def class self return import none true false null var let const function func new this else elif try
+except finally raise pass yield async await public private protected static void int str string bool
+""".split())
+
+# Names defined in nearly every file of some languages; they don't tell
+# files apart.
+GENERIC_SYMBOLS = frozenset({"Meta", "Config", "main", "init", "setUp", "tearDown"})
+
+TEXT_SAMPLE = 8192
+
+
+def get_repo_index_settings():
+    config = dict(DEFAULT_REPO_INDEX_SETTINGS)
+    config.update(getattr(settings, "REPO_INDEX", {}))
+    return config
+
+
+def terms(text):
+    """
+    Lower-cased search terms: each identifier whole and split into its
+    snake_case / camelCase parts.
+    """
+    out = []
+    for identifier in IDENTIFIER_RE.findall(text):
+        lowered = identifier.lower()
+        parts = [part.lower() for part in WORD_PART_RE.findall(identifier)]
+        if len(lowered) > 1 and lowered not in STOPWORDS:
+            out.append(lowered)
+        if len(parts) > 1:
+            out.extend(part for part in parts if len(part) > 1 and part not in STOPWORDS)
+    return out
+
+
+def path_terms(path):
+    return terms(re.sub(r"[/.-]+", " ", path))
+
+
+# ---------------------------------------------------------------------------
+# Reading a repository
+# ---------------------------------------------------------------------------
+
+
+def _skipped(path, skip_dirs):
+    return any(part in skip_dirs for part in path.split("/")[:-1])
+
+
+def _decode(raw):
+    if b"\0" in raw[:TEXT_SAMPLE]:
+        return None
+    return raw.decode("utf-8", errors="replace")
+
+
+def checkout_sha(path):
+    try:
+        return subprocess.run(
+            ["git", "-C", path, "rev-parse", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def read_checkout(path, limit):
+    """
+    Return (commit_sha, [(relative path, text or None)]) for a local
+    checkout. Git checkouts list tracked files only; binary files have no
+    text.
+    """
+    skip_dirs = set(get_repo_index_settings()["SKIP_DIRS"])
+    sha = checkout_sha(path)
+    try:
+        listing = subprocess.run(
+            ["git", "-C", path, "ls-files", "-z"], capture_output=True, check=True
+        ).stdout.decode("utf-8", errors="replace")
+        relpaths = [p for p in listing.split("\0") if p]
+    except (OSError, subprocess.CalledProcessError):
+        relpaths = []
+        for root, dirs, filenames in os.walk(path):
+            dirs[:] = [d for d in dirs if d not in skip_dirs]
+            for filename in filenames:
+                relpaths.append(os.path.relpath(os.path.join(root, filename), path).replace(os.sep, "/"))
+
+    files = []
+    for relpath in sorted(relpaths):
+        if _skipped(relpath, skip_dirs):
+            continue
+        full = os.path.join(path, relpath)
+        if not os.path.isfile(full):
+            continue
+        with open(full, "rb") as f:
+            files.append((relpath, _decode(f.read(limit))))
+    return sha, files
+
+
+def read_tarball(path, limit):
+    """
+    Return (commit_sha, files) for a source tarball. The SHA comes from the
+    `git archive` pax header, or from a GitHub-style "<owner>-<repo>-<sha>/"
+    top-level directory.
+    """
+    skip_dirs = set(get_repo_index_settings()["SKIP_DIRS"])
+    with tarfile.open(path, "r:*") as archive:
+        members = [member for member in archive.getmembers() if member.isfile()]
+        sha = archive.pax_headers.get("comment")
+        tops = {member.name.split("/", 1)[0] for member in members}
+        prefix = ""
+        if len(tops) == 1 and all("/" in member.name for member in members):
+            prefix = tops.pop() + "/"
+            match = re.search(r"-([0-9a-f]{7,40})$", prefix[:-1])
+            if sha is None and match:
+                sha = match.group(1)
+
+        files = []
+        for member in sorted(members, key=lambda m: m.name):
+            relpath = member.name[len(prefix):]
+            if not relpath or _skipped(relpath, skip_dirs):
+                continue
+            with archive.extractfile(member) as f:
+                files.append((relpath, _decode(f.read(limit))))
+    return sha, files
+
+
+# ---------------------------------------------------------------------------
+# Building
+# ---------------------------------------------------------------------------
+
+
+def build_index_data(files):
+    """
+    Build the stored form of an index from [(path, text or None)].
+    """
+    config = get_repo_index_settings()
+    paths, symbols, lengths = [], [], []
+    postings = defaultdict(list)
+    for doc, (path, text) in enumerate(files):
+        counts = Counter()
+        for term in path_terms(path):
+            counts[term] += FIELD_WEIGHTS["path"]
+        names = []
+        if text:
+            names = [
+                name for name in dict.fromkeys(SYMBOL_RE.findall(text))
+                if not name.startswith("__") and name not in GENERIC_SYMBOLS
+            ][:config["SYMBOLS_PER_FILE"]]
+            for term in terms(" ".join(names)):
+                counts[term] += FIELD_WEIGHTS["symbol"]
+            content = Counter(terms(text)).most_common(config["TERMS_PER_FILE"])
+            for term, count in content:
+                counts[term] += FIELD_WEIGHTS["content"] * count
+        paths.append(path)
+        symbols.append(names)
+        lengths.append(sum(counts.values()))
+        for term, count in counts.items():
+            postings[term].extend((doc, count))
+    return {"format": INDEX_FORMAT, "paths": paths, "symbols": symbols, "lengths": lengths, "postings": postings}
+
+
+def index_repository(owner, repo, source, commit_sha=None, force=False):
+    """
+    Index a checkout directory or tarball at `source` and store it. An index
+    already stored for the same commit is reused unless `force` is set.
+    Returns (RepositoryIndex, created).
+    """
+    config = get_repo_index_settings()
+    started = time.monotonic()
+    is_checkout = os.path.isdir(source)
+
+    def stored(sha):
+        return None if force or not sha else RepositoryIndex.objects.filter(
+            owner=owner, repo=repo, commit_sha=sha
+        ).first()
+
+    # Checkouts name their commit cheaply, so an unchanged one isn't read.
+    existing = stored(commit_sha or (checkout_sha(source) if is_checkout else None))
+    if existing is not None:
+        return existing, False
+
+    reader = read_checkout if is_checkout else read_tarball
+    found_sha, files = reader(source, config["CONTENT_BYTES"])
+    commit_sha = commit_sha or found_sha
+    if not commit_sha:
+        raise ValueError(f"Could not tell which commit {source} is; pass the commit SHA explicitly")
+    existing = stored(commit_sha)
+    if existing is not None:
+        return existing, False
+
+    data = build_index_data(files)
+    fields = {
+        "source": str(source)[:1024],
+        "file_count": len(data["paths"]),
+        "symbol_count": sum(len(names) for names in data["symbols"]),
+        "data": zlib.compress(json.dumps(data, separators=(",", ":")).encode("utf-8"), 6),
+        "build_ms": round((time.monotonic() - started) * 1000),
+    }
+    index, created = RepositoryIndex.objects.update_or_create(
+        owner=owner, repo=repo, commit_sha=commit_sha, defaults=fields
+    )
+    forget_index(owner, repo)
+    logger.info(
+        f"Indexed {index}: {index.file_count} files, {index.symbol_count} symbols, "
+        f"{len(fields['data']) // 1024} KiB in {index.build_ms} ms"
+    )
+    return index, created
+
+
+# ---------------------------------------------------------------------------
+# Querying
+# ---------------------------------------------------------------------------
+
+
+class RepoIndex:
+    """
+    A loaded index: BM25 ranking over files and path lookup.
+    """
+
+    def __init__(self, owner, repo, commit_sha, data):
+        self.owner = owner
+        self.repo = repo
+        self.commit_sha = commit_sha
+        self.paths = data["paths"]
+        self.symbols = data["symbols"]
+        self.lengths = data["lengths"]
+        self.postings = data["postings"]
+        self.avg_length = (sum(self.lengths) / len(self.lengths)) if self.lengths else 1
+        self.doc_of = {path: doc for doc, path in enumerate(self.paths)}
+        self.by_name = defaultdict(list)
+        for path in self.paths:
+            self.by_name[path.rsplit("/", 1)[-1]].append(path)
+
+    @classmethod
+    def from_row(cls, row):
+        return cls(row.owner, row.repo, row.commit_sha, json.loads(zlib.decompress(bytes(row.data))))
+
+    def resolve(self, path):
+        """
+        Map a path as written in an issue or an answer to a file in the
+        index, or None. Accepts leading "./" or "/", a repo-name prefix, a
+        checkout's absolute path, and bare file names that are unique.
+        """
+        path = (path or "").strip().strip("`'\"").replace("\\", "/")
+        path = re.sub(r":\d+(?::\d+)?$", "", path)
+        for prefix in ("./", "/", f"{self.repo}/", f"{self.owner}/{self.repo}/"):
+            if path in self.doc_of:
+                return path
+            if path.startswith(prefix):
+                path = path[len(prefix):]
+        if path in self.doc_of:
+            return path
+        candidates = [p for p in self.by_name.get(path.rsplit("/", 1)[-1], []) if path.endswith(p) or p.endswith(path)]
+        return candidates[0] if len(candidates) == 1 else None
+
+    def mentioned(self, text):
+        """
+        Files the issue names outright, e.g. in a stack trace.
+        """
+        found = []
+        for mention in PATH_MENTION_RE.findall(text):
+            path = self.resolve(mention)
+            if path is not None and path not in found:
+                found.append(path)
+        return found
+
+    def rank(self, text, k):
+        """
+        The `k` files that best match `text`, as [(path, score)]. Files the
+        text names outright come first.
+        """
+        count = len(self.paths)
+        query = Counter(terms(text))
+        scores = defaultdict(float)
+        for term, query_count in query.items():
+            entries = self.postings.get(term)
+            if not entries:
+                continue
+            df = len(entries) // 2
+            idf = math.log(1 + (count - df + 0.5) / (df + 0.5))
+            weight = idf * min(query_count, 3)
+            for position in range(0, len(entries), 2):
+                doc, tf = entries[position], entries[position + 1]
+                norm = K1 * (1 - B + B * self.lengths[doc] / self.avg_length)
+                scores[doc] += weight * tf * (K1 + 1) / (tf + norm)
+
+        top = max(scores.values(), default=1.0)
+        for path in self.mentioned(text):
+            scores[self.doc_of[path]] += 2 * top
+        ranked = sorted(scores.items(), key=lambda item: (-item[1], self.paths[item[0]]))[:k]
+        return [(self.paths[doc], round(score, 3)) for doc, score in ranked]
+
+    def candidates(self, text, k=None, symbols=None):
+        """
+        Top files with a few of the symbols each defines, for a prompt.
+        """
+        config = get_repo_index_settings()
+        k = k or config["TOP_K"]
+        symbols = symbols or config["SYMBOLS_PER_CANDIDATE"]
+        return [
+            {"path": path, "score": score, "symbols": self.symbols[self.doc_of[path]][:symbols]}
+            for path, score in self.rank(text, k)
+        ]
+
+
+_loaded = TTLCache(maxsize=get_repo_index_settings()["MEMORY_SIZE"], ttl=get_repo_index_settings()["MEMORY_TTL"])
+_loaded_lock = threading.Lock()
+
+
+def get_index(owner, repo):
+    """
+    The latest index for a repository, or None. Reads the database on a
+    memory miss.
+    """
+    key = (owner, repo)
+    with _loaded_lock:
+        if key in _loaded:
+            return _loaded[key]
+    row = RepositoryIndex.objects.filter(owner=owner, repo=repo).order_by("-built_at", "-id").first()
+    index = RepoIndex.from_row(row) if row is not None else None
+    with _loaded_lock:
+        # None is remembered too, so unindexed repos cost one query per TTL.
+        _loaded[key] = index
+    return index
+
+
+async def aget_index(owner, repo):
+    return await sync_to_async(get_index)(owner, repo)
+
+
+def cached_index(owner, repo):
+    """
+    The index for a repository if it is already in memory; never queries.
+    """
+    with _loaded_lock:
+        return _loaded.get((owner, repo))
+
+
+def preload_indexes(tickets):
+    """
+    Load the indexes for these tickets' repositories into memory, before
+    handing the tickets to threads that build prompts.
+    """
+    for owner, repo in {(ticket.owner, ticket.repo) for ticket in tickets}:
+        get_index(owner, repo)
+
+
+def forget_index(owner, repo):
+    with _loaded_lock:
+        _loaded.pop((owner, repo), None)
+
+
+def ticket_query(ticket):
+    labels = " ".join(label["name"] if isinstance(label, dict) else str(label) for label in ticket.labels or [])
+    return f"{ticket.title}\n{ticket.title}\n{labels}\n{ticket.body or ''}"
+
+
+def ground_fix(fix, ticket):
+    """
+    Check a fix's files_to_fix against the ticket's repository index: paths
+    are normalized to the indexed ones, and paths not in the repository
+    move to `unmatched_files`. Adds the indexed `commit_sha`. A no-op when
+    the repository has no index in memory.
+    """
+    index = cached_index(ticket.owner, ticket.repo)
+    if index is None or not isinstance(fix, dict):
+        return fix
+    matched, unmatched = [], []
+    for path in fix.get("files_to_fix") or []:
+        resolved = index.resolve(str(path))
+        if resolved is None:
+            unmatched.append(path)
+        elif resolved not in matched:
+            matched.append(resolved)
+    fix["files_to_fix"] = matched
+    fix["commit_sha"] = index.commit_sha
+    if unmatched:
+        fix["unmatched_files"] = unmatched
+    return fix
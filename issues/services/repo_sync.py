@@ -0,0 +1,91 @@
+# issues/services/repo_sync.py
+import logging
+from collections import namedtuple
+
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from issues.models import RepoSyncState
+from issues.services.github_client import GitHubClientError, get_github_client
+from issues.services.issue_extraction import issue_to_ticket_dict
+from issues.services.ticket_ingest import ingest_issues
+
+logger = logging.getLogger(__name__)
+
+SyncResult = namedtuple("SyncResult", ["repo", "status", "fetched", "created", "updated"])
+
+
+def _as_github_timestamp(value):
+    return value.strftime("%Y-%m-%dT%H:%M:%SZ") if value else None
+
+
+def apply_issues(owner, repo, issues):
+    """
+    Upsert GitHub issue payloads into Ticket. Returns (created, updated).
+    """
+    result = ingest_issues([issue_to_ticket_dict(issue, owner, repo) for issue in issues], return_ids=False)
+    return result.created, result.updated
+
+
+def sync_repo(state, client=None):
+    """
+    Bring one repository's tickets up to date with GitHub.
+
+    Only issues updated since the stored cursor are requested. A conditional
+    request that comes back 304 Not Modified costs one round trip and
+    changes nothing.
+    """
+    client = client or get_github_client("GITHUB_SYNC_CLIENT")
+    since = _as_github_timestamp(state.cursor)
+    # The stored ETag belongs to the listing for the current cursor only.
+    etag = state.etag or None
+
+    try:
+        batch = client.fetch_updated_issues(state.owner, state.repo, since=since, etag=etag)
+    except GitHubClientError as e:
+        state.last_status = "error"
+        state.last_error = str(e)
+        state.last_synced_at = timezone.now()
+        state.save(update_fields=["last_status", "last_error", "last_synced_at"])
+        logger.error(f"Sync of {state} failed: {e}")
+        return SyncResult(str(state), "error", 0, 0, 0)
+
+    if batch.not_modified:
+        state.last_status = "not_modified"
+        state.last_error = ""
+        state.last_synced_at = timezone.now()
+        state.save(update_fields=["last_status", "last_error", "last_synced_at"])
+        return SyncResult(str(state), "not_modified", 0, 0, 0)
+
+    created, updated = apply_issues(state.owner, state.repo, batch.issues)
+
+    timestamps = [parse_datetime(i["updated_at"]) for i in batch.issues if i.get("updated_at")]
+    new_cursor = max(timestamps, default=state.cursor)
+    if state.cursor is not None and new_cursor is not None:
+        new_cursor = max(new_cursor, state.cursor)
+
+    # GitHub's `since` is inclusive, so an unchanged repo keeps returning the
+    # issues at the cursor. Keep the ETag only when the cursor (and therefore
+    # the request URL) stays the same; otherwise the next sync refreshes it.
+    state.etag = (batch.etag or "") if new_cursor == state.cursor else ""
+    state.cursor = new_cursor
+    state.issues_synced += created + updated
+    state.last_status = "synced"
+    state.last_error = ""
+    state.last_synced_at = timezone.now()
+    state.save()
+
+    logger.info(f"Synced {state}: {len(batch.issues)} fetched, {created} created, {updated} updated")
+    return SyncResult(str(state), "synced", len(batch.issues), created, updated)
+
+
+def track_repo(owner, repo):
+    state, _ = RepoSyncState.objects.get_or_create(owner=owner, repo=repo)
+    if not state.enabled:
+        state.enabled = True
+        state.save(update_fields=["enabled"])
+    return state
+
+
+def sync_all_repos(client=None):
+    return [sync_repo(state, client) for state in RepoSyncState.objects.filter(enabled=True).order_by("id")]
@@ -0,0 +1,252 @@
+# issues/services/retention.py
+"""
+Retention: archive and delete expired rows, and evict idle ADK sessions.
+
+A policy walks its expired rows in primary-key order, CHUNK_SIZE at a time.
+Each chunk is written to a gzip-compressed NDJSON archive together with its
+dependent rows (suggestions, job events), the archive is synced to disk,
+and only then is the chunk deleted in a transaction of its own. Memory use
+is one chunk whatever the backlog, every write lock is held for one short
+DELETE, and a row is never deleted before it is archived. A run that stops
+halfway leaves a valid archive of everything it deleted; the next run picks
+up the rest.
+
+Archives are named <policy>-<timestamp>.ndjson.gz under ARCHIVE_DIR. Each
+line is {"model", "pk", "fields", "related": {name: [rows]}}.
+
+The cache can't list its keys, so ADK session keys are indexed by the hour
+they were last used (track_session). evict_idle_sessions() deletes the
+sessions whose newest index entry is older than SESSION_IDLE_SECONDS.
+"""
+import gzip
+import json
+import logging
+import os
+import time
+from collections import defaultdict, namedtuple
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.utils import timezone
+
+from issues.models import ExtractionJob, JobEvent, SuggestedFix, Ticket
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_RETENTION_SETTINGS = {
+    # None keeps rows forever.
+    "TICKET_DAYS": 30,
+    "JOB_DAYS": 14,
+    "CHUNK_SIZE": 500,
+    # Seconds to sleep between chunks, so other writers get the lock.
+    "CHUNK_PAUSE": 0,
+    "ARCHIVE": True,
+    # None means <BASE_DIR>/archives.
+    "ARCHIVE_DIR": None,
+    "COMPRESS_LEVEL": 6,
+    "SESSION_IDLE_SECONDS": 24 * 3600,
+    # How far back the session index goes; older entries expire on their own.
+    "SESSION_INDEX_HOURS": 7 * 24,
+}
+
+Related = namedtuple("Related", ["name", "model", "field"])
+RetentionPolicy = namedtuple("RetentionPolicy", ["name", "model", "date_field", "days_setting", "filters", "related"])
+RetentionResult = namedtuple("RetentionResult", ["policy", "cutoff", "archived", "deleted", "chunks", "archive", "seconds"])
+
+POLICIES = {
+    "tickets": RetentionPolicy(
+        "tickets", Ticket, "created_at", "TICKET_DAYS", {},
+        [Related("suggestions", SuggestedFix, "ticket_id"), Related("events", JobEvent, "ticket_id")],
+    ),
+    # Only finished jobs; a job still running is never old enough.
+    "jobs": RetentionPolicy(
+        "jobs", ExtractionJob, "created_at", "JOB_DAYS", {"status__in": ExtractionJob.FINISHED_STATUSES},
+        [Related("events", JobEvent, "job_id")],
+    ),
+}
+
+SESSION_INDEX_PREFIX = "adk_sessions:index:"
+
+
+def get_retention_settings():
+    config = dict(DEFAULT_RETENTION_SETTINGS)
+    config.update(getattr(settings, "RETENTION", {}))
+    config["ARCHIVE_DIR"] = config["ARCHIVE_DIR"] or os.path.join(settings.BASE_DIR, "archives")
+    return config
+
+
+class ArchiveWriter:
+    """
+    Append-only gzip NDJSON file. Written as <name>.partial and renamed
+    when closed, including after an error: whatever it holds was deleted
+    from the database and must be kept.
+    """
+
+    def __init__(self, path, compress_level=6):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.path = path
+        self.partial = path + ".partial"
+        self.records = 0
+        self._raw = open(self.partial, "wb")
+        self._gzip = gzip.GzipFile(fileobj=self._raw, mode="wb", compresslevel=compress_level)
+
+    def write(self, records):
+        for record in records:
+            self._gzip.write(json.dumps(record, cls=DjangoJSONEncoder, separators=(",", ":")).encode("utf-8") + b"\n")
+            self.records += 1
+
+    def sync(self):
+        """
+        Make everything written so far readable from disk. A sync flush
+        keeps the file decompressible up to this point even if the process
+        dies before close().
+        """
+        self._gzip.flush()
+        self._raw.flush()
+        os.fsync(self._raw.fileno())
+
+    def close(self):
+        self._gzip.close()
+        self._raw.close()
+        if self.records:
+            os.replace(self.partial, self.path)
+            return self.path
+        os.remove(self.partial)
+        return None
+
+
+def _archive_records(policy, ids):
+    """
+    The chunk's rows and their dependent rows, as archive records.
+    """
+    related = {}
+    for relation in policy.related:
+        grouped = defaultdict(list)
+        for row in relation.model.objects.filter(**{f"{relation.field}__in": ids}).order_by("pk").values():
+            grouped[row[relation.field]].append(row)
+        related[relation.name] = grouped
+
+    label = policy.model._meta.label_lower
+    for row in policy.model.objects.filter(pk__in=ids).order_by("pk").values():
+        pk = row.pop("id")
+        yield {
+            "model": label,
+            "pk": pk,
+            "fields": row,
+            "related": {name: grouped.get(pk, []) for name, grouped in related.items()},
+        }
+
+
+def apply_policy(name, days=None, chunk_size=None, archive=None, dry_run=False, now=None):
+    """
+    Archive and delete the rows policy `name` considers expired. `days`,
+    `chunk_size` and `archive` override RETENTION settings. With dry_run,
+    nothing is touched and `deleted` is the number that would be.
+    """
+    config = get_retention_settings()
+    policy = POLICIES[name]
+    days = config[policy.days_setting] if days is None else days
+    chunk_size = chunk_size or config["CHUNK_SIZE"]
+    archive = config["ARCHIVE"] if archive is None else archive
+    now = now or timezone.now()
+    if days is None:
+        return RetentionResult(name, None, 0, 0, 0, None, 0.0)
+
+    cutoff = now - timedelta(days=days)
+    expired = policy.model.objects.filter(**{f"{policy.date_field}__lt": cutoff}, **policy.filters)
+    if dry_run:
+        return RetentionResult(name, cutoff, 0, expired.count(), 0, None, 0.0)
+
+    started = time.monotonic()
+    writer = None
+    if archive:
+        path = os.path.join(config["ARCHIVE_DIR"], f"{name}-{now:%Y%m%d-%H%M%S}.ndjson.gz")
+        writer = ArchiveWriter(path, config["COMPRESS_LEVEL"])
+    archived = deleted = chunks = 0
+    last_pk = None
+    label = policy.model._meta.label
+    try:
+        while True:
+            page = expired if last_pk is None else expired.filter(pk__gt=last_pk)
+            ids = list(page.order_by("pk").values_list("pk", flat=True)[:chunk_size])
+            if not ids:
+                break
+            last_pk = ids[-1]
+
+            if writer is not None:
+                before = writer.records
+                writer.write(_archive_records(policy, ids))
+                writer.sync()
+                archived += writer.records - before
+            with transaction.atomic():
+                _, per_model = policy.model.objects.filter(pk__in=ids).delete()
+            deleted += per_model.get(label, 0)
+            chunks += 1
+            if config["CHUNK_PAUSE"]:
+                time.sleep(config["CHUNK_PAUSE"])
+    finally:
+        archive_path = writer.close() if writer is not None else None
+
+    seconds = round(time.monotonic() - started, 3)
+    logger.info(f"Retention {name}: deleted {deleted} rows older than {cutoff:%Y-%m-%d} in {chunks} chunks, "
+                f"archived {archived} to {archive_path or 'nowhere'} in {seconds}s")
+    return RetentionResult(name, cutoff, archived, deleted, chunks, archive_path, seconds)
+
+
+# -- ADK sessions ---------------------------------------------------------------
+
+def _hour(timestamp):
+    return int(timestamp // 3600)
+
+
+def track_session(key, now=None):
+    """
+    Note that the session stored at cache key `key` was just used. Call it
+    whenever a session is created or resumed.
+
+    Concurrent updates of the same hour's index can lose an entry; such a
+    session is then only removed by its own cache timeout.
+    """
+    config = get_retention_settings()
+    index_key = f"{SESSION_INDEX_PREFIX}{_hour(now or time.time())}"
+    keys = cache.get(index_key) or []
+    if key not in keys:
+        keys.append(key)
+        cache.set(index_key, keys, timeout=config["SESSION_INDEX_HOURS"] * 3600)
+
+
+def evict_idle_sessions(idle_seconds=None, now=None):
+    """
+    Delete sessions not used for `idle_seconds`, and the index entries that
+    led to them. Returns the number of sessions evicted.
+    """
+    config = get_retention_settings()
+    idle_seconds = config["SESSION_IDLE_SECONDS"] if idle_seconds is None else idle_seconds
+    now = now or time.time()
+    current = _hour(now)
+    idle_before = _hour(now - idle_seconds)
+    index_keys = [f"{SESSION_INDEX_PREFIX}{hour}" for hour in range(current - config["SESSION_INDEX_HOURS"], current + 1)]
+    index = cache.get_many(index_keys)
+
+    recent, stale, expired_index = set(), set(), []
+    for index_key, keys in index.items():
+        if _hour_of(index_key) >= idle_before:
+            recent.update(keys)
+        else:
+            stale.update(keys)
+            expired_index.append(index_key)
+
+    evict = sorted(stale - recent)
+    chunk_size = config["CHUNK_SIZE"]
+    for start in range(0, len(evict), chunk_size):
+        cache.delete_many(evict[start:start + chunk_size])
+    cache.delete_many(expired_index)
+    logger.info(f"Evicted {len(evict)} idle ADK sessions ({len(recent)} still active)")
+    return len(evict)
+
+
+def _hour_of(index_key):
+    return int(index_key[len(SESSION_INDEX_PREFIX):])
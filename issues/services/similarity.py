@@ -0,0 +1,301 @@
+# issues/services/similarity.py
+"""
+Near-duplicate ticket detection with MinHash and LSH banding.
+
+A ticket's title and body are cut into word shingles. A MinHash signature
+of NUM_PERM 32-bit values estimates the Jaccard similarity of two tickets'
+shingle sets as the share of positions where their signatures agree. The
+signature is split into BANDS bands. Tickets that share any band
+land in the same bucket and become candidates, so a lookup touches only a
+handful of tickets, not the whole table.
+
+Signatures are stored in TicketSignature as tickets are saved or ingested,
+and each process keeps an in-memory LSH index of them. The index picks up
+rows written by other processes every REFRESH_INTERVAL seconds.
+"""
+import logging
+import re
+import threading
+import time
+import zlib
+from collections import defaultdict
+from datetime import timedelta
+
+import numpy as np
+from django.conf import settings
+from django.utils import timezone
+
+from issues.models import SuggestedFix, Ticket, TicketSignature
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SIMILARITY_SETTINGS = {
+    "NUM_PERM": 128,
+    # BANDS x ROWS must equal NUM_PERM. 32 bands of 4 rows make tickets
+    # above ~0.5 Jaccard similarity very likely to collide.
+    "BANDS": 32,
+    "SHINGLE_SIZE": 3,
+    "SEED": 1,
+    # Estimated similarity at or above which a neighbour's suggestion is
+    # served instead of calling the agent.
+    "REUSE_THRESHOLD": 0.8,
+    "REUSE": True,
+    "REFRESH_INTERVAL": 5,
+}
+
+MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+MAX_HASH = np.uint64(0xFFFFFFFF)
+
+TOKEN_RE = re.compile(r"[a-z0-9_]+")
+# Volatile bits that differ between otherwise identical reports.
+NOISE_RE = re.compile(r"https?://\S+|0x[0-9a-f]+|\b\d+\b")
+
+
+def get_similarity_settings():
+    config = dict(DEFAULT_SIMILARITY_SETTINGS)
+    config.update(getattr(settings, "SIMILARITY", {}))
+    return config
+
+
+def shingles(text, size=None):
+    """
+    Set of word `size`-grams of the normalized text; the words themselves
+    for texts shorter than that.
+    """
+    size = size or get_similarity_settings()["SHINGLE_SIZE"]
+    words = TOKEN_RE.findall(NOISE_RE.sub(" ", text.lower()))
+    if len(words) < size:
+        return set(words)
+    return {" ".join(words[i:i + size]) for i in range(len(words) - size + 1)}
+
+
+def ticket_text(title, body):
+    return f"{title}\n{body or ''}"
+
+
+class MinHasher:
+    """
+    Universal hash family (a * x + b) mod p over CRC32 shingle hashes.
+    Fixed seed, so signatures compare across processes and restarts.
+    """
+
+    def __init__(self, num_perm, seed):
+        generator = np.random.RandomState(seed)
+        self.num_perm = num_perm
+        self.a = generator.randint(1, 2**61 - 1, size=num_perm, dtype=np.uint64)[:, None]
+        self.b = generator.randint(0, 2**61 - 1, size=num_perm, dtype=np.uint64)[:, None]
+
+    def signature(self, text):
+        """
+        Signature of `text` as uint32[num_perm], or None if it has no words.
+        """
+        grams = shingles(text)
+        if not grams:
+            return None
+        hashes = np.fromiter((zlib.crc32(gram.encode("utf-8")) for gram in grams), dtype=np.uint64, count=len(grams))
+        # uint64 wrap-around in a * x is part of the hash, not an error.
+        with np.errstate(over="ignore"):
+            values = (self.a * hashes[None, :] + self.b) % MERSENNE_PRIME & MAX_HASH
+        return values.min(axis=1).astype(np.uint32)
+
+
+class LSHIndex:
+    """
+    In-memory banded LSH over MinHash signatures, keyed by ticket id.
+    """
+
+    def __init__(self, num_perm, bands):
+        if num_perm % bands:
+            raise ValueError("NUM_PERM must be a multiple of BANDS")
+        self.bands = bands
+        self.rows = num_perm // bands
+        self._lock = threading.Lock()
+        self._buckets = [defaultdict(set) for _ in range(bands)]
+        self._signatures = {}
+
+    def __len__(self):
+        return len(self._signatures)
+
+    def _keys(self, signature):
+        return [band.tobytes() for band in signature.reshape(self.bands, self.rows)]
+
+    def _remove(self, ticket_id):
+        old = self._signatures.pop(ticket_id, None)
+        if old is not None:
+            for band, key in enumerate(self._keys(old)):
+                bucket = self._buckets[band].get(key)
+                if bucket is not None:
+                    bucket.discard(ticket_id)
+                    if not bucket:
+                        del self._buckets[band][key]
+
+    def add(self, ticket_id, signature):
+        with self._lock:
+            self._remove(ticket_id)
+            self._signatures[ticket_id] = signature
+            for band, key in enumerate(self._keys(signature)):
+                self._buckets[band][key].add(ticket_id)
+
+    def remove(self, ticket_id):
+        with self._lock:
+            self._remove(ticket_id)
+
+    def get(self, ticket_id):
+        return self._signatures.get(ticket_id)
+
+    def query(self, signature, k=10, threshold=0.0, exclude=None):
+        """
+        Up to `k` (ticket_id, estimated similarity) pairs at or above
+        `threshold`, most similar first.
+        """
+        with self._lock:
+            candidates = set()
+            for band, key in enumerate(self._keys(signature)):
+                candidates |= self._buckets[band].get(key, set())
+            candidates.discard(exclude)
+            if not candidates:
+                return []
+            ids = list(candidates)
+            matrix = np.stack([self._signatures[ticket_id] for ticket_id in ids])
+        scores = (matrix == signature).mean(axis=1)
+        order = np.argsort(-scores, kind="stable")[:k]
+        return [(ids[i], round(float(scores[i]), 4)) for i in order if scores[i] >= threshold]
+
+
+class SimilarityIndex:
+    """
+    The process's LSH index, loaded from TicketSignature on first use and
+    topped up with newer rows at most every REFRESH_INTERVAL seconds.
+    """
+
+    def __init__(self, config):
+        self.config = config
+        self.hasher = MinHasher(config["NUM_PERM"], config["SEED"])
+        self.lsh = LSHIndex(config["NUM_PERM"], config["BANDS"])
+        self._refresh_lock = threading.Lock()
+        self._synced_at = None
+        self._checked = 0.0
+
+    def refresh(self, force=False):
+        if not force and time.monotonic() - self._checked < self.config["REFRESH_INTERVAL"]:
+            return
+        with self._refresh_lock:
+            if not force and time.monotonic() - self._checked < self.config["REFRESH_INTERVAL"]:
+                return
+            started = timezone.now()
+            rows = TicketSignature.objects.all()
+            if self._synced_at is not None:
+                # Overlap a little: a row committed late with an earlier
+                # timestamp would otherwise be missed. Re-adding is harmless.
+                rows = rows.filter(updated_at__gte=self._synced_at - timedelta(seconds=1))
+            count = 0
+            for ticket_id, signature in rows.values_list("ticket_id", "signature").iterator(chunk_size=2000):
+                self.lsh.add(ticket_id, np.frombuffer(bytes(signature), dtype=np.uint32))
+                count += 1
+            if self._synced_at is None:
+                logger.info(f"Loaded {count} ticket signatures into the similarity index")
+            self._synced_at = started
+            self._checked = time.monotonic()
+
+    def signature_for(self, ticket):
+        signature = self.lsh.get(ticket.id) if ticket.id else None
+        if signature is None:
+            signature = self.hasher.signature(ticket_text(ticket.title, ticket.body))
+        return signature
+
+    def similar(self, ticket, k=10, threshold=0.0):
+        self.refresh()
+        signature = self.signature_for(ticket)
+        if signature is None:
+            return []
+        return self.lsh.query(signature, k=k, threshold=threshold, exclude=ticket.id)
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_similarity_index():
+    global _index
+    with _index_lock:
+        if _index is None:
+            _index = SimilarityIndex(get_similarity_settings())
+        return _index
+
+
+def index_tickets(tickets):
+    """
+    Compute and store signatures for tickets (objects with id, title and
+    body) and add them to this process's index.
+    """
+    index = get_similarity_index()
+    now = timezone.now()
+    rows, signatures = [], []
+    for ticket in tickets:
+        signature = index.hasher.signature(ticket_text(ticket.title, ticket.body))
+        if signature is None:
+            continue
+        rows.append(TicketSignature(ticket_id=ticket.id, signature=signature.tobytes(), updated_at=now))
+        signatures.append((ticket.id, signature))
+    if rows:
+        TicketSignature.objects.bulk_create(
+            rows, update_conflicts=True, unique_fields=["ticket"], update_fields=["signature", "updated_at"]
+        )
+    for ticket_id, signature in signatures:
+        index.lsh.add(ticket_id, signature)
+    return len(rows)
+
+
+def forget_ticket(ticket_id):
+    get_similarity_index().lsh.remove(ticket_id)
+
+
+def similar_tickets(ticket, k=10, threshold=0.0):
+    """
+    The `k` most similar other tickets as [(ticket_id, similarity)].
+    """
+    return get_similarity_index().similar(ticket, k=k, threshold=threshold)
+
+
+def find_reusable_suggestion(ticket):
+    """
+    A fresh stored suggestion from a near-duplicate ticket in the same
+    repository, as (payload, neighbour, similarity), or None. Neighbours are
+    tried most similar first.
+    """
+    config = get_similarity_settings()
+    if not config["REUSE"]:
+        return None
+    neighbours = similar_tickets(ticket, k=5, threshold=config["REUSE_THRESHOLD"])
+    if not neighbours:
+        return None
+    similarity_of = dict(neighbours)
+    stored = (
+        SuggestedFix.objects.filter(
+            ticket_id__in=similarity_of,
+            ticket__owner=ticket.owner,
+            ticket__repo=ticket.repo,
+            agent_version=settings.SUGGEST_FIX_AGENT_VERSION,
+            expires_at__gt=timezone.now(),
+        )
+        .select_related("ticket")
+        .only("payload", "ticket__id", "ticket__issue_number", "ticket__title")
+    )
+    best = max(stored, key=lambda fix: similarity_of[fix.ticket_id], default=None)
+    if best is None:
+        return None
+    return best.payload, best.ticket, similarity_of[best.ticket_id]
+
+
+def backfill(batch_size=1000):
+    """
+    Compute signatures for every ticket that has none. Returns the count.
+    """
+    total, last_id = 0, 0
+    pending = Ticket.objects.filter(signature__isnull=True).only("id", "title", "body").order_by("id")
+    while True:
+        batch = list(pending.filter(id__gt=last_id)[:batch_size])
+        if not batch:
+            return total
+        total += index_tickets(batch)
+        last_id = batch[-1].id
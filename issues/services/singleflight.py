@@ -0,0 +1,306 @@
+# issues/services/singleflight.py
+"""
+Request coalescing: concurrent callers asking for the same key share one
+computation instead of each starting their own agent run.
+
+Within a process, followers wait on the leader's Future; if the leader is
+cancelled or interrupted rather than failing, one of them takes over the
+computation. Across processes (web workers, Celery workers), leaders take
+a lock in a shared store and publish the result there; callers that lose
+the lock poll for it. If the lock holder dies or fails, its lock expires
+or is released, and a waiter takes over.
+"""
+import asyncio
+import copy
+import logging
+import threading
+import time
+import uuid
+from concurrent.futures import Future
+
+from django.conf import settings
+from django.core.cache import caches
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SINGLEFLIGHT_SETTINGS = {
+    # "cache" (Django cache; shared when CACHES points at Redis), "local"
+    # (in-memory, this process only) or "none" (in-process coalescing only).
+    "STORE": "cache",
+    "CACHE_ALIAS": "default",
+    # How long a leader may hold a key before others assume it died.
+    "LOCK_TTL": 300,
+    # How long a published result stays readable by late waiters.
+    "RESULT_TTL": 30,
+    "POLL_INTERVAL": 0.05,
+    "WAIT_TIMEOUT": 300,
+}
+
+
+class _LeaderGone(Exception):
+    """
+    Set on the shared future in place of the leader's CancelledError or
+    KeyboardInterrupt: that says nothing about the key, so a follower
+    computes it instead of failing with it.
+    """
+
+
+def get_singleflight_settings():
+    config = dict(DEFAULT_SINGLEFLIGHT_SETTINGS)
+    config.update(getattr(settings, "SINGLEFLIGHT", {}))
+    return config
+
+
+class CacheFlightStore:
+    """
+    Lock and result store on a Django cache. cache.add is an atomic
+    set-if-absent on Redis and Memcached, which is all the lock needs.
+    """
+
+    def __init__(self, alias="default"):
+        self.alias = alias
+
+    @property
+    def cache(self):
+        return caches[self.alias]
+
+    def acquire(self, key, ttl):
+        token = uuid.uuid4().hex
+        return token if self.cache.add(f"singleflight:lock:{key}", token, timeout=ttl) else None
+
+    def release(self, key, token):
+        lock_key = f"singleflight:lock:{key}"
+        if self.cache.get(lock_key) == token:
+            self.cache.delete(lock_key)
+
+    def locked(self, key):
+        return self.cache.get(f"singleflight:lock:{key}") is not None
+
+    def publish(self, key, value, ttl):
+        self.cache.set(f"singleflight:result:{key}", {"value": value}, timeout=ttl)
+
+    def peek(self, key):
+        entry = self.cache.get(f"singleflight:result:{key}")
+        return (True, entry["value"]) if entry is not None else (False, None)
+
+
+class LocalFlightStore:
+    """
+    In-memory stand-in for a shared store. Several SingleFlight instances
+    built on one LocalFlightStore behave like separate workers sharing Redis.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._locks = {}
+        self._results = {}
+
+    def _live(self, table, key):
+        entry = table.get(key)
+        if entry is not None and entry[1] < time.monotonic():
+            del table[key]
+            return None
+        return entry
+
+    def acquire(self, key, ttl):
+        with self._lock:
+            if self._live(self._locks, key) is not None:
+                return None
+            token = uuid.uuid4().hex
+            self._locks[key] = (token, time.monotonic() + ttl)
+            return token
+
+    def release(self, key, token):
+        with self._lock:
+            entry = self._live(self._locks, key)
+            if entry is not None and entry[0] == token:
+                del self._locks[key]
+
+    def locked(self, key):
+        with self._lock:
+            return self._live(self._locks, key) is not None
+
+    def publish(self, key, value, ttl):
+        with self._lock:
+            self._results[key] = (value, time.monotonic() + ttl)
+
+    def peek(self, key):
+        with self._lock:
+            entry = self._live(self._results, key)
+            return (True, entry[0]) if entry is not None else (False, None)
+
+
+class SingleFlight:
+    """
+    `do(key, fn)` returns (value, shared): `shared` is true when the value
+    came from another caller's computation rather than this call's `fn`.
+    `ado(key, coro_fn)` is the asyncio equivalent. Values must be picklable
+    when a shared store is in use.
+    """
+
+    def __init__(self, store=None, lock_ttl=300, result_ttl=30, poll_interval=0.05, wait_timeout=300):
+        self.store = store
+        self.lock_ttl = lock_ttl
+        self.result_ttl = result_ttl
+        self.poll_interval = poll_interval
+        self.wait_timeout = wait_timeout
+        self._lock = threading.Lock()
+        self._calls = {}
+        self.stats = {"leaders": 0, "local_followers": 0, "remote_followers": 0}
+
+    # -- in-process --------------------------------------------------------
+
+    def _join(self, key):
+        """
+        Return (future, is_leader) for the in-process call on `key`.
+        """
+        with self._lock:
+            future = self._calls.get(key)
+            if future is not None:
+                self.stats["local_followers"] += 1
+                return future, False
+            future = Future()
+            self._calls[key] = future
+            return future, True
+
+    def _finish(self, key, future, value=None, error=None):
+        with self._lock:
+            self._calls.pop(key, None)
+        if future.done():
+            # Cancelled from outside; no follower is waiting on it any more.
+            return
+        if error is not None and not isinstance(error, Exception):
+            error = _LeaderGone(f"Leader for {key} stopped: {error!r}")
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(value)
+
+    def do(self, key, fn):
+        future, leader = self._join(key)
+        if not leader:
+            try:
+                return copy.deepcopy(future.result(timeout=self.wait_timeout)), True
+            except _LeaderGone:
+                return self.do(key, fn)
+        try:
+            value, shared = self._lead(key, fn)
+        except BaseException as e:
+            self._finish(key, future, error=e)
+            raise
+        self._finish(key, future, value)
+        return value, shared
+
+    async def ado(self, key, coro_fn):
+        future, leader = self._join(key)
+        if not leader:
+            # Shielded: a follower timing out must not cancel the shared
+            # future under the leader and the other followers.
+            try:
+                value = await asyncio.wait_for(asyncio.shield(asyncio.wrap_future(future)), self.wait_timeout)
+            except _LeaderGone:
+                # The first follower back in becomes the leader.
+                return await self.ado(key, coro_fn)
+            return copy.deepcopy(value), True
+        try:
+            value, shared = await self._alead(key, coro_fn)
+        except BaseException as e:
+            self._finish(key, future, error=e)
+            raise
+        self._finish(key, future, value)
+        return value, shared
+
+    # -- across processes --------------------------------------------------
+
+    def _lead(self, key, fn):
+        if self.store is None:
+            self.stats["leaders"] += 1
+            return fn(), False
+
+        deadline = time.monotonic() + self.wait_timeout
+        while True:
+            token = self.store.acquire(key, self.lock_ttl)
+            if token is not None:
+                self.stats["leaders"] += 1
+                try:
+                    value = fn()
+                    self.store.publish(key, value, self.result_ttl)
+                    return value, False
+                finally:
+                    self.store.release(key, token)
+
+            # Another process is computing it: wait for its result, or for
+            # its lock to go away without one and try to take over.
+            while self.store.locked(key) and time.monotonic() < deadline:
+                time.sleep(self.poll_interval)
+            found, value = self.store.peek(key)
+            if found:
+                self.stats["remote_followers"] += 1
+                return value, True
+            if time.monotonic() >= deadline:
+                logger.warning(f"Gave up waiting on in-flight {key}; computing it here")
+                self.stats["leaders"] += 1
+                return fn(), False
+
+    async def _alead(self, key, coro_fn):
+        if self.store is None:
+            self.stats["leaders"] += 1
+            return await coro_fn(), False
+
+        deadline = time.monotonic() + self.wait_timeout
+        while True:
+            token = await asyncio.to_thread(self.store.acquire, key, self.lock_ttl)
+            if token is not None:
+                self.stats["leaders"] += 1
+                try:
+                    value = await coro_fn()
+                    await asyncio.to_thread(self.store.publish, key, value, self.result_ttl)
+                    return value, False
+                finally:
+                    await asyncio.to_thread(self.store.release, key, token)
+
+            while await asyncio.to_thread(self.store.locked, key) and time.monotonic() < deadline:
+                await asyncio.sleep(self.poll_interval)
+            found, value = await asyncio.to_thread(self.store.peek, key)
+            if found:
+                self.stats["remote_followers"] += 1
+                return value, True
+            if time.monotonic() >= deadline:
+                logger.warning(f"Gave up waiting on in-flight {key}; computing it here")
+                self.stats["leaders"] += 1
+                return await coro_fn(), False
+
+
+_flight = None
+_flight_lock = threading.Lock()
+
+
+def get_singleflight():
+    global _flight
+    with _flight_lock:
+        if _flight is None:
+            config = get_singleflight_settings()
+            store = {
+                "cache": lambda: CacheFlightStore(config["CACHE_ALIAS"]),
+                "local": LocalFlightStore,
+                "none": lambda: None,
+            }[config["STORE"]]()
+            _flight = SingleFlight(
+                store,
+                lock_ttl=config["LOCK_TTL"],
+                result_ttl=config["RESULT_TTL"],
+                poll_interval=config["POLL_INTERVAL"],
+                wait_timeout=config["WAIT_TIMEOUT"],
+            )
+        return _flight
+
+
+def coalesce(key, fn):
+    """
+    Run `fn` once for all concurrent callers of `key`. Returns (value, shared).
+    """
+    return get_singleflight().do(key, fn)
+
+
+async def acoalesce(key, coro_fn):
+    return await get_singleflight().ado(key, coro_fn)
@@ -1,100 +1,139 @@
 # issues/services/suggest_fix_integration.py
-import json
 import logging
-import subprocess
-import tempfile
-import os
-from pathlib import Path
 from issues.models import Ticket
+from issues.services import telemetry
+from issues.services.agent_pool import AgentInvocationError, arun_agent, run_agent
+from issues.services.output_parser import StreamingOutputParser, parse_stream
+from issues.services.prompts import afix_prompt, batch_prompt, fix_prompt
+from issues.services.repo_index import get_index, ground_fix
 
 logger = logging.getLogger(__name__)
 
+
 def get_suggested_fix_for_issue(ticket_id: int):
     ticket = Ticket.objects.get(id=ticket_id)
+    get_index(ticket.owner, ticket.repo)
+    return suggest_fix_for_ticket(ticket)
 
-    # Construct GitHub issue URL dynamically
-    issue_url = f"https://github.com/{ticket.owner}/{ticket.repo}/issues/{ticket.issue_number}"
 
-    prompt_text = f"""
-GitHub issue URL: {issue_url}
-Issue title: {ticket.title}
-Issue body: {ticket.body}
-Labels: {ticket.labels}
-Repo: {ticket.repo}
+def suggest_fix_for_ticket(ticket):
+    """
+    Ask the agent for a fix for one ticket. Makes no database queries, so it
+    can run on worker threads; the repository index is only read from
+    memory, so load it first (repo_index.preload_indexes).
+    """
+    try:
+        parser = StreamingOutputParser(lambda value: accept_fix(value, ticket))
+        output = run_agent("github_suggest_fix", fix_prompt(ticket), stop_when=parser.feed)
+        suggested_fix = parser.finish()
+        telemetry.record_parse("github_suggest_fix", parser)
+        if suggested_fix:
+            return ground_fix(suggested_fix, ticket)
 
-Suggest a concise fix and which files to modify. Return ONLY a JSON object with:
-- issue_id
-- suggested_fix
-- files_to_fix (list of file paths)
-"""
+        logger.error(f"Agent returned no valid output: {output}")
 
-    try:
-        # Find the agent folder
-        agent_dir = Path(__file__).parent.parent.parent / "adk_agents" / "github_suggest_fix"
-        if not agent_dir.exists():
-            logger.error(f"Agent directory not found at {agent_dir}")
-            return None
-
-        # Create replay JSON file
-        replay_data = {
-            "state": {},
-            "queries": [prompt_text]
-        }
-        with tempfile.NamedTemporaryFile(mode='w', suffix='.json', delete=False) as f:
-            json.dump(replay_data, f, indent=2)
-            replay_file = f.name
-
-        # Run ADK CLI in replay mode
-        result = subprocess.run([
-            'adk', 'run', str(agent_dir), '--replay', replay_file
-        ],
-        capture_output=True,
-        text=True,
-        timeout=120,
-        cwd=str(agent_dir.parent)
-        )
-
-        # Cleanup temp file
-        try:
-            os.unlink(replay_file)
-        except:
-            pass
+    except AgentInvocationError as e:
+        logger.error(f"ADK agent invocation failed: {e}")
+    except Exception as e:
+        logger.error(f"ADK agent execution failed: {e}")
 
-        if result.returncode == 0:
-            suggested_fix = parse_adk_output(result.stdout, ticket)
-            if suggested_fix:
-                return suggested_fix
+    # If execution fails, return None
+    return None
 
-        logger.error(f"ADK CLI failed or no valid output. stdout: {result.stdout}, stderr: {result.stderr}")
 
-    except subprocess.TimeoutExpired:
-        logger.error("ADK CLI replay timed out")
+async def asuggest_fix_for_ticket(ticket):
+    """
+    suggest_fix_for_ticket for async views; awaits the agent instead of
+    blocking a thread on it.
+    """
+    try:
+        parser = StreamingOutputParser(lambda value: accept_fix(value, ticket))
+        output = await arun_agent("github_suggest_fix", await afix_prompt(ticket), stop_when=parser.feed)
+        suggested_fix = parser.finish()
+        telemetry.record_parse("github_suggest_fix", parser)
+        if suggested_fix:
+            return ground_fix(suggested_fix, ticket)
+
+        logger.error(f"Agent returned no valid output: {output}")
+
+    except AgentInvocationError as e:
+        logger.error(f"ADK agent invocation failed: {e}")
     except Exception as e:
-        logger.error(f"ADK CLI execution failed: {e}")
+        logger.error(f"ADK agent execution failed: {e}")
 
-    # If execution fails, return None
     return None
 
 
-def parse_adk_output(output, ticket):
+def suggest_fixes_for_tickets(tickets, timeout=None):
     """
-    Parse JSON output from ADK CLI for suggested fix
+    Ask for fixes for several tickets in one agent request.
+    Returns {ticket_id: fix} for the tickets the agent answered; the caller
+    decides what to do about the rest. Makes no database queries.
     """
-    import re
+    tickets_by_id = {ticket.id: ticket for ticket in tickets}
     try:
-        # Try to extract JSON from stdout
-        matches = re.findall(r'(\{.*"suggested_fix".*\})', output, re.DOTALL)
-        for match in matches:
-            try:
-                data = json.loads(match)
-                if "suggested_fix" in data:
-                    # Ensure issue_id and files_to_fix exist
-                    data.setdefault("issue_id", ticket.issue_number)
-                    data.setdefault("files_to_fix", [])
-                    return data
-            except json.JSONDecodeError:
-                continue
-        return None
+        parser = StreamingOutputParser(lambda value: accept_fixes(value, tickets_by_id))
+        output = run_agent("github_suggest_fix", batch_prompt(tickets), timeout=timeout, stop_when=parser.feed)
+        fixes = parser.finish()
+        telemetry.record_parse("github_suggest_fix", parser)
+        if fixes:
+            return {ticket_id: ground_fix(fix, tickets_by_id[ticket_id]) for ticket_id, fix in fixes.items()}
+
+        logger.error(f"Agent returned no valid batch output: {output}")
+
+    except AgentInvocationError as e:
+        logger.error(f"ADK agent invocation failed for batch {sorted(tickets_by_id)}: {e}")
     except Exception as e:
-        logger.error(f"Error parsing ADK output: {e}")
+        logger.error(f"ADK agent execution failed for batch {sorted(tickets_by_id)}: {e}")
+
+    return {}
+
+
+def parse_adk_output(output, ticket):
+    """
+    Parse JSON output from ADK CLI for suggested fix
+    """
+    return parse_stream([output], lambda value: accept_fix(value, ticket))
+
+
+def accept_fix(value, ticket):
+    """
+    Return the first object carrying a "suggested_fix", with issue_id and
+    files_to_fix defaulted, or None.
+    """
+    candidates = value if isinstance(value, list) else [value]
+    for data in candidates:
+        if isinstance(data, dict) and "suggested_fix" in data:
+            data.setdefault("issue_id", ticket.issue_number)
+            data.setdefault("files_to_fix", [])
+            return data
+    return None
+
+
+def accept_fixes(value, tickets_by_id):
+    """
+    Map a batch answer to {ticket_id: fix}. Accepts a list of objects with a
+    ticket_id, or an object keyed by ticket id. Returns None when no entry
+    matches a ticket in the batch.
+    """
+    if isinstance(value, dict) and "suggested_fix" not in value:
+        value = [
+            {"ticket_id": key, **item} for key, item in value.items() if isinstance(item, dict)
+        ]
+    if not isinstance(value, list):
         return None
+
+    fixes = {}
+    for item in value:
+        if not isinstance(item, dict) or "suggested_fix" not in item:
+            continue
+        try:
+            ticket = tickets_by_id.get(int(item.pop("ticket_id", None)))
+        except (TypeError, ValueError):
+            continue
+        if ticket is None or ticket.id in fixes:
+            continue
+        item.setdefault("issue_id", ticket.issue_number)
+        item.setdefault("files_to_fix", [])
+        fixes[ticket.id] = item
+    return fixes or None
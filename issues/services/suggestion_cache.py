@@ -0,0 +1,314 @@
+# issues/services/suggestion_cache.py
+import hashlib
+import json
+import logging
+import threading
+import time
+from datetime import timedelta
+
+from asgiref.sync import sync_to_async
+from cachetools import TTLCache
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import F
+from django.utils import timezone
+
+from issues.models import SuggestedFix
+from issues.services import telemetry
+from issues.services.repo_index import aget_index, get_index
+from issues.services.similarity import find_reusable_suggestion
+from issues.services.singleflight import acoalesce, coalesce, get_singleflight
+from issues.services.suggest_fix_integration import asuggest_fix_for_ticket, suggest_fix_for_ticket
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_SETTINGS = {
+    "TTL": 7 * 24 * 3600,
+    "LRU_SIZE": 512,
+}
+
+STATS_KEYS = ("memory_hits", "db_hits", "reused", "misses")
+
+
+def get_cache_settings():
+    config = dict(DEFAULT_CACHE_SETTINGS)
+    config.update(getattr(settings, "SUGGESTION_CACHE", {}))
+    return config
+
+
+_config = get_cache_settings()
+_lru = TTLCache(maxsize=_config["LRU_SIZE"], ttl=_config["TTL"])
+_lru_lock = threading.Lock()
+
+
+def _index_sha(index):
+    return index.commit_sha if index is not None else ""
+
+
+def suggestion_cache_key(ticket, index_sha=None):
+    """
+    Hash every input that shapes the suggest-fix prompt, plus the agent
+    version, so a changed ticket or a new model never reuses an old answer.
+    The prompt lists files from the repository's index, so its commit SHA
+    ("" without an index) is one of them; `index_sha` skips looking it up.
+    """
+    if index_sha is None:
+        index_sha = _index_sha(get_index(ticket.owner, ticket.repo))
+    inputs = {
+        "owner": ticket.owner,
+        "repo": ticket.repo,
+        "issue_number": ticket.issue_number,
+        "title": ticket.title,
+        "body": ticket.body,
+        "labels": ticket.labels,
+        "agent_version": settings.SUGGEST_FIX_AGENT_VERSION,
+        "index_sha": index_sha,
+    }
+    canonical = json.dumps(inputs, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+async def asuggestion_cache_key(ticket):
+    return suggestion_cache_key(ticket, _index_sha(await aget_index(ticket.owner, ticket.repo)))
+
+
+def _bump(name):
+    # Kept in the Django cache so every process reports into the same counters
+    # when CACHES points at a shared backend.
+    key = f"suggestion_cache:{name}"
+    cache.add(key, 0, timeout=None)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, 1, timeout=None)
+
+
+def record_miss():
+    _bump("misses")
+
+
+def cache_stats():
+    counts = {name: cache.get(f"suggestion_cache:{name}", 0) for name in STATS_KEYS}
+    lookups = sum(counts.values())
+    hits = counts["memory_hits"] + counts["db_hits"]
+    with _lru_lock:
+        lru_size = len(_lru)
+    return {
+        **counts,
+        "lookups": lookups,
+        "hit_ratio": round(hits / lookups, 4) if lookups else None,
+        "lru_entries": lru_size,
+        "stored": SuggestedFix.objects.count(),
+        # Per process: agent runs led vs. joined by concurrent requests.
+        "singleflight": dict(get_singleflight().stats),
+    }
+
+
+def get_cached_suggestion(ticket, key=None):
+    """
+    Return (payload, source) for a fresh stored suggestion, or (None, None).
+    """
+    key = key or suggestion_cache_key(ticket)
+
+    with _lru_lock:
+        entry = _lru.get(key)
+    if entry is not None:
+        _bump("memory_hits")
+        return entry[1], "memory"
+
+    stored = SuggestedFix.objects.filter(cache_key=key, expires_at__gt=timezone.now()).first()
+    if stored is not None:
+        SuggestedFix.objects.filter(pk=stored.pk).update(hits=F("hits") + 1)
+        with _lru_lock:
+            _lru[key] = (ticket.id, stored.payload)
+        _bump("db_hits")
+        return stored.payload, "db"
+
+    return None, None
+
+
+# Columns overwritten when a suggestion is regenerated under the same key.
+STORED_FIELDS = ["ticket", "agent_version", "payload", "expires_at", "hits", "generation_ms"]
+
+
+def _suggestion_row(ticket, payload, key, generation_ms):
+    return SuggestedFix(
+        ticket=ticket,
+        cache_key=key,
+        agent_version=settings.SUGGEST_FIX_AGENT_VERSION,
+        payload=payload,
+        expires_at=timezone.now() + timedelta(seconds=get_cache_settings()["TTL"]),
+        hits=0,
+        generation_ms=generation_ms,
+    )
+
+
+def store_suggestion(ticket, payload, key=None, generation_ms=None):
+    key = key or suggestion_cache_key(ticket)
+    # A single INSERT ... ON CONFLICT rather than update_or_create's
+    # read-then-write, which deadlocks on SQLite under concurrent writers.
+    with telemetry.stage("db.save_suggestion"):
+        SuggestedFix.objects.bulk_create(
+            [_suggestion_row(ticket, payload, key, generation_ms)],
+            update_conflicts=True,
+            unique_fields=["cache_key"],
+            update_fields=STORED_FIELDS,
+        )
+    with _lru_lock:
+        _lru[key] = (ticket.id, payload)
+
+
+def get_or_generate_suggestion(ticket, force=False):
+    """
+    Serve a suggestion from the in-memory LRU, then the database, then a
+    near-duplicate ticket's suggestion, and only call the agent on a miss
+    or when `force` is set.
+    Returns (payload, source) where source is "memory", "db", "reused" or
+    "agent".
+    """
+    key = suggestion_cache_key(ticket)
+    if not force:
+        payload, source = get_cached_suggestion(ticket, key)
+        if payload is not None:
+            return payload, source
+        payload = reused_suggestion(ticket)
+        if payload is not None:
+            _bump("reused")
+            return payload, "reused"
+
+    record_miss()
+    payload, _ = generate_suggestion(ticket, key)
+    return payload, "agent"
+
+
+def reused_suggestion(ticket):
+    """
+    A copy of a near-duplicate ticket's stored suggestion, with
+    "reused_from" saying whose, or None. Not stored for this ticket, so
+    regenerating asks the agent.
+    """
+    found = find_reusable_suggestion(ticket)
+    if found is None:
+        return None
+    payload, neighbour, similarity = found
+    return {
+        **payload,
+        "reused_from": {
+            "ticket_id": neighbour.id,
+            "issue_number": neighbour.issue_number,
+            "title": neighbour.title,
+            "similarity": similarity,
+        },
+    }
+
+
+def generate_suggestion(ticket, key=None):
+    """
+    Call the agent for a ticket and store the answer. Concurrent callers for
+    the same ticket content, in this process or another, share one agent
+    run, which is also the only one to store it. Returns (payload, shared).
+    """
+    key = key or suggestion_cache_key(ticket)
+
+    def generate():
+        started = time.monotonic()
+        get_index(ticket.owner, ticket.repo)
+        payload = suggest_fix_for_ticket(ticket)
+        if payload:
+            store_suggestion(ticket, payload, key, generation_ms=round((time.monotonic() - started) * 1000))
+        return payload
+
+    return coalesce(f"fix:{key}", generate)
+
+
+async def _abump(name):
+    key = f"suggestion_cache:{name}"
+    await cache.aadd(key, 0, timeout=None)
+    try:
+        await cache.aincr(key)
+    except ValueError:
+        await cache.aset(key, 1, timeout=None)
+
+
+async def aget_cached_suggestion(ticket, key=None):
+    """
+    get_cached_suggestion using the async ORM.
+    """
+    key = key or await asuggestion_cache_key(ticket)
+
+    with _lru_lock:
+        entry = _lru.get(key)
+    if entry is not None:
+        await _abump("memory_hits")
+        return entry[1], "memory"
+
+    stored = await SuggestedFix.objects.filter(cache_key=key, expires_at__gt=timezone.now()).afirst()
+    if stored is not None:
+        await SuggestedFix.objects.filter(pk=stored.pk).aupdate(hits=F("hits") + 1)
+        with _lru_lock:
+            _lru[key] = (ticket.id, stored.payload)
+        await _abump("db_hits")
+        return stored.payload, "db"
+
+    return None, None
+
+
+async def astore_suggestion(ticket, payload, key=None, generation_ms=None):
+    key = key or await asuggestion_cache_key(ticket)
+    with telemetry.stage("db.save_suggestion"):
+        await SuggestedFix.objects.abulk_create(
+            [_suggestion_row(ticket, payload, key, generation_ms)],
+            update_conflicts=True,
+            unique_fields=["cache_key"],
+            update_fields=STORED_FIELDS,
+        )
+    with _lru_lock:
+        _lru[key] = (ticket.id, payload)
+
+
+async def aget_or_generate_suggestion(ticket, force=False):
+    """
+    get_or_generate_suggestion for async views: the database is reached
+    through the async ORM and the agent call is awaited.
+    """
+    key = await asuggestion_cache_key(ticket)
+    if not force:
+        payload, source = await aget_cached_suggestion(ticket, key)
+        if payload is not None:
+            return payload, source
+        payload = await sync_to_async(reused_suggestion)(ticket)
+        if payload is not None:
+            await _abump("reused")
+            return payload, "reused"
+
+    await _abump("misses")
+
+    async def generate():
+        started = time.monotonic()
+        await aget_index(ticket.owner, ticket.repo)
+        payload = await asuggest_fix_for_ticket(ticket)
+        if payload:
+            await astore_suggestion(ticket, payload, key, generation_ms=round((time.monotonic() - started) * 1000))
+        return payload
+
+    payload, _ = await acoalesce(f"fix:{key}", generate)
+    return payload, "agent"
+
+
+def invalidate_ticket(ticket, keep_key=None):
+    """
+    Drop stored suggestions for a ticket, except the one under `keep_key`.
+    """
+    stale = SuggestedFix.objects.filter(ticket_id=ticket.id)
+    if keep_key:
+        stale = stale.exclude(cache_key=keep_key)
+    deleted, _ = stale.delete()
+
+    with _lru_lock:
+        for key, (ticket_id, _) in list(_lru.items()):
+            if ticket_id == ticket.id and key != keep_key:
+                del _lru[key]
+
+    if deleted:
+        logger.info(f"Invalidated {deleted} cached suggestion(s) for ticket {ticket.id}")
+    return deleted
@@ -0,0 +1,167 @@
+# issues/services/suggestion_warmup.py
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import Case, Exists, IntegerField, OuterRef, Value, When
+from django.utils import timezone
+
+from issues.models import SuggestedFix, SuggestionWarmup, Ticket
+from issues.services.batch_suggest import SUGGEST_FIELDS
+from issues.services.rate_limiter import mark_thread_bulk
+from issues.services.repo_index import preload_indexes
+from issues.services.singleflight import coalesce
+from issues.services.suggest_fix_integration import suggest_fix_for_ticket
+from issues.services.suggestion_cache import store_suggestion, suggestion_cache_key
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_WARMUP_SETTINGS = {
+    "CONCURRENCY": 2,
+    "PAGE_SIZE": 20,
+    "ORDER": SuggestionWarmup.ORDER_NEWEST,
+    "PRIORITY_LABELS": ["security", "critical", "bug"],
+    # Tickets per periodic task run; None means until the queue is empty.
+    "TASK_LIMIT": 100,
+    # A "running" run not updated for this long is assumed dead and resumed.
+    "STALE_AFTER": 900,
+}
+
+
+def get_warmup_settings():
+    config = dict(DEFAULT_WARMUP_SETTINGS)
+    config.update(getattr(settings, "SUGGESTION_WARMUP", {}))
+    return config
+
+
+def pending_tickets(run):
+    """
+    Unsolved tickets without a fresh suggestion from the current agent
+    version, in the run's priority order, minus the ones this run already
+    failed on.
+    """
+    fresh = SuggestedFix.objects.filter(
+        ticket=OuterRef("pk"),
+        expires_at__gt=timezone.now(),
+        agent_version=settings.SUGGEST_FIX_AGENT_VERSION,
+    )
+    queryset = (
+        Ticket.objects.filter(status=Ticket.STATUS_UNSOLVED)
+        .exclude(Exists(fresh))
+        .only(*SUGGEST_FIELDS)
+    )
+    if run.failed_ticket_ids:
+        queryset = queryset.exclude(id__in=run.failed_ticket_ids)
+
+    if run.order == SuggestionWarmup.ORDER_LABEL:
+        labels = get_warmup_settings()["PRIORITY_LABELS"]
+        # Labels are stored as a JSON list of names; match the quoted name.
+        rank = Case(
+            *[When(labels__icontains=f'"{label}"', then=Value(i)) for i, label in enumerate(labels)],
+            default=Value(len(labels)),
+            output_field=IntegerField(),
+        )
+        return queryset.order_by(rank, "-created_at", "-id")
+    return queryset.order_by("-created_at", "-id")
+
+
+def start_or_resume_warmup(order=None, limit=None, resume=True):
+    """
+    Pick up the latest interrupted (or abandoned) run, or start a new one.
+    """
+    config = get_warmup_settings()
+    run = None
+    if resume:
+        stale = timezone.now() - timedelta(seconds=config["STALE_AFTER"])
+        run = (
+            SuggestionWarmup.objects.filter(status=SuggestionWarmup.STATUS_INTERRUPTED)
+            | SuggestionWarmup.objects.filter(status=SuggestionWarmup.STATUS_RUNNING, updated_at__lt=stale)
+        ).order_by("-id").first()
+    if run is None:
+        run = SuggestionWarmup(order=order or config["ORDER"], limit=limit)
+    else:
+        logger.info(f"Resuming {run}")
+        if limit is not None:
+            run.limit = run.processed + limit
+
+    remaining = pending_tickets(run).count()
+    if run.limit is not None:
+        remaining = min(remaining, run.limit - run.processed)
+    run.total = run.processed + remaining
+    run.status = SuggestionWarmup.STATUS_RUNNING
+    run.save()
+    return run
+
+
+def _generate(ticket):
+    # Coalesced with anyone opening the same ticket meanwhile; whoever ran
+    # the agent stores the result.
+    started = time.monotonic()
+    payload, shared = coalesce(f"fix:{suggestion_cache_key(ticket)}", lambda: suggest_fix_for_ticket(ticket))
+    return payload, round((time.monotonic() - started) * 1000), shared
+
+
+def run_warmup(run, concurrency=None, page_size=None, on_ticket=None):
+    """
+    Generate suggestions for the run's queue, `concurrency` agent calls at a
+    time, saving progress after every ticket. `on_ticket(run, ticket, ok,
+    latency_ms)` is called as each one finishes.
+    """
+    config = get_warmup_settings()
+    concurrency = concurrency or config["CONCURRENCY"]
+    page_size = max(page_size or config["PAGE_SIZE"], concurrency)
+
+    executor = ThreadPoolExecutor(
+        max_workers=concurrency, thread_name_prefix="suggestion-warmup", initializer=mark_thread_bulk
+    )
+    try:
+        while run.limit is None or run.processed < run.limit:
+            size = page_size if run.limit is None else min(page_size, run.limit - run.processed)
+            page = list(pending_tickets(run)[:size])
+            if not page:
+                break
+            preload_indexes(page)
+            futures = {executor.submit(_generate, ticket): ticket for ticket in page}
+            for future in as_completed(futures):
+                ticket = futures[future]
+                payload, latency_ms, shared = future.result()
+                _record(run, ticket, payload, latency_ms, store=not shared)
+                if on_ticket is not None:
+                    on_ticket(run, ticket, bool(payload), latency_ms)
+    except BaseException:
+        # Ctrl-C, a Celery time limit or a crash: keep what was done so the
+        # next run carries on from here.
+        executor.shutdown(wait=False, cancel_futures=True)
+        run.status = SuggestionWarmup.STATUS_INTERRUPTED
+        run.save(update_fields=["status", "updated_at"])
+        raise
+    executor.shutdown()
+
+    run.status = SuggestionWarmup.STATUS_COMPLETED
+    run.finished_at = timezone.now()
+    run.total = run.processed
+    run.save(update_fields=["status", "finished_at", "total", "updated_at"])
+    logger.info(
+        f"{run}: {run.succeeded} suggestions stored, {run.failed} failed, "
+        f"avg {run.latency_ms_avg} ms, max {run.latency_ms_max} ms"
+    )
+    return run
+
+
+def _record(run, ticket, payload, latency_ms, store=True):
+    if payload:
+        if store:
+            store_suggestion(ticket, payload, generation_ms=latency_ms)
+        run.succeeded += 1
+    else:
+        run.failed += 1
+        run.failed_ticket_ids.append(ticket.id)
+    run.processed += 1
+    run.latency_ms_total += latency_ms
+    run.latency_ms_max = max(run.latency_ms_max, latency_ms)
+    run.save(update_fields=[
+        "processed", "succeeded", "failed", "failed_ticket_ids",
+        "latency_ms_total", "latency_ms_max", "updated_at",
+    ])
@@ -0,0 +1,295 @@
+# issues/services/telemetry.py
+"""
+OpenTelemetry tracing and metrics for the request pipeline.
+
+Each stage of a request (prompt file write, agent process or worker start,
+queueing, LLM time, output parsing, MCP calls, database writes) is a span
+and a sample in the issues.stage.duration histogram, labelled with the
+stage name. Prompt and response sizes, parse failures and issues per
+extraction are recorded as well.
+
+Instruments are created at import against the global providers, which
+setup_telemetry() installs once per process (IssuesConfig.ready):
+
+- an in-memory reader that /metrics renders in the Prometheus text format,
+- OTLP span and metric exporters when TELEMETRY["OTLP"] is on; they read
+  the standard OTEL_EXPORTER_OTLP_* environment variables,
+- console exporters for local runs when TELEMETRY["CONSOLE"] is on.
+
+Until then every call here goes to the API's no-op implementation.
+"""
+import logging
+import math
+import threading
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+from opentelemetry import context, metrics, trace
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TELEMETRY_SETTINGS = {
+    "ENABLED": True,
+    "SERVICE_NAME": "github-issues",
+    # Needs opentelemetry-exporter-otlp-proto-http.
+    "OTLP": False,
+    "CONSOLE": False,
+    # Seconds between pushes to the OTLP and console metric exporters.
+    "EXPORT_INTERVAL": 30,
+    "PROMETHEUS": True,
+}
+
+# Stages run from milliseconds (parsing) to two minutes (an agent call).
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+COUNT_BUCKETS = (0, 1, 2, 5, 10, 25, 50, 100, 250, 500)
+
+tracer = trace.get_tracer("issues")
+meter = metrics.get_meter("issues")
+
+stage_duration = meter.create_histogram(
+    "issues.stage.duration", unit="s", description="Time spent in one stage of a request"
+)
+prompt_size = meter.create_histogram(
+    "issues.agent.prompt.size", unit="By", description="Size of prompts sent to agents"
+)
+response_size = meter.create_histogram(
+    "issues.agent.response.size", unit="By", description="Size of agent output read"
+)
+parse_failures = meter.create_counter(
+    "issues.agent.parse.failures", description="Agent answers with no usable JSON in them"
+)
+extraction_issues = meter.create_histogram(
+    "issues.extraction.issues", unit="{issue}", description="Issues found per extraction job"
+)
+http_duration = meter.create_histogram(
+    "http.server.request.duration", unit="s", description="Time to produce an HTTP response"
+)
+task_duration = meter.create_histogram(
+    "celery.task.duration", unit="s", description="Celery task run time"
+)
+
+_setup_lock = threading.Lock()
+_metric_reader = None
+_configured = False
+
+
+def get_telemetry_settings():
+    config = dict(DEFAULT_TELEMETRY_SETTINGS)
+    config.update(getattr(settings, "TELEMETRY", {}))
+    return config
+
+
+def setup_telemetry():
+    """
+    Install the tracer and meter providers and their exporters. Safe to
+    call more than once; only the first call does anything.
+    """
+    global _configured, _metric_reader
+    with _setup_lock:
+        if _configured:
+            return
+        _configured = True
+        config = get_telemetry_settings()
+        if not config["ENABLED"]:
+            return
+
+        from opentelemetry.sdk.metrics import MeterProvider
+        from opentelemetry.sdk.metrics.export import (
+            ConsoleMetricExporter,
+            InMemoryMetricReader,
+            PeriodicExportingMetricReader,
+        )
+        from opentelemetry.sdk.metrics.view import ExplicitBucketHistogramAggregation, View
+        from opentelemetry.sdk.resources import Resource
+        from opentelemetry.sdk.trace import TracerProvider
+        from opentelemetry.sdk.trace.export import BatchSpanProcessor, ConsoleSpanExporter
+
+        resource = Resource.create({"service.name": config["SERVICE_NAME"]})
+        interval_ms = config["EXPORT_INTERVAL"] * 1000
+        tracer_provider = TracerProvider(resource=resource)
+        readers = []
+
+        if config["PROMETHEUS"]:
+            _metric_reader = InMemoryMetricReader()
+            readers.append(_metric_reader)
+        if config["OTLP"]:
+            try:
+                from opentelemetry.exporter.otlp.proto.http.metric_exporter import OTLPMetricExporter
+                from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+            except ImportError:
+                logger.warning("TELEMETRY['OTLP'] is on but opentelemetry-exporter-otlp-proto-http is not installed")
+            else:
+                tracer_provider.add_span_processor(BatchSpanProcessor(OTLPSpanExporter()))
+                readers.append(PeriodicExportingMetricReader(OTLPMetricExporter(), export_interval_millis=interval_ms))
+        if config["CONSOLE"]:
+            tracer_provider.add_span_processor(BatchSpanProcessor(ConsoleSpanExporter()))
+            readers.append(PeriodicExportingMetricReader(ConsoleMetricExporter(), export_interval_millis=interval_ms))
+
+        views = [
+            View(instrument_name=name, aggregation=ExplicitBucketHistogramAggregation(buckets))
+            for name, buckets in [
+                ("issues.stage.duration", DURATION_BUCKETS),
+                ("http.server.request.duration", DURATION_BUCKETS),
+                ("celery.task.duration", DURATION_BUCKETS),
+                ("issues.agent.prompt.size", SIZE_BUCKETS),
+                ("issues.agent.response.size", SIZE_BUCKETS),
+                ("issues.extraction.issues", COUNT_BUCKETS),
+            ]
+        ]
+        trace.set_tracer_provider(tracer_provider)
+        metrics.set_meter_provider(MeterProvider(resource=resource, metric_readers=readers, views=views))
+
+
+@contextmanager
+def stage(name, **attributes):
+    """
+    Run the block as a span named `name` and record its duration in
+    issues.stage.duration. `attributes` label both, so keep them low
+    cardinality (agent names, sources); put ids on the yielded span.
+    """
+    started = time.perf_counter()
+    outcome = "error"
+    try:
+        with tracer.start_as_current_span(name, attributes=attributes) as span:
+            yield span
+            outcome = "ok"
+    finally:
+        stage_duration.record(time.perf_counter() - started, {"stage": name, "outcome": outcome, **attributes})
+
+
+def record_stage(name, seconds, outcome="ok", **attributes):
+    """
+    Record a stage timed outside a `stage` block, e.g. by another thread
+    or spread over several calls. Also noted on the current span, if any.
+    """
+    stage_duration.record(seconds, {"stage": name, "outcome": outcome, **attributes})
+    trace.get_current_span().set_attribute(f"{name}.seconds", round(seconds, 6))
+
+
+def record_prompt(agent_name, text):
+    size = len(text.encode("utf-8"))
+    prompt_size.record(size, {"agent": agent_name})
+    trace.get_current_span().set_attribute("agent.prompt.bytes", size)
+
+
+def record_response(agent_name, text):
+    size = len((text or "").encode("utf-8"))
+    response_size.record(size, {"agent": agent_name})
+    trace.get_current_span().set_attribute("agent.response.bytes", size)
+
+
+def record_parse(agent_name, parser):
+    """
+    Record the time a StreamingOutputParser spent parsing, and a failure
+    if it found nothing it could use.
+    """
+    ok = parser.done
+    record_stage("agent.parse", parser.seconds, outcome="ok" if ok else "error", agent=agent_name)
+    if not ok:
+        parse_failures.add(1, {"agent": agent_name})
+
+
+def record_extraction(count, source):
+    extraction_issues.record(count, {"source": source})
+
+
+# -- Celery ------------------------------------------------------------------
+
+_task_spans = {}
+
+
+def _task_prerun(task_id=None, task=None, **kwargs):
+    span = tracer.start_span(f"celery {task.name}", attributes={"celery.task": task.name, "celery.task_id": task_id})
+    _task_spans[task_id] = (span, context.attach(trace.set_span_in_context(span)), time.perf_counter())
+
+
+def _task_postrun(task_id=None, task=None, state=None, **kwargs):
+    entry = _task_spans.pop(task_id, None)
+    if entry is None:
+        return
+    span, token, started = entry
+    context.detach(token)
+    span.set_attribute("celery.state", state or "")
+    if state not in (None, "SUCCESS"):
+        span.set_status(trace.Status(trace.StatusCode.ERROR))
+    span.end()
+    task_duration.record(time.perf_counter() - started, {"task": task.name, "state": state or "UNKNOWN"})
+
+
+def connect_celery_signals():
+    """
+    Time every Celery task as a span and a celery.task.duration sample.
+    """
+    from celery.signals import task_postrun, task_prerun
+
+    task_prerun.connect(_task_prerun, weak=False, dispatch_uid="telemetry_task_prerun")
+    task_postrun.connect(_task_postrun, weak=False, dispatch_uid="telemetry_task_postrun")
+
+
+# -- Prometheus exposition -----------------------------------------------------
+
+UNIT_SUFFIXES = {"s": "_seconds", "By": "_bytes"}
+
+
+def _metric_name(metric, suffix=""):
+    name = metric.name.replace(".", "_").replace("-", "_")
+    unit = UNIT_SUFFIXES.get(metric.unit or "", "")
+    if unit and not name.endswith(unit):
+        name += unit
+    return name + suffix
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(attributes, extra=None):
+    pairs = [*attributes.items(), *(extra or {}).items()]
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{key.replace(".", "_")}="{_escape(value)}"' for key, value in pairs) + "}"
+
+
+def _number(value):
+    if value == math.inf:
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def prometheus_text():
+    """
+    This process's metrics in the Prometheus text exposition format, or
+    None when the in-memory reader isn't installed.
+    """
+    from opentelemetry.sdk.metrics.export import Histogram, Sum
+
+    if _metric_reader is None:
+        return None
+    data = _metric_reader.get_metrics_data()
+    lines = []
+    for resource_metrics in (data.resource_metrics if data else []):
+        for scope_metrics in resource_metrics.scope_metrics:
+            for metric in scope_metrics.metrics:
+                points = metric.data.data_points
+                if isinstance(metric.data, Histogram):
+                    name = _metric_name(metric)
+                    lines += [f"# HELP {name} {metric.description}", f"# TYPE {name} histogram"]
+                    for point in points:
+                        attributes = dict(point.attributes)
+                        running = 0
+                        for bound, count in zip([*point.explicit_bounds, math.inf], point.bucket_counts):
+                            running += count
+                            lines.append(f"{name}_bucket{_labels(attributes, {'le': _number(bound)})} {running}")
+                        lines.append(f"{name}_sum{_labels(attributes)} {_number(point.sum)}")
+                        lines.append(f"{name}_count{_labels(attributes)} {point.count}")
+                elif isinstance(metric.data, Sum) and metric.data.is_monotonic:
+                    name = _metric_name(metric, "_total")
+                    lines += [f"# HELP {name} {metric.description}", f"# TYPE {name} counter"]
+                    lines += [f"{name}{_labels(dict(point.attributes))} {_number(point.value)}" for point in points]
+                else:
+                    name = _metric_name(metric)
+                    lines += [f"# HELP {name} {metric.description}", f"# TYPE {name} gauge"]
+                    lines += [f"{name}{_labels(dict(point.attributes))} {_number(point.value)}" for point in points]
+    return "\n".join(lines) + "\n"
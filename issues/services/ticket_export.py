@@ -0,0 +1,205 @@
+# issues/services/ticket_export.py
+"""
+Streaming bulk export of tickets and stored suggestions, for analytics.
+
+Rows come from QuerySet.values().iterator(chunk_size=...), so no model
+instances are built and only one chunk of rows is held at a time. They are
+encoded as NDJSON or CSV and handed out in blocks of about BUFFER_BYTES,
+optionally gzip-compressed on the fly with zlib; the first block goes out as
+soon as the first row is read. Memory use is the same for a thousand rows
+and a million.
+
+Filters are the ticket list's equality filters (owner, repo, status, type)
+plus `since` / `until` on created_at. A bare date in `until` includes that
+whole day. Rows are ordered by (created_at, id), the order of the
+(field, -created_at, -id) indexes read backwards.
+"""
+import csv
+import io
+import json
+import logging
+import zlib
+from collections import namedtuple
+from datetime import datetime, time, timedelta
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from issues.models import SuggestedFix, Ticket
+from issues.services.ticket_listing import FILTER_FIELDS
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_EXPORT_SETTINGS = {
+    # Rows fetched from the database per round trip.
+    "CHUNK_SIZE": 2000,
+    # Encoded bytes collected before a block is handed out.
+    "BUFFER_BYTES": 64 * 1024,
+    "COMPRESS_LEVEL": 6,
+}
+
+CONTENT_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+}
+
+ExportDataset = namedtuple("ExportDataset", ["name", "model", "fields", "filter_prefix", "columns"])
+
+DATASETS = {
+    "tickets": ExportDataset(
+        "tickets", Ticket,
+        ["id", "owner", "repo", "issue_number", "title", "body", "labels", "type", "status", "created_at"],
+        "",
+        ["id", "owner", "repo", "issue_number", "title", "body", "labels", "type", "status", "created_at"],
+    ),
+    # One row per stored suggestion, with the ticket it answers and the
+    # parts of the agent's payload analytics care about.
+    "suggestions": ExportDataset(
+        "suggestions", SuggestedFix,
+        ["id", "ticket_id", "ticket__owner", "ticket__repo", "ticket__issue_number", "agent_version", "payload",
+         "hits", "generation_ms", "created_at", "expires_at"],
+        "ticket__",
+        ["id", "ticket_id", "owner", "repo", "issue_number", "agent_version", "suggested_fix", "files_to_fix",
+         "hits", "generation_ms", "created_at", "expires_at"],
+    ),
+}
+
+
+class ExportError(ValueError):
+    pass
+
+
+def get_export_settings():
+    config = dict(DEFAULT_EXPORT_SETTINGS)
+    config.update(getattr(settings, "EXPORTS", {}))
+    return config
+
+
+def _parse_bound(value, name, end_of_day=False):
+    try:
+        # parse_datetime would also take a bare date, as midnight.
+        day = parse_date(value)
+        moment = parse_datetime(value) if day is None else None
+    except ValueError:
+        day = moment = None
+    if day is not None:
+        moment = datetime.combine(day + timedelta(days=1) if end_of_day else day, time.min)
+    if moment is None:
+        raise ExportError(f"Invalid {name}: {value!r} (expected YYYY-MM-DD or an ISO datetime)")
+    if timezone.is_naive(moment):
+        moment = timezone.make_aware(moment)
+    return moment
+
+
+def export_queryset(dataset, params):
+    """
+    The rows of `dataset` matching the filters in the GET-style mapping
+    `params`, as a values() queryset in export order.
+    """
+    if dataset not in DATASETS:
+        raise ExportError(f"Unknown dataset: {dataset!r} (expected one of {', '.join(DATASETS)})")
+    spec = DATASETS[dataset]
+    filters = {f"{spec.filter_prefix}{name}": params.get(name) for name in FILTER_FIELDS if params.get(name)}
+    if params.get("since"):
+        filters["created_at__gte"] = _parse_bound(params["since"], "since")
+    if params.get("until"):
+        filters["created_at__lt"] = _parse_bound(params["until"], "until", end_of_day=True)
+    return spec.model.objects.filter(**filters).order_by("created_at", "id").values(*spec.fields)
+
+
+def _row(dataset, values):
+    if dataset != "suggestions":
+        return values
+    payload = values.pop("payload") or {}
+    return {
+        "id": values["id"],
+        "ticket_id": values["ticket_id"],
+        "owner": values["ticket__owner"],
+        "repo": values["ticket__repo"],
+        "issue_number": values["ticket__issue_number"],
+        "agent_version": values["agent_version"],
+        "suggested_fix": payload.get("suggested_fix") if isinstance(payload, dict) else None,
+        "files_to_fix": payload.get("files_to_fix") if isinstance(payload, dict) else None,
+        "hits": values["hits"],
+        "generation_ms": values["generation_ms"],
+        "created_at": values["created_at"],
+        "expires_at": values["expires_at"],
+    }
+
+
+def export_rows(dataset, params, chunk_size=None):
+    chunk_size = chunk_size or get_export_settings()["CHUNK_SIZE"]
+    for values in export_queryset(dataset, params).iterator(chunk_size=chunk_size):
+        yield _row(dataset, values)
+
+
+def _ndjson_lines(rows):
+    for row in rows:
+        yield json.dumps(row, cls=DjangoJSONEncoder, ensure_ascii=False, separators=(",", ":")) + "\n"
+
+
+def _csv_value(value):
+    # JSON columns (labels, files_to_fix) stay JSON inside their cell.
+    if isinstance(value, (list, dict)):
+        return json.dumps(value, ensure_ascii=False, separators=(",", ":"))
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+def _csv_lines(rows, columns):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    for row in rows:
+        writer.writerow([_csv_value(row[column]) for column in columns])
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    # Header of an empty export.
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def export_stream(dataset, params, export_format="ndjson", compress=False, config=None):
+    """
+    The export as a generator of byte blocks. Filters are validated before
+    the first block, so a bad parameter raises ExportError here rather than
+    in the middle of a response.
+    """
+    config = config or get_export_settings()
+    if export_format not in CONTENT_TYPES:
+        raise ExportError(f"Unknown format: {export_format!r} (expected one of {', '.join(CONTENT_TYPES)})")
+    export_queryset(dataset, params)
+    rows = export_rows(dataset, params, config["CHUNK_SIZE"])
+    if export_format == "ndjson":
+        lines = _ndjson_lines(rows)
+    else:
+        lines = _csv_lines(rows, DATASETS[dataset].columns)
+    return _blocks(lines, config, compress)
+
+
+def _blocks(lines, config, compress):
+    compressor = zlib.compressobj(config["COMPRESS_LEVEL"], zlib.DEFLATED, 16 + zlib.MAX_WBITS) if compress else None
+    pending, size, sent = [], 0, False
+    for line in lines:
+        data = line.encode("utf-8")
+        pending.append(data)
+        size += len(data)
+        # The first row goes out at once, then full blocks.
+        if size >= config["BUFFER_BYTES"] or not sent:
+            block = b"".join(pending)
+            pending, size, sent = [], 0, True
+            yield compressor.compress(block) + compressor.flush(zlib.Z_SYNC_FLUSH) if compressor else block
+    block = b"".join(pending)
+    if compressor:
+        yield compressor.compress(block) + compressor.flush()
+    elif block:
+        yield block
+
+
+def export_filename(dataset, export_format, compress=False, now=None):
+    now = now or timezone.now()
+    return f"{dataset}-{now:%Y%m%d-%H%M%S}.{export_format}{'.gz' if compress else ''}"
@@ -0,0 +1,154 @@
+# issues/services/ticket_ingest.py
+import logging
+from collections import namedtuple
+
+from django.db import connection, transaction
+
+from issues.models import SuggestedFix, Ticket
+from issues.services import telemetry
+from issues.services.similarity import index_tickets
+
+logger = logging.getLogger(__name__)
+
+IngestResult = namedtuple("IngestResult", ["created", "updated", "skipped", "ticket_ids"])
+
+KEY_FIELDS = ["owner", "repo", "issue_number"]
+CONTENT_FIELDS = ["title", "body", "labels", "type"]
+DEFAULT_CHUNK_SIZE = 500
+
+
+def ticket_fields(issue):
+    """
+    Normalize an issue dict into Ticket column values, or return None when
+    it lacks the fields a ticket needs.
+    """
+    try:
+        return {
+            "owner": issue["owner"],
+            "repo": issue["repo"],
+            "issue_number": int(issue["issue_number"]),
+            "title": (issue["title"] or "")[:500],
+            "body": (issue.get("body") or "")[:1000],
+            "labels": issue.get("labels") or [],
+            "type": issue.get("type") or "issue",
+        }
+    except (KeyError, TypeError, ValueError):
+        return None
+
+
+def _key(fields):
+    return (fields["owner"], fields["repo"], fields["issue_number"])
+
+
+def ingest_issues(issues, chunk_size=DEFAULT_CHUNK_SIZE, return_ids=True):
+    """
+    Upsert a batch of issue dicts into Ticket.
+
+    Each chunk is one transaction with a fixed number of round trips: one
+    SELECT to classify rows, one INSERT ... ON CONFLICT DO UPDATE for new and
+    changed rows, one SELECT for their ids and one upsert of the written
+    tickets' similarity signatures.
+    Invalid rows, repeats within the batch and rows identical to what is
+    stored count as skipped.
+    """
+    rows = {}
+    skipped = 0
+    for issue in issues:
+        fields = ticket_fields(issue)
+        if fields is None:
+            logger.warning(f"Skipping issue without required fields: {issue}")
+            skipped += 1
+            continue
+        if _key(fields) in rows:
+            skipped += 1
+        rows[_key(fields)] = fields
+
+    created = updated = 0
+    ticket_ids = []
+    items = list(rows.values())
+    with telemetry.stage("db.ingest_tickets") as span:
+        for start in range(0, len(items), chunk_size):
+            c, u, s, ids = _ingest_chunk(items[start:start + chunk_size], return_ids)
+            created += c
+            updated += u
+            skipped += s
+            ticket_ids.extend(ids)
+        span.set_attributes({"tickets.created": created, "tickets.updated": updated, "tickets.skipped": skipped})
+
+    return IngestResult(created, updated, skipped, ticket_ids)
+
+
+def _lock_for_write():
+    """
+    Take SQLite's write lock as the transaction's first statement. atomic()
+    issues a deferred BEGIN there, so the classifying SELECT would take a
+    read lock, and upgrading that to a write lock while another ingest is
+    writing fails at once with "database is locked" rather than waiting out
+    the busy timeout. A write that matches no rows waits like any other.
+    Other databases lock per row and need nothing here.
+    """
+    if connection.vendor == "sqlite":
+        with connection.cursor() as cursor:
+            cursor.execute(f"UPDATE {Ticket._meta.db_table} SET id = id WHERE 0")
+
+
+def _ingest_chunk(chunk, return_ids):
+    keys = {_key(fields) for fields in chunk}
+    with transaction.atomic():
+        _lock_for_write()
+        stored = {
+            (row["owner"], row["repo"], row["issue_number"]): row
+            for row in Ticket.objects.filter(
+                owner__in={k[0] for k in keys},
+                repo__in={k[1] for k in keys},
+                issue_number__in={k[2] for k in keys},
+            ).values("id", *KEY_FIELDS, *CONTENT_FIELDS)
+            if (row["owner"], row["repo"], row["issue_number"]) in keys
+        }
+
+        to_write = []
+        changed_ids = []
+        created = skipped = 0
+        for fields in chunk:
+            existing = stored.get(_key(fields))
+            if existing is None:
+                created += 1
+            elif any(existing[name] != fields[name] for name in CONTENT_FIELDS):
+                changed_ids.append(existing["id"])
+            else:
+                skipped += 1
+                continue
+            to_write.append(Ticket(**fields))
+
+        if to_write:
+            Ticket.objects.bulk_create(
+                to_write,
+                update_conflicts=True,
+                unique_fields=KEY_FIELDS,
+                update_fields=[*CONTENT_FIELDS, "updated_at"],
+            )
+        if changed_ids:
+            # bulk_create skips post_save, so drop suggestions for changed
+            # content here instead of in issues.signals.
+            SuggestedFix.objects.filter(ticket_id__in=changed_ids).delete()
+
+        ids_by_key = {}
+        if return_ids or to_write:
+            ids_by_key = {
+                tuple(row[1:]): row[0]
+                for row in Ticket.objects.filter(
+                    owner__in={k[0] for k in keys},
+                    repo__in={k[1] for k in keys},
+                    issue_number__in={k[2] for k in keys},
+                ).values_list("id", *KEY_FIELDS)
+                if tuple(row[1:]) in keys
+            }
+
+    if to_write:
+        # Also skipped by bulk_create's missing post_save: keep the
+        # near-duplicate index current for new and changed tickets.
+        for ticket in to_write:
+            ticket.id = ids_by_key.get(_key(ticket.__dict__))
+        index_tickets([ticket for ticket in to_write if ticket.id is not None])
+
+    return created, len(changed_ids), skipped, list(ids_by_key.values()) if return_ids else []
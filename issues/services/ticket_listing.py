@@ -0,0 +1,79 @@
+# issues/services/ticket_listing.py
+import base64
+from collections import namedtuple
+
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+
+from issues.models import Ticket
+
+# Columns the ticket list renders; body is never loaded for the list.
+LIST_FIELDS = ["id", "repo", "owner", "issue_number", "title", "labels", "type", "status", "created_at"]
+FILTER_FIELDS = ["owner", "repo", "status", "type"]
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+KeysetPage = namedtuple("KeysetPage", ["items", "next_cursor", "prev_cursor"])
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(ticket):
+    raw = f"{ticket.created_at.isoformat()}|{ticket.id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor):
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        created_at, ticket_id = raw.rsplit("|", 1)
+        created_at = parse_datetime(created_at)
+        if created_at is None:
+            raise ValueError(raw)
+        return created_at, int(ticket_id)
+    except (ValueError, UnicodeDecodeError) as e:
+        raise InvalidCursor(f"Invalid cursor: {cursor}") from e
+
+
+def filter_tickets(params):
+    """
+    Apply the equality filters from a GET-style mapping. Every filter has a
+    matching (field, -created_at, -id) index.
+    """
+    queryset = Ticket.objects.only(*LIST_FIELDS)
+    filters = {name: params.get(name) for name in FILTER_FIELDS if params.get(name)}
+    return queryset.filter(**filters), filters
+
+
+def keyset_page(queryset, after=None, before=None, page_size=DEFAULT_PAGE_SIZE):
+    """
+    Return one page of `queryset` ordered newest first, using the
+    (created_at, id) of the boundary row rather than an OFFSET, so the cost
+    of a page doesn't depend on how deep it is.
+    """
+    page_size = max(1, min(page_size, MAX_PAGE_SIZE))
+
+    if before:
+        created_at, ticket_id = decode_cursor(before)
+        rows = list(
+            queryset.filter(Q(created_at__gt=created_at) | Q(created_at=created_at, id__gt=ticket_id))
+            .order_by("created_at", "id")[:page_size + 1]
+        )
+        has_more = len(rows) > page_size
+        items = list(reversed(rows[:page_size]))
+        prev_cursor = encode_cursor(items[0]) if has_more and items else None
+        next_cursor = encode_cursor(items[-1]) if items else None
+        return KeysetPage(items, next_cursor, prev_cursor)
+
+    if after:
+        created_at, ticket_id = decode_cursor(after)
+        queryset = queryset.filter(Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=ticket_id))
+
+    rows = list(queryset.order_by("-created_at", "-id")[:page_size + 1])
+    has_more = len(rows) > page_size
+    items = rows[:page_size]
+    next_cursor = encode_cursor(items[-1]) if has_more and items else None
+    prev_cursor = encode_cursor(items[0]) if after and items else None
+    return KeysetPage(items, next_cursor, prev_cursor)
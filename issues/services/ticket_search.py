@@ -0,0 +1,293 @@
+# issues/services/ticket_search.py
+"""
+Ranked full-text search over ticket title, body and labels.
+
+The index is created by migration 0010. On SQLite it is an external-content
+FTS5 table kept in sync by triggers, on Postgres a stored tsvector column
+with a GIN index. Other databases get FallbackSearchBackend, which scans
+with icontains. Set TICKET_SEARCH["BACKEND"] to a dotted path to plug in
+another backend.
+
+User input is never passed through as query syntax. Words and "quoted
+phrases" are all required, and the last bare word also matches as a prefix,
+so results update as someone types.
+"""
+import logging
+import re
+import time
+from collections import namedtuple
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import Q
+from django.utils.html import escape
+from django.utils.module_loading import import_string
+from django.utils.safestring import mark_safe
+
+from issues.models import Ticket
+from issues.services.ticket_listing import FILTER_FIELDS, LIST_FIELDS
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SEARCH_SETTINGS = {
+    # None picks the backend for the database vendor.
+    "BACKEND": None,
+    # bm25 column weights on SQLite. Postgres weighs title A, labels B,
+    # body C in the generated column instead.
+    "WEIGHTS": {"title": 10.0, "body": 1.0, "labels": 4.0},
+    "SNIPPET_WORDS": 16,
+    "PAGE_SIZE": 20,
+    "MAX_PAGE_SIZE": 100,
+    # Ranked results page by OFFSET; past this, refine the query instead.
+    "MAX_OFFSET": 1000,
+    # Shorter trailing words are matched whole: a one-letter prefix matches
+    # most of the index.
+    "MIN_PREFIX": 2,
+    # bm25 has to score every match, so a word in half the tickets would
+    # cost tens of milliseconds. Broader queries rank only their newest
+    # RANK_WINDOW matches (SQLite).
+    "RANK_WINDOW": 2000,
+}
+
+SearchPage = namedtuple("SearchPage", ["items", "has_more", "took_ms", "backend"])
+SearchTerm = namedtuple("SearchTerm", ["words", "prefix"])
+
+# Highlight markers the database puts around matches. They can't occur in
+# ticket text, so the snippet is escaped first and the markers swapped for
+# <mark> tags afterwards.
+MARK_START = "\x02"
+MARK_END = "\x03"
+
+WORD_RE = re.compile(r"\w+")
+TERM_RE = re.compile(r'"([^"]*)"?|(\S+)')
+
+
+def get_search_settings():
+    config = dict(DEFAULT_SEARCH_SETTINGS)
+    config.update(getattr(settings, "TICKET_SEARCH", {}))
+    return config
+
+
+def parse_query(query, min_prefix=None):
+    """
+    Split a search box string into SearchTerms: one per quoted phrase or
+    bare word, punctuation dropped.
+    """
+    min_prefix = get_search_settings()["MIN_PREFIX"] if min_prefix is None else min_prefix
+    terms = []
+    for match in TERM_RE.finditer(query or ""):
+        words = tuple(WORD_RE.findall((match.group(1) if match.group(1) is not None else match.group(2)).lower()))
+        if words:
+            terms.append(SearchTerm(words, False))
+    if terms and len(terms[-1].words) == 1 and not query.rstrip().endswith('"'):
+        last = terms[-1]
+        if len(last.words[0]) >= min_prefix:
+            terms[-1] = SearchTerm(last.words, True)
+    return terms
+
+
+def highlight(text):
+    """
+    Escape a marked-up snippet from the database and turn its match markers
+    into <mark> tags.
+    """
+    if not text:
+        return ""
+    return mark_safe(escape(text).replace(MARK_START, "<mark>").replace(MARK_END, "</mark>"))
+
+
+def _where(filters, alias="t"):
+    clauses, params = [], []
+    for name in FILTER_FIELDS:
+        if filters.get(name):
+            clauses.append(f"{alias}.{name} = %s")
+            params.append(filters[name])
+    return "".join(f" AND {clause}" for clause in clauses), params
+
+
+def _columns(alias="t"):
+    return ", ".join(f"{alias}.{name}" for name in LIST_FIELDS)
+
+
+class SQLiteFTSBackend:
+    """
+    FTS5 MATCH ordered by bm25. Ranking runs inside the FTS index, and
+    snippets are only built for the rows on the page.
+    """
+    name = "sqlite-fts5"
+
+    def __init__(self, config):
+        self.config = config
+
+    def match_expression(self, terms):
+        parts = []
+        for term in terms:
+            phrase = '"' + " ".join(term.words) + '"'
+            parts.append(phrase + "*" if term.prefix else phrase)
+        return " ".join(parts)
+
+    def search(self, terms, filters, limit, offset):
+        weights = self.config["WEIGHTS"]
+        rank = f"bm25(issues_ticket_fts, {float(weights['title'])}, {float(weights['body'])}, {float(weights['labels'])})"
+        where, params = _where(filters)
+        match = self.match_expression(terms)
+        matches = (
+            f"FROM issues_ticket_fts JOIN issues_ticket t ON t.id = issues_ticket_fts.rowid "
+            f"WHERE issues_ticket_fts MATCH %s{where}"
+        )
+
+        # FTS5 walks matches in rowid order without scoring them, so finding
+        # where the newest RANK_WINDOW end is cheap.
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"SELECT issues_ticket_fts.rowid {matches} ORDER BY issues_ticket_fts.rowid DESC LIMIT 1 OFFSET %s",
+                [match, *params, self.config["RANK_WINDOW"]],
+            )
+            row = cursor.fetchone()
+        window, window_params = ("", []) if row is None else (" AND issues_ticket_fts.rowid > %s", [row[0]])
+
+        # The inner query ranks ids only; the outer one adds the columns
+        # and snippets for the page. CROSS JOIN keeps the page as the outer
+        # loop, so snippets are looked up by rowid instead of re-running the
+        # MATCH over every hit.
+        sql = (
+            f"SELECT {_columns()}, page.score AS rank, "
+            f"highlight(issues_ticket_fts, 0, %s, %s) AS title_snippet, "
+            f"snippet(issues_ticket_fts, 1, %s, %s, '…', %s) AS body_snippet "
+            f"FROM (SELECT issues_ticket_fts.rowid AS id, {rank} AS score {matches}{window} "
+            f"      ORDER BY score, issues_ticket_fts.rowid DESC LIMIT %s OFFSET %s) AS page "
+            f"CROSS JOIN issues_ticket_fts CROSS JOIN issues_ticket t "
+            f"WHERE issues_ticket_fts MATCH %s AND issues_ticket_fts.rowid = page.id AND t.id = page.id "
+            f"ORDER BY page.score, page.id DESC"
+        )
+        return list(Ticket.objects.raw(sql, [
+            MARK_START, MARK_END, MARK_START, MARK_END, self.config["SNIPPET_WORDS"],
+            match, *params, *window_params, limit, offset, match,
+        ]))
+
+    def rebuild(self):
+        with connection.cursor() as cursor:
+            cursor.execute("INSERT INTO issues_ticket_fts(issues_ticket_fts) VALUES ('rebuild')")
+            cursor.execute("INSERT INTO issues_ticket_fts(issues_ticket_fts) VALUES ('optimize')")
+        return True
+
+
+class PostgresSearchBackend:
+    """
+    tsquery against the generated search_vector column, ranked with
+    ts_rank_cd. Headlines are only built for the rows on the page.
+    """
+    name = "postgres-tsvector"
+
+    def __init__(self, config):
+        self.config = config
+
+    def tsquery(self, terms):
+        parts = []
+        for term in terms:
+            phrase = " <-> ".join(term.words)
+            parts.append(f"({phrase}:*)" if term.prefix else f"({phrase})")
+        return " & ".join(parts)
+
+    def search(self, terms, filters, limit, offset):
+        where, params = _where(filters)
+        options = f"StartSel={MARK_START}, StopSel={MARK_END}, HighlightAll=true"
+        body_options = (
+            f"StartSel={MARK_START}, StopSel={MARK_END}, "
+            f"MaxWords={self.config['SNIPPET_WORDS']}, MinWords={max(1, self.config['SNIPPET_WORDS'] // 3)}, "
+            f"FragmentDelimiter=' … ', MaxFragments=2"
+        )
+        sql = (
+            f"SELECT {_columns()}, page.rank AS rank, "
+            f"ts_headline('english', t.title, page.query, %s) AS title_snippet, "
+            f"ts_headline('english', t.body, page.query, %s) AS body_snippet "
+            f"FROM (SELECT t.id, ts_rank_cd(t.search_vector, q.query) AS rank, q.query "
+            f"      FROM issues_ticket t, to_tsquery('english', %s) AS q(query) "
+            f"      WHERE t.search_vector @@ q.query{where} "
+            f"      ORDER BY rank DESC, t.id DESC LIMIT %s OFFSET %s) AS page "
+            f"JOIN issues_ticket t ON t.id = page.id "
+            f"ORDER BY page.rank DESC, t.id DESC"
+        )
+        return list(Ticket.objects.raw(sql, [options, body_options, self.tsquery(terms), *params, limit, offset]))
+
+    def rebuild(self):
+        # The generated column is maintained by Postgres on every write.
+        return False
+
+
+class FallbackSearchBackend:
+    """
+    icontains on title and body, newest first, for databases without a
+    search index. Scans the table; fine for development data only.
+    """
+    name = "icontains"
+
+    def __init__(self, config):
+        self.config = config
+
+    def search(self, terms, filters, limit, offset):
+        queryset = Ticket.objects.only(*LIST_FIELDS, "body").filter(**{k: v for k, v in filters.items() if v})
+        for term in terms:
+            phrase = " ".join(term.words)
+            queryset = queryset.filter(Q(title__icontains=phrase) | Q(body__icontains=phrase))
+        items = list(queryset.order_by("-created_at", "-id")[offset:offset + limit])
+        pattern = re.compile("|".join(re.escape(" ".join(term.words)) for term in terms), re.IGNORECASE)
+        for ticket in items:
+            ticket.rank = None
+            ticket.title_snippet = pattern.sub(lambda m: f"{MARK_START}{m.group(0)}{MARK_END}", ticket.title)
+            ticket.body_snippet = self._snippet(ticket.body, pattern)
+        return items
+
+    def _snippet(self, body, pattern):
+        words = body.split()
+        size = self.config["SNIPPET_WORDS"]
+        for i, word in enumerate(words):
+            if pattern.search(word):
+                start = max(0, i - size // 3)
+                window = " ".join(words[start:start + size])
+                text = pattern.sub(lambda m: f"{MARK_START}{m.group(0)}{MARK_END}", window)
+                return ("…" if start else "") + text + ("…" if start + size < len(words) else "")
+        return " ".join(words[:size])
+
+    def rebuild(self):
+        return False
+
+
+BACKENDS = {
+    "sqlite": SQLiteFTSBackend,
+    "postgresql": PostgresSearchBackend,
+}
+
+
+def get_search_backend(config=None):
+    config = config or get_search_settings()
+    if config["BACKEND"]:
+        backend_class = import_string(config["BACKEND"])
+    else:
+        backend_class = BACKENDS.get(connection.vendor, FallbackSearchBackend)
+    return backend_class(config)
+
+
+def search_tickets(query, filters=None, limit=None, offset=0):
+    """
+    One page of tickets matching `query`, best first, each with `rank`,
+    `title_snippet` and `body_snippet` (HTML-safe, matches in <mark>).
+    `filters` are the same equality filters as the ticket list.
+    """
+    config = get_search_settings()
+    limit = max(1, min(limit or config["PAGE_SIZE"], config["MAX_PAGE_SIZE"]))
+    offset = max(0, min(offset, config["MAX_OFFSET"]))
+    backend = get_search_backend(config)
+    terms = parse_query(query, config["MIN_PREFIX"])
+    if not terms:
+        return SearchPage([], False, 0.0, backend.name)
+
+    started = time.perf_counter()
+    rows = backend.search(terms, filters or {}, limit + 1, offset)
+    took_ms = round((time.perf_counter() - started) * 1000, 2)
+    items = rows[:limit]
+    for ticket in items:
+        ticket.title_snippet = highlight(ticket.title_snippet) or ticket.title
+        ticket.body_snippet = highlight(ticket.body_snippet)
+    logger.debug(f"Search {query!r} ({backend.name}) returned {len(items)} tickets in {took_ms} ms")
+    return SearchPage(items, len(rows) > limit and offset + limit <= config["MAX_OFFSET"], took_ms, backend.name)
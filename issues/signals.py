@@ -0,0 +1,32 @@
+# issues/signals.py
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import Ticket
+
+
+@receiver(post_save, sender=Ticket)
+def invalidate_stale_suggestions(sender, instance, created, **kwargs):
+    if created:
+        return
+    from issues.services.suggestion_cache import invalidate_ticket, suggestion_cache_key
+
+    # Suggestions are content-addressed, so anything not matching the
+    # ticket's current content can no longer be served.
+    invalidate_ticket(instance, keep_key=suggestion_cache_key(instance))
+
+
+@receiver(post_save, sender=Ticket)
+def update_ticket_signature(sender, instance, update_fields=None, **kwargs):
+    if update_fields is not None and not {"title", "body"} & set(update_fields):
+        return
+    from issues.services.similarity import index_tickets
+
+    index_tickets([instance])
+
+
+@receiver(post_delete, sender=Ticket)
+def forget_ticket_signature(sender, instance, **kwargs):
+    from issues.services.similarity import forget_ticket
+
+    forget_ticket(instance.id)
@@ -1,198 +1,57 @@
 # issues/tasks.py
 from celery import shared_task
-from django.utils import timezone
-from .models import Ticket, Issue, ProcessingLog
-from .services.adk_integration import ADKGitHubService
+from .models import Ticket
+from .services.extraction_jobs import run_extraction_job
+from .services.job_events import EventBuffer
 import logging
-import time
 
 logger = logging.getLogger(__name__)
 
 @shared_task(bind=True)
-def process_github_url_task(self, ticket_id):
+def process_github_url_task(self, job_id):
     """
-    Background task to process GitHub URL using ADK service with session management
-    
+    Background task that runs an ExtractionJob created by submit_extraction_job
+
     Args:
-        ticket_id: ID of the ticket to process
+        job_id: UUID (as string) of the ExtractionJob to run
     """
-    start_time = time.time()
-    adk_service = None
-    
+    job = run_extraction_job(job_id)
+    return {
+        'success': job.status == job.STATUS_SUCCEEDED,
+        'job_id': str(job.id),
+        'result': job.result,
+        'error': job.error,
+        'processing_time': job.duration_seconds,
+    }
+
+@shared_task
+def sync_repos_task():
+    """
+    Periodic task: incremental issue sync for every tracked repository
+    """
+    from .services.repo_sync import sync_all_repos
+
+    results = sync_all_repos()
+    return [result._asdict() for result in results]
+
+@shared_task
+def warm_suggestions_task():
+    """
+    Periodic task: pre-compute suggestions for unsolved tickets, resuming the
+    previous run if it was cut short
+    """
+    from django.core.cache import cache
+    from .services.suggestion_warmup import get_warmup_settings, run_warmup, start_or_resume_warmup
+
+    config = get_warmup_settings()
+    # One warm-up at a time; overlapping beats would just race on the queue.
+    if not cache.add("suggestion_warmup:lock", True, timeout=config["STALE_AFTER"]):
+        return None
     try:
-        # Get ticket
-        ticket = Ticket.objects.get(ticket_id=ticket_id)
-        
-        # Create ADK service with session tied to this ticket
-        session_id = f"ticket_{ticket_id}_{ticket.created_at.strftime('%Y%m%d_%H%M%S')}"
-        adk_service = ADKGitHubService(session_id=session_id)
-        
-        # Log start with session info
-        ProcessingLog.objects.create(
-            ticket=ticket,
-            level='info',
-            message=f'Started processing ticket #{ticket_id} for URL: {ticket.github_url} (Session: {session_id})'
-        )
-        
-        # Update status
-        ticket.status = 'processing'
-        ticket.save()
-        
-        # Test connection first
-        connection_test = adk_service.test_connection()
-        if not connection_test['success']:
-            raise Exception(f"ADK service connection failed: {connection_test['message']}")
-        
-        ProcessingLog.objects.create(
-            ticket=ticket,
-            level='info',
-            message=f'ADK service connection established successfully. Session exchanges: {connection_test["session_info"]["total_exchanges"]}'
-        )
-        
-        # Extract issues with session context
-        result = adk_service.extract_issues_from_url(ticket.github_url, ticket_id=ticket_id)
-        
-        if not result['success']:
-            raise Exception(result['error'])
-        
-        issues_data = result['data']
-        
-        ProcessingLog.objects.create(
-            ticket=ticket,
-            level='info',
-            message=f'Successfully extracted {len(issues_data)} issues from GitHub. Session: {result["session_id"]}'
-        )
-        
-        # If we got a truncated response, try to continue the conversation
-        if result.get('response_preview', '').endswith('...'):
-            ProcessingLog.objects.create(
-                ticket=ticket,
-                level='info',
-                message='Response was truncated, attempting to get complete data...'
-            )
-            
-            # Ask for complete data
-            continue_result = adk_service.continue_conversation(
-                "Please provide the complete list of all issues if the previous response was truncated."
-            )
-            
-            if continue_result['success']:
-                # Try to parse additional issues from the continued conversation
-                additional_issues = adk_service._parse_agent_response(continue_result['response'])
-                if additional_issues and len(additional_issues) > len(issues_data):
-                    issues_data = additional_issues
-                    ProcessingLog.objects.create(
-                        ticket=ticket,
-                        level='info',
-                        message=f'Retrieved complete data: {len(issues_data)} issues total'
-                    )
-        
-        # Save issues to database
-        created_issues = []
-        skipped_issues = []
-        
-        for issue_data in issues_data:
-            try:
-                issue, created = Issue.objects.get_or_create(
-                    ticket=ticket,
-                    repo=issue_data['repo'],
-                    owner=issue_data['owner'],
-                    issue_number=issue_data['issue_number'],
-                    defaults={
-                        'title': issue_data['title'],
-                        'body': issue_data['body'],
-                        'labels': issue_data['labels'],
-                        'issue_type': issue_data['type'],
-                        'github_url': issue_data['github_url']
-                    }
-                )
-                
-                if created:
-                    created_issues.append(issue)
-                    logger.info(f"Created issue: {issue}")
-                else:
-                    skipped_issues.append(issue)
-                    logger.info(f"Issue already exists: {issue}")
-                    
-            except Exception as e:
-                ProcessingLog.objects.create(
-                    ticket=ticket,
-                    level='warning',
-                    message=f'Failed to save issue #{issue_data.get("issue_number", "unknown")}: {str(e)}'
-                )
-                continue
-        
-        # Log summary of what was processed
-        if skipped_issues:
-            ProcessingLog.objects.create(
-                ticket=ticket,
-                level='info',
-                message=f'Skipped {len(skipped_issues)} duplicate issues that already existed'
-            )
-        
-        # Update ticket with results
-        processing_time = time.time() - start_time
-        ticket.total_issues_found = len(created_issues)
-        ticket.processing_time_seconds = processing_time
-        ticket.status = 'completed'
-        ticket.save()
-        
-        # Final log with session summary
-        session_summary = adk_service.get_session_summary()
-        ProcessingLog.objects.create(
-            ticket=ticket,
-            level='info',
-            message=f'Processing completed successfully. Created {len(created_issues)} new issues in {processing_time:.2f} seconds. Session had {session_summary["total_exchanges"]} exchanges.'
-        )
-        
-        # Optional: Clear session after successful completion to free memory
-        # adk_service.clear_session()
-        
-        return {
-            'success': True,
-            'ticket_id': ticket_id,
-            'issues_created': len(created_issues),
-            'issues_skipped': len(skipped_issues),
-            'processing_time': processing_time,
-            'session_exchanges': session_summary['total_exchanges']
-        }
-        
-    except Ticket.DoesNotExist:
-        error_msg = f'Ticket {ticket_id} not found'
-        logger.error(error_msg)
-        return {'success': False, 'error': error_msg}
-        
-    except Exception as e:
-        error_msg = f'Failed to process ticket {ticket_id}: {str(e)}'
-        logger.error(error_msg)
-        
-        try:
-            ticket = Ticket.objects.get(ticket_id=ticket_id)
-            ticket.status = 'failed'
-            ticket.error_message = str(e)
-            processing_time = time.time() - start_time
-            ticket.processing_time_seconds = processing_time
-            ticket.save()
-            
-            ProcessingLog.objects.create(
-                ticket=ticket,
-                level='error',
-                message=f'Processing failed after {processing_time:.2f} seconds: {str(e)}'
-            )
-            
-            # Get session info if available
-            if adk_service:
-                session_info = adk_service.get_session_summary()
-                ProcessingLog.objects.create(
-                    ticket=ticket,
-                    level='info',
-                    message=f'Session had {session_info["total_exchanges"]} exchanges before failure'
-                )
-            
-        except Exception as save_error:
-            logger.error(f"Failed to save error state for ticket {ticket_id}: {save_error}")
-        
-        return {'success': False, 'error': error_msg}
+        run = run_warmup(start_or_resume_warmup(limit=config["TASK_LIMIT"]))
+    finally:
+        cache.delete("suggestion_warmup:lock")
+    return run.as_dict()
 
 @shared_task
 def continue_ticket_conversation(ticket_id, message):
@@ -203,29 +62,34 @@ def continue_ticket_conversation(ticket_id, message):
         ticket_id: ID of the ticket
         message: Follow-up message or question
     """
+    from .services.conversations import continue_conversation
+
     try:
-        ticket = Ticket.objects.get(ticket_id=ticket_id)
-        
-        # Recreate the session for this ticket
-        session_id = f"ticket_{ticket_id}_{ticket.created_at.strftime('%Y%m%d_%H%M%S')}"
-        adk_service = ADKGitHubService(session_id=session_id)
-        
-        # Continue the conversation
-        result = adk_service.continue_conversation(message)
-        
+        ticket = Ticket.objects.get(id=ticket_id)
+
+        # The ticket's session keeps the recent exchanges and a compacted
+        # summary of older ones, so the prompt stays the same size
+        reply = continue_conversation(ticket, message)
+
         # Log the interaction
-        ProcessingLog.objects.create(
-            ticket=ticket,
-            level='info',
-            message=f'Continued conversation: User: "{message}" | Response: "{result.get("response", "No response")[:200]}..."'
-        )
-        
+        with EventBuffer(ticket=ticket) as events:
+            events.info(
+                f'Continued conversation: User: "{message[:200]}" | Response: "{(reply.response or reply.error)[:200]}..."',
+                stage="conversation",
+                session_id=reply.session_id,
+                turns=reply.turns,
+                summarized=reply.summarized,
+                prompt_tokens=reply.prompt_tokens,
+            )
+
+        if not reply.success:
+            return {'success': False, 'error': reply.error, 'session_id': reply.session_id}
         return {
-            'success': result['success'],
-            'response': result.get('response', ''),
-            'session_id': result['session_id']
+            'success': True,
+            'response': reply.response,
+            'session_id': reply.session_id
         }
-        
+
     except Ticket.DoesNotExist:
         return {'success': False, 'error': f'Ticket {ticket_id} not found'}
     except Exception as e:
@@ -235,37 +99,33 @@ def continue_ticket_conversation(ticket_id, message):
 @shared_task
 def cleanup_old_sessions():
     """
-    Periodic task to cleanup old ADK sessions from cache
+    Periodic task: evict ADK sessions that have been idle for
+    RETENTION['SESSION_IDLE_SECONDS'] from the cache
     """
-    try:
-        from django.core.cache import cache
-        from datetime import timedelta
-        
-        # This is a simplified cleanup - in practice, you'd need to track session keys
-        # For now, just log that cleanup should happen
-        logger.info("Session cleanup task executed - implement specific cleanup logic based on your cache backend")
-        
-        return "Session cleanup completed"
-        
-    except Exception as e:
-        logger.error(f"Error during session cleanup: {str(e)}")
-        return f"Session cleanup failed: {str(e)}"
+    from .services.retention import evict_idle_sessions
+
+    evicted = evict_idle_sessions()
+    return f'Evicted {evicted} idle sessions'
 
 @shared_task
 def cleanup_old_tickets():
     """
-    Periodic task to cleanup old tickets (optional)
+    Periodic task to archive and delete tickets older than
+    RETENTION['TICKET_DAYS'] (optional)
     Run this as a periodic task if needed
     """
-    from datetime import timedelta
-    from django.utils import timezone
-    
-    # Delete tickets older than 30 days
-    cutoff_date = timezone.now() - timedelta(days=30)
-    old_tickets = Ticket.objects.filter(created_at__lt=cutoff_date)
-    
-    deleted_count = old_tickets.count()
-    old_tickets.delete()
-    
-    logger.info(f'Cleaned up {deleted_count} old tickets')
-    return f'Cleaned up {deleted_count} old tickets'
\ No newline at end of file
+    from .services.retention import apply_policy
+
+    result = apply_policy("tickets")
+    return f'Cleaned up {result.deleted} old tickets'
+
+@shared_task
+def cleanup_old_jobs():
+    """
+    Periodic task: archive and delete finished extraction jobs, with their
+    events, older than RETENTION['JOB_DAYS']
+    """
+    from .services.retention import apply_policy
+
+    result = apply_policy("jobs")
+    return f'Cleaned up {result.deleted} old jobs'
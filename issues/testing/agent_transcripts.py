@@ -0,0 +1,74 @@
+# issues/testing/agent_transcripts.py
+"""
+Synthetic agent transcripts for exercising issues.services.output_parser:
+large noisy transcripts ending in an answer, and malformed ones with
+truncated JSON and stray brackets around (usually) one intact value. Used
+by OutputParserTests and the bench_output_parser command.
+"""
+import json
+
+PROSE = [
+    "Calling tool list_issues with {\"owner\": \"octo\"",
+    "The response contained [partial results and a stray } brace.",
+    "I'll look at \"quoted text\" and keep going",
+    "Thinking about {the next step]",
+    "```python\nprint({'not': 'json'})\n```",
+    "Unterminated \"string that runs to the end of the line",
+]
+
+
+def sample_issue(n):
+    return {
+        "repo": "widgets",
+        "owner": "octo",
+        "issue_number": n,
+        "title": f"Issue {n} with \"quotes\", {{braces}} and [brackets]",
+        "body": "Line one\nLine two \\ backslash",
+        "labels": ["bug"],
+    }
+
+
+def transcript(size, rng):
+    """
+    Agent-like noise of roughly `size` characters followed by a fenced
+    answer, so the parser has to scan the whole text before succeeding.
+    """
+    parts = []
+    length = 0
+    while length < size:
+        line = rng.choice(PROSE)
+        parts.append(line)
+        length += len(line) + 1
+    answer = [sample_issue(n) for n in range(1, 6)]
+    parts.append("```json\n" + json.dumps(answer, indent=2) + "\n```")
+    return "\n".join(parts), answer
+
+
+def chunks(text, rng, size=None):
+    pos = 0
+    while pos < len(text):
+        step = size or rng.randint(1, 64)
+        yield text[pos:pos + step]
+        pos += step
+
+
+def malformed_transcript(rng):
+    """
+    Build a transcript of prose, truncated JSON and stray brackets around
+    (usually) one intact value, which must always be recovered. Returns the
+    text and that value, or None.
+    """
+    expected = sample_issue(rng.randint(1, 1000)) if rng.random() < 0.8 else None
+    broken = json.dumps([sample_issue(n) for n in range(3)])
+    noise = [
+        rng.choice(PROSE),
+        broken[:rng.randint(1, len(broken) - 1)],
+        rng.choice(["}", "]", "{", "[", "\"", "\\", "```json", "```"]) * rng.randint(1, 3),
+        "".join(rng.choice("{}[]\":,\\ abc\n") for _ in range(rng.randint(0, 40))),
+    ]
+    parts = rng.sample(noise, k=rng.randint(1, len(noise)))
+    if expected is not None:
+        # A raw newline ends any string the noise left open.
+        parts.append("\n```json\n" + json.dumps(expected) + "\n```\n")
+        parts.append(rng.choice(PROSE))
+    return "\n".join(parts), expected
@@ -0,0 +1,397 @@
+# issues/testing/benchmark.py
+"""
+End-to-end benchmarks of the views and Celery tasks against the fake agent
+(fake_adk) and the fake GitHub MCP server (fake_mcp_server), so a run needs
+no model, API key, Docker or network.
+
+Each scenario fires a number of operations at a fixed concurrency and
+reports p50/p95/p99 latency, throughput, errors and the process's peak RSS.
+Runs go into a throwaway test database seeded with synthetic tickets, and
+are saved as JSON so two of them can be compared with compare_results().
+
+Used by `manage.py benchmark` and `manage.py benchmark_compare`.
+"""
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from unittest import mock
+
+import django
+from django.conf import settings
+from django.db import close_old_connections, connection
+from django.test import Client
+from django.test.utils import override_settings, setup_databases, teardown_databases
+from django.urls import reverse
+
+from issues.models import ExtractionJob, RepoSyncState, SuggestedFix, Ticket
+from issues.services import agent_pool
+from issues.services.issue_extraction import issue_to_ticket_dict
+from issues.services.mcp_sessions import shutdown_mcp_pool
+from issues.services.ticket_ingest import ingest_issues
+from issues.testing import fake_adk
+from issues.testing.fake_mcp_server import make_issue
+
+BENCH_OWNER = "bench"
+RESULTS_VERSION = 1
+
+# The ticket list as people use it: pages, filters and the search box.
+VIEW_TICKETS_QUERIES = [
+    {},
+    {"owner": BENCH_OWNER, "repo": "repo-1"},
+    {"status": Ticket.STATUS_UNSOLVED},
+    {"page_size": 100},
+    {"q": "traceback valueerror"},
+    {"q": "synthetic issue 4"},
+    {"q": "mod"},
+]
+
+# Metric -> True when a higher value is worse.
+COMPARED_METRICS = {
+    "p50_ms": True,
+    "p95_ms": True,
+    "p99_ms": True,
+    "throughput_rps": False,
+    "peak_rss_mb": True,
+}
+
+
+def percentile(ordered, pct):
+    """
+    Linear-interpolated percentile of an already sorted list.
+    """
+    if not ordered:
+        return 0.0
+    position = (len(ordered) - 1) * pct / 100
+    low = int(position)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (position - low)
+
+
+def peak_rss_mb():
+    """
+    High-water RSS of this process and of its finished children (agent
+    replays, MCP servers), in MB. ru_maxrss is KB on Linux, bytes on macOS.
+    """
+    scale = 1024 * 1024 if sys.platform == "darwin" else 1024
+    own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    return round(own / scale, 1), round(children / scale, 1)
+
+
+def summarize(latencies, errors, elapsed, concurrency):
+    ordered = sorted(latencies)
+    own, children = peak_rss_mb()
+    return {
+        "operations": len(ordered),
+        "concurrency": concurrency,
+        "errors": errors,
+        "elapsed_s": round(elapsed, 3),
+        "throughput_rps": round(len(ordered) / elapsed, 2) if elapsed else 0.0,
+        "mean_ms": round(sum(ordered) / len(ordered) * 1000, 2) if ordered else 0.0,
+        "p50_ms": round(percentile(ordered, 50) * 1000, 2),
+        "p95_ms": round(percentile(ordered, 95) * 1000, 2),
+        "p99_ms": round(percentile(ordered, 99) * 1000, 2),
+        "max_ms": round(ordered[-1] * 1000, 2) if ordered else 0.0,
+        "peak_rss_mb": own,
+        "peak_children_rss_mb": children,
+    }
+
+
+def run_concurrently(operation, items, concurrency):
+    """
+    Call `operation(item)` for every item from `concurrency` threads. It
+    returns True on success; an exception counts as an error. Returns
+    (latencies, errors, elapsed).
+    """
+    def timed(item):
+        started = time.perf_counter()
+        try:
+            ok = operation(item)
+        except Exception:
+            ok = False
+        finally:
+            close_old_connections()
+        return time.perf_counter() - started, ok
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="benchmark") as executor:
+        results = list(executor.map(timed, items))
+    elapsed = time.perf_counter() - started
+    return [r[0] for r in results], sum(1 for r in results if not r[1]), elapsed
+
+
+class Benchmark:
+    """
+    One benchmark run. Use as a context manager: entering creates the test
+    database and installs the fakes, leaving removes both.
+    """
+
+    SCENARIOS = ["create_tickets", "suggest_fix", "view_tickets", "celery"]
+
+    def __init__(self, requests=50, concurrency=8, latency_ms=50, output_bytes=0, issues=50, repos=5,
+                 tickets=1000, agent="pool", mcp_latency_ms=0, timeout=60):
+        self.requests = requests
+        self.concurrency = concurrency
+        self.latency_ms = latency_ms
+        self.output_bytes = output_bytes
+        self.issues = issues
+        self.repos = repos
+        self.tickets = tickets
+        self.agent = agent
+        self.mcp_latency_ms = mcp_latency_ms
+        self.timeout = timeout
+        self._stack = []
+
+    def options(self):
+        return {name: getattr(self, name) for name in (
+            "requests", "concurrency", "latency_ms", "output_bytes", "issues", "repos", "tickets", "agent",
+            "mcp_latency_ms",
+        )}
+
+    # -- environment -------------------------------------------------------
+
+    def __enter__(self):
+        os.environ["FAKE_ADK_LATENCY_MS"] = str(self.latency_ms)
+        os.environ["FAKE_ADK_OUTPUT_BYTES"] = str(self.output_bytes)
+        pools = {}
+
+        def fake_pool(agent_name):
+            return pools.setdefault(
+                agent_name, fake_adk.FakeAgentPool(agent_name, self.latency_ms / 1000, self.output_bytes)
+            )
+
+        fake_mcp = {
+            "COMMAND": sys.executable,
+            "ARGS": ["-m", "issues.testing.fake_mcp_server"],
+            "ENV": {
+                "PYTHONPATH": str(settings.BASE_DIR),
+                "FAKE_MCP_ISSUES": str(self.issues),
+                "FAKE_MCP_LATENCY_MS": str(self.mcp_latency_ms),
+                "FASTMCP_LOG_LEVEL": "WARNING",
+            },
+        }
+        overrides = override_settings(
+            ADK_AGENT_POOL={
+                **settings.ADK_AGENT_POOL,
+                "ENABLED": self.agent == "pool",
+                "REPLAY_COMMAND": [sys.executable, "-S", fake_adk.__file__],
+            },
+            # The limiter would measure GEMINI_RPM rather than the code.
+            GEMINI_RATE_LIMIT={**getattr(settings, "GEMINI_RATE_LIMIT", {}), "ENABLED": False},
+            GITHUB_MCP_SERVER=fake_mcp,
+            GITHUB_CLIENT="issues.services.github_client.MCPGitHubClient",
+            # No ETags from the fake server; sync falls back to full listings.
+            GITHUB_SYNC_CLIENT="issues.services.github_client.MCPGitHubClient",
+            EXTRACTION_JOBS={**getattr(settings, "EXTRACTION_JOBS", {}), "RUNNER": "thread"},
+            # Keep coalescing and counters off any shared Redis.
+            CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+                                "LOCATION": "benchmark"}},
+            ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, "testserver"],
+        )
+        overrides.enable()
+        self._stack.append(overrides.disable)
+
+        patch = mock.patch.object(agent_pool, "get_pool", fake_pool)
+        patch.start()
+        self._stack.append(patch.stop)
+
+        if connection.vendor == "sqlite":
+            # A file rather than shared-cache memory: concurrent writers then
+            # wait on the busy timeout instead of failing with "table locked".
+            directory = tempfile.TemporaryDirectory(prefix="benchmark-")
+            self._stack.append(directory.cleanup)
+            connection.settings_dict.setdefault("TEST", {})["NAME"] = os.path.join(directory.name, "bench.sqlite3")
+        old_config = setup_databases(verbosity=0, interactive=False)
+        self._stack.append(lambda: teardown_databases(old_config, verbosity=0))
+        self._stack.append(shutdown_mcp_pool)
+        self.seed()
+        return self
+
+    def __exit__(self, *exc_info):
+        while self._stack:
+            self._stack.pop()()
+
+    def seed(self):
+        """
+        Tracked repositories bench/repo-0.. with `tickets` tickets between
+        them, built from the fake MCP server's issue payloads.
+        """
+        per_repo = max(1, self.tickets // self.repos)
+        for n in range(self.repos):
+            repo = f"repo-{n}"
+            RepoSyncState.objects.create(owner=BENCH_OWNER, repo=repo)
+            ingest_issues(
+                [issue_to_ticket_dict(make_issue(BENCH_OWNER, repo, i), BENCH_OWNER, repo)
+                 for i in range(1, per_repo + 1)],
+                return_ids=False,
+            )
+
+    # -- scenarios ---------------------------------------------------------
+
+    def run(self, scenarios=None, progress=None):
+        """
+        Run the named scenarios (all by default) and return the results
+        document.
+        """
+        started_at = datetime.now(timezone.utc)
+        results = {}
+        for name in scenarios or self.SCENARIOS:
+            for label, summary in getattr(self, f"scenario_{name}")():
+                results[label] = summary
+                if progress:
+                    progress(label, summary)
+        return {
+            "version": RESULTS_VERSION,
+            "started_at": started_at.isoformat(),
+            "environment": environment_info(),
+            "options": self.options(),
+            "scenarios": results,
+        }
+
+    def _wait_for_job(self, client, status_url):
+        deadline = time.monotonic() + self.timeout
+        while time.monotonic() < deadline:
+            status = client.get(status_url).json()["status"]
+            if status in (ExtractionJob.STATUS_SUCCEEDED, ExtractionJob.STATUS_FAILED):
+                return status == ExtractionJob.STATUS_SUCCEEDED
+            time.sleep(0.005)
+        return False
+
+    def scenario_create_tickets(self):
+        """
+        Queue an extraction of a fresh repository and poll its status until
+        the tickets are saved: view, job runner, MCP fetch and ingest.
+        """
+        def operation(n):
+            client = Client()
+            response = client.get(reverse("create_tickets"), {"url": f"https://github.com/{BENCH_OWNER}/new-{n}"})
+            return response.status_code == 202 and self._wait_for_job(client, response.json()["status_url"])
+
+        latencies, errors, elapsed = run_concurrently(operation, range(self.requests), self.concurrency)
+        # Stop the MCP servers so their memory shows up as children's RSS.
+        shutdown_mcp_pool()
+        yield "create_tickets", summarize(latencies, errors, elapsed, self.concurrency)
+
+    def scenario_suggest_fix(self):
+        """
+        Regenerate the suggestion for distinct tickets, so nothing is served
+        from the cache or coalesced.
+        """
+        ticket_ids = list(Ticket.objects.filter(owner=BENCH_OWNER).order_by("-id")
+                          .values_list("id", flat=True)[:self.requests])
+
+        def operation(ticket_id):
+            path = reverse("suggest_fix_for_issue", args=[ticket_id])
+            return Client().get(path, {"regenerate": 1}).status_code == 200
+
+        latencies, errors, elapsed = run_concurrently(operation, ticket_ids, self.concurrency)
+        yield "suggest_fix", summarize(latencies, errors, elapsed, self.concurrency)
+
+    def scenario_view_tickets(self):
+        def operation(n):
+            query = VIEW_TICKETS_QUERIES[n % len(VIEW_TICKETS_QUERIES)]
+            return Client().get(reverse("view_tickets"), query).status_code == 200
+
+        latencies, errors, elapsed = run_concurrently(operation, range(self.requests), self.concurrency)
+        yield "view_tickets", summarize(latencies, errors, elapsed, self.concurrency)
+
+    def scenario_celery(self):
+        """
+        The Celery tasks, run in-process with apply() so the task signals
+        (and their telemetry) fire as they would on a worker.
+        """
+        from issues.tasks import process_github_url_task, sync_repos_task, warm_suggestions_task
+
+        job_ids = [
+            str(ExtractionJob.objects.create(url=f"https://github.com/{BENCH_OWNER}/task-{n}").id)
+            for n in range(self.requests)
+        ]
+
+        def process(job_id):
+            return process_github_url_task.apply(args=[job_id]).get()["success"]
+
+        latencies, errors, elapsed = run_concurrently(process, job_ids, self.concurrency)
+        yield "celery.process_github_url", summarize(latencies, errors, elapsed, self.concurrency)
+
+        # sync_repos and the warm-up each run one at a time by design. The
+        # first sync lists every repository; the next ones are incremental.
+        latencies, errors, elapsed = run_concurrently(lambda _: sync_repos_task.apply().successful(), range(3), 1)
+        shutdown_mcp_pool()
+        yield "celery.sync_repos", summarize(latencies, errors, elapsed, 1)
+
+        latencies, errors = [], 0
+        started = time.perf_counter()
+        for _ in range(3):
+            SuggestedFix.objects.all().delete()
+            run_started = time.perf_counter()
+            result = warm_suggestions_task.apply()
+            latencies.append(time.perf_counter() - run_started)
+            errors += 0 if result.successful() and result.result else 1
+        yield "celery.warm_suggestions", summarize(latencies, errors, time.perf_counter() - started, 1)
+
+
+def _git_revision():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=settings.BASE_DIR,
+            capture_output=True, text=True, timeout=5,
+        ).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def environment_info():
+    return {
+        "git_revision": _git_revision(),
+        "python": platform.python_version(),
+        "django": django.get_version(),
+        "database": connection.vendor,
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+    }
+
+
+def save_results(results, path):
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(path, "w") as f:
+        json.dump(results, f, indent=2)
+
+
+def load_results(path):
+    with open(path) as f:
+        return json.load(f)
+
+
+def compare_results(baseline, current, threshold=0.10, min_delta_ms=1.0):
+    """
+    Compare two result documents scenario by scenario. Returns rows of
+    (scenario, metric, baseline, current, change, regressed). A metric
+    regresses when it is more than `threshold` (a fraction) worse; latency
+    changes under `min_delta_ms` are treated as noise. More errors than the
+    baseline is always a regression.
+    """
+    rows = []
+    for name, new in current["scenarios"].items():
+        old = baseline["scenarios"].get(name)
+        if old is None:
+            continue
+        for metric, higher_is_worse in COMPARED_METRICS.items():
+            before, after = old.get(metric), new.get(metric)
+            if before is None or after is None:
+                continue
+            change = (after - before) / before if before else 0.0
+            worse = change > threshold if higher_is_worse else change < -threshold
+            if metric.endswith("_ms") and abs(after - before) < min_delta_ms:
+                worse = False
+            rows.append((name, metric, before, after, change, worse))
+        rows.append((name, "errors", old["errors"], new["errors"], None, new["errors"] > old["errors"]))
+    return rows
@@ -0,0 +1,144 @@
+# issues/testing/fake_adk.py
+"""
+A stand-in for the `adk` CLI's replay mode that needs no model or API key.
+It prints an agent-style transcript whose answer has the shape each agent
+under adk_agents/ returns.
+
+    python issues/testing/fake_adk.py run adk_agents/github_suggest_fix --replay replay.json
+
+Point the replay path at it with an absolute path (the replay runs from
+adk_agents/), e.g. ADK_REPLAY_COMMAND="python $PWD/issues/testing/fake_adk.py".
+
+Environment:
+    FAKE_ADK_LATENCY_MS   delay before the answer is printed (default 0)
+    FAKE_ADK_OUTPUT_BYTES agent chatter printed before the answer (default 0)
+
+FakeAgentPool answers the same way in-process, standing in for
+issues.services.agent_pool.AgentPool without worker processes, and
+FakeAgentRunner stands in for the agent a pool worker loads.
+
+Only the standard library is imported, so start-up stays cheap when many
+copies run at once.
+"""
+import json
+import os
+import re
+import sys
+import threading
+import time
+from concurrent.futures import Future
+
+LATENCY = int(os.getenv("FAKE_ADK_LATENCY_MS", "0")) / 1000
+OUTPUT_BYTES = int(os.getenv("FAKE_ADK_OUTPUT_BYTES", "0"))
+CHATTER = "Calling tool list_issues and reading the response before answering.\n"
+
+
+def answer(agent_name, prompt):
+    if agent_name == "github_mcp":
+        match = re.search(r"github\.com/([^/\s]+)/([^/\s]+?)(?:/issues/(\d+))?(?:[/\s]|$)", prompt)
+        owner, repo, number = match.groups() if match else ("octo", "widgets", None)
+        numbers = [int(number)] if number else range(1, 6)
+        return [
+            {"repo": repo, "owner": owner, "issue_number": n, "title": f"Synthetic issue {n}", "body": "", "labels": []}
+            for n in numbers
+        ]
+
+    if "\nFollow-up question:\n" in prompt:
+        question = prompt.split("\nFollow-up question:\n", 1)[1].split("\n", 1)[0]
+        return {"response": f"Synthetic answer to: {question[:80]}", "files_to_fix": ["app/module.py"]}
+
+    ticket_ids = [int(n) for n in re.findall(r"^Ticket (\d+)$", prompt, re.MULTILINE)]
+    if ticket_ids:
+        return [
+            {"ticket_id": n, "suggested_fix": f"Synthetic fix for ticket {n}", "files_to_fix": ["app/module.py"]}
+            for n in ticket_ids
+        ]
+    match = re.search(r"/issues/(\d+)", prompt)
+    return {
+        "issue_id": int(match.group(1)) if match else None,
+        "suggested_fix": "Synthetic fix",
+        "files_to_fix": ["app/module.py"],
+    }
+
+
+def transcript(agent_name, prompt, output_bytes=None):
+    """
+    The agent's printed output: `output_bytes` of tool-call chatter (which
+    the parser has to scan past), then the fenced JSON answer.
+    """
+    output_bytes = OUTPUT_BYTES if output_bytes is None else output_bytes
+    chatter = (CHATTER * (output_bytes // len(CHATTER) + 1))[:output_bytes]
+    return (
+        f"[{agent_name}]: {chatter}Here is the result.\n"
+        f"```json\n{json.dumps(answer(agent_name, prompt), indent=2)}\n```\n"
+    )
+
+
+class FakeAgentPool:
+    """
+    Resolves each submitted prompt's Future after `latency` seconds from a
+    timer thread, like a pool whose workers are all waiting on the model.
+    """
+
+    def __init__(self, agent_name, latency, output_bytes=None):
+        self.agent_name = agent_name
+        self.latency = latency
+        self.output_bytes = output_bytes
+
+    def submit(self, prompt_text):
+        future = Future()
+        future.request_id = None
+        # Timestamps as AgentPool sets them: a worker picks the prompt up at once.
+        future.submitted_at = future.started_at = time.monotonic()
+        future.finished_at = None
+
+        def resolve(output):
+            future.finished_at = time.monotonic()
+            future.set_result(output)
+
+        timer = threading.Timer(self.latency, resolve, [transcript(self.agent_name, prompt_text, self.output_bytes)])
+        timer.daemon = True
+        timer.start()
+        return future
+
+    def forget(self, future):
+        pass
+
+    def run(self, prompt_text, timeout=None):
+        return self.submit(prompt_text).result(timeout=timeout)
+
+
+class FakeAgentRunner:
+    """
+    Takes the place of agent_pool._AgentRunner inside a pool worker: answers
+    each prompt after `latency` seconds without loading an agent or a model.
+    """
+
+    def __init__(self, agent_name, latency=LATENCY, output_bytes=None):
+        self.agent_name = agent_name
+        self.latency = latency
+        self.output_bytes = output_bytes
+
+    def run(self, prompt_text):
+        time.sleep(self.latency)
+        return transcript(self.agent_name, prompt_text, self.output_bytes)
+
+    def close(self):
+        pass
+
+
+def main(argv):
+    if len(argv) < 4 or argv[0] != "run" or argv[2] != "--replay":
+        sys.exit("usage: fake_adk run <agent_dir> --replay <file>")
+    agent_name = os.path.basename(os.path.normpath(argv[1]))
+    with open(argv[3]) as f:
+        queries = json.load(f)["queries"]
+
+    for prompt in queries:
+        print(f"[user]: {prompt.strip().splitlines()[0] if prompt.strip() else ''}", flush=True)
+        time.sleep(LATENCY)
+        print(transcript(agent_name, prompt), end="", flush=True)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,110 @@
+# issues/testing/fake_mcp_server.py
+"""
+A stand-in for ghcr.io/github/github-mcp-server that needs no network or
+Docker. It speaks MCP over stdio and serves synthetic repositories with the
+same tool names, arguments and JSON shapes as the real server.
+
+    python -m issues.testing.fake_mcp_server
+
+Environment:
+    FAKE_MCP_ISSUES       issues per repository (default 50)
+    FAKE_MCP_LATENCY_MS   delay added to every tool call (default 0)
+"""
+import asyncio
+import json
+import os
+from datetime import datetime, timedelta, timezone
+
+from mcp.server.fastmcp import FastMCP
+
+ISSUES_PER_REPO = int(os.getenv("FAKE_MCP_ISSUES", "50"))
+LATENCY = int(os.getenv("FAKE_MCP_LATENCY_MS", "0")) / 1000
+EPOCH = datetime(2025, 1, 1, tzinfo=timezone.utc)
+LABELS = ["bug", "enhancement", "documentation", "question", "performance"]
+
+server = FastMCP("fake-github-mcp-server")
+
+
+def _timestamp(dt):
+    return dt.strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+def make_issue(owner, repo, number):
+    """
+    Build a deterministic GitHub REST-style issue payload.
+    """
+    created = EPOCH + timedelta(hours=number)
+    return {
+        "number": number,
+        "title": f"Synthetic issue {number} in {owner}/{repo}",
+        "body": f"Steps to reproduce issue {number}.\n\nTraceback (most recent call last):\n  File \"app/module_{number % 7}.py\", line {number}, in handler\nValueError: bad value {number}",
+        "state": "open" if number % 3 else "closed",
+        "labels": [{"name": LABELS[number % len(LABELS)]}],
+        "user": {"login": f"user{number % 11}"},
+        "html_url": f"https://github.com/{owner}/{repo}/issues/{number}",
+        "created_at": _timestamp(created),
+        "updated_at": _timestamp(created + timedelta(minutes=number % 60)),
+        "comments": number % 4,
+    }
+
+
+def _issues(owner, repo):
+    return [make_issue(owner, repo, n) for n in range(ISSUES_PER_REPO, 0, -1)]
+
+
+async def _delay():
+    if LATENCY:
+        await asyncio.sleep(LATENCY)
+
+
+@server.tool()
+async def list_issues(owner: str, repo: str, state: str = "open", labels: list[str] | None = None,
+                      sort: str = "created", direction: str = "desc", since: str | None = None,
+                      page: int = 1, perPage: int = 30) -> str:
+    await _delay()
+    issues = _issues(owner, repo)
+    if state != "all":
+        issues = [i for i in issues if i["state"] == state]
+    if labels:
+        issues = [i for i in issues if {l["name"] for l in i["labels"]} & set(labels)]
+    if since:
+        issues = [i for i in issues if i["updated_at"] >= since]
+    if sort == "updated":
+        issues.sort(key=lambda i: i["updated_at"], reverse=direction == "desc")
+    start = (page - 1) * perPage
+    return json.dumps(issues[start:start + perPage])
+
+
+@server.tool()
+async def get_issue(owner: str, repo: str, issue_number: int) -> str:
+    await _delay()
+    if not 1 <= issue_number <= ISSUES_PER_REPO:
+        raise ValueError(f"issue {owner}/{repo}#{issue_number} not found")
+    return json.dumps(make_issue(owner, repo, issue_number))
+
+
+@server.tool()
+async def get_issue_comments(owner: str, repo: str, issue_number: int, page: int = 1, perPage: int = 30) -> str:
+    await _delay()
+    issue = make_issue(owner, repo, issue_number)
+    comments = [
+        {"id": issue_number * 100 + i, "user": {"login": f"user{i}"}, "body": f"Comment {i} on #{issue_number}"}
+        for i in range(issue["comments"])
+    ]
+    return json.dumps(comments[(page - 1) * perPage:page * perPage])
+
+
+@server.tool()
+async def search_issues(q: str, sort: str | None = None, order: str | None = None,
+                        page: int = 1, perPage: int = 30) -> str:
+    await _delay()
+    terms = q.split()
+    repo_term = next((t[5:] for t in terms if t.startswith("repo:")), "fake/repo")
+    owner, _, repo = repo_term.partition("/")
+    words = [t.lower() for t in terms if ":" not in t]
+    items = [i for i in _issues(owner, repo) if all(w in (i["title"] + i["body"]).lower() for w in words)]
+    return json.dumps({"total_count": len(items), "items": items[(page - 1) * perPage:page * perPage]})
+
+
+if __name__ == "__main__":
+    server.run()
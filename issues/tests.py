@@ -1,3 +1,1481 @@
-from django.test import TestCase
+import asyncio
+import gzip
+import json
+import os
+import queue
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import zlib
+from contextlib import contextmanager
+from io import StringIO
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+from unittest import mock
 
-# Create your tests here.
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.db import connection, transaction
+from django.test import AsyncClient, Client, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.http import http_date
+
+from issues import views
+from issues.models import ExtractionJob, JobEvent, RepoSyncState, SuggestedFix, SuggestionWarmup, Ticket
+from issues.services import (
+    agent_pool,
+    batch_suggest,
+    conversations,
+    extraction_jobs,
+    github_tools,
+    issue_extraction,
+    mcp_sessions,
+    prompts,
+    retention,
+    similarity,
+    suggestion_cache,
+    suggestion_warmup,
+)
+from issues.services.adk_integration import accept_issues
+from issues.services.agent_pool import AgentInvocationError
+from issues.services.job_events import EventBuffer, job_events
+from issues.services.github_client import GitHubClient, GitHubClientError, MCPGitHubClient, SyncBatch, get_github_client
+from issues.services.output_parser import JSONStreamScanner, parse_stream
+from issues.services.prompts import count_tokens
+from issues.services.rate_limiter import is_throttle_error
+from issues.services.repo_sync import sync_repo
+from issues.services.singleflight import LocalFlightStore, SingleFlight
+from issues.services.ticket_ingest import ingest_issues
+from issues.services.ticket_listing import InvalidCursor, keyset_page
+from issues.services.ticket_export import ExportError, export_stream
+from issues.services.ticket_search import search_tickets
+from issues.testing.fake_adk import FakeAgentPool, FakeAgentRunner
+from issues.testing.agent_transcripts import chunks, malformed_transcript, sample_issue, transcript
+from issues.testing.fake_mcp_server import make_issue
+
+
+def make_ticket(number, **fields):
+    values = {
+        "owner": "octo",
+        "repo": "widgets",
+        "issue_number": number,
+        "title": f"Issue {number}",
+        "body": "",
+        "labels": [],
+        "type": "issue",
+    }
+    values.update(fields)
+    return Ticket.objects.create(**values)
+
+
+def issue(number, **fields):
+    values = {"owner": "octo", "repo": "widgets", "issue_number": number, "title": f"Issue {number}", "body": ""}
+    values.update(fields)
+    return values
+
+
+class IngestTests(TestCase):
+    def test_counts_created_updated_and_skipped(self):
+        result = ingest_issues([issue(1), issue(2), issue(3)])
+        self.assertEqual((result.created, result.updated, result.skipped), (3, 0, 0))
+        self.assertEqual(len(result.ticket_ids), 3)
+
+        result = ingest_issues([issue(1), issue(2, title="Renamed"), issue(4), issue(4), {"title": "no key"}])
+        # 1 unchanged, the repeat of 4 and the invalid row are skipped.
+        self.assertEqual((result.created, result.updated, result.skipped), (1, 1, 3))
+        self.assertEqual(Ticket.objects.count(), 4)
+        self.assertEqual(Ticket.objects.get(issue_number=2).title, "Renamed")
+
+    def test_update_bumps_updated_at(self):
+        ingest_issues([issue(1)])
+        before = Ticket.objects.get(issue_number=1).updated_at
+        ingest_issues([issue(1, body="new body")])
+        self.assertGreater(Ticket.objects.get(issue_number=1).updated_at, before)
+
+
+class KeysetPageTests(TestCase):
+    def setUp(self):
+        # Pairs of tickets share a created_at, so only the id breaks the tie.
+        start = timezone.now()
+        for number in range(1, 8):
+            ticket = make_ticket(number)
+            Ticket.objects.filter(pk=ticket.pk).update(created_at=start + timedelta(minutes=number // 2))
+        self.newest_first = list(Ticket.objects.order_by("-created_at", "-id").values_list("id", flat=True))
+
+    def walk_forward(self, page_size):
+        pages, after = [], None
+        while True:
+            page = keyset_page(Ticket.objects.all(), after=after, page_size=page_size)
+            pages.append(page)
+            if not page.next_cursor:
+                return pages
+            after = page.next_cursor
+
+    def ids(self, page):
+        return [ticket.id for ticket in page.items]
+
+    def test_pages_cover_every_row_once_across_ties(self):
+        for page_size in (1, 2, 3, 7, 50):
+            pages = self.walk_forward(page_size)
+            self.assertEqual([i for page in pages for i in self.ids(page)], self.newest_first, page_size)
+            self.assertIsNone(pages[0].prev_cursor)
+
+    def test_exact_multiple_has_no_empty_last_page(self):
+        Ticket.objects.filter(pk=self.newest_first[-1]).delete()
+        pages = self.walk_forward(3)
+        self.assertEqual([len(page.items) for page in pages], [3, 3])
+
+    def test_before_walks_back_to_the_same_pages(self):
+        pages = self.walk_forward(3)
+        page = pages[-1]
+        for expected in reversed(pages[:-1]):
+            page = keyset_page(Ticket.objects.all(), before=page.prev_cursor, page_size=3)
+            self.assertEqual(self.ids(page), self.ids(expected))
+        self.assertIsNone(page.prev_cursor)
+
+    def test_new_ticket_does_not_shift_the_next_page(self):
+        first = keyset_page(Ticket.objects.all(), page_size=3)
+        make_ticket(100)
+        second = keyset_page(Ticket.objects.all(), after=first.next_cursor, page_size=3)
+        self.assertEqual(self.ids(second), self.newest_first[3:6])
+
+    def test_invalid_cursor(self):
+        for cursor in ("not-a-cursor", "bm8gYmFy", "!!"):
+            with self.assertRaises(InvalidCursor):
+                keyset_page(Ticket.objects.all(), after=cursor)
+        self.assertEqual(self.client.get(reverse("view_tickets"), {"after": "not-a-cursor"}).status_code, 400)
+
+
+class SuggestionCacheKeyTests(TestCase):
+    def test_key_follows_the_repository_index(self):
+        ticket = make_ticket(1)
+        with mock.patch.object(suggestion_cache, "get_index", return_value=None):
+            unindexed = suggestion_cache.suggestion_cache_key(ticket)
+        self.assertEqual(unindexed, suggestion_cache.suggestion_cache_key(ticket, index_sha=""))
+
+        keys = set()
+        for sha in ("a" * 40, "b" * 40):
+            index = SimpleNamespace(commit_sha=sha)
+            with mock.patch.object(suggestion_cache, "get_index", return_value=index), \
+                    mock.patch.object(suggestion_cache, "aget_index", mock.AsyncMock(return_value=index)):
+                key = suggestion_cache.suggestion_cache_key(ticket)
+                self.assertEqual(asyncio.run(suggestion_cache.asuggestion_cache_key(ticket)), key)
+            keys.add(key)
+        self.assertNotIn(unindexed, keys)
+        self.assertEqual(len(keys), 2)
+
+
+class SuggestFixesBatchViewTests(TransactionTestCase):
+    # The batch runs on a thread of its own, with its own connection.
+
+    def test_batch_is_answered_by_an_async_view(self):
+        self.assertTrue(asyncio.iscoroutinefunction(views.suggest_fixes_batch_view))
+        tickets = [make_ticket(number) for number in range(1, 4)]
+
+        def answer(batch, timeout=None):
+            return {ticket.id: {"suggested_fix": f"Fix {ticket.issue_number}", "files_to_fix": []} for ticket in batch}
+
+        client = Client(enforce_csrf_checks=True)
+        with mock.patch.object(batch_suggest, "suggest_fixes_for_tickets", side_effect=answer):
+            response = client.post(reverse("suggest_fixes_batch"), {"ticket_ids": [t.id for t in tickets]},
+                                   content_type="application/json")
+
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual((data["tickets"], data["suggested"], data["failed"]), (3, 3, []))
+        self.assertEqual({result["source"] for result in data["results"]}, {"batch"})
+        self.assertEqual(SuggestedFix.objects.count(), 3)
+
+    def test_malformed_bodies_are_rejected(self):
+        bodies = [
+            {"ticket_ids": "abc"},
+            [1, 2],
+            {"filters": [1]},
+            {"ticket_ids": [1, "2"]},
+            {"filters": {"title": "x"}},
+            {"filters": {"owner": ["octo"]}},
+        ]
+        for body in bodies:
+            response = self.client.post(reverse("suggest_fixes_batch"), body, content_type="application/json")
+            self.assertEqual(response.status_code, 400, body)
+            self.assertIn("error", response.json())
+
+    def test_no_matching_tickets(self):
+        response = self.client.post(reverse("suggest_fixes_batch"), {"ticket_ids": [999]},
+                                    content_type="application/json")
+        self.assertEqual(response.status_code, 404)
+
+
+class SearchIndexMigrationTests(TestCase):
+    def test_ticket_created_after_migrating_is_searchable(self):
+        make_ticket(1, title="Crash when saving settings")
+        results = search_tickets("crash").items
+        self.assertEqual([ticket.issue_number for ticket in results], [1])
+
+    def test_edited_ticket_is_reindexed(self):
+        ticket = make_ticket(1, title="Crash when saving settings")
+        ticket.title = "Hang when saving settings"
+        ticket.save()
+        self.assertEqual(search_tickets("crash").items, [])
+        self.assertEqual(len(search_tickets("hang").items), 1)
+
+
+class TicketApiTests(TestCase):
+    def setUp(self):
+        for number in range(1, 6):
+            make_ticket(number, body="long body " * 50)
+
+    def test_list_leaves_out_body_and_honours_fields(self):
+        results = self.client.get("/api/v1/tickets/").json()["results"]
+        self.assertEqual(len(results), 5)
+        self.assertNotIn("body", results[0])
+
+        results = self.client.get("/api/v1/tickets/?fields=id,body").json()["results"]
+        self.assertEqual(set(results[0]), {"id", "body"})
+
+    def test_unknown_field_is_rejected(self):
+        response = self.client.get("/api/v1/tickets/?fields=id,nope")
+        self.assertEqual(response.status_code, 400)
+
+    def test_unchanged_list_is_not_modified_after_one_query(self):
+        response = self.client.get("/api/v1/tickets/?page_size=2")
+        self.assertEqual(response.status_code, 200)
+        etag = response["ETag"]
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get("/api/v1/tickets/?page_size=2", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(len(queries), 1)
+
+    def test_edit_changes_etag(self):
+        ticket = Ticket.objects.get(issue_number=5)
+        etag = self.client.get(f"/api/v1/tickets/{ticket.id}/")["ETag"]
+        ticket.status = Ticket.STATUS_SOLVED
+        ticket.save()
+        response = self.client.get(f"/api/v1/tickets/{ticket.id}/", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+
+    def test_patch_with_stale_etag_fails(self):
+        ticket = Ticket.objects.get(issue_number=1)
+        etag = self.client.get(f"/api/v1/tickets/{ticket.id}/")["ETag"]
+        response = self.client.patch(f"/api/v1/tickets/{ticket.id}/", {"status": "solved"},
+                                     content_type="application/json", HTTP_IF_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        response = self.client.patch(f"/api/v1/tickets/{ticket.id}/", {"status": "unsolved"},
+                                     content_type="application/json", HTTP_IF_MATCH=etag)
+        self.assertEqual(response.status_code, 412)
+        ticket.refresh_from_db()
+        self.assertEqual(ticket.status, Ticket.STATUS_SOLVED)
+
+
+class SuggestionApiTests(TestCase):
+    def setUp(self):
+        suggestion_cache._lru.clear()
+        self.addCleanup(suggestion_cache._lru.clear)
+        self.ticket = make_ticket(1)
+        self.key = suggestion_cache.suggestion_cache_key(self.ticket)
+        suggestion_cache.store_suggestion(self.ticket, {"suggested_fix": "First fix"}, self.key)
+        self.url = f"/api/v1/suggestions/{SuggestedFix.objects.get().id}/"
+
+    def test_regenerated_suggestion_is_not_reported_unchanged(self):
+        first = self.client.get(self.url)
+        self.assertEqual(first.json()["suggested_fix"], "First fix")
+        self.assertFalse(first.has_header("Last-Modified"))
+
+        SuggestedFix.objects.update(expires_at=timezone.now() - timedelta(seconds=1))
+        suggestion_cache.store_suggestion(self.ticket, {"suggested_fix": "Second fix"}, self.key)
+        # A client that saw the first fix just now.
+        for headers in ({"HTTP_IF_NONE_MATCH": first["ETag"]}, {"HTTP_IF_MODIFIED_SINCE": http_date(time.time())}):
+            response = self.client.get(self.url, **headers)
+            self.assertEqual(response.status_code, 200, headers)
+            self.assertEqual(response.json()["suggested_fix"], "Second fix")
+
+    def test_unchanged_suggestion_list_is_not_modified(self):
+        etag = self.client.get("/api/v1/suggestions/")["ETag"]
+        self.assertEqual(self.client.get("/api/v1/suggestions/", HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+
+class GitHubClientInterfaceTests(SimpleTestCase):
+    def test_client_missing_a_method_fails_when_created(self):
+        class Incomplete(GitHubClient):
+            def get_issue(self, owner, repo, issue_number):
+                return {}
+
+        with self.assertRaises(TypeError):
+            Incomplete()
+
+    def test_default_fetch_updated_issues_pages_list_issues(self):
+        class Paged(GitHubClient):
+            def get_issue(self, owner, repo, issue_number):
+                return {}
+
+            def list_issues(self, owner, repo, state="open", since=None, per_page=30, page=1):
+                return [{"number": n} for n in range((page - 1) * per_page, min(page * per_page, 5))]
+
+        batch = Paged().fetch_updated_issues("octo", "widgets", per_page=2)
+        self.assertEqual([issue["number"] for issue in batch.issues], [0, 1, 2, 3, 4])
+        self.assertFalse(batch.not_modified)
+
+
+FAKE_MCP_SERVER = {
+    "COMMAND": sys.executable,
+    "ARGS": ["-m", "issues.testing.fake_mcp_server"],
+    "ENV": {"PYTHONPATH": str(settings.BASE_DIR), "FAKE_MCP_ISSUES": "5", "FASTMCP_LOG_LEVEL": "WARNING"},
+}
+MISSING_MCP_SERVER = {"COMMAND": "/nonexistent/github-mcp-server", "ARGS": [], "ENV": {}}
+
+
+@override_settings(
+    GITHUB_CLIENT="issues.services.github_client.MCPGitHubClient",
+    GITHUB_MCP_POOL={"SIZE": 1, "STARTUP_TIMEOUT": 30, "RETRY_AFTER": 60},
+    SINGLEFLIGHT={"STORE": "none"},
+)
+class GitHubFastPathTests(SimpleTestCase):
+    def setUp(self):
+        self.reset_pool()
+        self.addCleanup(self.reset_pool)
+
+    def reset_pool(self):
+        mcp_sessions.shutdown_mcp_pool()
+        mcp_sessions._start_failure = None
+        get_github_client.cache_clear()
+
+    @override_settings(GITHUB_MCP_SERVER=FAKE_MCP_SERVER)
+    def test_canonical_url_is_fetched_without_the_agent(self):
+        with mock.patch.object(issue_extraction, "get_issues_from_url") as agent:
+            issues, source = issue_extraction.extract_issues("https://github.com/octo/widgets/issues/3")
+        agent.assert_not_called()
+        self.assertEqual(source, "github")
+        self.assertEqual([(i["owner"], i["repo"], i["issue_number"]) for i in issues], [("octo", "widgets", 3)])
+
+    @override_settings(GITHUB_MCP_SERVER=MISSING_MCP_SERVER)
+    def test_server_that_cannot_start_falls_back_to_the_agent(self):
+        agent_issues = [{"owner": "octo", "repo": "widgets", "issue_number": 3, "title": "From agent"}]
+        started = time.monotonic()
+        with mock.patch.object(issue_extraction, "get_issues_from_url", return_value=agent_issues):
+            issues, source = issue_extraction.extract_issues("https://github.com/octo/widgets/issues/3")
+        self.assertEqual((issues, source), (agent_issues, "agent"))
+        self.assertLess(time.monotonic() - started, 10)
+
+    @override_settings(GITHUB_MCP_SERVER=MISSING_MCP_SERVER)
+    def test_failed_start_is_not_retried_during_cool_down(self):
+        with self.assertRaises(GitHubClientError):
+            MCPGitHubClient().get_issue("octo", "widgets", 3)
+        threads = threading.active_count()
+        with mock.patch.object(mcp_sessions.MCPSessionPool, "start") as start:
+            with self.assertRaises(GitHubClientError):
+                MCPGitHubClient().get_issue("octo", "widgets", 3)
+        start.assert_not_called()
+        self.assertEqual(threading.active_count(), threads)
+
+    @override_settings(GITHUB_MCP_SERVER=FAKE_MCP_SERVER)
+    def test_agent_tools_use_the_pool(self):
+        result = asyncio.run(github_tools.get_issue("octo", "widgets", 3))
+        self.assertEqual(result["number"], 3)
+        self.assertEqual(mcp_sessions.mcp_pool_stats()["sessions"][0]["calls"], 1)
+
+    @override_settings(GITHUB_MCP_SERVER=MISSING_MCP_SERVER)
+    def test_agent_tools_report_errors_to_the_model(self):
+        result = asyncio.run(github_tools.get_issue("octo", "widgets", 3))
+        self.assertIn("error", result)
+
+    @override_settings(GITHUB_MCP_SERVER=FAKE_MCP_SERVER)
+    def test_start_in_progress_does_not_block_stats(self):
+        starts = []
+        release = threading.Event()
+        self.addCleanup(release.set)
+
+        def slow_start(pool):
+            starts.append(pool)
+            release.wait(5)
+
+        pools = []
+        with mock.patch.object(mcp_sessions.MCPSessionPool, "start", slow_start):
+            threads = [threading.Thread(target=lambda: pools.append(mcp_sessions.get_mcp_pool())) for _ in range(3)]
+            for thread in threads:
+                thread.start()
+            while not starts:
+                time.sleep(0.01)
+            started = time.monotonic()
+            self.assertIsNone(mcp_sessions.mcp_pool_stats())
+            self.assertLess(time.monotonic() - started, 1)
+            release.set()
+            for thread in threads:
+                thread.join(5)
+        self.assertEqual(len(starts), 1)
+        self.assertEqual(pools, starts * 3)
+
+    @override_settings(GITHUB_MCP_SERVER=FAKE_MCP_SERVER)
+    def test_session_restart_after_a_failed_call_is_held_by_the_pool(self):
+        pool = mcp_sessions.get_mcp_pool()
+        release = threading.Event()
+        self.addCleanup(release.set)
+
+        async def broken_call(name, arguments):
+            raise BrokenPipeError("server went away")
+
+        async def slow_restart(slot):
+            await asyncio.to_thread(release.wait, 5)
+
+        pool._slots[0].session = SimpleNamespace(call_tool=broken_call)
+        with mock.patch.object(pool, "_restart", slow_restart):
+            with self.assertRaises(mcp_sessions.MCPSessionError):
+                pool.call_tool("get_issue", {"owner": "octo", "repo": "widgets", "issue_number": 3})
+            self.assertEqual(len(pool._background), 1)
+            release.set()
+            deadline = time.monotonic() + 5
+            while pool._background and time.monotonic() < deadline:
+                time.sleep(0.01)
+        self.assertEqual(pool._background, set())
+
+
+class SingleFlightTests(SimpleTestCase):
+    def test_cancelled_leader_hands_over_to_a_follower(self):
+        flight = SingleFlight()
+        calls = []
+
+        async def compute():
+            calls.append(1)
+            await asyncio.sleep(0.1)
+            return {"fix": "value"}
+
+        async def run():
+            leader = asyncio.create_task(flight.ado("key", compute))
+            await asyncio.sleep(0.01)
+            followers = [asyncio.create_task(flight.ado("key", compute)) for _ in range(3)]
+            await asyncio.sleep(0.01)
+            leader.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await leader
+            return await asyncio.gather(*followers)
+
+        results = asyncio.run(run())
+        self.assertEqual([value for value, _ in results], [{"fix": "value"}] * 3)
+        self.assertEqual(sorted(shared for _, shared in results), [False, True, True])
+        self.assertEqual(len(calls), 2)
+
+    def test_interrupted_leader_hands_over_but_errors_are_shared(self):
+        flight = SingleFlight()
+        entered, release = threading.Event(), threading.Event()
+        outcomes = []
+
+        def interrupted():
+            entered.set()
+            release.wait(5)
+            raise KeyboardInterrupt
+
+        def lead(fn):
+            try:
+                flight.do("key", fn)
+            except BaseException as e:
+                outcomes.append(type(e))
+
+        def follow():
+            outcomes.append(flight.do("key", lambda: "computed by a follower"))
+
+        leader = threading.Thread(target=lead, args=[interrupted])
+        leader.start()
+        entered.wait(5)
+        follower = threading.Thread(target=follow)
+        follower.start()
+        while not flight.stats["local_followers"]:
+            time.sleep(0.01)
+        release.set()
+        leader.join(5)
+        follower.join(5)
+        self.assertCountEqual(outcomes, [KeyboardInterrupt, ("computed by a follower", False)])
+
+        # An ordinary failure is the answer for everyone waiting.
+        outcomes.clear()
+        entered.clear()
+        release.clear()
+
+        def failing():
+            entered.set()
+            release.wait(5)
+            raise ValueError("agent failed")
+
+        leader = threading.Thread(target=lead, args=[failing])
+        leader.start()
+        entered.wait(5)
+        follower = threading.Thread(target=lead, args=[lambda: "unused"])
+        follower.start()
+        while flight.stats["local_followers"] < 2:
+            time.sleep(0.01)
+        release.set()
+        leader.join(5)
+        follower.join(5)
+        self.assertEqual(outcomes, [ValueError, ValueError])
+
+    def test_concurrent_callers_share_one_call(self):
+        flight = SingleFlight(LocalFlightStore())
+        calls = []
+        results = []
+        started = threading.Barrier(5)
+
+        def compute():
+            calls.append(1)
+            time.sleep(0.2)
+            return {"fix": "value"}
+
+        def caller():
+            started.wait()
+            results.append(flight.do("key", compute))
+
+        threads = [threading.Thread(target=caller) for _ in range(5)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual([value for value, _ in results], [{"fix": "value"}] * 5)
+        self.assertEqual(sorted(shared for _, shared in results), [False, True, True, True, True])
+
+    def test_second_process_reads_the_published_result(self):
+        store = LocalFlightStore()
+        leader, other = SingleFlight(store, poll_interval=0.01), SingleFlight(store, poll_interval=0.01)
+        calls = []
+
+        def compute():
+            calls.append(1)
+            time.sleep(0.2)
+            return 42
+
+        thread = threading.Thread(target=leader.do, args=("key", compute))
+        thread.start()
+        time.sleep(0.05)
+        self.assertEqual(other.do("key", compute), (42, True))
+        thread.join()
+        self.assertEqual(len(calls), 1)
+
+    def test_follower_timeout_does_not_fail_the_leader(self):
+        flight = SingleFlight(wait_timeout=0.05)
+
+        async def compute():
+            await asyncio.sleep(0.2)
+            return "value"
+
+        async def follower():
+            await asyncio.sleep(0.01)
+            return await flight.ado("key", compute)
+
+        async def run():
+            return await asyncio.gather(flight.ado("key", compute), follower(), follower(),
+                                        return_exceptions=True)
+
+        leader, *followers = asyncio.run(run())
+        self.assertEqual(leader, ("value", False))
+        self.assertTrue(all(isinstance(result, asyncio.TimeoutError) for result in followers))
+        # The key is free again for the next caller.
+        self.assertEqual(asyncio.run(flight.ado("key", compute)), ("value", False))
+
+
+class OutputParserTests(SimpleTestCase):
+    url = "https://github.com/octo/widgets"
+
+    def accept(self, value):
+        return accept_issues(value, self.url)
+
+    def test_malformed_transcripts_keep_the_intact_value(self):
+        rng = random.Random(0)
+        for n in range(300):
+            text, expected = malformed_transcript(rng)
+            scanner = JSONStreamScanner()
+            chunked = []
+            for chunk in chunks(text, rng):
+                chunked.extend(scanner.feed(chunk))
+            chunked.extend(scanner.finish())
+            scanner = JSONStreamScanner()
+            whole = scanner.feed(text) + scanner.finish()
+
+            self.assertEqual(chunked, whole, f"case {n}: chunking changed the result")
+            if expected is not None:
+                self.assertIn(expected, whole, f"case {n}: lost the intact value")
+
+    def test_truncated_answer(self):
+        issues = [sample_issue(n) for n in range(3)]
+        text = json.dumps(issues)
+        first_done = text.index(json.dumps(issues[0])) + len(json.dumps(issues[0]))
+        for cut in range(1, len(text)):
+            result = parse_stream([text[:cut]], self.accept)
+            # Only issues whose object closed before the cut, never a partial one.
+            expected = [0] if cut >= first_done else []
+            self.assertEqual([issue["issue_number"] for issue in result or []], expected, f"cut at {cut}")
+
+    def test_time_is_linear_in_transcript_size(self):
+        rng = random.Random(0)
+        per_mb = []
+        for size_mb in (0.5, 2):
+            text, answer = transcript(int(size_mb * 1024 * 1024), rng)
+            elapsed = None
+            for _ in range(3):
+                started = time.perf_counter()
+                result = parse_stream(chunks(text, rng, 4096), self.accept)
+                run = time.perf_counter() - started
+                elapsed = run if elapsed is None else min(elapsed, run)
+            self.assertEqual([issue["issue_number"] for issue in result], [issue["issue_number"] for issue in answer])
+            per_mb.append(elapsed / size_mb)
+        # Quadratic parsing would be 4x slower per MB on the larger transcript.
+        self.assertLess(max(per_mb) / min(per_mb), 2.5)
+
+
+class ThrottleErrorTests(SimpleTestCase):
+    transcript = 'Found issue "Handle 429 responses: rate limit exceeded" (RESOURCE_EXHAUSTED)'
+
+    def test_transcript_is_not_read(self):
+        error = AgentInvocationError(f"ADK CLI failed. stdout: {self.transcript}, stderr: KeyError('repo')",
+                                     stderr="KeyError('repo')")
+        self.assertFalse(is_throttle_error(error))
+
+    def test_stderr(self):
+        stderr = "google.genai.errors.ClientError: 429 RESOURCE_EXHAUSTED. Quota exceeded"
+        error = AgentInvocationError(f"ADK CLI failed. stdout: , stderr: {stderr}", stderr=stderr)
+        self.assertTrue(is_throttle_error(error))
+
+    def test_status_code_wins(self):
+        self.assertTrue(is_throttle_error(AgentInvocationError("ClientError()", status=429)))
+        self.assertFalse(is_throttle_error(AgentInvocationError(f"ServerError({self.transcript!r})", status=500)))
+
+    def test_pool_error_without_status(self):
+        self.assertTrue(is_throttle_error(AgentInvocationError("ClientError('429 RESOURCE_EXHAUSTED')")))
+        self.assertFalse(is_throttle_error(AgentInvocationError("demo did not answer within 5s")))
+
+
+def read_archive(path):
+    """
+    Records in a gzip NDJSON archive, including one still being written
+    (sync-flushed but without a gzip trailer).
+    """
+    with open(path, "rb") as f:
+        data = zlib.decompressobj(16 + zlib.MAX_WBITS).decompress(f.read())
+    return [json.loads(line) for line in data.decode("utf-8").splitlines()]
+
+
+class RetentionTests(TestCase):
+    def setUp(self):
+        archive_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(archive_dir.cleanup)
+        self.archive_dir = archive_dir.name
+        overrides = override_settings(RETENTION={"ARCHIVE_DIR": self.archive_dir, "CHUNK_SIZE": 2})
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+        cache.clear()
+
+        self.old = timezone.now() - timedelta(days=60)
+        self.expired = []
+        for number in range(1, 6):
+            ticket = make_ticket(number)
+            Ticket.objects.filter(pk=ticket.pk).update(created_at=self.old)
+            JobEvent.objects.create(ticket=ticket, message=f"event {number}", created_at=self.old)
+            self.expired.append(ticket.pk)
+        self.kept = make_ticket(99).pk
+
+    def test_each_chunk_is_archived_before_it_is_deleted(self):
+        atomic = transaction.atomic
+        seen = []
+
+        @contextmanager
+        def checked_atomic(*args, **kwargs):
+            partial = [os.path.join(self.archive_dir, name) for name in os.listdir(self.archive_dir)]
+            archived = [record["pk"] for path in partial for record in read_archive(path)]
+            seen.append(archived)
+            # Everything deleted so far plus this chunk, and still in the database.
+            chunk = archived[(len(seen) - 1) * 2:]
+            self.assertEqual(archived, self.expired[:len(archived)])
+            self.assertEqual(Ticket.objects.filter(pk__in=chunk).count(), len(chunk))
+            with atomic(*args, **kwargs):
+                yield
+
+        with mock.patch.object(retention, "transaction", SimpleNamespace(atomic=checked_atomic)):
+            result = retention.apply_policy("tickets")
+
+        self.assertEqual([len(archived) for archived in seen], [2, 4, 5])
+        self.assertEqual((result.archived, result.deleted, result.chunks), (5, 5, 3))
+        self.assertEqual(list(Ticket.objects.values_list("pk", flat=True)), [self.kept])
+        records = read_archive(result.archive)
+        self.assertEqual([record["pk"] for record in records], self.expired)
+        self.assertEqual(records[0]["related"]["events"][0]["message"], "event 1")
+
+    def test_partial_archive_is_renamed_after_an_error(self):
+        atomic = transaction.atomic
+        calls = []
+
+        @contextmanager
+        def failing_atomic(*args, **kwargs):
+            calls.append(1)
+            if len(calls) == 2:
+                raise RuntimeError("disk full")
+            with atomic(*args, **kwargs):
+                yield
+
+        with mock.patch.object(retention, "transaction", SimpleNamespace(atomic=failing_atomic)), \
+                self.assertRaises(RuntimeError):
+            retention.apply_policy("tickets")
+
+        names = os.listdir(self.archive_dir)
+        self.assertEqual(len(names), 1)
+        self.assertTrue(names[0].endswith(".ndjson.gz"))
+        with gzip.open(os.path.join(self.archive_dir, names[0]), "rt") as f:
+            archived = [json.loads(line)["pk"] for line in f]
+        # The deleted chunk and the one archived when the error came.
+        self.assertEqual(archived, self.expired[:4])
+        self.assertEqual(Ticket.objects.count(), 4)
+
+    def test_dry_run_touches_nothing(self):
+        result = retention.apply_policy("tickets", dry_run=True)
+        self.assertEqual((result.deleted, result.archived, result.archive), (5, 0, None))
+        self.assertEqual(Ticket.objects.count(), 6)
+        self.assertEqual(os.listdir(self.archive_dir), [])
+
+    def test_only_finished_jobs_are_deleted(self):
+        for status in (ExtractionJob.STATUS_PENDING, ExtractionJob.STATUS_RUNNING,
+                       ExtractionJob.STATUS_SUCCEEDED, ExtractionJob.STATUS_FAILED):
+            ExtractionJob.objects.create(url="https://github.com/octo/widgets", status=status)
+        ExtractionJob.objects.update(created_at=self.old)
+
+        result = retention.apply_policy("jobs", archive=False)
+        self.assertEqual(result.deleted, 2)
+        self.assertEqual(
+            set(ExtractionJob.objects.values_list("status", flat=True)),
+            {ExtractionJob.STATUS_PENDING, ExtractionJob.STATUS_RUNNING},
+        )
+
+    def test_session_used_recently_is_kept(self):
+        now = time.time()
+        long_ago = now - 3 * 24 * 3600
+        for key in ("session:idle", "session:active"):
+            cache.set(key, "state")
+            retention.track_session(key, now=long_ago)
+        retention.track_session("session:active", now=now - 60)
+
+        self.assertEqual(retention.evict_idle_sessions(idle_seconds=24 * 3600, now=now), 1)
+        self.assertIsNone(cache.get("session:idle"))
+        self.assertEqual(cache.get("session:active"), "state")
+
+
+class ScriptedGitHubClient(GitHubClient):
+    """
+    Answers fetch_updated_issues with the queued SyncBatch (or raises the
+    queued error) and records each call's (since, etag).
+    """
+
+    def __init__(self, *responses):
+        self.responses = list(responses)
+        self.calls = []
+
+    def get_issue(self, owner, repo, issue_number):
+        raise GitHubClientError("not scripted")
+
+    def list_issues(self, owner, repo, state="open", since=None, per_page=30, page=1):
+        raise GitHubClientError("not scripted")
+
+    def fetch_updated_issues(self, owner, repo, since=None, etag=None, per_page=100):
+        self.calls.append((since, etag))
+        response = self.responses.pop(0)
+        if isinstance(response, Exception):
+            raise response
+        return response
+
+
+def updated(number, timestamp):
+    return {**make_issue("octo", "widgets", number), "updated_at": timestamp}
+
+
+class RepoSyncTests(TestCase):
+    def setUp(self):
+        self.state = RepoSyncState.objects.create(owner="octo", repo="widgets")
+
+    def sync(self, *responses):
+        client = ScriptedGitHubClient(*responses)
+        result = sync_repo(self.state, client)
+        self.state.refresh_from_db()
+        return result, client.calls
+
+    def test_cursor_moves_to_newest_update_and_etag_follows_it(self):
+        result, calls = self.sync(SyncBatch(
+            [updated(1, "2024-05-01T10:00:00Z"), updated(2, "2024-05-03T10:00:00Z")], '"v1"', False
+        ))
+        self.assertEqual(calls, [(None, None)])
+        self.assertEqual((result.status, result.created), ("synced", 2))
+        self.assertEqual(self.state.cursor.isoformat(), "2024-05-03T10:00:00+00:00")
+        # The cursor moved, so the ETag was for another URL.
+        self.assertEqual(self.state.etag, "")
+
+        # `since` is inclusive: the issue at the cursor comes back unchanged.
+        _, calls = self.sync(SyncBatch([updated(2, "2024-05-03T10:00:00Z")], '"v2"', False))
+        self.assertEqual(calls, [("2024-05-03T10:00:00Z", None)])
+        self.assertEqual(self.state.etag, '"v2"')
+
+        # An older timestamp never moves the cursor back.
+        _, calls = self.sync(SyncBatch([updated(1, "2024-04-01T10:00:00Z")], '"v3"', False))
+        self.assertEqual(calls, [("2024-05-03T10:00:00Z", '"v2"')])
+        self.assertEqual(self.state.cursor.isoformat(), "2024-05-03T10:00:00+00:00")
+        self.assertEqual(self.state.etag, '"v3"')
+
+    def test_not_modified_changes_nothing(self):
+        self.sync(SyncBatch([updated(1, "2024-05-03T10:00:00Z")], None, False))
+        self.sync(SyncBatch([updated(1, "2024-05-03T10:00:00Z")], '"v1"', False))
+        before = (self.state.cursor, self.state.etag, self.state.issues_synced)
+
+        result, calls = self.sync(SyncBatch([], None, True))
+        self.assertEqual(calls, [("2024-05-03T10:00:00Z", '"v1"')])
+        self.assertEqual(result.status, "not_modified")
+        self.assertEqual((self.state.cursor, self.state.etag, self.state.issues_synced), before)
+        self.assertEqual(self.state.last_status, "not_modified")
+        self.assertEqual(Ticket.objects.count(), 1)
+
+    def test_client_error_is_recorded(self):
+        self.sync(SyncBatch([updated(1, "2024-05-03T10:00:00Z")], None, False))
+        cursor = self.state.cursor
+
+        result, _ = self.sync(GitHubClientError("502 Bad Gateway"))
+        self.assertEqual(result.status, "error")
+        self.assertEqual((self.state.last_status, self.state.last_error), ("error", "502 Bad Gateway"))
+        self.assertEqual(self.state.cursor, cursor)
+
+
+CRASH_REPORT = (
+    "Saving the settings page crashes with a KeyError when the notification section is left empty. "
+    "Steps: open settings, clear every notification checkbox, press save. Traceback (most recent call last): "
+    "File settings/forms.py line 88 in clean_notifications KeyError: email. Expected the page to save and "
+    "show the confirmation banner instead of a server error."
+)
+
+
+class SimilarityTests(TestCase):
+    def setUp(self):
+        # The LSH index is per process; start each test from an empty one.
+        similarity._index = None
+        self.addCleanup(setattr, similarity, "_index", None)
+        self.original = make_ticket(1, title="Settings save crashes with KeyError", body=CRASH_REPORT)
+        suggestion_cache.store_suggestion(self.original, {"suggested_fix": "Default missing keys", "files_to_fix": []})
+
+    def test_near_duplicate_reuses_the_suggestion(self):
+        # Only the numbers differ, which shingling ignores, plus one word.
+        body = CRASH_REPORT.replace("line 88", "line 91").replace("press save", "click save")
+        duplicate = make_ticket(2, title="Settings save crashes with KeyError", body=body)
+        (neighbour, score), = similarity.similar_tickets(duplicate)
+        self.assertEqual(neighbour, self.original.id)
+        self.assertGreaterEqual(score, similarity.get_similarity_settings()["REUSE_THRESHOLD"])
+
+        payload = suggestion_cache.reused_suggestion(duplicate)
+        self.assertEqual(payload["suggested_fix"], "Default missing keys")
+        self.assertEqual(payload["reused_from"]["ticket_id"], self.original.id)
+        self.assertEqual(payload["reused_from"]["similarity"], score)
+
+    def test_unrelated_ticket_is_not_reused(self):
+        unrelated = make_ticket(2, title="Dark mode colours are too faint",
+                                body="The sidebar text in dark mode has low contrast and is hard to read.")
+        self.assertIsNone(suggestion_cache.reused_suggestion(unrelated))
+
+    def test_ticket_from_another_repo_is_not_reused(self):
+        elsewhere = make_ticket(1, repo="gadgets", title="Settings save crashes with KeyError", body=CRASH_REPORT)
+        self.assertEqual(similarity.similar_tickets(elsewhere)[0][1], 1.0)
+        self.assertIsNone(suggestion_cache.reused_suggestion(elsewhere))
+
+
+class LSHIndexTests(SimpleTestCase):
+    def setUp(self):
+        hasher = similarity.MinHasher(128, 1)
+        self.first = hasher.signature(CRASH_REPORT)
+        self.second = hasher.signature("The sidebar text in dark mode has low contrast and is hard to read.")
+        self.lsh = similarity.LSHIndex(128, 32)
+
+    def bucket_entries(self):
+        return [ticket_id for band in self.lsh._buckets for bucket in band.values() for ticket_id in bucket]
+
+    def test_re_adding_replaces_the_old_buckets(self):
+        self.lsh.add(7, self.first)
+        self.lsh.add(7, self.second)
+        self.assertEqual(self.bucket_entries(), [7] * 32)
+        self.assertEqual(self.lsh.query(self.first), [])
+        self.assertEqual(self.lsh.query(self.second), [(7, 1.0)])
+
+    def test_remove_leaves_no_buckets(self):
+        self.lsh.add(7, self.first)
+        self.lsh.add(8, self.first)
+        self.lsh.remove(7)
+        self.assertEqual(self.lsh.query(self.first), [(8, 1.0)])
+        self.lsh.remove(8)
+        self.assertEqual(len(self.lsh), 0)
+        self.assertTrue(all(not band for band in self.lsh._buckets))
+
+
+@override_settings(SIMILARITY={"REUSE": False}, SINGLEFLIGHT={"STORE": "none"})
+class SuggestionCacheTests(TestCase):
+    def setUp(self):
+        suggestion_cache._lru.clear()
+        self.addCleanup(suggestion_cache._lru.clear)
+        self.ticket = make_ticket(1, title="Crash on save", body="KeyError: email")
+        agent = mock.patch.object(suggestion_cache, "suggest_fix_for_ticket",
+                                  side_effect=lambda ticket: {"suggested_fix": f"Fix for {ticket.title}"})
+        self.agent = agent.start()
+        self.addCleanup(agent.stop)
+
+    def test_served_from_memory_then_database(self):
+        self.assertEqual(suggestion_cache.get_or_generate_suggestion(self.ticket)[1], "agent")
+        self.assertEqual(suggestion_cache.get_or_generate_suggestion(self.ticket)[1], "memory")
+        suggestion_cache._lru.clear()
+        payload, source = suggestion_cache.get_or_generate_suggestion(self.ticket)
+        self.assertEqual((payload, source), ({"suggested_fix": "Fix for Crash on save"}, "db"))
+        self.assertEqual(self.agent.call_count, 1)
+        self.assertEqual(SuggestedFix.objects.get().hits, 1)
+
+    def test_expired_row_is_not_served(self):
+        suggestion_cache.get_or_generate_suggestion(self.ticket)
+        suggestion_cache._lru.clear()
+        SuggestedFix.objects.update(expires_at=timezone.now() - timedelta(seconds=1))
+        self.assertEqual(suggestion_cache.get_or_generate_suggestion(self.ticket)[1], "agent")
+        self.assertEqual(self.agent.call_count, 2)
+        # Regenerated under the same key.
+        self.assertGreater(SuggestedFix.objects.get().expires_at, timezone.now())
+
+    def test_force_bypasses_the_cache(self):
+        suggestion_cache.get_or_generate_suggestion(self.ticket)
+        self.assertEqual(suggestion_cache.get_or_generate_suggestion(self.ticket, force=True)[1], "agent")
+        self.assertEqual(self.agent.call_count, 2)
+        self.assertEqual(SuggestedFix.objects.count(), 1)
+
+    def test_edited_ticket_drops_its_old_suggestions(self):
+        suggestion_cache.get_or_generate_suggestion(self.ticket)
+        old_key = SuggestedFix.objects.get().cache_key
+
+        self.ticket.title = "Crash on save when email is empty"
+        self.ticket.save()
+        self.assertFalse(SuggestedFix.objects.filter(cache_key=old_key).exists())
+        self.assertNotIn(old_key, suggestion_cache._lru)
+
+        payload, source = suggestion_cache.get_or_generate_suggestion(self.ticket)
+        self.assertEqual((payload["suggested_fix"], source), ("Fix for Crash on save when email is empty", "agent"))
+
+    def test_status_change_keeps_the_suggestion(self):
+        suggestion_cache.get_or_generate_suggestion(self.ticket)
+        self.ticket.status = Ticket.STATUS_SOLVED
+        self.ticket.save()
+        self.assertEqual(suggestion_cache.get_or_generate_suggestion(self.ticket)[1], "memory")
+
+
+@override_settings(SINGLEFLIGHT={"STORE": "none"})
+class SuggestionWarmupTests(TransactionTestCase):
+    # Suggestions are generated on worker threads, with their own connections.
+
+    def setUp(self):
+        suggestion_cache._lru.clear()
+        self.tickets = [make_ticket(number) for number in range(1, 6)]
+        self.answered = []
+        self.fail_on = set()
+        self.interrupt_on = None
+        agent = mock.patch.object(suggestion_warmup, "suggest_fix_for_ticket", side_effect=self.answer)
+        agent.start()
+        self.addCleanup(agent.stop)
+
+    def answer(self, ticket):
+        if ticket.issue_number == self.interrupt_on:
+            self.interrupt_on = None
+            raise KeyboardInterrupt
+        self.answered.append(ticket.issue_number)
+        return None if ticket.issue_number in self.fail_on else {"suggested_fix": f"Fix {ticket.issue_number}"}
+
+    def run_warmup(self, **kwargs):
+        run = suggestion_warmup.start_or_resume_warmup(**kwargs)
+        return suggestion_warmup.run_warmup(run, concurrency=1, page_size=1)
+
+    def test_interrupted_run_resumes_with_its_counters(self):
+        self.fail_on = {4}
+        self.interrupt_on = 2
+        with self.assertRaises(KeyboardInterrupt):
+            self.run_warmup()
+        interrupted = SuggestionWarmup.objects.get()
+        self.assertEqual(interrupted.status, SuggestionWarmup.STATUS_INTERRUPTED)
+        self.assertEqual((interrupted.processed, interrupted.succeeded, interrupted.failed), (3, 2, 1))
+
+        run = self.run_warmup()
+        self.assertEqual(run.id, interrupted.id)
+        self.assertEqual(run.status, SuggestionWarmup.STATUS_COMPLETED)
+        self.assertEqual((run.processed, run.succeeded, run.failed, run.total), (5, 4, 1, 5))
+        # Newest first; 4 failed before the interruption and isn't retried.
+        self.assertEqual(self.answered, [5, 4, 3, 2, 1])
+
+    def test_failed_tickets_are_skipped_for_the_rest_of_the_run(self):
+        self.fail_on = {3}
+        run = self.run_warmup()
+        self.assertEqual(run.failed_ticket_ids, [self.tickets[2].id])
+        self.assertEqual(sorted(self.answered), [1, 2, 3, 4, 5])
+        self.assertEqual(SuggestedFix.objects.count(), 4)
+
+    def test_label_order_puts_security_first(self):
+        for ticket, labels in zip(self.tickets, [["bug"], [], ["security"], ["docs"], ["critical", "bug"]]):
+            Ticket.objects.filter(pk=ticket.pk).update(labels=labels)
+        self.run_warmup(order=SuggestionWarmup.ORDER_LABEL)
+        self.assertEqual(self.answered, [3, 5, 1, 4, 2])
+
+    def test_limit_is_respected(self):
+        run = self.run_warmup(limit=2)
+        self.assertEqual((run.processed, run.total), (2, 2))
+        self.assertEqual(self.answered, [5, 4])
+
+
+class TicketExportTests(TestCase):
+    def export(self, params, export_format="ndjson", compress=False):
+        return b"".join(export_stream("tickets", params, export_format, compress))
+
+    def test_empty_csv_export_has_the_header(self):
+        data = self.export({"repo": "nothing-here"}, "csv").decode()
+        self.assertEqual(data.splitlines(), [
+            "id,owner,repo,issue_number,title,body,labels,type,status,created_at",
+        ])
+
+    def test_bare_until_date_includes_that_whole_day(self):
+        day = timezone.make_aware(datetime(2024, 5, 3))
+        for number, moment in enumerate([day, day + timedelta(hours=23, minutes=59), day + timedelta(days=1)]):
+            ticket = make_ticket(number)
+            Ticket.objects.filter(pk=ticket.pk).update(created_at=moment)
+
+        rows = [json.loads(line) for line in self.export({"since": "2024-05-03", "until": "2024-05-03"}).splitlines()]
+        self.assertEqual([row["issue_number"] for row in rows], [0, 1])
+
+    def test_invalid_since_fails_before_the_first_block(self):
+        with self.assertRaises(ExportError):
+            export_stream("tickets", {"since": "last tuesday"})
+        response = self.client.get(reverse("export", args=["tickets"]), {"since": "last tuesday"})
+        self.assertEqual(response.status_code, 400)
+
+    def test_gzip_output_decompresses_to_the_same_ndjson(self):
+        for number in range(1, 4):
+            make_ticket(number, body="Traceback (most recent call last):\n" * 20)
+        plain = self.export({})
+        self.assertEqual(len(plain.splitlines()), 3)
+        self.assertEqual(gzip.decompress(self.export({}, compress=True)), plain)
+
+
+class ConversationTests(SimpleTestCase):
+    def long_exchange(self, n):
+        question = f"Why does step {n} fail? " + "It happens again after the retry loop finishes. " * 40
+        answer = f"Step {n} fails because the worker times out. " + "Raise the timeout and retry with backoff. " * 40
+        return question, answer
+
+    def test_many_turns_stay_within_the_history_and_session_limits(self):
+        config = conversations.get_conversation_settings()
+        session = None
+        for n in range(60):
+            session = conversations.add_turn(session, 1, *self.long_exchange(n))
+            self.assertLessEqual(len(session["turns"]), config["MAX_TURNS"])
+            self.assertLessEqual(count_tokens(conversations.render_history(session)), config["HISTORY_TOKENS"])
+            self.assertLessEqual(len(json.dumps(session)), config["MAX_SESSION_BYTES"])
+        self.assertEqual(session["summarized"] + len(session["turns"]), 60)
+
+    def test_small_session_limit_still_bounds_the_session(self):
+        config = dict(conversations.get_conversation_settings(), MAX_SESSION_BYTES=4096)
+        session = None
+        for n in range(30):
+            session = conversations.add_turn(session, 1, *self.long_exchange(n), config=config)
+            self.assertLessEqual(len(json.dumps(session)), 4096)
+
+    def test_facts_survive_folding(self):
+        session = conversations.add_turn(
+            None, 1, "The crash is a KeyError in issues/views.py, see https://example.com/issues/7",
+            "load_ticket() raises it on v2.3.1 when the id is missing.",
+        )
+        for n in range(10):
+            session = conversations.add_turn(session, 1, *self.long_exchange(n))
+        self.assertNotIn("KeyError", json.dumps(session["turns"]))
+        for fact in ["KeyError", "issues/views.py", "https://example.com/issues/7", "load_ticket()", "v2.3.1"]:
+            self.assertIn(fact, session["facts"])
+        history = conversations.render_history(session)
+        self.assertIn("Facts so far: ", history)
+        self.assertIn("issues/views.py", history)
+
+
+class JobEventStreamTests(TestCase):
+    def setUp(self):
+        self.job = ExtractionJob.objects.create(url="https://github.com/octo/widgets",
+                                                status=ExtractionJob.STATUS_RUNNING)
+        with EventBuffer(job=self.job) as events:
+            for n in range(1, 6):
+                events.info(f"Step {n}", stage="fetch")
+        self.url = reverse("job_events", args=[self.job.id])
+
+    def finish_job(self, *args):
+        self.job.status = ExtractionJob.STATUS_SUCCEEDED
+        self.job.save(update_fields=["status", "updated_at"])
+
+    def parse(self, body):
+        """
+        The stream's events as (event, id, data) tuples.
+        """
+        parsed = []
+        for block in body.strip().split("\n\n"):
+            fields = dict(line.split(": ", 1) for line in block.splitlines())
+            if "event" in fields:
+                parsed.append((fields["event"], fields.get("id"), json.loads(fields["data"])))
+        return parsed
+
+    def test_job_events_reads_after_a_sequence_number(self):
+        self.assertEqual([event.seq for event in job_events(self.job.id)], [1, 2, 3, 4, 5])
+        self.assertEqual([event.message for event in job_events(self.job.id, after=3)], ["Step 4", "Step 5"])
+
+    def test_last_event_id_resumes_after_that_event(self):
+        self.finish_job()
+        response = self.client.get(self.url, HTTP_LAST_EVENT_ID="2")
+        events = self.parse(b"".join(response.streaming_content).decode())
+        self.assertEqual([(event, event_id) for event, event_id, _ in events],
+                         [("log", "3"), ("log", "4"), ("log", "5"), ("done", None)])
+        self.assertEqual(events[0][2]["message"], "Step 3")
+
+    def test_stream_closes_when_the_job_finishes(self):
+        # Each poll finishes the job; the stream must end on the next one.
+        with mock.patch.object(views, "time", SimpleNamespace(monotonic=time.monotonic, sleep=self.finish_job)):
+            response = self.client.get(self.url, HTTP_LAST_EVENT_ID="5")
+            events = self.parse(b"".join(response.streaming_content).decode())
+        self.assertEqual([event for event, _, _ in events], ["progress", "done"])
+        self.assertEqual(events[-1][2]["status"], ExtractionJob.STATUS_SUCCEEDED)
+
+    async def test_async_stream_resumes_and_closes(self):
+        self.job.status = ExtractionJob.STATUS_FAILED
+        await self.job.asave(update_fields=["status", "updated_at"])
+        response = await AsyncClient().get(self.url, headers={"Last-Event-ID": "4"})
+        body = "".join([chunk.decode() async for chunk in response.streaming_content])
+        self.assertEqual([(event, event_id) for event, event_id, _ in self.parse(body)],
+                         [("log", "5"), ("done", None)])
+
+
+class ThreadProcess:
+    """
+    A pool worker in a thread of this process, so the worker can use a
+    patched _AgentRunner. terminate() only marks it dead. Use with
+    queue.Queue request and response queues.
+    """
+
+    def __init__(self, target, args, name, daemon):
+        self.thread = threading.Thread(target=target, args=args, name=name, daemon=True)
+        self.terminated = False
+        self.pid = None
+
+    def start(self):
+        self.thread.start()
+        self.pid = self.thread.native_id
+
+    def is_alive(self):
+        return self.thread.is_alive() and not self.terminated
+
+    def terminate(self):
+        self.terminated = True
+
+    def join(self, timeout=None):
+        if not self.terminated:
+            self.thread.join(timeout)
+
+
+class AgentPoolTests(SimpleTestCase):
+    def setUp(self):
+        self.loaded = []
+        self.release = threading.Event()
+        self.addCleanup(self.release.set)
+
+    def runner(self, agent_name):
+        self.loaded.append(agent_name)
+        return FakeAgentRunner(agent_name, latency=0)
+
+    def issue_id(self, output):
+        return parse_stream([output], lambda value: value if isinstance(value, dict) else None)["issue_id"]
+
+    def start_pool(self, runner=None, **options):
+        options = {"size": 1, "max_requests": 100, "request_timeout": 5, "heartbeat_interval": 0.05,
+                   "heartbeat_timeout": 5, "startup_timeout": 5, "restart_backoff": 0, **options}
+        patcher = mock.patch.object(agent_pool, "_AgentRunner", runner or self.runner)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        pool = agent_pool.AgentPool("github_suggest_fix", **options)
+        pool._ctx = SimpleNamespace(Process=ThreadProcess)
+        pool._requests, pool._responses = queue.Queue(), queue.Queue()
+        pool.start()
+        self.addCleanup(pool.shutdown, 1)
+        return pool
+
+    def test_warm_worker_serves_every_request(self):
+        pool = self.start_pool()
+        for number in range(1, 4):
+            output = pool.run(f"Fix https://github.com/octo/widgets/issues/{number}")
+            self.assertEqual(self.issue_id(output), number)
+        self.assertEqual(self.loaded, ["github_suggest_fix"])
+        self.assertEqual(pool.health()["workers"][0]["served"], 3)
+
+    def test_worker_is_recycled_after_max_requests(self):
+        pool = self.start_pool(max_requests=2)
+        for number in range(1, 6):
+            pool.run(f"Fix https://github.com/octo/widgets/issues/{number}")
+        self.assertEqual(len(self.loaded), 3)
+        self.assertEqual(pool.health()["recycled"], 2)
+
+    def test_hung_worker_fails_its_request_and_is_replaced(self):
+        def runner(agent_name):
+            fake = self.runner(agent_name)
+            if len(self.loaded) == 1:
+                fake.run = lambda prompt_text: self.release.wait()
+            return fake
+
+        pool = self.start_pool(runner, request_timeout=0.2)
+        with self.assertRaisesRegex(AgentInvocationError, "hung"):
+            pool.submit("Fix https://github.com/octo/widgets/issues/1").result(timeout=5)
+        output = pool.run("Fix https://github.com/octo/widgets/issues/2")
+        self.assertEqual(self.issue_id(output), 2)
+        self.assertEqual(len(self.loaded), 2)
+
+    def test_failed_worker_leaves_requests_for_one_still_starting(self):
+        def runner(agent_name):
+            self.loaded.append(agent_name)
+            if len(self.loaded) == 1:
+                # Fail only once a request is waiting, while worker 2 loads.
+                self.release.wait(5)
+                raise RuntimeError("no such agent")
+            time.sleep(0.3)
+            return FakeAgentRunner(agent_name, latency=0)
+
+        pool = self.start_pool(runner, size=2, restart_backoff=60)
+        future = pool.submit("Fix https://github.com/octo/widgets/issues/7")
+        self.release.set()
+        output = future.result(timeout=5)
+        self.assertEqual(self.issue_id(output), 7)
+        self.assertIn("no such agent", pool.health()["last_error"])
+
+
+class PromptCompactionTests(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+
+    def test_repeated_lines_are_folded(self):
+        lines = [f"2024-05-0{n % 9 + 1} 10:00:{n:02d} worker {n} retrying connection" for n in range(50)]
+        folded = prompts.collapse_repeated_lines("\n".join(["Starting", *lines, "Done"]))
+        self.assertEqual(folded.splitlines(), [
+            "Starting", lines[0], "    [previous line repeated 49 more times]", "Done",
+        ])
+
+    def test_log_lines_seen_earlier_are_dropped(self):
+        text = "ERROR cache miss for key 1\nretrying\nERROR cache miss for key 2\nERROR cache miss for key 3\nok"
+        self.assertEqual(prompts.collapse_repeated_lines(text).splitlines(), [
+            "ERROR cache miss for key 1", "retrying", "    [2 repeated log lines omitted]", "ok",
+        ])
+
+    def test_long_stack_trace_keeps_its_distinctive_frames(self):
+        frames = [f'  File "/usr/lib/python3.11/site-packages/lib/mod{n}.py", line {n}, in call{n}\n    call()'
+                  for n in range(30)]
+        frames[0] = '  File "/app/manage.py", line 10, in main\n    run()'
+        frames[15] = '  File "/app/issues/views.py", line 42, in suggest\n    fix = build(ticket)'
+        text = "Traceback (most recent call last):\n" + "\n".join(frames) + "\nKeyError: 'id'"
+        collapsed = prompts.collapse_stack_traces(text, max_frames=8)
+        kept = [line for line in collapsed.splitlines() if line.lstrip().startswith("File ")]
+        self.assertLessEqual(len(kept), 8)
+        for needle in ["/app/manage.py", "/app/issues/views.py", "mod28.py", "mod29.py", "KeyError: 'id'"]:
+            self.assertIn(needle, collapsed)
+        self.assertIn("... 14 frames omitted ...", collapsed)
+
+    def test_water_fill_keeps_small_segments_and_splits_the_rest(self):
+        self.assertEqual(prompts._water_fill([10, 500, 1000], 300), [10, 145, 145])
+        self.assertEqual(prompts._water_fill([10, 20], 300), [10, 20])
+
+    def test_compacted_text_stays_within_the_budget(self):
+        rng = random.Random(1)
+        words = "the worker crashes when the queue is drained and retried after a timeout".split()
+
+        def prose(n):
+            return " ".join(rng.choice(words) for _ in range(n))
+
+        def code(n):
+            return "```python\n" + "\n".join(f"value_{i} = compute(item_{i}, retries={i})" for i in range(n)) + "\n```"
+
+        segments = [prose(300), code(80), prose(50), code(5), prose(500), code(200)]
+        for budget in (60, 100, 200, 400, 800):
+            for start in range(4):
+                text = "\n\n".join(segments[start:])
+                compacted = prompts.compact_text(text, budget)
+                self.assertLessEqual(prompts.count_tokens(compacted), budget, (budget, start))
+                if budget >= 200:
+                    # Every segment keeps its opening lines.
+                    self.assertIn(segments[start][:40] if start % 2 == 0 else "```python", compacted)
+
+    def test_async_record_prompt_counts_like_record_prompt(self):
+        prompts.record_prompt("github_mcp", "one two six ten", "one two")
+        asyncio.run(prompts.arecord_prompt("github_mcp", "one two six ten", "one two"))
+        stats = prompts.prompt_stats()["github_mcp"]
+        self.assertEqual((stats["prompts"], stats["compacted"], stats["raw_tokens"], stats["sent_tokens"]),
+                         (2, 2, 8, 4))
+
+
+class TelemetryTests(TestCase):
+    def request_count(self, route, status_code=200):
+        """
+        The http.server.request.duration sample count for a route, from /metrics.
+        """
+        response = self.client.get("/metrics")
+        self.assertTrue(response["Content-Type"].startswith("text/plain; version=0.0.4"))
+        prefix = f'http_server_request_duration_seconds_count{{method="GET",route="{route}",status_code="{status_code}"}} '
+        for line in response.content.decode().splitlines():
+            if line.startswith(prefix):
+                return int(line[len(prefix):])
+        return 0
+
+    def test_request_is_recorded_under_its_route_pattern(self):
+        job = ExtractionJob.objects.create(url="https://github.com/octo/widgets")
+        route = "/issues/jobs/<uuid:job_id>/log/"
+        before = self.request_count(route)
+        for _ in range(2):
+            self.assertEqual(self.client.get(reverse("job_log", args=[job.id])).status_code, 200)
+        self.assertEqual(self.request_count(route), before + 2)
+        self.assertNotIn(str(job.id), self.client.get("/metrics").content.decode())
+
+    def test_metrics_are_in_the_prometheus_text_format(self):
+        self.client.get(reverse("prompt_stats"))
+        text = self.client.get("/metrics").content.decode()
+        name = "http_server_request_duration_seconds"
+        self.assertIn(f"# TYPE {name} histogram", text)
+        labels = 'method="GET",route="/issues/prompt-stats/",status_code="200"'
+        buckets = [line for line in text.splitlines() if line.startswith(f"{name}_bucket{{{labels},")]
+        self.assertEqual(buckets[-1].split(" ")[0], f'{name}_bucket{{{labels},le="+Inf"}}')
+        counts = [int(line.rsplit(" ", 1)[1]) for line in buckets]
+        self.assertEqual(counts, sorted(counts))
+        self.assertIn(f"{name}_count{{{labels}}} {counts[-1]}", text)
+        self.assertRegex(text, rf"{name}_sum\{{{labels}\}} \d")
+
+
+@override_settings(
+    ADK_AGENT_POOL={**settings.ADK_AGENT_POOL, "ENABLED": True},
+    GEMINI_RATE_LIMIT={**settings.GEMINI_RATE_LIMIT, "ENABLED": False},
+    SINGLEFLIGHT={"STORE": "none"},
+)
+class AsyncViewTests(TestCase):
+    def setUp(self):
+        suggestion_cache._lru.clear()
+        self.addCleanup(suggestion_cache._lru.clear)
+        similarity._index = None
+        self.addCleanup(setattr, similarity, "_index", None)
+        self.pools = {}
+        get_pool = mock.patch.object(agent_pool, "get_pool", side_effect=lambda agent_name: self.pools.setdefault(
+            agent_name, mock.Mock(wraps=FakeAgentPool(agent_name, latency=0))))
+        get_pool.start()
+        self.addCleanup(get_pool.stop)
+        self.ticket = make_ticket(7, title="Crash on save", body="KeyError: email")
+
+    async def test_create_tickets_returns_202_with_the_job(self):
+        with mock.patch.object(extraction_jobs, "_dispatch") as dispatch:
+            response = await AsyncClient().get(reverse("create_tickets"),
+                                               {"url": "https://github.com/octo/widgets/issues/3"})
+        self.assertEqual(response.status_code, 202)
+        body = response.json()
+        job = await ExtractionJob.objects.aget(id=body["job_id"])
+        dispatch.assert_called_once_with(job)
+        self.assertEqual(body, {
+            "job_id": str(job.id),
+            "status": ExtractionJob.STATUS_PENDING,
+            "status_url": reverse("job_status", args=[job.id]),
+            "events_url": reverse("job_events", args=[job.id]),
+        })
+
+    async def test_create_tickets_rejects_bad_input(self):
+        client = AsyncClient()
+        self.assertEqual((await client.get(reverse("create_tickets"))).status_code, 400)
+        response = await client.get(reverse("create_tickets"), {
+            "url": "https://github.com/octo/widgets", "start_date": "2024-05-03", "end_date": "2024-05-01",
+        })
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(await ExtractionJob.objects.aexists())
+
+    async def test_suggest_fix_is_generated_once_then_cached(self):
+        client = AsyncClient()
+        url = reverse("suggest_fix_for_issue", args=[self.ticket.id])
+        first = await client.get(url)
+        self.assertEqual((first.status_code, first.context["suggestion_source"]), (200, "agent"))
+        self.assertContains(first, "Synthetic fix")
+
+        second = await client.get(url)
+        self.assertEqual(second.context["suggestion_source"], "memory")
+        self.assertContains(second, "Synthetic fix")
+        self.assertEqual(self.pools["github_suggest_fix"].submit.call_count, 1)
+
+    async def test_stored_suggestion_is_served_without_the_agent(self):
+        key = await suggestion_cache.asuggestion_cache_key(self.ticket)
+        await suggestion_cache.astore_suggestion(self.ticket, {"suggested_fix": "Check the email field"}, key)
+        suggestion_cache._lru.clear()
+        response = await AsyncClient().get(reverse("suggest_fix_for_issue", args=[self.ticket.id]))
+        self.assertEqual(response.context["suggestion_source"], "db")
+        self.assertContains(response, "Check the email field")
+        self.assertEqual(self.pools, {})
+
+
+class LoadTestCommandTests(TransactionTestCase):
+    def test_both_handlers_answer_every_request(self):
+        out = StringIO()
+        call_command("loadtest_agents", requests=4, latency_ms=0, threads=2, stdout=out)
+        lines = out.getvalue().splitlines()
+        self.assertEqual([line.split()[0] for line in lines], ["wsgi", "asgi"])
+        for line in lines:
+            self.assertIn(" 4 requests", line)
+            self.assertTrue(line.endswith("errors 0"), line)
+        self.assertFalse(Ticket.objects.filter(owner="loadtest").exists())
+
+
+class BenchmarkCommandTests(SimpleTestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+
+    def results(self, **p95_ms):
+        return {"version": 1, "options": {"requests": 3}, "scenarios": {
+            name: {"operations": 3, "errors": 0, "throughput_rps": 100.0, "p50_ms": 10.0, "p95_ms": value,
+                   "p99_ms": 20.0, "peak_rss_mb": 100.0}
+            for name, value in p95_ms.items()
+        }}
+
+    def save(self, name, results):
+        path = os.path.join(self.directory, name)
+        with open(path, "w") as f:
+            json.dump(results, f)
+        return path
+
+    def compare(self, baseline, current):
+        out = StringIO()
+        call_command("benchmark_compare", self.save("baseline.json", baseline), self.save("current.json", current),
+                     stdout=out, stderr=StringIO())
+        return out.getvalue()
+
+    def test_benchmark_runs_on_a_tiny_dataset(self):
+        # In its own process: the benchmark sets up a test database of its own.
+        path = os.path.join(self.directory, "run.json")
+        subprocess.run(
+            [sys.executable, "manage.py", "benchmark", "--scenarios", "suggest_fix,view_tickets",
+             "--requests", "3", "--concurrency", "2", "--latency-ms", "0", "--tickets", "10", "--repos", "2",
+             "--output", path],
+            cwd=settings.BASE_DIR, check=True, capture_output=True, timeout=120,
+        )
+        with open(path) as f:
+            results = json.load(f)
+        self.assertEqual(sorted(results["scenarios"]), ["suggest_fix", "view_tickets"])
+        for summary in results["scenarios"].values():
+            self.assertEqual((summary["operations"], summary["errors"]), (3, 0))
+            self.assertLessEqual(summary["p50_ms"], summary["p95_ms"])
+        self.assertIn("No regressions", self.compare(results, results))
+
+    def test_compare_flags_a_slower_scenario(self):
+        with self.assertRaisesRegex(CommandError, "1 regression"):
+            self.compare(self.results(suggest_fix=15.0, view_tickets=15.0),
+                         self.results(suggest_fix=30.0, view_tickets=15.5))
+
+    def test_compare_ignores_changes_under_the_threshold(self):
+        output = self.compare(self.results(suggest_fix=15.0), self.results(suggest_fix=16.0))
+        self.assertNotIn("REGRESSION", output)
+        self.assertIn("No regressions", output)
+
+    def test_compare_flags_new_errors(self):
+        current = self.results(suggest_fix=15.0)
+        current["scenarios"]["suggest_fix"]["errors"] = 1
+        with self.assertRaisesRegex(CommandError, "1 regression"):
+            self.compare(self.results(suggest_fix=15.0), current)
@@ -6,7 +6,20 @@ from . import views
 urlpatterns = [
     path('', views.home, name='home'),  
     path('create-tickets/', views.create_tickets_view, name='create_tickets'),  
+    path('jobs/<uuid:job_id>/', views.job_status_view, name='job_status'),
+    path('jobs/<uuid:job_id>/events/', views.job_events_view, name='job_events'),
+    path('jobs/<uuid:job_id>/log/', views.job_log_view, name='job_log'),
     path('view-tickets/', views.view_tickets, name='view_tickets'),  
     path('update-ticket/', views.update_ticket, name='update_ticket'),  
     path('suggest_fix_for_issue/<int:ticket_id>/', views.suggest_fix_view, name='suggest_fix_for_issue'),
+    path('tickets/search/', views.search_tickets_view, name='search_tickets'),
+    path('export/<str:dataset>/', views.export_view, name='export'),
+    path('tickets/<int:ticket_id>/similar/', views.similar_tickets_view, name='similar_tickets'),
+    path('suggest-fixes/batch/', views.suggest_fixes_batch_view, name='suggest_fixes_batch'),
+    path('agent-pool/health/', views.agent_pool_health, name='agent_pool_health'),
+    path('agent-limits/', views.agent_limits_view, name='agent_limits'),
+    path('prompt-stats/', views.prompt_stats_view, name='prompt_stats'),
+    path('mcp-pool/stats/', views.mcp_pool_view, name='mcp_pool_stats'),
+    path('suggestion-cache/stats/', views.suggestion_cache_stats, name='suggestion_cache_stats'),
+    path('suggestion-warmup/', views.suggestion_warmup_status, name='suggestion_warmup_status'),
 ]
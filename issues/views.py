@@ -1,22 +1,52 @@
 # issues/views.py
 from django.shortcuts import render
-from django.http import JsonResponse
-from issues.services.adk_integration import get_issues_from_url
+from django.http import Http404, HttpResponse, JsonResponse, StreamingHttpResponse
+from django.core.handlers.asgi import ASGIRequest
+from asgiref.sync import sync_to_async
+from django.urls import reverse
+from urllib.parse import urlencode
+from issues.services.extraction_jobs import asubmit_extraction_job
+from issues.services.job_events import LEVELS, ajob_events, job_events
+from issues.services.ticket_listing import (
+    DEFAULT_PAGE_SIZE,
+    FILTER_FIELDS,
+    InvalidCursor,
+    filter_tickets,
+    keyset_page,
+)
+from issues.services.ticket_export import CONTENT_TYPES, ExportError, export_filename, export_stream
+from issues.services.ticket_search import search_tickets
+import asyncio
 import logging
+import time
 from datetime import datetime
 from django.views.decorators.csrf import csrf_exempt
 import json
 from django.http import JsonResponse
-from .models import Ticket
-from issues.services.suggest_fix_integration import get_suggested_fix_for_issue
+from .models import ExtractionJob, SuggestionWarmup, Ticket
+from issues.services.suggestion_cache import aget_or_generate_suggestion, cache_stats
+from issues.services.batch_suggest import SUGGEST_FIELDS, asuggest_fixes_batch, get_batch_settings
+from issues.services.agent_pool import pool_health
+from issues.services.prompts import prompt_stats
+from issues.services.telemetry import prometheus_text
+from issues.services.rate_limiter import get_rate_limiter
+from issues.services.similarity import similar_tickets
+from issues.services.mcp_sessions import mcp_pool_stats
 from django.shortcuts import get_object_or_404, render
 logger = logging.getLogger(__name__)
 
+JOB_EVENTS_POLL_SECONDS = 0.5
+JOB_EVENTS_MAX_SECONDS = 30
+
 def home(request):
     return render(request, "home.html")
 
 
-def create_tickets_view(request):
+async def create_tickets_view(request):
+    """
+    Queue an extraction job for a GitHub URL and return its id right away.
+    Progress is available from job_status_view / job_events_view.
+    """
     url = request.GET.get("url")
     start_date_str = request.GET.get("start_date")
     end_date_str = request.GET.get("end_date")
@@ -30,91 +60,16 @@ def create_tickets_view(request):
     date_format = "%Y-%m-%d"
     try:
         if start_date_str:
-            start_date = datetime.strptime(start_date_str, date_format)
+            start_date = datetime.strptime(start_date_str, date_format).date()
         if end_date_str:
-            end_date = datetime.strptime(end_date_str, date_format)
+            end_date = datetime.strptime(end_date_str, date_format).date()
         if start_date and end_date and start_date > end_date:
             return JsonResponse({"error": "Start date cannot be after end date"}, status=400)
     except ValueError:
         return JsonResponse({"error": "Invalid date format, expected MM/DD/YYYY"}, status=400)
 
     try:
-        # Fetch issues from ADK agent
-        issues = get_issues_from_url(url)
-
-        logger.info(f"Received issues data: {issues}")
-
-        if not issues:
-            return JsonResponse({"error": "No issues found"}, status=404)
-
-        # Check if the first issue has an error
-        if len(issues) > 0 and "error" in issues[0]:
-            return JsonResponse({
-                "error": "Agent failed to fetch issues",
-                "details": issues[0]
-            }, status=500)
-
-        # Filter by date if created_at is available
-        if start_date or end_date:
-            filtered_issues = []
-            for issue in issues:
-                # If the agent provides 'created_at', filter by it
-                created_str = issue.get("created_at")
-                if created_str:
-                    created_at = datetime.strptime(created_str, "%Y-%m-%dT%H:%M:%SZ")
-                    if start_date and created_at < start_date:
-                        continue
-                    if end_date and created_at > end_date:
-                        continue
-                filtered_issues.append(issue)
-            issues = filtered_issues
-
-        issues = issues[:10]
-
-        saved_tickets = []
-        for issue in issues:
-            # Validate required fields
-            required_fields = ['repo', 'owner', 'issue_number', 'title', 'body']
-            missing_fields = [field for field in required_fields if field not in issue]
-
-            if missing_fields:
-                logger.warning(f"Issue missing required fields {missing_fields}: {issue}")
-                issue = fill_missing_fields(issue, url)
-                missing_fields = [field for field in required_fields if field not in issue]
-                if missing_fields:
-                    logger.error(f"Still missing fields {missing_fields} after processing: {issue}")
-                    continue
-
-            try:
-                ticket, created = Ticket.objects.get_or_create(
-                    repo=issue["repo"],
-                    owner=issue["owner"],
-                    issue_number=issue["issue_number"],
-                    defaults={
-                        "title": issue["title"][:500],
-                        "body": issue["body"][:1000] if issue["body"] else "",
-                        "labels": issue.get("labels", []),
-                        "type": issue.get("type", "issue")
-                    }
-                )
-                saved_tickets.append(ticket.id)
-                logger.info(f"{'Created' if created else 'Found existing'} ticket: {ticket}")
-            except Exception as e:
-                logger.error(f"Error saving ticket for issue {issue}: {str(e)}")
-                continue
-
-        if not saved_tickets:
-            return JsonResponse({
-                "error": "No tickets could be saved",
-                "details": "Issues may be missing required fields or filtered out by date"
-            }, status=400)
-
-        return JsonResponse({
-            "saved_ticket_ids": saved_tickets,
-            "total_processed": len(issues),
-            "total_saved": len(saved_tickets)
-        })
-
+        job = await asubmit_extraction_job(url, start_date, end_date)
     except Exception as e:
         logger.error(f"Error in create_tickets_view: {str(e)}")
         return JsonResponse({
@@ -122,33 +77,238 @@ def create_tickets_view(request):
             "details": str(e)
         }, status=500)
 
+    return JsonResponse({
+        "job_id": str(job.id),
+        "status": job.status,
+        "status_url": reverse("job_status", args=[job.id]),
+        "events_url": reverse("job_events", args=[job.id]),
+    }, status=202)
 
-def fill_missing_fields(issue, url):
-    """Try to fill missing fields from URL and issue data"""
-    import re
 
-    github_match = re.match(r'https://github\.com/([^/]+)/([^/]+)', url)
-    if github_match:
-        if 'owner' not in issue:
-            issue['owner'] = github_match.group(1)
-        if 'repo' not in issue:
-            issue['repo'] = github_match.group(2)
+def job_status_view(request, job_id):
+    """
+    Current state of an extraction job, for polling clients.
+    """
+    job = get_object_or_404(ExtractionJob, id=job_id)
+    return JsonResponse(job.as_dict())
+
+
+def _job_event(job):
+    event = "done" if job.is_finished else "progress"
+    return f"event: {event}\ndata: {json.dumps(job.as_dict())}\n\n"
 
-    issue_match = re.search(r'/issues/(\d+)', url)
-    if issue_match and 'issue_number' not in issue:
-        issue['issue_number'] = int(issue_match.group(1))
 
-    if 'title' not in issue:
-        issue['title'] = f"Issue from {url}"
-    if 'body' not in issue:
-        issue['body'] = ""
+def _log_event(event):
+    # The id lets a reconnecting EventSource resume the log (Last-Event-ID).
+    return f"id: {event.seq}\nevent: log\ndata: {json.dumps(event.as_dict())}\n\n"
 
-    return issue
+
+def _last_event_id(request):
+    try:
+        return max(int(request.headers.get("Last-Event-ID") or request.GET.get("after") or 0), 0)
+    except ValueError:
+        return 0
+
+
+def job_log_view(request, job_id):
+    """
+    A job's log as JSON, oldest first, from ?after=<seq>. ?level= drops
+    events below that level.
+    """
+    job = get_object_or_404(ExtractionJob, id=job_id)
+    level = request.GET.get("level")
+    if level and level not in LEVELS:
+        return JsonResponse({"error": f"level must be one of {', '.join(LEVELS)}"}, status=400)
+    events = job_events(job.id, after=_last_event_id(request), min_level=level)
+    return JsonResponse({
+        "job_id": str(job.id),
+        "status": job.status,
+        "events": [event.as_dict() for event in events],
+        "next_after": events[-1].seq if events else _last_event_id(request),
+    })
+
+
+async def job_events_view(request, job_id):
+    """
+    Stream job progress and its log as Server-Sent Events until the job
+    finishes. The stream is capped at JOB_EVENTS_MAX_SECONDS; EventSource
+    reconnects on its own if the job is still running by then, and picks
+    the log up after the last event it saw.
+    """
+    try:
+        job = await ExtractionJob.objects.aget(id=job_id)
+    except ExtractionJob.DoesNotExist:
+        raise Http404("No such job")
+    after = _last_event_id(request)
+
+    def event_stream():
+        deadline = time.monotonic() + JOB_EVENTS_MAX_SECONDS
+        last_seen = None
+        last_seq = after
+        yield "retry: 1000\n\n"
+        while True:
+            current = ExtractionJob.objects.get(id=job.id)
+            for event in job_events(job.id, after=last_seq):
+                last_seq = event.seq
+                yield _log_event(event)
+            if current.updated_at != last_seen:
+                last_seen = current.updated_at
+                yield _job_event(current)
+            if current.is_finished or time.monotonic() > deadline:
+                return
+            time.sleep(JOB_EVENTS_POLL_SECONDS)
+
+    async def aevent_stream():
+        deadline = time.monotonic() + JOB_EVENTS_MAX_SECONDS
+        last_seen = None
+        last_seq = after
+        yield "retry: 1000\n\n"
+        while True:
+            current = await ExtractionJob.objects.aget(id=job.id)
+            for event in await ajob_events(job.id, after=last_seq):
+                last_seq = event.seq
+                yield _log_event(event)
+            if current.updated_at != last_seen:
+                last_seen = current.updated_at
+                yield _job_event(current)
+            if current.is_finished or time.monotonic() > deadline:
+                return
+            await asyncio.sleep(JOB_EVENTS_POLL_SECONDS)
+
+    # Under ASGI an idle stream should cost a coroutine, not a thread. Under
+    # WSGI Django would buffer an async stream to the end, so poll in the
+    # request thread as before.
+    stream = aevent_stream() if isinstance(request, ASGIRequest) else event_stream()
+    response = StreamingHttpResponse(stream, content_type="text/event-stream")
+    response["Cache-Control"] = "no-cache"
+    response["X-Accel-Buffering"] = "no"
+    return response
 
 
 def view_tickets(request):
-    tickets = Ticket.objects.all().order_by("-created_at")
-    return render(request, "view_tickets.html", {"tickets": tickets})
+    queryset, filters = filter_tickets(request.GET)
+    try:
+        page_size = int(request.GET.get("page_size", DEFAULT_PAGE_SIZE))
+    except ValueError:
+        page_size = DEFAULT_PAGE_SIZE
+
+    query = request.GET.get("q", "").strip()
+    if query:
+        return _search_results(request, query, filters, page_size)
+
+    try:
+        page = keyset_page(queryset, after=request.GET.get("after"), before=request.GET.get("before"),
+                           page_size=page_size)
+    except InvalidCursor:
+        return JsonResponse({"error": "Invalid page cursor"}, status=400)
+
+    # Filters (and page size) carried over into the page links
+    link_params = dict(filters)
+    if page_size != DEFAULT_PAGE_SIZE:
+        link_params["page_size"] = page_size
+
+    return render(request, "view_tickets.html", {
+        "tickets": page.items,
+        "filters": filters,
+        "status_choices": Ticket.STATUS_CHOICES,
+        "next_query": urlencode({**link_params, "after": page.next_cursor}) if page.next_cursor else None,
+        "prev_query": urlencode({**link_params, "before": page.prev_cursor}) if page.prev_cursor else None,
+    })
+
+
+def _search_results(request, query, filters, page_size):
+    """
+    view_tickets with a search box query: best match first, paged by offset
+    since rank has no stable keyset.
+    """
+    try:
+        offset = max(int(request.GET.get("offset", 0)), 0)
+    except ValueError:
+        offset = 0
+    page = search_tickets(query, filters, limit=page_size, offset=offset)
+
+    link_params = {**filters, "q": query}
+    if page_size != DEFAULT_PAGE_SIZE:
+        link_params["page_size"] = page_size
+    return render(request, "view_tickets.html", {
+        "tickets": page.items,
+        "filters": filters,
+        "query": query,
+        "search": page,
+        "clear_query": urlencode(filters),
+        "status_choices": Ticket.STATUS_CHOICES,
+        "next_query": urlencode({**link_params, "offset": offset + len(page.items)}) if page.has_more else None,
+        "prev_query": urlencode({**link_params, "offset": max(offset - page_size, 0)}) if offset else None,
+    })
+
+
+def export_view(request, dataset):
+    """
+    Stream every ticket (or stored suggestion) matching the filters as
+    NDJSON or CSV: ?format=ndjson|csv, ?gzip=1, owner/repo/status/type as on
+    the ticket list, and ?since= / ?until= dates on created_at.
+    """
+    export_format = request.GET.get("format", "ndjson")
+    compress = request.GET.get("gzip", "").lower() in ("1", "true", "yes")
+    try:
+        stream = export_stream(dataset, request.GET, export_format, compress)
+    except ExportError as e:
+        return JsonResponse({"error": str(e)}, status=400)
+
+    async def astream():
+        # Django buffers a sync iterator to the end under ASGI, so pull the
+        # blocks one at a time in the thread that opened the query.
+        next_block = sync_to_async(lambda: next(stream, None))
+        while (block := await next_block()) is not None:
+            yield block
+
+    response = StreamingHttpResponse(
+        astream() if isinstance(request, ASGIRequest) else stream,
+        content_type="application/gzip" if compress else CONTENT_TYPES[export_format],
+    )
+    response["Content-Disposition"] = f'attachment; filename="{export_filename(dataset, export_format, compress)}"'
+    response["X-Accel-Buffering"] = "no"
+    return response
+
+
+def search_tickets_view(request):
+    """
+    Ranked full-text search over ticket title, body and labels as JSON.
+    ?q= is the query; owner/repo/status/type filter as on the ticket list;
+    ?limit= and ?offset= page through the results.
+    """
+    query = request.GET.get("q", "").strip()
+    if not query:
+        return JsonResponse({"error": "No query provided"}, status=400)
+    _, filters = filter_tickets(request.GET)
+    try:
+        limit = int(request.GET.get("limit", 0)) or None
+        offset = int(request.GET.get("offset", 0))
+    except ValueError:
+        return JsonResponse({"error": "limit and offset must be numbers"}, status=400)
+
+    page = search_tickets(query, filters, limit=limit, offset=offset)
+    return JsonResponse({
+        "query": query,
+        "backend": page.backend,
+        "query_ms": page.took_ms,
+        "has_more": page.has_more,
+        "results": [
+            {
+                "ticket_id": ticket.id,
+                "owner": ticket.owner,
+                "repo": ticket.repo,
+                "issue_number": ticket.issue_number,
+                "title": ticket.title,
+                "labels": ticket.labels,
+                "status": ticket.status,
+                "rank": ticket.rank,
+                "title_snippet": ticket.title_snippet,
+                "body_snippet": ticket.body_snippet,
+            }
+            for ticket in page.items
+        ],
+    })
 
 
 
@@ -163,6 +323,8 @@ def update_ticket(request):
         value = data['value']
 
         if field == "status":
+            if value not in dict(Ticket.STATUS_CHOICES):
+                return JsonResponse({"error": f"Invalid status {value!r}"}, status=400)
             ticket.status = value
         elif field == "assignee":
             from django.contrib.auth.models import User
@@ -171,16 +333,184 @@ def update_ticket(request):
         return JsonResponse({"success": True})
     except Exception as e:
         return JsonResponse({"error": str(e)}, status=400)
-def suggest_fix_view(request, ticket_id):
+async def suggest_fix_view(request, ticket_id):
     """
     Display the suggested fix for a ticket/issue.
+    Async so that waiting on the agent doesn't tie up a worker thread.
     """
-    ticket = get_object_or_404(Ticket, id=ticket_id)
-    
-    # Fetch suggested fix from the agent
-    suggested_fix_data = get_suggested_fix_for_issue(ticket.id)
-    
+    try:
+        ticket = await Ticket.objects.aget(id=ticket_id)
+    except Ticket.DoesNotExist:
+        raise Http404("No such ticket")
+
+    # Served from the suggestion cache unless missing, stale or ?regenerate=1
+    force = request.GET.get("regenerate") == "1"
+    suggested_fix_data, source = await aget_or_generate_suggestion(ticket, force=force)
+
     return render(request, "suggest_fix.html", {
         "ticket": ticket,
-        "suggested_fix": suggested_fix_data
-    })
\ No newline at end of file
+        "suggested_fix": suggested_fix_data,
+        "suggestion_source": source,
+    })
+
+
+def similar_tickets_view(request, ticket_id):
+    """
+    The tickets most similar to this one by title and body (MinHash
+    estimate of Jaccard similarity). ?k= sets how many, ?min= the cut-off.
+    """
+    ticket = get_object_or_404(Ticket.objects.only("id", "title", "body"), id=ticket_id)
+    try:
+        k = min(max(int(request.GET.get("k", 10)), 1), 100)
+        threshold = float(request.GET.get("min", 0.3))
+    except ValueError:
+        return JsonResponse({"error": "k and min must be numbers"}, status=400)
+
+    started = time.perf_counter()
+    neighbours = similar_tickets(ticket, k=k, threshold=threshold)
+    query_ms = (time.perf_counter() - started) * 1000
+    found = Ticket.objects.in_bulk([ticket_id for ticket_id, _ in neighbours])
+    return JsonResponse({
+        "ticket_id": ticket.id,
+        "query_ms": round(query_ms, 3),
+        "similar": [
+            {
+                "ticket_id": other_id,
+                "similarity": similarity,
+                "owner": found[other_id].owner,
+                "repo": found[other_id].repo,
+                "issue_number": found[other_id].issue_number,
+                "title": found[other_id].title,
+            }
+            for other_id, similarity in neighbours
+            if other_id in found
+        ],
+    })
+
+
+def _batch_body_error(data):
+    if not isinstance(data, dict):
+        return "Expected a JSON object"
+    ticket_ids = data.get("ticket_ids")
+    if ticket_ids is not None and not (
+        isinstance(ticket_ids, list) and all(type(ticket_id) is int for ticket_id in ticket_ids)
+    ):
+        return "ticket_ids must be a list of integers"
+    filters = data.get("filters")
+    if filters is not None:
+        if not isinstance(filters, dict) or not all(isinstance(value, str) for value in filters.values()):
+            return "filters must be an object of strings"
+        unknown = sorted(set(filters) - set(FILTER_FIELDS))
+        if unknown:
+            return f"Unknown filters: {', '.join(unknown)} (expected {', '.join(FILTER_FIELDS)})"
+    return None
+
+
+async def suggest_fixes_batch_view(request):
+    """
+    Suggest fixes for many tickets at once. POST a JSON body with either
+    "ticket_ids" or "filters" (owner/repo/status/type), plus optional "force".
+    Async, like suggest_fix_view, so a batch of up to VIEW_LIMIT tickets
+    waits on the agent without tying up a worker thread.
+    """
+    if request.method != "POST":
+        return JsonResponse({"error": "POST required"}, status=400)
+    try:
+        data = json.loads(request.body or "{}")
+    except ValueError:
+        return JsonResponse({"error": "Invalid JSON body"}, status=400)
+    error = _batch_body_error(data)
+    if error:
+        return JsonResponse({"error": error}, status=400)
+
+    limit = get_batch_settings()["VIEW_LIMIT"]
+    if data.get("ticket_ids"):
+        tickets = Ticket.objects.filter(id__in=data["ticket_ids"]).order_by("id")
+    else:
+        tickets, _ = filter_tickets(data.get("filters") or {"status": Ticket.STATUS_UNSOLVED})
+        tickets = tickets.only(*SUGGEST_FIELDS).order_by("-created_at", "-id")
+    tickets = [ticket async for ticket in tickets[:limit]]
+    if not tickets:
+        return JsonResponse({"error": "No matching tickets"}, status=404)
+
+    result = await asuggest_fixes_batch(tickets, force=bool(data.get("force")))
+    return JsonResponse({
+        "tickets": len(tickets),
+        "suggested": len(result.suggestions),
+        "failed": result.failed,
+        "batches": result.batches,
+        "retried": result.retried,
+        "elapsed_seconds": round(result.elapsed, 3),
+        "tickets_per_minute": result.tickets_per_minute,
+        "results": [
+            {"ticket_id": ticket.id, "source": result.sources.get(ticket.id), "suggestion": result.suggestions.get(ticket.id)}
+            for ticket in tickets
+        ],
+    })
+
+
+# csrf_exempt() wraps views in a sync function before Django 5.0.
+suggest_fixes_batch_view.csrf_exempt = True
+
+
+def agent_pool_health(request):
+    """
+    Report the state of the warm ADK agent worker pools.
+    """
+    pools = pool_health()
+    healthy = all(pool["healthy"] > 0 for pool in pools)
+    return JsonResponse({"healthy": healthy, "pools": pools}, status=200 if healthy else 503)
+
+
+def mcp_pool_view(request):
+    """
+    Report utilization of the shared GitHub MCP session pool.
+    """
+    stats = mcp_pool_stats()
+    if stats is None:
+        return JsonResponse({"started": False})
+    return JsonResponse({"started": True, **stats})
+
+
+def agent_limits_view(request):
+    """
+    Current admission limits for agent calls: adaptive concurrency window,
+    token buckets, in-flight calls per traffic class and throttle counters.
+    """
+    limiter = get_rate_limiter()
+    if limiter is None:
+        return JsonResponse({"enabled": False})
+    return JsonResponse({"enabled": True, **limiter.snapshot()})
+
+
+def metrics_view(request):
+    """
+    This process's OpenTelemetry metrics in the Prometheus text format.
+    Each server process keeps its own; use OTLP export to aggregate them.
+    """
+    text = prometheus_text()
+    if text is None:
+        raise Http404("Prometheus metrics are disabled")
+    return HttpResponse(text, content_type="text/plain; version=0.0.4; charset=utf-8")
+
+
+def prompt_stats_view(request):
+    """
+    Prompt sizes per agent, before and after compaction.
+    """
+    return JsonResponse({"agents": prompt_stats()})
+
+
+def suggestion_cache_stats(request):
+    """
+    Hit/miss counters for the suggested-fix cache.
+    """
+    return JsonResponse(cache_stats())
+
+
+def suggestion_warmup_status(request):
+    """
+    Progress of the most recent suggestion warm-up runs.
+    """
+    runs = SuggestionWarmup.objects.order_by("-id")[:10]
+    return JsonResponse({"runs": [run.as_dict() for run in runs]})